@@ -0,0 +1,546 @@
+"""Screen capture for the screen tools.
+
+- Backends stay open between grabs: DXGI desktop duplication via ``dxcam``
+  on Windows, ``mss`` (GDI on Windows, XShm on X11, so it also runs under
+  Xvfb), ``pyautogui`` as the last resort, and ``FrameBuffer``, an
+  in-memory screen for tests and headless runs. ``SCREEN_CAPTURE_BACKEND``
+  picks one (``auto`` tries them in that order).
+- measure_change(): grey-level difference on a tile grid (NumPy when
+  installed, PIL otherwise) with the changed-pixel ratio and changed cells.
+- ScreenCapture: grabs frames and reports dirty rectangles, the screen
+  tiles that changed since the previous full-screen grab (or since the last
+  grab under the same named baseline, e.g. the screenshot tool's).
+- render_screenshot(): downscale, paste the cached coordinate-grid overlay
+  in one pass, and encode JPEG without the slow ``optimize`` pass;
+  contact_sheet() tiles several frames into one image.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from PIL import Image, ImageChops, ImageDraw
+
+from core.tracing import traced
+
+try:
+    import pyautogui
+except Exception:  # pragma: no cover - headless environments
+    pyautogui = None
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import mss
+except Exception:
+    mss = None
+
+try:
+    import dxcam  # type: ignore
+except Exception:
+    dxcam = None
+
+log = logging.getLogger(__name__)
+
+# auto | dxcam | mss | pyautogui | framebuffer
+CAPTURE_BACKEND = os.environ.get("SCREEN_CAPTURE_BACKEND", "auto").strip().lower() or "auto"
+
+DIRTY_TILE = 32             # dirty rectangles are reported on this grid (screen pixels)
+DIRTY_THRESHOLD = 10        # grey-level difference that counts as a change
+GRID_STEP = 200             # coordinate grid spacing on screenshots (displayed pixels)
+JPEG_QUALITY = 75
+
+Rect = tuple[int, int, int, int]    # x, y, width, height
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+class FrameBuffer:
+    """In-memory screen: draw into ``image``; grabs return copies."""
+
+    name = "framebuffer"
+
+    def __init__(self, width: int = 1280, height: int = 720, color=(0, 0, 0)):
+        self.image = Image.new("RGB", (width, height), color)
+
+    def size(self) -> tuple[int, int]:
+        return self.image.size
+
+    def grab(self, region: Rect | None = None) -> Image.Image:
+        if region is None:
+            return self.image.copy()
+        x, y, w, h = region
+        return self.image.crop((x, y, x + w, y + h))
+
+    def close(self) -> None:
+        pass
+
+
+class PyAutoGuiBackend:
+    """pyautogui.screenshot(): a fresh full-screen grab every call."""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        if pyautogui is None:
+            raise RuntimeError("pyautogui is not available")
+
+    def size(self) -> tuple[int, int]:
+        w, h = pyautogui.size()
+        return int(w), int(h)
+
+    def grab(self, region: Rect | None = None) -> Image.Image:
+        img = pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
+        return img if img.mode == "RGB" else img.convert("RGB")
+
+    def close(self) -> None:
+        pass
+
+
+class MssBackend:
+    """mss, one handle per thread (its device contexts belong to the opening thread)."""
+
+    name = "mss"
+
+    def __init__(self):
+        if mss is None:
+            raise RuntimeError("mss is not installed")
+        self._local = threading.local()
+        self._sct()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def size(self) -> tuple[int, int]:
+        mon = self._sct().monitors[1]
+        return mon["width"], mon["height"]
+
+    def grab(self, region: Rect | None = None) -> Image.Image:
+        sct = self._sct()
+        mon = sct.monitors[1]
+        if region is not None:
+            x, y, w, h = region
+            mon = {"left": mon["left"] + x, "top": mon["top"] + y, "width": w, "height": h}
+        shot = sct.grab(mon)
+        return Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+
+    def close(self) -> None:
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+class DxcamBackend:
+    """DXGI desktop duplication (Windows 8+).
+
+    The duplication session stays open. DXGI hands out a frame only when the
+    desktop changed; otherwise the previous image object is returned, which
+    ScreenCapture recognises as "nothing changed" without diffing.
+    """
+
+    name = "dxcam"
+
+    def __init__(self):
+        if dxcam is None or sys.platform != "win32":
+            raise RuntimeError("dxcam is not available")
+        self._camera = dxcam.create(output_color="RGB")
+        if self._camera is None:
+            raise RuntimeError("no DXGI output")
+        self._lock = threading.Lock()
+        self._last: Image.Image | None = None
+
+    def size(self) -> tuple[int, int]:
+        return int(self._camera.width), int(self._camera.height)
+
+    def grab(self, region: Rect | None = None) -> Image.Image:
+        with self._lock:
+            frame = self._camera.grab()
+            tries = 0
+            while frame is None and self._last is None and tries < 20:
+                time.sleep(0.01)        # the first frame can take a moment to arrive
+                frame = self._camera.grab()
+                tries += 1
+            if frame is not None:
+                self._last = Image.fromarray(frame)
+            elif self._last is None:
+                raise RuntimeError("DXGI returned no frame")
+            img = self._last
+        if region is None:
+            return img
+        x, y, w, h = region
+        return img.crop((x, y, x + w, y + h))
+
+    def close(self) -> None:
+        try:
+            self._camera.release()
+        except Exception:
+            pass
+
+
+_BACKENDS = {
+    "dxcam": DxcamBackend,
+    "mss": MssBackend,
+    "pyautogui": PyAutoGuiBackend,
+    "framebuffer": FrameBuffer,
+}
+
+
+def create_backend(name: str = CAPTURE_BACKEND):
+    """The named backend, or for ``auto`` the first of dxcam, mss, pyautogui that opens."""
+    names = ("dxcam", "mss", "pyautogui") if name == "auto" else (name,)
+    for n in names:
+        cls = _BACKENDS.get(n)
+        if cls is None:
+            log.warning("Unknown SCREEN_CAPTURE_BACKEND %r", n)
+            continue
+        try:
+            backend = cls()
+        except Exception as e:
+            log.debug("capture backend %s unavailable: %s", n, e)
+            continue
+        log.debug("screen capture backend: %s", backend.name)
+        return backend
+    return PyAutoGuiBackend()
+
+
+# ── Change detection ──────────────────────────────────────────────────────────
+
+def grey(img: Image.Image) -> Image.Image:
+    return img if img.mode == "L" else img.convert("L")
+
+
+@dataclass
+class Change:
+    """How two frames differ, measured on a grid of ``tile``-pixel cells."""
+
+    ratio: float        # share of pixels whose grey level moved past the threshold
+    cols: int
+    rows: int
+    tile: int
+    mask: bytes         # one byte per cell, row-major; non-zero = changed
+
+    @property
+    def tiles(self) -> list[tuple[int, int]]:
+        """(column, row) of every changed cell."""
+        return [(i % self.cols, i // self.cols) for i, v in enumerate(self.mask) if v]
+
+    @property
+    def tile_ratio(self) -> float:
+        return sum(1 for v in self.mask if v) / float(len(self.mask) or 1)
+
+    def rects(self, size: tuple[int, int]) -> list[Rect]:
+        """Changed cells as rectangles (x, y, w, h) clipped to ``size``.
+
+        Cells changed in one row are merged into spans, and identical spans in
+        consecutive rows into one rectangle.
+        """
+        w, h = size
+        tile, cols, data = self.tile, self.cols, self.mask
+        rects: list[Rect] = []
+        open_spans: dict[tuple[int, int], int] = {}     # (x0, x1) -> index in rects
+        for r in range(self.rows):
+            spans = []
+            c = 0
+            while c < cols:
+                if data[r * cols + c]:
+                    start = c
+                    while c < cols and data[r * cols + c]:
+                        c += 1
+                    spans.append((start, c))
+                else:
+                    c += 1
+            next_open = {}
+            for c0, c1 in spans:
+                x0, x1 = c0 * tile, min(c1 * tile, w)
+                y0, y1 = r * tile, min((r + 1) * tile, h)
+                i = open_spans.get((x0, x1))
+                if i is not None:
+                    x, y, rw, _ = rects[i]
+                    rects[i] = (x, y, rw, y1 - y)
+                else:
+                    i = len(rects)
+                    rects.append((x0, y0, x1 - x0, y1 - y0))
+                next_open[(x0, x1)] = i
+            open_spans = next_open
+        return rects
+
+
+def _change_np(a: Image.Image, b: Image.Image, tile: int, threshold: int, min_pixels: int) -> Change:
+    w, h = b.size
+    cols, rows = -(-w // tile), -(-h // tile)
+    ga, gb = np.asarray(a), np.asarray(b)
+    hit = (np.maximum(ga, gb) - np.minimum(ga, gb)) > threshold     # no int16 round trip
+    changed = int(np.count_nonzero(hit))
+    if not changed:
+        return Change(0.0, cols, rows, tile, bytes(cols * rows))
+    if rows * tile != h or cols * tile != w:
+        hit = np.pad(hit, ((0, rows * tile - h), (0, cols * tile - w)))
+    # Sum tile rows first (short uint16 sums), then tile columns
+    counts = (hit.view(np.uint8).reshape(rows, tile, cols * tile).sum(axis=1, dtype=np.uint16)
+              .reshape(rows, cols, tile).sum(axis=2, dtype=np.uint32))
+    mask = (counts >= min_pixels).astype(np.uint8).tobytes()
+    return Change(changed / float(w * h), cols, rows, tile, mask)
+
+
+def _change_pil(a: Image.Image, b: Image.Image, tile: int, threshold: int, min_pixels: int) -> Change:
+    w, h = b.size
+    cols, rows = -(-w // tile), -(-h // tile)
+    hit = ImageChops.difference(a, b).point([1 if p > threshold else 0 for p in range(256)])
+    changed = hit.histogram()[1]
+    if not changed:
+        return Change(0.0, cols, rows, tile, bytes(cols * rows))
+    # reduce() averages over the pixels a cell actually has (edge cells are smaller)
+    means = array("f", hit.convert("F").reduce(tile).tobytes())
+    mask = bytearray(cols * rows)
+    for i, m in enumerate(means):
+        if m:
+            cw = min(tile, w - (i % cols) * tile)
+            ch = min(tile, h - (i // cols) * tile)
+            mask[i] = m * cw * ch + 0.5 >= min_pixels
+    return Change(changed / float(w * h), cols, rows, tile, bytes(mask))
+
+
+def measure_change(prev: Image.Image, cur: Image.Image, *, tile: int = DIRTY_TILE,
+                   threshold: int = DIRTY_THRESHOLD, min_pixels: int = 1) -> Change:
+    """Compare two same-sized frames in grey levels.
+
+    A cell counts as changed when at least ``min_pixels`` of its pixels moved
+    by more than ``threshold``. Uses NumPy when installed, PIL otherwise.
+    """
+    if prev.size != cur.size:
+        raise ValueError(f"frame sizes differ: {prev.size} vs {cur.size}")
+    a, b = grey(prev), grey(cur)
+    if np is not None:
+        return _change_np(a, b, tile, threshold, min_pixels)
+    return _change_pil(a, b, tile, threshold, min_pixels)
+
+
+def dirty_rects(prev: Image.Image, cur: Image.Image, *, tile: int = DIRTY_TILE,
+                threshold: int = DIRTY_THRESHOLD) -> list[Rect]:
+    """Rectangles (x, y, w, h) of ``tile``-sized cells that differ between two frames."""
+    if prev is cur:
+        return []
+    if prev.size != cur.size:
+        return [(0, 0, *cur.size)]
+    return measure_change(prev, cur, tile=tile, threshold=threshold).rects(cur.size)
+
+
+@dataclass
+class Frame:
+    image: Image.Image
+    timestamp: float
+    # Changed areas (screen pixels) since the baseline frame; None when there
+    # was no baseline, i.e. everything is new
+    dirty: list[Rect] | None = None
+    region: Rect | None = None
+    _grey: Image.Image | None = field(default=None, repr=False, compare=False)
+
+    def grey(self) -> Image.Image:
+        """Grey-level copy used for change detection (converted once per frame)."""
+        if self._grey is None:
+            self._grey = grey(self.image)
+        return self._grey
+
+    @property
+    def changed(self) -> bool:
+        return self.dirty is None or bool(self.dirty)
+
+    def dirty_ratio(self) -> float:
+        if self.dirty is None:
+            return 1.0
+        w, h = self.image.size
+        return sum(rw * rh for _, _, rw, rh in self.dirty) / float(w * h or 1)
+
+    def dirty_bbox(self) -> Rect | None:
+        """One rectangle around every dirty rectangle (None when nothing changed)."""
+        if self.dirty is None:
+            return (0, 0, *self.image.size)
+        if not self.dirty:
+            return None
+        x0 = min(x for x, _, _, _ in self.dirty)
+        y0 = min(y for _, y, _, _ in self.dirty)
+        x1 = max(x + w for x, _, w, _ in self.dirty)
+        y1 = max(y + h for _, y, _, h in self.dirty)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+
+class ScreenCapture:
+    """Grabs frames from one long-lived backend and tracks what changed."""
+
+    def __init__(self, backend=None, *, tile: int = DIRTY_TILE, threshold: int = DIRTY_THRESHOLD):
+        self.backend = backend if backend is not None else create_backend()
+        self.tile = tile
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._prev: Frame | None = None
+        self._prev_stale = False
+        self._baselines: dict[str, Frame] = {}
+
+    def size(self) -> tuple[int, int]:
+        return self.backend.size()
+
+    @traced("screen.grab", cat="screen")
+    def grab(self, region: Rect | None = None, *, since: Frame | None = None, baseline: str = "") -> Frame:
+        """Capture the screen (or ``region``).
+
+        Full-screen grabs get ``dirty`` rectangles relative to ``since`` when
+        given, otherwise relative to the previous full-screen grab made
+        through this object. With ``baseline`` the reference is instead the
+        last grab made under that name, which only such grabs move, so e.g.
+        OCR grabs in between don't hide a change from the screenshot tool.
+        Region grabs don't compute or move any baseline.
+        """
+        with self._lock:
+            img = self.backend.grab(region)
+            if region is not None:
+                return Frame(img, time.time(), None, region)
+            frame = Frame(img, time.time())
+            if baseline:
+                base = self._baselines.get(baseline)
+                self._baselines[baseline] = frame
+            else:
+                base = since if since is not None and since.region is None else self._prev
+            if base is not None:
+                frame.dirty = self._diff(base, frame)
+            self._prev = frame
+            self._prev_stale = False
+        return frame
+
+    def latest(self, max_age: float = 0.5) -> Frame:
+        """The last full-screen frame when at most ``max_age`` seconds old and
+        not invalidated since, otherwise a new grab."""
+        with self._lock:
+            prev = None if self._prev_stale else self._prev
+        if prev is not None and time.time() - prev.timestamp <= max_age:
+            return prev
+        return self.grab()
+
+    def invalidate(self) -> None:
+        """The screen was just driven (click, typing...): latest() must not reuse
+        the last frame. Dirty-rect baselines are kept."""
+        with self._lock:
+            self._prev_stale = True
+
+    def _diff(self, base: Frame, frame: Frame) -> list[Rect]:
+        if base.image is frame.image:
+            return []
+        if base.image.size != frame.image.size:
+            return [(0, 0, *frame.image.size)]
+        change = measure_change(base.grey(), frame.grey(), tile=self.tile, threshold=self.threshold)
+        return change.rects(frame.image.size)
+
+    def reset(self) -> None:
+        """Forget the baselines; the next grab reports the whole screen as new."""
+        with self._lock:
+            self._prev = None
+            self._baselines.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._prev = None
+            self._baselines.clear()
+            self.backend.close()
+
+
+_capture: ScreenCapture | None = None
+_capture_lock = threading.Lock()
+
+
+def get_capture() -> ScreenCapture:
+    """Process-wide ScreenCapture (the backend is opened on first use)."""
+    global _capture
+    if _capture is None:
+        with _capture_lock:
+            if _capture is None:
+                _capture = ScreenCapture()
+    return _capture
+
+
+def invalidate_latest() -> None:
+    """Mark the shared capture's last frame stale (no backend is opened for it)."""
+    if _capture is not None:
+        _capture.invalidate()
+
+
+# ── Rendering ─────────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=8)
+def grid_overlay(size: tuple[int, int], screen_size: tuple[int, int], step: int = GRID_STEP) -> Image.Image:
+    """Transparent RGBA layer with the red coordinate grid, labelled in screen pixels."""
+    w, h = size
+    sw, sh = screen_size
+    scale_x = w / float(sw or w)
+    scale_y = h / float(sh or h)
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    for x in range(0, w, step):
+        draw.line([(x, 0), (x, h)], fill=(255, 0, 0, 255), width=1)
+        draw.text((x + 2, 2), str(int(x / scale_x)), fill=(255, 0, 0, 255))
+    for y in range(0, h, step):
+        draw.line([(0, y), (w, y)], fill=(255, 0, 0, 255), width=1)
+        draw.text((2, y + 2), str(int(y / scale_y)), fill=(255, 0, 0, 255))
+    return layer
+
+
+def fit_width(img: Image.Image, max_width: int) -> Image.Image:
+    """Downscale to ``max_width`` (new image), or return a copy when already narrow enough."""
+    w, h = img.size
+    if w <= max_width:
+        return img.copy()
+    # reducing_gap=1: box-reduce by the integer factor first, then a cheap bilinear pass
+    return img.resize((max_width, int(h * max_width / w)), Image.Resampling.BILINEAR, reducing_gap=1.0)
+
+
+def save_jpeg(img: Image.Image, path: str, quality: int = JPEG_QUALITY) -> None:
+    """Baseline JPEG without ``optimize`` (the extra Huffman pass costs more than it saves here)."""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img.save(path, "JPEG", quality=quality)
+
+
+@traced("screen.encode", cat="screen")
+def render_screenshot(img: Image.Image, path: str, *, screen_size: tuple[int, int],
+                      max_width: int, grid: bool = True) -> tuple[int, int]:
+    """Downscale ``img``, composite the grid overlay and write a JPEG. Returns the saved size."""
+    out = fit_width(img, max_width)
+    if out.mode != "RGB":
+        out = out.convert("RGB")
+    if grid:
+        overlay = grid_overlay(out.size, tuple(screen_size))
+        out.paste(overlay, (0, 0), overlay)
+    save_jpeg(out, path)
+    return out.size
+
+
+def contact_sheet(images: list[Image.Image], path: str, *, labels: list[str] | None = None,
+                  columns: int = 3, width: int = 960) -> tuple[int, int]:
+    """Tile ``images`` into one JPEG ``width`` pixels wide, each with its label. Returns the saved size."""
+    if not images:
+        raise ValueError("no images")
+    columns = max(1, min(columns, len(images)))
+    cell_w = width // columns
+    cells = [fit_width(img, cell_w) for img in images]
+    cell_h = max(c.height for c in cells)
+    rows = -(-len(cells) // columns)
+    sheet = Image.new("RGB", (cell_w * columns, cell_h * rows), (0, 0, 0))
+    draw = ImageDraw.Draw(sheet)
+    for i, cell in enumerate(cells):
+        x, y = (i % columns) * cell_w, (i // columns) * cell_h
+        sheet.paste(cell.convert("RGB") if cell.mode != "RGB" else cell, (x, y))
+        if labels:
+            draw.rectangle((x, y, x + 8 + 7 * len(labels[i]), y + 14), fill=(0, 0, 0))
+            draw.text((x + 4, y + 2), labels[i], fill=(255, 255, 0))
+    save_jpeg(sheet, path)
+    return sheet.size
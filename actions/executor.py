@@ -1,3 +1,5 @@
+import ctypes
+import glob
 import json
 import subprocess
 import time
@@ -5,21 +7,44 @@ import os
 import re
 import hashlib
 import threading
+import webbrowser
+import zipfile
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import psutil
 import pyautogui
-import requests
-from PIL import ImageChops
 
-from memory.store import MemoryStore
+from memory.store import get_store
+from core import http_client
+from core.op_log import backup_file, log_op
 from core.task_manager import TaskManager
 from core.skill_manager import SkillManager
+from core.tracing import span
 from actions import web_helpers as _web_helpers
+from actions.capture import (
+    contact_sheet, fit_width, get_capture, invalidate_latest, measure_change, render_screenshot, save_jpeg,
+)
+from actions.ocr import get_ocr
+from actions.template_match import DEFAULT_SCALES, get_matcher
+from actions.tool_registry import ToolRegistry, ToolSpec
+
+try:
+    import win32clipboard  # type: ignore
+    import win32con  # type: ignore
+except Exception:  # pragma: no cover - pywin32 is optional, ctypes fallback below
+    win32clipboard = None
+    win32con = None
+
+try:
+    import winreg  # type: ignore
+except Exception:  # pragma: no cover - Windows only
+    winreg = None
 from actions.input_win32 import (
     mouse_click, mouse_double_click, mouse_move, mouse_scroll,
     hotkey as win32_hotkey, key_press as win32_key_press, type_text as win32_type_text,
 )
 
-_memory = MemoryStore()
 _task_mgr = TaskManager()
 _skill_manager = SkillManager()
 _screen_lock = threading.Lock()
@@ -90,8 +115,17 @@ TOOLS_SCHEMA = [
         "type": "function",
         "function": {
             "name": "screenshot",
-            "description": "Take a screenshot and return it for analysis",
-            "parameters": {"type": "object", "properties": {}, "required": []},
+            "description": "Take a screenshot and return it for analysis. The result lists the screen areas that changed since the previous screenshot.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "changed_only": {
+                        "type": "boolean",
+                        "description": "Only return the area that changed since the previous screenshot (cheaper when checking the effect of an action)",
+                    },
+                },
+                "required": [],
+            },
         },
     },
     {
@@ -115,8 +149,14 @@ TOOLS_SCHEMA = [
         "type": "function",
         "function": {
             "name": "read_screen_text",
-            "description": "OCR: extract all visible text from the current screen. Much more accurate than reading text from screenshots visually.",
-            "parameters": {"type": "object", "properties": {}, "required": []},
+            "description": "OCR: extract all visible text from the current screen. Much more accurate than reading text from screenshots visually. With find, returns the screen coordinates of that text instead, ready to click.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "find": {"type": "string", "description": "Only locate this text and return where it is"},
+                },
+                "required": [],
+            },
         },
     },
     {
@@ -214,7 +254,7 @@ TOOLS_SCHEMA = [
         "type": "function",
         "function": {
             "name": "watch_screen",
-            "description": "Periodically screenshot the screen to observe changes (e.g. watching a video). Returns key frames where the screen changed significantly.",
+            "description": "Periodically screenshot the screen to observe changes (e.g. watching a video). Returns the key frames where the screen changed significantly as one contact-sheet image, plus when each was taken and how much changed.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -495,7 +535,7 @@ TOOLS_SCHEMA = [
         "type": "function",
         "function": {
             "name": "wait_for_text",
-            "description": "Wait until specific text appears on screen (OCR polling). Returns when found or timeout.",
+            "description": "Wait until specific text appears on screen (OCR polling). Returns when found (with its screen coordinates, ready to click) or on timeout.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -646,12 +686,23 @@ TOOLS_SCHEMA = [
         "type": "function",
         "function": {
             "name": "find_image",
-            "description": "Find a saved image on screen and return its center coordinates. Use to locate buttons/icons reliably.",
+            "description": "Find a saved image on screen and return its center coordinates (plus every other match with its score). Use to locate buttons/icons reliably.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "image_path": {"type": "string", "description": "Path to the template image file"},
                     "confidence": {"type": "number", "description": "Match confidence 0-1, default 0.8"},
+                    "region": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "description": "Only search this area: [x, y, width, height]",
+                    },
+                    "multi_scale": {
+                        "type": "boolean",
+                        "description": "Also try the template scaled (for DPI-scaled displays), default true",
+                    },
+                    "grayscale": {"type": "boolean", "description": "Match in grayscale only (faster), default false"},
+                    "max_results": {"type": "integer", "description": "Most matches to return, default 5"},
                 },
                 "required": ["image_path"],
             },
@@ -799,35 +850,41 @@ SCREENSHOT_PATH = os.path.join(_BASE_DIR, "logs", "screen.jpg")
 os.makedirs(os.path.join(_BASE_DIR, "logs"), exist_ok=True)
 
 _SCREENSHOT_MAX_WIDTH = 960
-_WATCH_CHANGE_RATIO = 0.01
+_SCREENSHOT_MAX_DIRTY = 8  # changed rectangles listed in a screenshot result
+_FIND_IMAGE_MAX_AGE = 0.3  # find_image reuses a captured frame this recent (seconds)
+_WATCH_CHANGE_RATIO = 0.01  # share of changed cells that makes a key frame
+_WATCH_TILE = 16  # cell size on the downscaled frame
+_WATCH_MIN_PIXELS = 4  # changed pixels before a cell counts (ignores noise)
+_WATCH_MAX_FRAMES = 9  # key frames kept in memory and shown on the contact sheet
 _TEXT_CHUNK = 6_000
 _DISCORD_EMBED_MAX = 4000
 
-_page_cache: dict = {}          # url -> (text, timestamp)
-_page_cache_lock = threading.Lock()
-_PAGE_CACHE_TTL = 300           # 5 minutes
-
 _SCREEN_TOOL_NAMES = {
     "click", "double_click", "drag", "type_text", "hotkey", "key_press",
     "move_to", "scroll", "screenshot", "screenshot_region", "read_screen_text",
     "watch_screen", "wait_for_text", "window_list", "window_focus", "window_resize",
 }
-# 后台任务可用的工具（不含屏幕操作，避免与前台任务冲突）
-BG_TOOLS_SCHEMA = [t for t in TOOLS_SCHEMA if t["function"]["name"] not in _SCREEN_TOOL_NAMES]
+# Concurrency classes (declared per tool at registration, see _tool below):
+#   io        - network / disk reads, safe to overlap freely
+#   cpu       - heavy local work, overlaps but bounded by _CPU_SLOTS
+#   screen    - touches mouse/keyboard/screen, run one at a time in call order
+#   exclusive - side effects; acts as a barrier (default for anything unlisted)
+_TOOL_WORKERS = 4
+_CPU_SLOTS = threading.BoundedSemaphore(max(1, (os.cpu_count() or 2) // 2))
+
+_registry = ToolRegistry()
+_registry.attach_skills(_skill_manager)
+_tool = _registry.tool
 
 
 def get_tools_schema() -> list[dict]:
-    """Built-in tools + dynamically loaded skill tools."""
-    return TOOLS_SCHEMA + _skill_manager.tools_schema
+    """Built-in tools + dynamically loaded skill tools (built once per skill change)."""
+    return _registry.tools_schema()
 
 
 def get_bg_tools_schema() -> list[dict]:
     """Built-in background tools + skill tools (screen tools excluded)."""
-    skill_tools = [
-        t for t in _skill_manager.tools_schema
-        if t["function"]["name"] not in _SCREEN_TOOL_NAMES
-    ]
-    return BG_TOOLS_SCHEMA + skill_tools
+    return _registry.tools_schema(background=True)
 
 
 # ---- Web helpers (search, extraction, cache) ----
@@ -852,10 +909,28 @@ def _fetch_url_text(url: str) -> str:
     return _web_helpers.fetch_url_text(url)
 
 
+def _payload_size(value) -> int:
+    """Rough size of a tool argument or result for tracing (characters, not bytes on the wire)."""
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+    except Exception:
+        return 0
+
+
 def execute(action: dict) -> dict:
     """Execute a single action and return a structured result."""
     name = action["name"]
-    args = action.get("arguments", {})
+    with span(f"tool.{name}", cat="tool", args_size=_payload_size(action.get("arguments"))) as sp:
+        result = _execute(name, action.get("arguments", {}), sp)
+        sp.set(ok=bool(result.get("ok")), result_size=_payload_size(result.get("result")))
+        return result
+
+
+def _execute(name: str, args, sp) -> dict:
     if isinstance(args, str):
         try:
             args = json.loads(args)
@@ -868,33 +943,97 @@ def execute(action: dict) -> dict:
             except json.JSONDecodeError as e:
                 return {"ok": False, "result": f"Invalid tool arguments JSON: {e}"}
 
-    # 坐标越界检查
-    if name in ("click", "double_click", "move_to", "scroll"):
-        sw, sh = pyautogui.size()
-        x, y = args.get("x", 0), args.get("y", 0)
-        if not (0 <= x < sw and 0 <= y < sh):
-            return {"ok": False, "result": f"坐标 ({x},{y}) 超出屏幕范围 ({sw}x{sh})"}
-    elif name == "drag":
-        sw, sh = pyautogui.size()
-        for px, py in [(args.get("x1",0), args.get("y1",0)), (args.get("x2",0), args.get("y2",0))]:
-            if not (0 <= px < sw and 0 <= py < sh):
-                return {"ok": False, "result": f"坐标 ({px},{py}) 超出屏幕范围 ({sw}x{sh})"}
-
-    SCREEN_ACTIONS = {
-        "click", "double_click", "drag", "type_text", "hotkey",
-        "key_press", "move_to", "scroll", "screenshot",
-        "screenshot_region", "read_screen_text", "wait_for_text",
-        # watch_screen is excluded: it handles _screen_lock internally to avoid
-        # holding the lock during sleep intervals
-    }
-    if name in SCREEN_ACTIONS:
+    spec = _registry.get(name)
+    if spec is None:
+        return {"ok": False, "result": f"Unknown action: {name}"}
+    try:
+        error = spec.check(args)
+    except Exception as e:
+        error = str(e)
+    if error:
+        return {"ok": False, "result": error}
+
+    # watch_screen is registered without screen_lock: it handles _screen_lock
+    # internally to avoid holding the lock during sleep intervals
+    if spec.screen_lock:
         with _screen_lock:
-            return _do_execute(name, args)
-    return _do_execute(name, args)
+            sp.mark("lock_wait")
+            return _do_execute(spec, args)
+    return _do_execute(spec, args)
+
+
+def _do_execute(spec: ToolSpec, args: dict) -> dict:
+    """实际执行逻辑。"""
+    try:
+        result = spec.handler(args)
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
+    if result is None:
+        return {"ok": False, "result": f"Unknown action: {spec.name}"}
+    return result
+
+
+def tool_concurrency(name: str) -> str:
+    """Concurrency class of a tool (built-in registration or skill META)."""
+    spec = _registry.get(name)
+    return spec.concurrency if spec is not None else "exclusive"
+
+
+def _execute_safe(action: dict) -> dict:
+    try:
+        return execute(action)
+    except Exception as e:
+        return {"ok": False, "result": f"执行 {action.get('name', '')} 出错: {e}"}
+
+
+def _execute_cpu(action: dict) -> dict:
+    with _CPU_SLOTS:
+        return _execute_safe(action)
+
+
+def execute_many(actions: list[dict]) -> list[dict]:
+    """Execute several tool calls from one model turn; results keep input order.
+
+    io/cpu tools overlap in a bounded thread pool, screen tools run one after
+    another in call order, and an exclusive tool waits for everything before
+    it and blocks everything after it.
+    """
+    if len(actions) <= 1:
+        return [_execute_safe(a) for a in actions]
+    results: list[dict | None] = [None] * len(actions)
+
+    def _run_screen_chain(items: list[tuple[int, dict]]):
+        for i, a in items:
+            results[i] = _execute_safe(a)
+
+    with ThreadPoolExecutor(max_workers=min(_TOOL_WORKERS, len(actions)),
+                            thread_name_prefix="starbot-tool") as ex:
+        futures = []
+        screen_chain: list[tuple[int, dict]] = []
+
+        def _flush():
+            if screen_chain:
+                futures.append(ex.submit(_run_screen_chain, list(screen_chain)))
+                screen_chain.clear()
+            for f in futures:
+                f.result()
+            futures.clear()
+
+        for i, a in enumerate(actions):
+            cls = tool_concurrency(a.get("name", ""))
+            if cls == "exclusive":
+                _flush()
+                results[i] = _execute_safe(a)
+            elif cls == "screen":
+                screen_chain.append((i, a))
+            else:
+                fn = _execute_cpu if cls == "cpu" else _execute_safe
+                futures.append(ex.submit(lambda i=i, a=a, fn=fn: results.__setitem__(i, fn(a))))
+        _flush()
+    return results
 
 
 def _find_window_hwnd_by_title(title: str):
-    import ctypes
     target = (title or "").lower().strip()
     found = []
 
@@ -914,7 +1053,6 @@ def _find_window_hwnd_by_title(title: str):
 
 
 def _activate_window(hwnd):
-    import ctypes
     ctypes.windll.user32.ShowWindow(hwnd, 9)  # SW_RESTORE
     try:
         ctypes.windll.user32.SetForegroundWindow(hwnd)
@@ -922,926 +1060,1123 @@ def _activate_window(hwnd):
         pass
 
 
-def _do_execute(name: str, args: dict) -> dict:
-    """实际执行逻辑。"""
-    try:
-        if name == "click":
-            mouse_click(args["x"], args["y"], args.get("button", "left"))
-            return {"ok": True, "result": f"Clicked ({args['x']},{args['y']})"}
-
-        elif name == "type_text":
-            win32_type_text(args["text"])
-            return {"ok": True, "result": f"Typed {len(args['text'])} chars"}
-
-        elif name == "hotkey":
-            win32_hotkey(*args["keys"])
-            return {"ok": True, "result": f"Pressed {'+'.join(args['keys'])}"}
-
-        elif name == "scroll":
-            mouse_scroll(args["x"], args["y"], args["clicks"])
-            return {"ok": True, "result": f"Scrolled {args['clicks']} at ({args['x']},{args['y']})"}
-
-        elif name == "double_click":
-            mouse_double_click(args["x"], args["y"])
-            return {"ok": True, "result": f"Double-clicked ({args['x']},{args['y']})"}
-
-        elif name == "move_to":
-            mouse_move(args["x"], args["y"])
-            return {"ok": True, "result": f"Moved to ({args['x']},{args['y']})"}
-
-        elif name == "drag":
-            # Use low-level Win32 mouse events for real left-button drag
-            from ctypes import windll, Structure, Union, POINTER, c_ulong, c_long, sizeof, byref
-            INPUT_MOUSE = 0
-            MOUSEEVENTF_MOVE = 0x0001
-            MOUSEEVENTF_LEFTDOWN = 0x0002
-            MOUSEEVENTF_LEFTUP = 0x0004
-            MOUSEEVENTF_ABSOLUTE = 0x8000
-
-            class MOUSEINPUT(Structure):
-                _fields_ = [("dx", c_long), ("dy", c_long), ("mouseData", c_ulong),
-                            ("dwFlags", c_ulong), ("time", c_ulong), ("dwExtraInfo", POINTER(c_ulong))]
-            class _INPUT_UNION(Union):
-                _fields_ = [("mi", MOUSEINPUT)]
-            class INPUT(Structure):
-                _fields_ = [("type", c_ulong), ("_u", _INPUT_UNION)]
-
-            def _send(inp):
-                windll.user32.SendInput(1, byref(inp), sizeof(INPUT))
-
-            sw, sh = pyautogui.size()
-            def _abs(x, y):
-                return int(x * 65535 / (sw - 1)), int(y * 65535 / (sh - 1))
-
-            # move to start
-            mouse_move(args["x1"], args["y1"])
-            time.sleep(0.05)
-            ax1, ay1 = _abs(args["x1"], args["y1"])
-            ax2, ay2 = _abs(args["x2"], args["y2"])
-            _send(INPUT(type=INPUT_MOUSE, _u=_INPUT_UNION(mi=MOUSEINPUT(
-                dx=ax1, dy=ay1, mouseData=0, dwFlags=MOUSEEVENTF_LEFTDOWN|MOUSEEVENTF_ABSOLUTE, time=0, dwExtraInfo=None))))
-            time.sleep(0.05)
-            mouse_move(args["x2"], args["y2"])
-            time.sleep(0.05)
-            _send(INPUT(type=INPUT_MOUSE, _u=_INPUT_UNION(mi=MOUSEINPUT(
-                dx=ax2, dy=ay2, mouseData=0, dwFlags=MOUSEEVENTF_LEFTUP|MOUSEEVENTF_ABSOLUTE, time=0, dwExtraInfo=None))))
-            return {"ok": True, "result": f"Dragged ({args['x1']},{args['y1']}) -> ({args['x2']},{args['y2']})"}
-
-        elif name == "key_press":
-            win32_key_press(args["key"])
-            return {"ok": True, "result": f"Pressed {args['key']}"}
-
-        elif name == "wait":
-            time.sleep(args["seconds"])
-            return {"ok": True, "result": f"Waited {args['seconds']}s"}
-
-        elif name == "watch_screen":
-            duration = args["duration"]
-            interval = args.get("interval", 3)
-            root_frames_dir = os.path.join(_BASE_DIR, "logs", "frames")
-            run_id = time.strftime("%Y%m%d_%H%M%S")
-            frames_dir = os.path.join(root_frames_dir, f"watch_{run_id}")
-            os.makedirs(frames_dir, exist_ok=True)
-            prev_gray = None
-            key_frames = []
-            end_time = time.time() + duration
-            while time.time() < end_time:
-                # Hold lock only during screenshot; release before sleep
-                with _screen_lock:
-                    img = pyautogui.screenshot()
-                # 缩放到最大宽度再比较，减少计算量
-                sw = _SCREENSHOT_MAX_WIDTH
-                sh = int(img.height * sw / img.width)
-                small = img.resize((sw, sh))
-                gray = small.convert("L")
-                if prev_gray is None:
-                    path = f"{frames_dir}/frame_{len(key_frames):03d}.png"
-                    small.save(path)
-                    key_frames.append(path)
-                else:
-                    diff = ImageChops.difference(gray, prev_gray)
-                    # 用 getbbox 快速判断是否有变化区域，比 sum(getdata()) 快很多
-                    bbox = diff.point(lambda p: 255 if p > 10 else 0).getbbox()
-                    if bbox:
-                        bw = bbox[2] - bbox[0]
-                        bh = bbox[3] - bbox[1]
-                        change_ratio = (bw * bh) / (sw * sh)
-                        if change_ratio > _WATCH_CHANGE_RATIO:
-                            path = f"{frames_dir}/frame_{len(key_frames):03d}.png"
-                            small.save(path)
-                            key_frames.append(path)
-                prev_gray = gray
-                time.sleep(interval)  # sleep outside lock
-            # 返回所有关键帧路径供 AI 选择分析，以及最后一帧作为图像
-            last = key_frames[-1] if key_frames else SCREENSHOT_PATH
-            return {
-                "ok": True,
-                "result": f"Watched {duration}s, {len(key_frames)} key frames captured",
-                "image": last,
-            }
-
-        elif name == "get_subtitles":
-            url = args["url"]
-            lang = args.get("lang", "zh")
-            offset = args.get("offset", 0)
-            out_dir = os.path.join(_BASE_DIR, "logs", "subs")
-            os.makedirs(out_dir, exist_ok=True)
-            url_key = hashlib.md5(url.encode("utf-8", errors="ignore")).hexdigest()[:12]
-
-            # 优先读取当前 URL 的缓存字幕（支持 offset 续读）
+# ---- Tool handlers ----
+
+def _check_xy(args: dict) -> str | None:
+    # 坐标越界检查
+    sw, sh = pyautogui.size()
+    x, y = args.get("x", 0), args.get("y", 0)
+    if not (0 <= x < sw and 0 <= y < sh):
+        return f"坐标 ({x},{y}) 超出屏幕范围 ({sw}x{sh})"
+    return None
+
+
+def _check_drag(args: dict) -> str | None:
+    sw, sh = pyautogui.size()
+    for px, py in [(args.get("x1", 0), args.get("y1", 0)), (args.get("x2", 0), args.get("y2", 0))]:
+        if not (0 <= px < sw and 0 <= py < sh):
+            return f"坐标 ({px},{py}) 超出屏幕范围 ({sw}x{sh})"
+    return None
+
+
+_INPUT_MOUSE = 0
+_MOUSEEVENTF_LEFTDOWN = 0x0002
+_MOUSEEVENTF_LEFTUP = 0x0004
+_MOUSEEVENTF_ABSOLUTE = 0x8000
+
+
+class _MOUSEINPUT(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_long), ("dy", ctypes.c_long), ("mouseData", ctypes.c_ulong),
+                ("dwFlags", ctypes.c_ulong), ("time", ctypes.c_ulong),
+                ("dwExtraInfo", ctypes.POINTER(ctypes.c_ulong))]
+
+
+class _INPUT_UNION(ctypes.Union):
+    _fields_ = [("mi", _MOUSEINPUT)]
+
+
+class _INPUT(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_ulong), ("_u", _INPUT_UNION)]
+
+
+def _send_mouse_input(dx: int, dy: int, flags: int):
+    inp = _INPUT(type=_INPUT_MOUSE, _u=_INPUT_UNION(mi=_MOUSEINPUT(
+        dx=dx, dy=dy, mouseData=0, dwFlags=flags, time=0, dwExtraInfo=None)))
+    ctypes.windll.user32.SendInput(1, ctypes.byref(inp), ctypes.sizeof(_INPUT))
+
+
+_NO_WINREG = "注册表操作仅支持 Windows"
+
+
+@_tool("click", concurrency="screen", screen_lock=True, validate=_check_xy)
+def _tool_click(args: dict) -> dict:
+    mouse_click(args["x"], args["y"], args.get("button", "left"))
+    invalidate_latest()
+    return {"ok": True, "result": f"Clicked ({args['x']},{args['y']})"}
+
+
+@_tool("type_text", concurrency="screen", screen_lock=True)
+def _tool_type_text(args: dict) -> dict:
+    win32_type_text(args["text"])
+    invalidate_latest()
+    return {"ok": True, "result": f"Typed {len(args['text'])} chars"}
+
+
+@_tool("hotkey", concurrency="screen", screen_lock=True)
+def _tool_hotkey(args: dict) -> dict:
+    win32_hotkey(*args["keys"])
+    invalidate_latest()
+    return {"ok": True, "result": f"Pressed {'+'.join(args['keys'])}"}
+
+
+@_tool("scroll", concurrency="screen", screen_lock=True, validate=_check_xy)
+def _tool_scroll(args: dict) -> dict:
+    mouse_scroll(args["x"], args["y"], args["clicks"])
+    invalidate_latest()
+    return {"ok": True, "result": f"Scrolled {args['clicks']} at ({args['x']},{args['y']})"}
+
+
+@_tool("double_click", concurrency="screen", screen_lock=True, validate=_check_xy)
+def _tool_double_click(args: dict) -> dict:
+    mouse_double_click(args["x"], args["y"])
+    invalidate_latest()
+    return {"ok": True, "result": f"Double-clicked ({args['x']},{args['y']})"}
+
+
+@_tool("move_to", concurrency="screen", screen_lock=True, validate=_check_xy)
+def _tool_move_to(args: dict) -> dict:
+    mouse_move(args["x"], args["y"])
+    invalidate_latest()
+    return {"ok": True, "result": f"Moved to ({args['x']},{args['y']})"}
+
+
+@_tool("drag", concurrency="screen", screen_lock=True, validate=_check_drag)
+def _tool_drag(args: dict) -> dict:
+    # Use low-level Win32 mouse events for real left-button drag
+    sw, sh = pyautogui.size()
+    def _abs(x, y):
+        return int(x * 65535 / (sw - 1)), int(y * 65535 / (sh - 1))
+
+    # move to start
+    mouse_move(args["x1"], args["y1"])
+    time.sleep(0.05)
+    ax1, ay1 = _abs(args["x1"], args["y1"])
+    ax2, ay2 = _abs(args["x2"], args["y2"])
+    _send_mouse_input(ax1, ay1, _MOUSEEVENTF_LEFTDOWN | _MOUSEEVENTF_ABSOLUTE)
+    time.sleep(0.05)
+    mouse_move(args["x2"], args["y2"])
+    time.sleep(0.05)
+    _send_mouse_input(ax2, ay2, _MOUSEEVENTF_LEFTUP | _MOUSEEVENTF_ABSOLUTE)
+    invalidate_latest()
+    return {"ok": True, "result": f"Dragged ({args['x1']},{args['y1']}) -> ({args['x2']},{args['y2']})"}
+
+
+@_tool("key_press", concurrency="screen", screen_lock=True)
+def _tool_key_press(args: dict) -> dict:
+    win32_key_press(args["key"])
+    invalidate_latest()
+    return {"ok": True, "result": f"Pressed {args['key']}"}
+
+
+# In the screen chain so [click, wait, screenshot] waits before looking
+@_tool("wait", concurrency="screen")
+def _tool_wait(args: dict) -> dict:
+    time.sleep(args["seconds"])
+    return {"ok": True, "result": f"Waited {args['seconds']}s"}
+
+
+@_tool("watch_screen", concurrency="screen")
+def _tool_watch_screen(args: dict) -> dict:
+    duration = args["duration"]
+    interval = args.get("interval", 3)
+    capture = get_capture()
+    # Key frames stay in memory; only the newest _WATCH_MAX_FRAMES are kept
+    key_frames = deque(maxlen=_WATCH_MAX_FRAMES)  # (seconds, image)
+    timeline = []
+    ref = None  # grey copy of the last key frame; later frames are compared with it
+    start = time.time()
+    end_time = start + duration
+    while time.time() < end_time:
+        # Hold lock only during screenshot; release before sleep
+        with _screen_lock:
+            img = capture.grab().image
+        # 缩放到最大宽度再比较，减少计算量
+        small = fit_width(img, _SCREENSHOT_MAX_WIDTH)
+        gray = small.convert("L")
+        t = round(time.time() - start, 1)
+        if ref is None:
+            key_frames.append((t, small))
+            timeline.append({"t": t})
+            ref = gray
+        else:
+            change = measure_change(ref, gray, tile=_WATCH_TILE, min_pixels=_WATCH_MIN_PIXELS)
+            # Changed cells, not the bounding box: two small changes far apart stay small
+            if change.tile_ratio > _WATCH_CHANGE_RATIO:
+                key_frames.append((t, small))
+                timeline.append({"t": t, "changed": round(change.ratio, 4), "tiles": len(change.tiles)})
+                ref = gray
+        time.sleep(interval)  # sleep outside lock
+    if not key_frames:
+        return {"ok": False, "result": "未截到画面"}
+    path = SCREENSHOT_PATH.replace(".jpg", "_watch.jpg")
+    contact_sheet([im for _, im in key_frames], path, labels=[f"{t}s" for t, _ in key_frames])
+    shown = f" (image shows the last {len(key_frames)})" if len(key_frames) < len(timeline) else ""
+    return {
+        "ok": True,
+        "result": f"Watched {duration}s, {len(timeline)} key frames captured{shown}",
+        "frames": timeline,
+        "image": path,
+    }
+
+
+@_tool("get_subtitles", concurrency="io")
+def _tool_get_subtitles(args: dict) -> dict:
+    url = args["url"]
+    lang = args.get("lang", "zh")
+    offset = args.get("offset", 0)
+    out_dir = os.path.join(_BASE_DIR, "logs", "subs")
+    os.makedirs(out_dir, exist_ok=True)
+    url_key = hashlib.md5(url.encode("utf-8", errors="ignore")).hexdigest()[:12]
+
+    # 优先读取当前 URL 的缓存字幕（支持 offset 续读）
+    srt_files = [f for f in os.listdir(out_dir) if f.endswith(".srt") and f"sub_{url_key}" in f]
+    sub_text = ""
+    if srt_files and offset >= 0:
+        with open(os.path.join(out_dir, srt_files[0]), "r", encoding="utf-8", errors="ignore") as fh:
+            sub_text = fh.read()
+    else:
+        # 清理当前 URL 的旧缓存文件，不影响其他 URL 的缓存
+        for f in os.listdir(out_dir):
+            if f"sub_{url_key}" in f:
+                os.remove(os.path.join(out_dir, f))
+
+        out_tpl = os.path.join(out_dir, f"sub_{url_key}.%(ext)s")
+        for try_lang in [lang, "en"]:
+            subprocess.run(
+                ["yt-dlp", "--skip-download", "--write-auto-sub", "--write-sub",
+                 "--sub-lang", try_lang, "--sub-format", "srt", "--convert-subs", "srt",
+                 "-o", out_tpl, url],
+                capture_output=True, text=True, timeout=60,
+            )
             srt_files = [f for f in os.listdir(out_dir) if f.endswith(".srt") and f"sub_{url_key}" in f]
-            sub_text = ""
-            if srt_files and offset >= 0:
-                with open(os.path.join(out_dir, srt_files[0]), "r", encoding="utf-8", errors="ignore") as fh:
-                    sub_text = fh.read()
-            else:
-                # 清理当前 URL 的旧缓存文件，不影响其他 URL 的缓存
-                for f in os.listdir(out_dir):
-                    if f"sub_{url_key}" in f:
-                        os.remove(os.path.join(out_dir, f))
-
-                out_tpl = os.path.join(out_dir, f"sub_{url_key}.%(ext)s")
-                for try_lang in [lang, "en"]:
-                    subprocess.run(
-                        ["yt-dlp", "--skip-download", "--write-auto-sub", "--write-sub",
-                         "--sub-lang", try_lang, "--sub-format", "srt", "--convert-subs", "srt",
-                         "-o", out_tpl, url],
-                        capture_output=True, text=True, timeout=60,
-                    )
-                    srt_files = [f for f in os.listdir(out_dir) if f.endswith(".srt") and f"sub_{url_key}" in f]
-                    if srt_files:
-                        break
-                if not srt_files:
-                    return {"ok": False, "result": "No subtitles found"}
-                with open(os.path.join(out_dir, srt_files[0]), "r", encoding="utf-8", errors="ignore") as fh:
-                    sub_text = fh.read()
-            lines = [l for l in sub_text.splitlines()
-                     if l.strip() and not l.strip().isdigit()
-                     and not re.match(r'\d{2}:\d{2}', l.strip())]
-            clean = "\n".join(dict.fromkeys(lines))
-            total = len(clean)
-            segment = clean[offset:offset + _TEXT_CHUNK]
-            remaining = max(0, total - offset - _TEXT_CHUNK)
-            result = {"ok": True, "result": segment, "total_chars": total, "offset": offset}
-            if remaining > 0:
-                result["note"] = f"还有 {remaining} 字符，下次调用传 offset={offset + _TEXT_CHUNK}"
-            return result
-
-        elif name == "screenshot":
-            img = pyautogui.screenshot()
-            from PIL import ImageDraw
-            w, h = img.size
-            # 缩放到最大宽度
-            if w > _SCREENSHOT_MAX_WIDTH:
-                scale = _SCREENSHOT_MAX_WIDTH / w
-                img = img.resize((_SCREENSHOT_MAX_WIDTH, int(h * scale)))
-                w, h = img.size
-            draw = ImageDraw.Draw(img)
-            sw, sh = pyautogui.size()
-            scale_x = w / sw
-            scale_y = h / sh
-            step = 200
-            for x in range(0, w, step):
-                draw.line([(x, 0), (x, h)], fill=(255, 0, 0, 80), width=1)
-                draw.text((x + 2, 2), str(int(x / scale_x)), fill=(255, 0, 0))
-            for y in range(0, h, step):
-                draw.line([(0, y), (w, y)], fill=(255, 0, 0, 80), width=1)
-                draw.text((2, y + 2), str(int(y / scale_y)), fill=(255, 0, 0))
-            img.convert("RGB").save(SCREENSHOT_PATH, "JPEG", quality=75, optimize=True)
-            return {"ok": True, "result": f"Screenshot taken ({pyautogui.size()[0]}x{pyautogui.size()[1]}, displayed at {w}x{h})", "image": SCREENSHOT_PATH}
-
-        elif name == "screenshot_region":
-            region = (args["x"], args["y"], args["width"], args["height"])
-            img = pyautogui.screenshot(region=region)
-            if img.width < 800:
-                scale = min(800 / img.width, 3.0)
-                img = img.resize((int(img.width * scale), int(img.height * scale)))
-            path = SCREENSHOT_PATH.replace(".jpg", "_region.jpg")
-            img.convert("RGB").save(path, "JPEG", quality=75, optimize=True)
-            return {"ok": True, "result": f"Region screenshot ({args['width']}x{args['height']})", "image": path}
-
-        elif name == "read_screen_text":
-            img = pyautogui.screenshot()
-            try:
-                import pytesseract
-                text = pytesseract.image_to_string(img, lang="chi_sim+eng")
-            except ImportError:
-                return {
-                    "ok": False,
-                    "result": "OCR 不可用：缺少 pytesseract。请执行 `pip install pytesseract`，并安装 Tesseract 本体后重试。"
-                }
-            except Exception as e:
-                return {
-                    "ok": False,
-                    "result": (
-                        "OCR 执行失败。请确认已安装 Tesseract 并加入 PATH。"
-                        "\nWindows 可安装：winget install UB-Mannheim.TesseractOCR"
-                        "\n安装后可用 `tesseract --version` 验证。"
-                        f"\n错误详情: {e}"
-                    ),
-                }
-            if not (text or "").strip():
-                return {"ok": False, "result": "OCR found no text on screen"}
-            return {"ok": True, "result": text.strip()[:3000]}
-
-        elif name == "open_url":
-            import webbrowser
-            webbrowser.open(args["url"])
-            return {"ok": True, "result": f"Opened {args['url']}"}
-
-        elif name == "get_clipboard":
-            # 优先使用 pywin32，失败再回退到 ctypes 实现，尽量避免访问冲突
-            text = ""
-            try:
-                try:
-                    import win32clipboard  # type: ignore
-                    import win32con  # type: ignore
-                except ImportError:
-                    win32clipboard = None  # type: ignore
+            if srt_files:
+                break
+        if not srt_files:
+            return {"ok": False, "result": "No subtitles found"}
+        with open(os.path.join(out_dir, srt_files[0]), "r", encoding="utf-8", errors="ignore") as fh:
+            sub_text = fh.read()
+    lines = [l for l in sub_text.splitlines()
+             if l.strip() and not l.strip().isdigit()
+             and not re.match(r'\d{2}:\d{2}', l.strip())]
+    clean = "\n".join(dict.fromkeys(lines))
+    total = len(clean)
+    segment = clean[offset:offset + _TEXT_CHUNK]
+    remaining = max(0, total - offset - _TEXT_CHUNK)
+    result = {"ok": True, "result": segment, "total_chars": total, "offset": offset}
+    if remaining > 0:
+        result["note"] = f"还有 {remaining} 字符，下次调用传 offset={offset + _TEXT_CHUNK}"
+    return result
+
+
+def _screen_factor(img) -> tuple[float, float]:
+    """Captured pixels -> pyautogui coordinates (they differ under DPI scaling)."""
+    sw, sh = pyautogui.size()
+    iw, ih = img.size
+    return sw / float(iw or sw), sh / float(ih or sh)
+
+
+def _screen_match(match, img) -> dict:
+    fx, fy = _screen_factor(img)
+    x, y, w, h = match.box
+    cx, cy = match.center
+    return {"text": match.text, "x": int(cx * fx), "y": int(cy * fy),
+            "box": [int(x * fx), int(y * fy), int(w * fx), int(h * fy)]}
+
+
+def _ocr_error(e: Exception) -> dict:
+    if isinstance(e, RuntimeError):
+        return {
+            "ok": False,
+            "result": "OCR 不可用：缺少 pytesseract。请执行 `pip install pytesseract`，并安装 Tesseract 本体后重试。"
+        }
+    return {
+        "ok": False,
+        "result": (
+            "OCR 执行失败。请确认已安装 Tesseract 并加入 PATH。"
+            "\nWindows 可安装：winget install UB-Mannheim.TesseractOCR"
+            "\n安装后可用 `tesseract --version` 验证。"
+            f"\n错误详情: {e}"
+        ),
+    }
 
-                if win32clipboard is not None:
-                    win32clipboard.OpenClipboard()
+
+@_tool("screenshot", concurrency="screen", screen_lock=True)
+def _tool_screenshot(args: dict) -> dict:
+    # Own baseline: OCR, find_image and watch_screen grab the screen too
+    frame = get_capture().grab(baseline="screenshot")
+    sw, sh = pyautogui.size()
+    fx, fy = _screen_factor(frame.image)
+    changed = None
+    if frame.dirty is not None:
+        changed = [[int(x * fx), int(y * fy), int(w * fx), int(h * fy)]
+                   for x, y, w, h in frame.dirty[:_SCREENSHOT_MAX_DIRTY]]
+    if args.get("changed_only") and frame.dirty is not None:
+        box = frame.dirty_bbox()
+        if box is None:
+            return {"ok": True, "result": "屏幕自上次截图以来没有变化", "changed": []}
+        x, y, w, h = box
+        img = frame.image.crop((x, y, x + w, y + h))
+        if img.width < 800:
+            scale = min(800 / img.width, 3.0)
+            img = img.resize((int(img.width * scale), int(img.height * scale)))
+        path = SCREENSHOT_PATH.replace(".jpg", "_changed.jpg")
+        save_jpeg(img, path)
+        rx, ry, rw, rh = int(x * fx), int(y * fy), int(w * fx), int(h * fy)
+        return {
+            "ok": True,
+            "result": f"Changed area ({rw}x{rh} at {rx},{ry}; {frame.dirty_ratio():.0%} of the screen)",
+            "image": path,
+            "changed": changed,
+        }
+    w, h = render_screenshot(frame.image, SCREENSHOT_PATH, screen_size=(sw, sh), max_width=_SCREENSHOT_MAX_WIDTH)
+    result = {"ok": True, "result": f"Screenshot taken ({sw}x{sh}, displayed at {w}x{h})", "image": SCREENSHOT_PATH}
+    if changed is not None:
+        result["changed"] = changed
+    return result
+
+
+@_tool("screenshot_region", concurrency="screen", screen_lock=True)
+def _tool_screenshot_region(args: dict) -> dict:
+    region = (args["x"], args["y"], args["width"], args["height"])
+    img = get_capture().grab(region).image
+    if img.width < 800:
+        scale = min(800 / img.width, 3.0)
+        img = img.resize((int(img.width * scale), int(img.height * scale)))
+    path = SCREENSHOT_PATH.replace(".jpg", "_region.jpg")
+    save_jpeg(img, path)
+    return {"ok": True, "result": f"Region screenshot ({args['width']}x{args['height']})", "image": path}
+
+
+@_tool("read_screen_text", concurrency="screen", screen_lock=True)
+def _tool_read_screen_text(args: dict) -> dict:
+    img = get_capture().grab().image
+    target = (args.get("find") or "").strip()
+    try:
+        res = get_ocr().read(img, until=target or None)
+    except Exception as e:
+        return _ocr_error(e)
+    if target:
+        if not res.matches:
+            return {"ok": False, "result": f"屏幕上未找到文字: '{target}'"}
+        matches = [_screen_match(m, img) for m in res.matches[:10]]
+        first = matches[0]
+        return {"ok": True, "result": f"找到 {len(matches)} 处 '{target}'，第一处在 ({first['x']}, {first['y']})",
+                "matches": matches}
+    text = res.text
+    if not text.strip():
+        return {"ok": False, "result": "OCR found no text on screen"}
+    return {"ok": True, "result": text.strip()[:3000]}
+
+
+@_tool("open_url")
+def _tool_open_url(args: dict) -> dict:
+    webbrowser.open(args["url"])
+    return {"ok": True, "result": f"Opened {args['url']}"}
+
+
+@_tool("get_clipboard")
+def _tool_get_clipboard(args: dict) -> dict:
+    # 优先使用 pywin32，失败再回退到 ctypes 实现，尽量避免访问冲突
+    text = ""
+    try:
+        if win32clipboard is not None:
+            win32clipboard.OpenClipboard()
+            try:
+                if win32clipboard.IsClipboardFormatAvailable(win32con.CF_UNICODETEXT):
+                    data = win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
+                    text = data or ""
+                else:
+                    text = ""
+            finally:
+                win32clipboard.CloseClipboard()
+            return {"ok": True, "result": (text[:2000] if text else "(clipboard empty)")}
+
+        # ctypes 回退方案
+        CF_UNICODETEXT = 13
+        opened = False
+        try:
+            # 剪贴板可能被其它进程短暂占用，做轻量重试
+            for _ in range(5):
+                if ctypes.windll.user32.OpenClipboard(0):
+                    opened = True
+                    break
+                time.sleep(0.05)
+            if not opened:
+                return {"ok": False, "result": "剪贴板当前被占用，请稍后重试"}
+
+            h = ctypes.windll.user32.GetClipboardData(CF_UNICODETEXT)
+            if h:
+                p = ctypes.windll.kernel32.GlobalLock(h)
+                if p:
                     try:
-                        if win32clipboard.IsClipboardFormatAvailable(win32con.CF_UNICODETEXT):
-                            data = win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
-                            text = data or ""
-                        else:
-                            text = ""
+                        text = ctypes.wstring_at(p)
                     finally:
-                        win32clipboard.CloseClipboard()
-                    return {"ok": True, "result": (text[:2000] if text else "(clipboard empty)")}
+                        ctypes.windll.kernel32.GlobalUnlock(h)
+            return {"ok": True, "result": (text[:2000] if text else "(clipboard empty)")}
+        finally:
+            if opened:
+                try:
+                    ctypes.windll.user32.CloseClipboard()
+                except Exception:
+                    pass
+    except Exception as e:
+        return {"ok": False, "result": f"读取剪贴板失败: {e}"}
 
-                # ctypes 回退方案
-                import ctypes
 
-                CF_UNICODETEXT = 13
-                opened = False
-                try:
-                    # 剪贴板可能被其它进程短暂占用，做轻量重试
-                    for _ in range(5):
-                        if ctypes.windll.user32.OpenClipboard(0):
-                            opened = True
-                            break
-                        time.sleep(0.05)
-                    if not opened:
-                        return {"ok": False, "result": "剪贴板当前被占用，请稍后重试"}
-
-                    h = ctypes.windll.user32.GetClipboardData(CF_UNICODETEXT)
-                    if h:
-                        p = ctypes.windll.kernel32.GlobalLock(h)
-                        if p:
-                            try:
-                                text = ctypes.wstring_at(p)
-                            finally:
-                                ctypes.windll.kernel32.GlobalUnlock(h)
-                    return {"ok": True, "result": (text[:2000] if text else "(clipboard empty)")}
-                finally:
-                    if opened:
-                        try:
-                            ctypes.windll.user32.CloseClipboard()
-                        except Exception:
-                            pass
-            except Exception as e:
-                return {"ok": False, "result": f"读取剪贴板失败: {e}"}
-
-        elif name == "run_command":
-            cmd = args["command"]
-            expect_path = (args.get("expect_path") or "").strip()
-            try:
-                r = subprocess.run(
-                    cmd, shell=True, capture_output=True, text=True, timeout=30,
-                )
-                stdout = r.stdout or ""
-                stderr = r.stderr or ""
-                output = (stdout + stderr).strip()[:2000]
-                return {"ok": r.returncode == 0, "result": output or "(no output)"}
-            except subprocess.TimeoutExpired as e:
-                # 超时软检查：如果调用方提供了期望文件路径且已生成，则视为成功但标记为超时完成
-                from pathlib import Path
-
-                stdout = (e.stdout or "") if hasattr(e, "stdout") else ""
-                stderr = (e.stderr or "") if hasattr(e, "stderr") else ""
-                output = (stdout + stderr).strip()[:2000]
-                if expect_path and Path(expect_path).expanduser().exists():
-                    msg = f"命令超时 (30s)，但检测到目标已存在: {expect_path}\n\n{output}"
-                    return {"ok": True, "result": msg.strip()}
-                return {
-                    "ok": False,
-                    "result": (f"命令在 30s 后超时: {cmd}\n\n{output}" if output else f"命令在 30s 后超时: {cmd}"),
-                }
-
-        elif name == "web_search":
-            results = _do_web_search(args["query"])
-            if not results:
-                return {"ok": False, "result": "搜索失败或无结果"}
-            out = "\n".join(
-                f"{i+1}. {r['title']}\n   {r['url']}\n   {r.get('snippet','')}"
-                for i, r in enumerate(results)
-            )
-            return {"ok": True, "result": out}
-
-        elif name == "fetch_page":
-            url = args["url"]
-            offset = args.get("offset", 0)
-            text = _fetch_url_text(url)
-            if not text:
-                return {"ok": False, "result": f"页面获取失败: {url}"}
-            segment = text[offset:offset + _TEXT_CHUNK]
-            remaining = max(0, len(text) - offset - _TEXT_CHUNK)
-            result = {"ok": True, "result": segment, "total_chars": len(text), "offset": offset}
-            if remaining > 0:
-                result["note"] = f"还有 {remaining} 字符未读，下次调用传 offset={offset + _TEXT_CHUNK}"
-            return result
-
-        elif name == "memory_save":
-            importance = int(args.get("importance", 5))
-            saved = _memory.save(args["category"], args["content"], importance=importance)
-            if saved:
-                return {"ok": True, "result": f"Saved to {args['category']} (importance={importance})"}
-            return {"ok": True, "result": f"Skipped (duplicate already exists in {args['category']})"}
-
-        elif name == "memory_recall":
-            category = (args.get("category") or "").strip().lower() or None
-            results = _memory.search_multi(args["query"], args.get("limit", 5), category=category)
-            if not results:
-                return {"ok": True, "result": "No memories found"}
-            # 只返回 category 和 content，去掉 created_at 等无用字段
-            out = "\n---\n".join(f"[{r['category']}] {r['content']}" for r in results)
-            return {"ok": True, "result": out}
-
-        elif name == "memory_delete":
-            mode = args.get("mode", "by_id")
-            if mode == "by_id":
-                mid = int(args.get("id", 0))
-                if not mid:
-                    return {"ok": False, "result": "id 参数缺失"}
-                ok = _memory.delete_by_id(mid)
-                return {"ok": ok, "result": f"已删除记忆 #{mid}" if ok else f"记忆 #{mid} 不存在"}
-            elif mode == "by_category":
-                cat = args.get("category", "")
-                if not cat:
-                    return {"ok": False, "result": "category 参数缺失"}
-                n = _memory.delete_by_category(cat)
-                return {"ok": True, "result": f"已删除 {cat} 分类下 {n} 条记忆"}
-            elif mode == "clear_all":
-                n = _memory.clear_all()
-                return {"ok": True, "result": f"已清空全部记忆，共删除 {n} 条"}
-            return {"ok": False, "result": f"未知 mode: {mode}"}
-
-        elif name == "bg_task":
-            tid = _task_mgr.launch(args["name"], args["prompt"],
-                                   on_done=_on_bg_task_done)
-            return {"ok": True, "result": f"后台任务 #{tid} '{args['name']}' 已启动"}
-
-        elif name == "task_status":
-            return {"ok": True, "result": _task_mgr.summary()}
-
-        elif name == "done":
-            return {"ok": True, "done": True, "result": args.get("summary", "")}
-
-        elif name == "learn_video":
-            return _learn_video(args["url"], args.get("topic", ""))
-
-        elif name == "file_read":
-            path = args["path"]
-            offset = args.get("offset", 0)
+@_tool("run_command")
+def _tool_run_command(args: dict) -> dict:
+    cmd = args["command"]
+    expect_path = (args.get("expect_path") or "").strip()
+    try:
+        r = subprocess.run(
+            cmd, shell=True, capture_output=True, text=True, timeout=30,
+        )
+        stdout = r.stdout or ""
+        stderr = r.stderr or ""
+        output = (stdout + stderr).strip()[:2000]
+        return {"ok": r.returncode == 0, "result": output or "(no output)"}
+    except subprocess.TimeoutExpired as e:
+        # 超时软检查：如果调用方提供了期望文件路径且已生成，则视为成功但标记为超时完成
+        stdout = (e.stdout or "") if hasattr(e, "stdout") else ""
+        stderr = (e.stderr or "") if hasattr(e, "stderr") else ""
+        output = (stdout + stderr).strip()[:2000]
+        if expect_path and Path(expect_path).expanduser().exists():
+            msg = f"命令超时 (30s)，但检测到目标已存在: {expect_path}\n\n{output}"
+            return {"ok": True, "result": msg.strip()}
+        return {
+            "ok": False,
+            "result": (f"命令在 30s 后超时: {cmd}\n\n{output}" if output else f"命令在 30s 后超时: {cmd}"),
+        }
+
+
+@_tool("web_search", concurrency="io")
+def _tool_web_search(args: dict) -> dict:
+    results = _do_web_search(args["query"])
+    if not results:
+        return {"ok": False, "result": "搜索失败或无结果"}
+    out = "\n".join(
+        f"{i+1}. {r['title']}\n   {r['url']}\n   {r.get('snippet','')}"
+        for i, r in enumerate(results)
+    )
+    return {"ok": True, "result": out}
+
+
+@_tool("fetch_page", concurrency="io")
+def _tool_fetch_page(args: dict) -> dict:
+    url = args["url"]
+    offset = args.get("offset", 0)
+    text = _fetch_url_text(url)
+    if not text:
+        return {"ok": False, "result": f"页面获取失败: {url}"}
+    segment = text[offset:offset + _TEXT_CHUNK]
+    remaining = max(0, len(text) - offset - _TEXT_CHUNK)
+    result = {"ok": True, "result": segment, "total_chars": len(text), "offset": offset}
+    if remaining > 0:
+        result["note"] = f"还有 {remaining} 字符未读，下次调用传 offset={offset + _TEXT_CHUNK}"
+    return result
+
+
+@_tool("memory_save")
+def _tool_memory_save(args: dict) -> dict:
+    importance = int(args.get("importance", 5))
+    status, memory_id = get_store().upsert(args["category"], args["content"], importance=importance)
+    if status == "inserted":
+        return {"ok": True, "result": f"Saved to {args['category']} (importance={importance})"}
+    if status == "merged":
+        return {"ok": True, "result": f"Updated similar memory #{memory_id} in {args['category']} with the new text"}
+    if status == "error":
+        return {"ok": False, "result": "Memory save failed"}
+    return {"ok": True, "result": f"Skipped (duplicate already exists in {args['category']})"}
+
+
+@_tool("memory_recall", concurrency="io")
+def _tool_memory_recall(args: dict) -> dict:
+    category = (args.get("category") or "").strip().lower() or None
+    results = get_store().search_multi(args["query"], args.get("limit", 5), category=category)
+    if not results:
+        return {"ok": True, "result": "No memories found"}
+    # 只返回 category 和 content，去掉 created_at 等无用字段
+    out = "\n---\n".join(f"[{r['category']}] {r['content']}" for r in results)
+    return {"ok": True, "result": out}
+
+
+@_tool("memory_delete")
+def _tool_memory_delete(args: dict) -> dict:
+    mode = args.get("mode", "by_id")
+    if mode == "by_id":
+        mid = int(args.get("id", 0))
+        if not mid:
+            return {"ok": False, "result": "id 参数缺失"}
+        ok = get_store().delete_by_id(mid)
+        return {"ok": ok, "result": f"已删除记忆 #{mid}" if ok else f"记忆 #{mid} 不存在"}
+    elif mode == "by_category":
+        cat = args.get("category", "")
+        if not cat:
+            return {"ok": False, "result": "category 参数缺失"}
+        n = get_store().delete_by_category(cat)
+        return {"ok": True, "result": f"已删除 {cat} 分类下 {n} 条记忆"}
+    elif mode == "clear_all":
+        n = get_store().clear_all()
+        return {"ok": True, "result": f"已清空全部记忆，共删除 {n} 条"}
+    return {"ok": False, "result": f"未知 mode: {mode}"}
+
+
+@_tool("bg_task")
+def _tool_bg_task(args: dict) -> dict:
+    tid = _task_mgr.launch(args["name"], args["prompt"],
+                           on_done=_on_bg_task_done)
+    return {"ok": True, "result": f"后台任务 #{tid} '{args['name']}' 已启动"}
+
+
+@_tool("task_status", concurrency="io")
+def _tool_task_status(args: dict) -> dict:
+    return {"ok": True, "result": _task_mgr.summary()}
+
+
+@_tool("done")
+def _tool_done(args: dict) -> dict:
+    return {"ok": True, "done": True, "result": args.get("summary", "")}
+
+
+@_tool("learn_video", concurrency="io")
+def _tool_learn_video(args: dict) -> dict:
+    return _learn_video(args["url"], args.get("topic", ""))
+
+
+@_tool("file_read", concurrency="io")
+def _tool_file_read(args: dict) -> dict:
+    path = args["path"]
+    offset = args.get("offset", 0)
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            content = f.read()
+        segment = content[offset:offset + _TEXT_CHUNK]
+        remaining = max(0, len(content) - offset - _TEXT_CHUNK)
+        result = {"ok": True, "result": segment, "total_chars": len(content)}
+        if remaining > 0:
+            result["note"] = f"还有 {remaining} 字符，下次传 offset={offset + _TEXT_CHUNK}"
+        return result
+    except FileNotFoundError:
+        return {"ok": False, "result": f"文件不存在: {path}"}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
+
+
+@_tool("file_write")
+def _tool_file_write(args: dict) -> dict:
+    path = args["path"]
+    mode = "a" if args.get("mode") == "append" else "w"
+    try:
+        backup = backup_file(path) if mode == "w" else None   # backup before overwrite
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, mode, encoding="utf-8") as f:
+            f.write(args["content"])
+        log_op("file_write", path, backup, f"mode={mode}, len={len(args['content'])}")
+        verb = "追加" if mode == "a" else "写入"
+        note = f"（原文件已备份）" if backup else ""
+        return {"ok": True, "result": f"已{verb} {len(args['content'])} 字符到 {path}{note}"}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
+
+
+@_tool("file_list", concurrency="io")
+def _tool_file_list(args: dict) -> dict:
+    path = args["path"]
+    pattern = args.get("pattern", "*")
+    try:
+        full = os.path.join(path, pattern)
+        entries = glob.glob(full)
+        lines = []
+        for e in sorted(entries)[:100]:
+            stat = os.stat(e)
+            kind = "📁" if os.path.isdir(e) else "📄"
+            lines.append(f"{kind} {os.path.basename(e)} ({stat.st_size} bytes)")
+        return {"ok": True, "result": "\n".join(lines) or "(空目录)"}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
+
+
+@_tool("file_search", concurrency="cpu")
+def _tool_file_search(args: dict) -> dict:
+    path = args["path"]
+    query = args["query"].lower()
+    pattern = args.get("pattern", "*")
+    try:
+        matches = []
+        for fpath in sorted(glob.glob(os.path.join(path, "**", pattern), recursive=True))[:200]:
+            if os.path.isdir(fpath):
+                continue
             try:
-                with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-                segment = content[offset:offset + _TEXT_CHUNK]
-                remaining = max(0, len(content) - offset - _TEXT_CHUNK)
-                result = {"ok": True, "result": segment, "total_chars": len(content)}
-                if remaining > 0:
-                    result["note"] = f"还有 {remaining} 字符，下次传 offset={offset + _TEXT_CHUNK}"
-                return result
-            except FileNotFoundError:
-                return {"ok": False, "result": f"文件不存在: {path}"}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "file_write":
-            path = args["path"]
-            mode = "a" if args.get("mode") == "append" else "w"
+                with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
+                    for lineno, line in enumerate(f, 1):
+                        if query in line.lower():
+                            matches.append(f"{fpath}:{lineno}: {line.rstrip()[:120]}")
+                            if len(matches) >= 50:
+                                break
+            except Exception:
+                pass
+            if len(matches) >= 50:
+                break
+        return {"ok": True, "result": "\n".join(matches) or "未找到匹配内容"}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
+
+
+@_tool("window_list", concurrency="screen")
+def _tool_window_list(args: dict) -> dict:
+    titles = []
+    def _cb(hwnd, _):
+        if ctypes.windll.user32.IsWindowVisible(hwnd):
+            buf = ctypes.create_unicode_buffer(256)
+            ctypes.windll.user32.GetWindowTextW(hwnd, buf, 256)
+            if buf.value.strip():
+                titles.append(buf.value)
+        return True
+    WNDENUMPROC = ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.c_int, ctypes.c_int)
+    ctypes.windll.user32.EnumWindows(WNDENUMPROC(_cb), 0)
+    return {"ok": True, "result": "\n".join(titles[:50])}
+
+
+@_tool("window_focus", concurrency="screen")
+def _tool_window_focus(args: dict) -> dict:
+    hwnd, win_title = _find_window_hwnd_by_title(args["title"])
+    if not hwnd:
+        return {"ok": False, "result": f"未找到标题含 '{args['title']}' 的窗口"}
+    _activate_window(hwnd)
+    return {"ok": True, "result": f"已切换到窗口: {win_title}"}
+
+
+@_tool("window_resize", concurrency="screen")
+def _tool_window_resize(args: dict) -> dict:
+    target_state = args["state"]
+    hwnd, _ = _find_window_hwnd_by_title(args["title"])
+    if not hwnd:
+        return {"ok": False, "result": f"未找到标题含 '{args['title']}' 的窗口"}
+    sw_map = {"maximize": 3, "minimize": 6, "restore": 9}
+    _activate_window(hwnd)
+    ok_sw = ctypes.windll.user32.ShowWindow(hwnd, sw_map[target_state])
+    if ok_sw == 0 and target_state != "minimize":
+        return {"ok": False, "result": f"窗口状态切换可能失败（{target_state}），请确认窗口权限/焦点"}
+    return {"ok": True, "result": f"窗口已{target_state}"}
+
+
+@_tool("wait_for_text", concurrency="screen", screen_lock=True)
+def _tool_wait_for_text(args: dict) -> dict:
+    target = args["text"]
+    timeout = args.get("timeout", 15)
+    end = time.time() + timeout
+    capture = get_capture()
+    ocr = get_ocr()
+    checked = None  # last frame that went through OCR
+    while time.time() < end:
+        frame = capture.grab(since=checked)
+        # OCR only when something changed since the last frame we read; bands
+        # that did not change come from the OCR cache
+        if checked is None or frame.changed:
+            checked = frame
             try:
-                from core.op_log import backup_file, log_op
-                backup = backup_file(path) if mode == "w" else None   # backup before overwrite
-                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
-                with open(path, mode, encoding="utf-8") as f:
-                    f.write(args["content"])
-                log_op("file_write", path, backup, f"mode={mode}, len={len(args['content'])}")
-                verb = "追加" if mode == "a" else "写入"
-                note = f"（原文件已备份）" if backup else ""
-                return {"ok": True, "result": f"已{verb} {len(args['content'])} 字符到 {path}{note}"}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "file_list":
-            import glob as _glob
-            path = args["path"]
-            pattern = args.get("pattern", "*")
+                res = ocr.read(frame.image, until=target)
+            except RuntimeError as e:
+                return _ocr_error(e)
+            except Exception:
+                res = None
+            if res is not None and res.matches:
+                hit = _screen_match(res.matches[0], frame.image)
+                return {"ok": True, "result": f"找到文字: '{target}'，位于 ({hit['x']}, {hit['y']})", **hit}
+        time.sleep(1)
+    return {"ok": False, "result": f"超时 {timeout}s，未找到文字: '{target}'"}
+
+
+@_tool("learn_url", concurrency="io")
+def _tool_learn_url(args: dict) -> dict:
+    return _learn_url(args["url"], args.get("topic", ""))
+
+
+@_tool("web_research", concurrency="io")
+def _tool_web_research(args: dict) -> dict:
+    query = args["query"]
+    topic = args.get("topic", "")
+    n = min(max(int(args.get("n_sources", 3)), 1), 5)
+    save = args.get("save", False)
+
+    search_results = _do_web_search(query)
+    if not search_results:
+        return {"ok": False, "result": "搜索无结果，请换个关键词"}
+
+    sources = search_results[:n]
+
+    def _fetch_one(r):
+        text = _fetch_url_text(r["url"])
+        if not text:
+            return ""
+        return f"### {r['title']}\nURL: {r['url']}\n\n{text[:8000]}"
+
+    with ThreadPoolExecutor(max_workers=n) as ex:
+        pages = [p for p in ex.map(_fetch_one, sources) if p]
+
+    if not pages:
+        return {"ok": False, "result": "所有来源均无法获取内容"}
+
+    combined = "\n\n---\n\n".join(pages)
+    note = _llm_summarize(combined, topic, query)
+
+    if save:
+        get_store().save("knowledge", f"[网络研究] {query}\n{note}")
+
+    sources_str = "\n".join(f"- {r['title']}: {r['url']}" for r in sources)
+    return {"ok": True, "result": f"{note}\n\n**来源：**\n{sources_str}"}
+
+
+@_tool("file_delete")
+def _tool_file_delete(args: dict) -> dict:
+    path = args["path"]
+    try:
+        backup = backup_file(path)   # backup before delete
+        if os.path.isdir(path):
+            os.rmdir(path)
+            backup = None   # dirs not backed up
+        else:
+            os.remove(path)
+        log_op("file_delete", path, backup)
+        note = "（已备份，可用 /rollback 恢复）" if backup else ""
+        return {"ok": True, "result": f"已删除: {path}{note}"}
+    except OSError as e:
+        if os.path.isdir(path):
+            return {"ok": False, "result": f"删除失败：目录可能非空或被占用 ({e})"}
+        return {"ok": False, "result": str(e)}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
+
+
+@_tool("set_clipboard")
+def _tool_set_clipboard(args: dict) -> dict:
+    text = args["text"]
+    # 优先使用 pywin32，失败再回退 ctypes 实现
+    try:
+        if win32clipboard is not None:
+            win32clipboard.OpenClipboard()
             try:
-                full = os.path.join(path, pattern)
-                entries = _glob.glob(full)
-                lines = []
-                for e in sorted(entries)[:100]:
-                    stat = os.stat(e)
-                    kind = "📁" if os.path.isdir(e) else "📄"
-                    lines.append(f"{kind} {os.path.basename(e)} ({stat.st_size} bytes)")
-                return {"ok": True, "result": "\n".join(lines) or "(空目录)"}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "file_search":
-            import glob as _glob
-            path = args["path"]
-            query = args["query"].lower()
-            pattern = args.get("pattern", "*")
+                win32clipboard.EmptyClipboard()
+                win32clipboard.SetClipboardData(win32con.CF_UNICODETEXT, text)
+            finally:
+                win32clipboard.CloseClipboard()
+            return {"ok": True, "result": f"已设置剪贴板: {text[:50]}"}
+
+        # ctypes 回退方案
+        CF_UNICODETEXT = 13
+        GMEM_MOVEABLE = 0x0002
+        GMEM_ZEROINIT = 0x0040
+
+        opened = False
+        try:
+            for _ in range(5):
+                if ctypes.windll.user32.OpenClipboard(0):
+                    opened = True
+                    break
+                time.sleep(0.05)
+            if not opened:
+                return {"ok": False, "result": "剪贴板当前被占用，请稍后重试"}
+
+            ctypes.windll.user32.EmptyClipboard()
+            size = (len(text) + 1) * 2
+            h = ctypes.windll.kernel32.GlobalAlloc(GMEM_MOVEABLE | GMEM_ZEROINIT, size)
+            if not h:
+                return {"ok": False, "result": "分配剪贴板内存失败"}
+            p = ctypes.windll.kernel32.GlobalLock(h)
+            if not p:
+                return {"ok": False, "result": "锁定剪贴板内存失败"}
             try:
-                matches = []
-                for fpath in sorted(_glob.glob(os.path.join(path, "**", pattern), recursive=True))[:200]:
-                    if os.path.isdir(fpath):
-                        continue
-                    try:
-                        with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
-                            for lineno, line in enumerate(f, 1):
-                                if query in line.lower():
-                                    matches.append(f"{fpath}:{lineno}: {line.rstrip()[:120]}")
-                                    if len(matches) >= 50:
-                                        break
-                    except Exception:
-                        pass
-                    if len(matches) >= 50:
-                        break
-                return {"ok": True, "result": "\n".join(matches) or "未找到匹配内容"}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "window_list":
-            import ctypes
-            titles = []
-            def _cb(hwnd, _):
-                if ctypes.windll.user32.IsWindowVisible(hwnd):
-                    buf = ctypes.create_unicode_buffer(256)
-                    ctypes.windll.user32.GetWindowTextW(hwnd, buf, 256)
-                    if buf.value.strip():
-                        titles.append(buf.value)
-                return True
-            WNDENUMPROC = ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.c_int, ctypes.c_int)
-            ctypes.windll.user32.EnumWindows(WNDENUMPROC(_cb), 0)
-            return {"ok": True, "result": "\n".join(titles[:50])}
-
-        elif name == "window_focus":
-            hwnd, win_title = _find_window_hwnd_by_title(args["title"])
-            if not hwnd:
-                return {"ok": False, "result": f"未找到标题含 '{args['title']}' 的窗口"}
-            _activate_window(hwnd)
-            return {"ok": True, "result": f"已切换到窗口: {win_title}"}
-
-        elif name == "window_resize":
-            import ctypes
-            target_state = args["state"]
-            hwnd, _ = _find_window_hwnd_by_title(args["title"])
-            if not hwnd:
-                return {"ok": False, "result": f"未找到标题含 '{args['title']}' 的窗口"}
-            sw_map = {"maximize": 3, "minimize": 6, "restore": 9}
-            _activate_window(hwnd)
-            ok_sw = ctypes.windll.user32.ShowWindow(hwnd, sw_map[target_state])
-            if ok_sw == 0 and target_state != "minimize":
-                return {"ok": False, "result": f"窗口状态切换可能失败（{target_state}），请确认窗口权限/焦点"}
-            return {"ok": True, "result": f"窗口已{target_state}"}
-
-        elif name == "wait_for_text":
-            target = args["text"]
-            timeout = args.get("timeout", 15)
-            end = time.time() + timeout
-            while time.time() < end:
-                img = pyautogui.screenshot()
+                ctypes.memmove(p, (text + "\0").encode("utf-16-le"), size)
+            finally:
+                ctypes.windll.kernel32.GlobalUnlock(h)
+            if not ctypes.windll.user32.SetClipboardData(CF_UNICODETEXT, h):
+                return {"ok": False, "result": "SetClipboardData 调用失败"}
+            return {"ok": True, "result": f"已设置剪贴板: {text[:50]}"}
+        finally:
+            if opened:
                 try:
-                    import pytesseract
-                    ocr = pytesseract.image_to_string(img, lang="chi_sim+eng")
-                    if target in ocr:
-                        return {"ok": True, "result": f"找到文字: '{target}'"}
+                    ctypes.windll.user32.CloseClipboard()
                 except Exception:
                     pass
-                time.sleep(1)
-            return {"ok": False, "result": f"超时 {timeout}s，未找到文字: '{target}'"}
+    except Exception as e:
+        return {"ok": False, "result": f"设置剪贴板失败: {e}"}
 
-        elif name == "learn_url":
-            return _learn_url(args["url"], args.get("topic", ""))
 
-        elif name == "web_research":
-            query = args["query"]
-            topic = args.get("topic", "")
-            n = min(max(int(args.get("n_sources", 3)), 1), 5)
-            save = args.get("save", False)
+@_tool("process_list", concurrency="io")
+def _tool_process_list(args: dict) -> dict:
+    procs = []
+    for p in sorted(psutil.process_iter(["pid", "name", "cpu_percent", "memory_percent"]),
+                    key=lambda x: x.info["memory_percent"] or 0, reverse=True)[:30]:
+        i = p.info
+        procs.append(f"{i['pid']:6d}  {(i['cpu_percent'] or 0):5.1f}%  {(i['memory_percent'] or 0):5.1f}%  {i['name']}")
+    return {"ok": True, "result": "   PID   CPU    MEM  NAME\n" + "\n".join(procs)}
 
-            search_results = _do_web_search(query)
-            if not search_results:
-                return {"ok": False, "result": "搜索无结果，请换个关键词"}
 
-            sources = search_results[:n]
+@_tool("process_kill")
+def _tool_process_kill(args: dict) -> dict:
+    pid = args.get("pid")
+    pname = args.get("name", "").lower()
+    killed = []
+    if pid:
+        try:
+            psutil.Process(pid).kill()
+            killed.append(str(pid))
+        except Exception as e:
+            return {"ok": False, "result": str(e)}
+    elif pname:
+        for p in psutil.process_iter(["pid", "name"]):
+            if p.info["name"] and pname in p.info["name"].lower():
+                try:
+                    p.kill()
+                    killed.append(f"{p.info['name']}({p.info['pid']})")
+                except Exception:
+                    pass
+    if not killed:
+        return {"ok": False, "result": "未找到匹配进程"}
+    return {"ok": True, "result": f"已终止: {', '.join(killed)}"}
+
+
+@_tool("notify")
+def _tool_notify(args: dict) -> dict:
+    try:
+        title = args["title"].replace("'", "\\'")
+        msg = args["message"].replace("'", "\\'")
+        subprocess.Popen(
+            ["powershell", "-WindowStyle", "Hidden", "-Command",
+             f"[Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, ContentType=WindowsRuntime] | Out-Null;"
+             f"$t = [Windows.UI.Notifications.ToastTemplateType]::ToastText02;"
+             f"$x = [Windows.UI.Notifications.ToastNotificationManager]::GetTemplateContent($t);"
+             f"$x.GetElementsByTagName('text')[0].AppendChild($x.CreateTextNode('{title}')) | Out-Null;"
+             f"$x.GetElementsByTagName('text')[1].AppendChild($x.CreateTextNode('{msg}')) | Out-Null;"
+             f"$n = [Windows.UI.Notifications.ToastNotification]::new($x);"
+             f"[Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier('Starbot').Show($n)"],
+            creationflags=0x08000000,
+        )
+        return {"ok": True, "result": f"通知已发送: {args['title']}"}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
+
 
-            def _fetch_one(r):
-                text = _fetch_url_text(r["url"])
-                if not text:
-                    return ""
-                return f"### {r['title']}\nURL: {r['url']}\n\n{text[:8000]}"
+@_tool("get_screen_size", concurrency="screen")
+def _tool_get_screen_size(args: dict) -> dict:
+    sw, sh = pyautogui.size()
+    return {"ok": True, "result": f"{sw}x{sh}"}
 
-            with ThreadPoolExecutor(max_workers=n) as ex:
-                pages = [p for p in ex.map(_fetch_one, sources) if p]
 
-            if not pages:
-                return {"ok": False, "result": "所有来源均无法获取内容"}
+@_tool("mouse_position", concurrency="screen")
+def _tool_mouse_position(args: dict) -> dict:
+    x, y = pyautogui.position()
+    return {"ok": True, "result": f"({x}, {y})"}
 
-            combined = "\n\n---\n\n".join(pages)
-            note = _llm_summarize(combined, topic, query)
 
-            if save:
-                _memory.save("knowledge", f"[网络研究] {query}\n{note}")
+@_tool("screenshot_window", concurrency="screen")
+def _tool_screenshot_window(args: dict) -> dict:
+    from ctypes import wintypes
+    hwnd, win_title = _find_window_hwnd_by_title(args["title"])
+    if not hwnd:
+        return {"ok": False, "result": f"未找到窗口: {args['title']}"}
+    _activate_window(hwnd)
+    time.sleep(0.12)
+    rect = wintypes.RECT()
+    ctypes.windll.user32.GetWindowRect(hwnd, ctypes.byref(rect))
+    x, y, w, h = rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
+    if w <= 0 or h <= 0:
+        return {"ok": False, "result": "窗口尺寸无效"}
+    try:
+        img = get_capture().grab(region=(x, y, w, h)).image
+    except Exception as e:
+        return {"ok": False, "result": f"窗口截图失败（可能权限不足）: {e}"}
+    path = SCREENSHOT_PATH.replace(".jpg", "_window.jpg")
+    save_jpeg(img, path)
+    return {"ok": True, "result": f"窗口截图 {w}x{h} ({win_title})", "image": path}
+
+
+@_tool("find_image", concurrency="screen")
+def _tool_find_image(args: dict) -> dict:
+    path = args["image_path"]
+    if not os.path.isfile(path):
+        return {"ok": False, "result": f"模板图片不存在: {path}"}
+    confidence = float(args.get("confidence", 0.8))
+    frame = get_capture().latest(_FIND_IMAGE_MAX_AGE)
+    img = frame.image
+    fx, fy = _screen_factor(img)
+    roi = None
+    if args.get("region"):
+        try:
+            x, y, w, h = (int(v) for v in args["region"])
+        except (TypeError, ValueError):
+            return {"ok": False, "result": "region 需为 [x, y, width, height]"}
+        x0, y0 = max(0, int(x / fx)), max(0, int(y / fy))
+        x1, y1 = min(img.width, int((x + w) / fx)), min(img.height, int((y + h) / fy))
+        if x1 <= x0 or y1 <= y0:
+            return {"ok": False, "result": "region 超出屏幕范围"}
+        roi = (x0, y0, x1 - x0, y1 - y0)
+    try:
+        matches = get_matcher().find(
+            img, path, region=roi,
+            scales=DEFAULT_SCALES if args.get("multi_scale", True) else (1.0,),
+            grey=bool(args.get("grayscale")),
+            threshold=confidence,
+            limit=max(1, min(int(args.get("max_results", 5)), 20)),
+        )
+    except RuntimeError:
+        # No numpy/opencv: pyautogui's own matcher
+        try:
+            loc = pyautogui.locateOnScreen(path, confidence=confidence)
+            if loc is None:
+                return {"ok": False, "result": "未在屏幕上找到该图像"}
+            cx, cy = pyautogui.center(loc)
+            return {"ok": True, "result": f"找到位置: ({cx}, {cy})", "x": cx, "y": cy}
+        except Exception as e:
+            return {"ok": False, "result": str(e)}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
+    if not matches:
+        return {"ok": False, "result": "未在屏幕上找到该图像"}
+    found = []
+    for m in matches:
+        x, y, w, h = m.box
+        cx, cy = m.center
+        found.append({"x": int(cx * fx), "y": int(cy * fy), "score": m.score, "scale": m.scale,
+                      "box": [int(x * fx), int(y * fy), int(w * fx), int(h * fy)]})
+    best = found[0]
+    more = f"，共 {len(found)} 处" if len(found) > 1 else ""
+    return {
+        "ok": True,
+        "result": f"找到位置: ({best['x']}, {best['y']})，相似度 {best['score']:.2f}{more}",
+        "x": best["x"],
+        "y": best["y"],
+        "matches": found,
+    }
 
-            sources_str = "\n".join(f"- {r['title']}: {r['url']}" for r in sources)
-            return {"ok": True, "result": f"{note}\n\n**来源：**\n{sources_str}"}
 
-        elif name == "file_delete":
-            path = args["path"]
+@_tool("http_request", concurrency="io")
+def _tool_http_request(args: dict) -> dict:
+    method = args["method"].upper()
+    url = args["url"]
+    headers = args.get("headers") or {}
+    body = args.get("body")
+    req_kwargs = {"headers": headers, "timeout": 15}
+    if body is not None:
+        ctype = str(headers.get("Content-Type") or headers.get("content-type") or "").lower()
+        if "application/json" in ctype:
             try:
-                from core.op_log import backup_file, log_op
-                backup = backup_file(path)   # backup before delete
-                if os.path.isdir(path):
-                    os.rmdir(path)
-                    backup = None   # dirs not backed up
+                req_kwargs["json"] = json.loads(body)
+            except Exception:
+                req_kwargs["data"] = body.encode() if isinstance(body, str) else body
+        else:
+            req_kwargs["data"] = body.encode() if isinstance(body, str) else body
+    try:
+        resp = http_client.request(method, url, **req_kwargs)
+    except Exception as e:
+        return {"ok": False, "result": f"请求失败: {e}"}
+    text = resp.text[:3000]
+    return {"ok": True, "result": f"HTTP {resp.status_code}\n{text}"}
+
+
+@_tool("zip_files")
+def _tool_zip_files(args: dict) -> dict:
+    output = args["output"]
+    try:
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
+            for p in args["paths"]:
+                if os.path.isdir(p):
+                    for root, _, files in os.walk(p):
+                        for f in files:
+                            fp = os.path.join(root, f)
+                            zf.write(fp, os.path.relpath(fp, os.path.dirname(p)))
                 else:
-                    os.remove(path)
-                log_op("file_delete", path, backup)
-                note = "（已备份，可用 /rollback 恢复）" if backup else ""
-                return {"ok": True, "result": f"已删除: {path}{note}"}
-            except OSError as e:
-                if os.path.isdir(path):
-                    return {"ok": False, "result": f"删除失败：目录可能非空或被占用 ({e})"}
-                return {"ok": False, "result": str(e)}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "set_clipboard":
-            text = args["text"]
-            # 优先使用 pywin32，失败再回退 ctypes 实现
-            try:
-                try:
-                    import win32clipboard  # type: ignore
-                    import win32con  # type: ignore
-                except ImportError:
-                    win32clipboard = None  # type: ignore
+                    zf.write(p, os.path.basename(p))
+        return {"ok": True, "result": f"已创建: {output}"}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
 
-                if win32clipboard is not None:
-                    win32clipboard.OpenClipboard()
-                    try:
-                        win32clipboard.EmptyClipboard()
-                        win32clipboard.SetClipboardData(win32con.CF_UNICODETEXT, text)
-                    finally:
-                        win32clipboard.CloseClipboard()
-                    return {"ok": True, "result": f"已设置剪贴板: {text[:50]}"}
 
-                # ctypes 回退方案
-                import ctypes
+@_tool("unzip")
+def _tool_unzip(args: dict) -> dict:
+    try:
+        with zipfile.ZipFile(args["path"], "r") as zf:
+            zf.extractall(args["dest"])
+        return {"ok": True, "result": f"已解压到: {args['dest']}"}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
 
-                CF_UNICODETEXT = 13
-                GMEM_MOVEABLE = 0x0002
-                GMEM_ZEROINIT = 0x0040
 
-                opened = False
-                try:
-                    for _ in range(5):
-                        if ctypes.windll.user32.OpenClipboard(0):
-                            opened = True
-                            break
-                        time.sleep(0.05)
-                    if not opened:
-                        return {"ok": False, "result": "剪贴板当前被占用，请稍后重试"}
-
-                    ctypes.windll.user32.EmptyClipboard()
-                    size = (len(text) + 1) * 2
-                    h = ctypes.windll.kernel32.GlobalAlloc(GMEM_MOVEABLE | GMEM_ZEROINIT, size)
-                    if not h:
-                        return {"ok": False, "result": "分配剪贴板内存失败"}
-                    p = ctypes.windll.kernel32.GlobalLock(h)
-                    if not p:
-                        return {"ok": False, "result": "锁定剪贴板内存失败"}
-                    try:
-                        ctypes.memmove(p, (text + "\0").encode("utf-16-le"), size)
-                    finally:
-                        ctypes.windll.kernel32.GlobalUnlock(h)
-                    if not ctypes.windll.user32.SetClipboardData(CF_UNICODETEXT, h):
-                        return {"ok": False, "result": "SetClipboardData 调用失败"}
-                    return {"ok": True, "result": f"已设置剪贴板: {text[:50]}"}
-                finally:
-                    if opened:
-                        try:
-                            ctypes.windll.user32.CloseClipboard()
-                        except Exception:
-                            pass
-            except Exception as e:
-                return {"ok": False, "result": f"设置剪贴板失败: {e}"}
-
-        elif name == "process_list":
-            import psutil
-            procs = []
-            for p in sorted(psutil.process_iter(["pid", "name", "cpu_percent", "memory_percent"]),
-                            key=lambda x: x.info["memory_percent"] or 0, reverse=True)[:30]:
-                i = p.info
-                procs.append(f"{i['pid']:6d}  {(i['cpu_percent'] or 0):5.1f}%  {(i['memory_percent'] or 0):5.1f}%  {i['name']}")
-            return {"ok": True, "result": "   PID   CPU    MEM  NAME\n" + "\n".join(procs)}
-
-        elif name == "process_kill":
-            import psutil
-            pid = args.get("pid")
-            pname = args.get("name", "").lower()
-            killed = []
-            if pid:
-                try:
-                    psutil.Process(pid).kill()
-                    killed.append(str(pid))
-                except Exception as e:
-                    return {"ok": False, "result": str(e)}
-            elif pname:
-                for p in psutil.process_iter(["pid", "name"]):
-                    if p.info["name"] and pname in p.info["name"].lower():
-                        try:
-                            p.kill()
-                            killed.append(f"{p.info['name']}({p.info['pid']})")
-                        except Exception:
-                            pass
-            if not killed:
-                return {"ok": False, "result": "未找到匹配进程"}
-            return {"ok": True, "result": f"已终止: {', '.join(killed)}"}
-
-        elif name == "notify":
-            try:
-                title = args["title"].replace("'", "\\'")
-                msg = args["message"].replace("'", "\\'")
-                subprocess.Popen(
-                    ["powershell", "-WindowStyle", "Hidden", "-Command",
-                     f"[Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, ContentType=WindowsRuntime] | Out-Null;"
-                     f"$t = [Windows.UI.Notifications.ToastTemplateType]::ToastText02;"
-                     f"$x = [Windows.UI.Notifications.ToastNotificationManager]::GetTemplateContent($t);"
-                     f"$x.GetElementsByTagName('text')[0].AppendChild($x.CreateTextNode('{title}')) | Out-Null;"
-                     f"$x.GetElementsByTagName('text')[1].AppendChild($x.CreateTextNode('{msg}')) | Out-Null;"
-                     f"$n = [Windows.UI.Notifications.ToastNotification]::new($x);"
-                     f"[Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier('Starbot').Show($n)"],
-                    creationflags=0x08000000,
-                )
-                return {"ok": True, "result": f"通知已发送: {args['title']}"}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "get_screen_size":
-            sw, sh = pyautogui.size()
-            return {"ok": True, "result": f"{sw}x{sh}"}
-
-        elif name == "mouse_position":
-            x, y = pyautogui.position()
-            return {"ok": True, "result": f"({x}, {y})"}
-
-        elif name == "screenshot_window":
-            import ctypes
-            hwnd, win_title = _find_window_hwnd_by_title(args["title"])
-            if not hwnd:
-                return {"ok": False, "result": f"未找到窗口: {args['title']}"}
-            _activate_window(hwnd)
-            time.sleep(0.12)
-            rect = ctypes.wintypes.RECT()
-            ctypes.windll.user32.GetWindowRect(hwnd, ctypes.byref(rect))
-            x, y, w, h = rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
-            if w <= 0 or h <= 0:
-                return {"ok": False, "result": "窗口尺寸无效"}
-            try:
-                img = pyautogui.screenshot(region=(x, y, w, h))
-            except Exception as e:
-                return {"ok": False, "result": f"窗口截图失败（可能权限不足）: {e}"}
-            base, ext = os.path.splitext(SCREENSHOT_PATH)
-            path = f"{base}_window{ext or '.png'}"
-            img.save(path)
-            return {"ok": True, "result": f"窗口截图 {w}x{h} ({win_title})", "image": path}
-
-        elif name == "find_image":
-            try:
-                loc = pyautogui.locateOnScreen(
-                    args["image_path"], confidence=args.get("confidence", 0.8)
-                )
-                if loc is None:
-                    return {"ok": False, "result": "未在屏幕上找到该图像"}
-                cx, cy = pyautogui.center(loc)
-                return {"ok": True, "result": f"找到位置: ({cx}, {cy})", "x": cx, "y": cy}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "http_request":
-            method = args["method"].upper()
-            url = args["url"]
-            headers = args.get("headers") or {}
-            body = args.get("body")
-            last_err = None
-            for attempt in range(3):
-                try:
-                    req_kwargs = {"method": method, "url": url, "headers": headers, "timeout": 15}
-                    if body is not None:
-                        ctype = str(headers.get("Content-Type") or headers.get("content-type") or "").lower()
-                        if "application/json" in ctype:
-                            try:
-                                req_kwargs["json"] = json.loads(body)
-                            except Exception:
-                                req_kwargs["data"] = body.encode() if isinstance(body, str) else body
-                        else:
-                            req_kwargs["data"] = body.encode() if isinstance(body, str) else body
-                    resp = requests.request(**req_kwargs)
-                    text = resp.text[:3000]
-                    return {"ok": True, "result": f"HTTP {resp.status_code}\n{text}"}
-                except Exception as e:
-                    last_err = e
-                    time.sleep(1.5 ** attempt)
-            return {"ok": False, "result": f"请求失败: {last_err}"}
-
-        elif name == "zip_files":
-            import zipfile
-            output = args["output"]
-            try:
-                with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
-                    for p in args["paths"]:
-                        if os.path.isdir(p):
-                            for root, _, files in os.walk(p):
-                                for f in files:
-                                    fp = os.path.join(root, f)
-                                    zf.write(fp, os.path.relpath(fp, os.path.dirname(p)))
-                        else:
-                            zf.write(p, os.path.basename(p))
-                return {"ok": True, "result": f"已创建: {output}"}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "unzip":
-            import zipfile
-            try:
-                with zipfile.ZipFile(args["path"], "r") as zf:
-                    zf.extractall(args["dest"])
-                return {"ok": True, "result": f"已解压到: {args['dest']}"}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "get_env":
-            val = os.environ.get(args["name"])
-            if val is None:
-                return {"ok": False, "result": f"环境变量 {args['name']} 不存在"}
-            return {"ok": True, "result": val}
-
-        elif name == "registry_read":
-            import winreg
-            key_path = args["key"]
-            value_name = args.get("value", "")
-            roots = {"HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
-                     "HKCU": winreg.HKEY_CURRENT_USER,
-                     "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
-                     "HKLM": winreg.HKEY_LOCAL_MACHINE,
-                     "HKEY_CLASSES_ROOT": winreg.HKEY_CLASSES_ROOT}
-            if "\\" not in key_path:
-                return {"ok": False, "result": f"注册表路径格式错误: {key_path}"}
-            root_name, sub = key_path.split("\\", 1)
-            root = roots.get(root_name.upper())
-            if not root:
-                return {"ok": False, "result": f"未知根键: {root_name}"}
-            try:
-                with winreg.OpenKey(root, sub) as k:
-                    data, _ = winreg.QueryValueEx(k, value_name)
-                return {"ok": True, "result": str(data)}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "registry_write":
-            import winreg
-            key_path = args["key"]
-            roots = {"HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
-                     "HKCU": winreg.HKEY_CURRENT_USER,
-                     "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
-                     "HKLM": winreg.HKEY_LOCAL_MACHINE}
-            if "\\" not in key_path:
-                return {"ok": False, "result": f"注册表路径格式错误: {key_path}"}
-            root_name, sub = key_path.split("\\", 1)
-            root = roots.get(root_name.upper())
-            if not root:
-                return {"ok": False, "result": f"未知根键: {root_name}"}
-            try:
-                reg_type_map = {
-                    "REG_SZ": winreg.REG_SZ,
-                    "REG_EXPAND_SZ": winreg.REG_EXPAND_SZ,
-                    "REG_MULTI_SZ": winreg.REG_MULTI_SZ,
-                    "REG_BINARY": winreg.REG_BINARY,
-                    "REG_DWORD": winreg.REG_DWORD,
-                }
-                reg_type_str = args.get("type", "REG_SZ").upper()
-                reg_type = reg_type_map.get(reg_type_str, winreg.REG_SZ)
-                data = args["data"]
-                if reg_type == winreg.REG_DWORD:
-                    data = int(data)
-                elif reg_type == winreg.REG_MULTI_SZ:
-                    data = data.split("\n")
-                with winreg.CreateKey(root, sub) as k:
-                    winreg.SetValueEx(k, args["value"], 0, reg_type, data)
-                return {"ok": True, "result": f"已写入注册表 ({reg_type_str})"}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "power":
-            action = args["action"]
-            delay = args.get("delay", 0)
-            if action == "cancel":
-                r = subprocess.run("shutdown /a", shell=True, capture_output=True, text=True)
-                if r.returncode == 0:
-                    return {"ok": True, "result": "已取消待定的关机/重启"}
-                return {"ok": False, "result": r.stderr.strip() or "没有待取消的关机任务"}
-            cmds = {
-                "shutdown": f"shutdown /s /t {delay}",
-                "restart":  f"shutdown /r /t {delay}",
-                "sleep":    "rundll32.exe powrprof.dll,SetSuspendState 0,1,0",
-                "lock":     "rundll32.exe user32.dll,LockWorkStation",
-            }
-            cmd = cmds.get(action)
-            if not cmd:
-                return {"ok": False, "result": f"未知操作: {action}"}
-            r = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            if r.returncode != 0:
-                return {"ok": False, "result": r.stderr.strip() or f"执行失败: {action}"}
-            return {"ok": True, "result": f"已执行: {action}"}
-
-        elif name == "registry_delete_value":
-            import winreg
-            key_path = args["key"]
-            roots = {"HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
-                     "HKCU": winreg.HKEY_CURRENT_USER,
-                     "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
-                     "HKLM": winreg.HKEY_LOCAL_MACHINE,
-                     "HKEY_CLASSES_ROOT": winreg.HKEY_CLASSES_ROOT,
-                     "HKEY_USERS": winreg.HKEY_USERS}
-            if "\\" not in key_path:
-                return {"ok": False, "result": f"注册表路径格式错误: {key_path}"}
-            root_name, sub = key_path.split("\\", 1)
-            root = roots.get(root_name.upper())
-            if not root:
-                return {"ok": False, "result": f"未知根键: {root_name}"}
-            try:
-                with winreg.OpenKey(root, sub, access=winreg.KEY_SET_VALUE) as k:
-                    winreg.DeleteValue(k, args["value"])
-                return {"ok": True, "result": f"已删除注册表值: {args['value']}"}
-            except FileNotFoundError:
-                return {"ok": False, "result": f"值不存在: {args['value']}"}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
-
-        elif name == "registry_list_keys":
-            import winreg
-            key_path = args["key"]
-            roots = {"HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
-                     "HKCU": winreg.HKEY_CURRENT_USER,
-                     "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
-                     "HKLM": winreg.HKEY_LOCAL_MACHINE,
-                     "HKEY_CLASSES_ROOT": winreg.HKEY_CLASSES_ROOT,
-                     "HKEY_USERS": winreg.HKEY_USERS}
-            if "\\" not in key_path:
-                return {"ok": False, "result": f"注册表路径格式错误: {key_path}"}
-            root_name, sub = key_path.split("\\", 1)
-            root = roots.get(root_name.upper())
-            if not root:
-                return {"ok": False, "result": f"未知根键: {root_name}"}
-            try:
-                subkeys = []
-                with winreg.OpenKey(root, sub) as k:
-                    i = 0
-                    while True:
-                        try:
-                            subkeys.append(winreg.EnumKey(k, i))
-                            i += 1
-                        except OSError:
-                            break
-                return {"ok": True, "result": "\n".join(subkeys) if subkeys else "(无子键)"}
-            except Exception as e:
-                return {"ok": False, "result": str(e)}
+@_tool("get_env", concurrency="io")
+def _tool_get_env(args: dict) -> dict:
+    val = os.environ.get(args["name"])
+    if val is None:
+        return {"ok": False, "result": f"环境变量 {args['name']} 不存在"}
+    return {"ok": True, "result": val}
+
+
+@_tool("registry_read", concurrency="io")
+def _tool_registry_read(args: dict) -> dict:
+    if winreg is None:
+        return {"ok": False, "result": _NO_WINREG}
+    key_path = args["key"]
+    value_name = args.get("value", "")
+    roots = {"HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
+             "HKCU": winreg.HKEY_CURRENT_USER,
+             "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
+             "HKLM": winreg.HKEY_LOCAL_MACHINE,
+             "HKEY_CLASSES_ROOT": winreg.HKEY_CLASSES_ROOT}
+    if "\\" not in key_path:
+        return {"ok": False, "result": f"注册表路径格式错误: {key_path}"}
+    root_name, sub = key_path.split("\\", 1)
+    root = roots.get(root_name.upper())
+    if not root:
+        return {"ok": False, "result": f"未知根键: {root_name}"}
+    try:
+        with winreg.OpenKey(root, sub) as k:
+            data, _ = winreg.QueryValueEx(k, value_name)
+        return {"ok": True, "result": str(data)}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
+
+
+@_tool("registry_write")
+def _tool_registry_write(args: dict) -> dict:
+    if winreg is None:
+        return {"ok": False, "result": _NO_WINREG}
+    key_path = args["key"]
+    roots = {"HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
+             "HKCU": winreg.HKEY_CURRENT_USER,
+             "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
+             "HKLM": winreg.HKEY_LOCAL_MACHINE}
+    if "\\" not in key_path:
+        return {"ok": False, "result": f"注册表路径格式错误: {key_path}"}
+    root_name, sub = key_path.split("\\", 1)
+    root = roots.get(root_name.upper())
+    if not root:
+        return {"ok": False, "result": f"未知根键: {root_name}"}
+    try:
+        reg_type_map = {
+            "REG_SZ": winreg.REG_SZ,
+            "REG_EXPAND_SZ": winreg.REG_EXPAND_SZ,
+            "REG_MULTI_SZ": winreg.REG_MULTI_SZ,
+            "REG_BINARY": winreg.REG_BINARY,
+            "REG_DWORD": winreg.REG_DWORD,
+        }
+        reg_type_str = args.get("type", "REG_SZ").upper()
+        reg_type = reg_type_map.get(reg_type_str, winreg.REG_SZ)
+        data = args["data"]
+        if reg_type == winreg.REG_DWORD:
+            data = int(data)
+        elif reg_type == winreg.REG_MULTI_SZ:
+            data = data.split("\n")
+        with winreg.CreateKey(root, sub) as k:
+            winreg.SetValueEx(k, args["value"], 0, reg_type, data)
+        return {"ok": True, "result": f"已写入注册表 ({reg_type_str})"}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
 
-        else:
-            # Try skill plugins before declaring unknown
-            skill_result = _skill_manager.execute(name, args)
-            if skill_result is not None:
-                return skill_result
-            return {"ok": False, "result": f"Unknown action: {name}"}
 
+@_tool("power")
+def _tool_power(args: dict) -> dict:
+    action = args["action"]
+    delay = args.get("delay", 0)
+    if action == "cancel":
+        r = subprocess.run("shutdown /a", shell=True, capture_output=True, text=True)
+        if r.returncode == 0:
+            return {"ok": True, "result": "已取消待定的关机/重启"}
+        return {"ok": False, "result": r.stderr.strip() or "没有待取消的关机任务"}
+    cmds = {
+        "shutdown": f"shutdown /s /t {delay}",
+        "restart":  f"shutdown /r /t {delay}",
+        "sleep":    "rundll32.exe powrprof.dll,SetSuspendState 0,1,0",
+        "lock":     "rundll32.exe user32.dll,LockWorkStation",
+    }
+    cmd = cmds.get(action)
+    if not cmd:
+        return {"ok": False, "result": f"未知操作: {action}"}
+    r = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    if r.returncode != 0:
+        return {"ok": False, "result": r.stderr.strip() or f"执行失败: {action}"}
+    return {"ok": True, "result": f"已执行: {action}"}
+
+
+@_tool("registry_delete_value")
+def _tool_registry_delete_value(args: dict) -> dict:
+    if winreg is None:
+        return {"ok": False, "result": _NO_WINREG}
+    key_path = args["key"]
+    roots = {"HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
+             "HKCU": winreg.HKEY_CURRENT_USER,
+             "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
+             "HKLM": winreg.HKEY_LOCAL_MACHINE,
+             "HKEY_CLASSES_ROOT": winreg.HKEY_CLASSES_ROOT,
+             "HKEY_USERS": winreg.HKEY_USERS}
+    if "\\" not in key_path:
+        return {"ok": False, "result": f"注册表路径格式错误: {key_path}"}
+    root_name, sub = key_path.split("\\", 1)
+    root = roots.get(root_name.upper())
+    if not root:
+        return {"ok": False, "result": f"未知根键: {root_name}"}
+    try:
+        with winreg.OpenKey(root, sub, access=winreg.KEY_SET_VALUE) as k:
+            winreg.DeleteValue(k, args["value"])
+        return {"ok": True, "result": f"已删除注册表值: {args['value']}"}
+    except FileNotFoundError:
+        return {"ok": False, "result": f"值不存在: {args['value']}"}
     except Exception as e:
         return {"ok": False, "result": str(e)}
 
 
+@_tool("registry_list_keys", concurrency="io")
+def _tool_registry_list_keys(args: dict) -> dict:
+    if winreg is None:
+        return {"ok": False, "result": _NO_WINREG}
+    key_path = args["key"]
+    roots = {"HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
+             "HKCU": winreg.HKEY_CURRENT_USER,
+             "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
+             "HKLM": winreg.HKEY_LOCAL_MACHINE,
+             "HKEY_CLASSES_ROOT": winreg.HKEY_CLASSES_ROOT,
+             "HKEY_USERS": winreg.HKEY_USERS}
+    if "\\" not in key_path:
+        return {"ok": False, "result": f"注册表路径格式错误: {key_path}"}
+    root_name, sub = key_path.split("\\", 1)
+    root = roots.get(root_name.upper())
+    if not root:
+        return {"ok": False, "result": f"未知根键: {root_name}"}
+    try:
+        subkeys = []
+        with winreg.OpenKey(root, sub) as k:
+            i = 0
+            while True:
+                try:
+                    subkeys.append(winreg.EnumKey(k, i))
+                    i += 1
+                except OSError:
+                    break
+        return {"ok": True, "result": "\n".join(subkeys) if subkeys else "(无子键)"}
+    except Exception as e:
+        return {"ok": False, "result": str(e)}
+
+
+_registry.set_builtin_schema(TOOLS_SCHEMA, bg_excluded=_SCREEN_TOOL_NAMES)
+# 后台任务可用的工具（不含屏幕操作，避免与前台任务冲突）
+BG_TOOLS_SCHEMA = _registry.builtin_schema(background=True)
+
+
 _summarize_llm = None
 
 def _get_summarize_llm():
     global _summarize_llm
     if _summarize_llm is None:
         from core.adapter import UniversalLLM
-        from config import config
-        _summarize_llm = UniversalLLM(config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL)
+        _summarize_llm = UniversalLLM.from_config()
     return _summarize_llm
 
 def _llm_summarize(text: str, topic: str, source: str) -> str:
@@ -1906,7 +2241,7 @@ def _learn_video(url: str, topic: str) -> dict:
     clean = "\n".join(dict.fromkeys(lines))
 
     note = _llm_summarize(clean, topic, url)
-    _memory.save("knowledge", f"[视频学习] {url}\n{note}")
+    get_store().save("knowledge", f"[视频学习] {url}\n{note}")
 
     return {"ok": True, "result": f"学习完成，字幕 {len(clean)} 字符，已提炼摘要存入记忆。\n\n{note[:800]}"}
 
@@ -1917,5 +2252,5 @@ def _learn_url(url: str, topic: str) -> dict:
     if len(text) < 100:
         return {"ok": False, "result": "Page content too short or failed to extract"}
     note = _llm_summarize(text, topic, url)
-    _memory.save("knowledge", f"[网页学习] {url}\n{note}")
+    get_store().save("knowledge", f"[网页学习] {url}\n{note}")
     return {"ok": True, "result": f"学习完成，正文 {len(text)} 字符，已提炼摘要存入记忆。\n\n{note[:800]}"}
@@ -0,0 +1,372 @@
+"""Incremental OCR for the screen tools.
+
+- Engines return words with boxes: ``TesserocrEngine`` keeps one Tesseract
+  API instance warm in-process; ``PytesseractEngine`` runs the tesseract
+  binary, so it OCRs the bands of a pass in one call (stacked into one
+  image) to pay the process start once. ``OCR_ENGINE`` picks one (``auto``
+  prefers tesserocr). Tests pass their own engine to ``OcrService``.
+- OcrService: splits a frame into full-width bands at the gaps between text
+  lines, caches each band's words by a hash of its pixels, and only OCRs
+  bands it hasn't seen (unchanged or merely scrolled bands are free). With
+  ``until`` it stops at the first band that contains the text.
+- find_text(): matches text across the words of a line (ignoring spaces,
+  which Tesseract puts between CJK characters) and returns its box.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from PIL import Image, ImageChops
+
+try:
+    import tesserocr  # type: ignore
+except Exception:  # pragma: no cover - optional warm OCR engine
+    tesserocr = None
+
+try:
+    import pytesseract  # type: ignore
+except Exception:  # pragma: no cover - optional OCR dependency
+    pytesseract = None
+
+log = logging.getLogger(__name__)
+
+# auto | tesserocr | pytesseract
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "auto").strip().lower() or "auto"
+OCR_LANG = os.environ.get("OCR_LANG", "chi_sim+eng").strip() or "chi_sim+eng"
+
+BAND_MIN = 24           # band height limits (pixels)
+BAND_MAX = 160
+BAND_PAD = 4            # quiet rows kept above and below the text of a band
+EDGE_LEVEL = 32         # grey step between neighbouring pixels that counts as an edge
+CACHE_BANDS = 1024      # band results kept in the cache
+SHEET_GAP = 16          # white rows between bands stacked for one engine call
+
+Box = tuple[int, int, int, int]     # x, y, width, height
+
+
+@dataclass
+class Word:
+    text: str
+    box: Box
+    conf: float = -1.0
+    line: int = 0       # words with the same value were read as one text line
+
+
+@dataclass
+class Match:
+    text: str
+    box: Box
+
+    @property
+    def center(self) -> tuple[int, int]:
+        x, y, w, h = self.box
+        return x + w // 2, y + h // 2
+
+
+@dataclass
+class OcrResult:
+    words: list[Word]
+    matches: list[Match] = field(default_factory=list)
+    ocr_bands: int = 0          # bands sent to the engine in this call
+    cached_bands: int = 0       # bands answered from the cache
+
+    @property
+    def text(self) -> str:
+        lines: dict[int, list[str]] = {}
+        for w in self.words:
+            lines.setdefault(w.line, []).append(w.text)
+        return "\n".join(_join_words(ws) for ws in lines.values())
+
+
+_CJK_GAP = re.compile(r"(?<=[\u3000-\u9fff\uff00-\uffef]) (?=[\u3000-\u9fff\uff00-\uffef])")
+
+
+def _join_words(words: list[str]) -> str:
+    return _CJK_GAP.sub("", " ".join(words))
+
+
+def find_text(words: list[Word], target: str) -> list[Match]:
+    """Every occurrence of ``target`` inside one line, whitespace and case ignored."""
+    needle = "".join(target.split()).lower()
+    if not needle:
+        return []
+    lines: dict[int, list[Word]] = {}
+    for w in words:
+        lines.setdefault(w.line, []).append(w)
+    matches = []
+    for ws in lines.values():
+        spans, pos = [], 0
+        for w in ws:
+            t = "".join(w.text.split()).lower()
+            spans.append((pos, pos + len(t), w))
+            pos += len(t)
+        hay = "".join("".join(w.text.split()).lower() for w in ws)
+        start = hay.find(needle)
+        while start >= 0:
+            end = start + len(needle)
+            hit = [w for s, e, w in spans if s < end and e > start]
+            x0 = min(w.box[0] for w in hit)
+            y0 = min(w.box[1] for w in hit)
+            x1 = max(w.box[0] + w.box[2] for w in hit)
+            y1 = max(w.box[1] + w.box[3] for w in hit)
+            matches.append(Match(_join_words([w.text for w in hit]), (x0, y0, x1 - x0, y1 - y0)))
+            start = hay.find(needle, end)
+    return matches
+
+
+# ── Engines ───────────────────────────────────────────────────────────────────
+
+class TesserocrEngine:
+    """One Tesseract API kept loaded (language data is read once)."""
+
+    name = "tesserocr"
+    batch = 1           # in-process calls are cheap: OCR band by band
+
+    def __init__(self, lang: str = OCR_LANG):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self._api = tesserocr.PyTessBaseAPI(lang=lang)
+        self._lock = threading.Lock()
+
+    def words(self, img: Image.Image) -> list[Word]:
+        level = tesserocr.RIL.WORD
+        out = []
+        line = -1
+        with self._lock:
+            self._api.SetImage(img)
+            self._api.Recognize()
+            for r in tesserocr.iterate_level(self._api.GetIterator(), level):
+                text = r.GetUTF8Text(level)
+                if r.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+                if not text or not text.strip():
+                    continue
+                x0, y0, x1, y1 = r.BoundingBox(level)
+                out.append(Word(text.strip(), (x0, y0, x1 - x0, y1 - y0), float(r.Confidence(level)), max(line, 0)))
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._api.End()
+
+
+class PytesseractEngine:
+    """The tesseract binary through pytesseract (one process per call)."""
+
+    name = "pytesseract"
+    batch = 0           # 0 = everything in one call
+
+    def __init__(self, lang: str = OCR_LANG):
+        if pytesseract is None:
+            raise RuntimeError("pytesseract is not installed")
+        self.lang = lang
+
+    def words(self, img: Image.Image) -> list[Word]:
+        data = pytesseract.image_to_data(img, lang=self.lang, output_type=pytesseract.Output.DICT)
+        out = []
+        lines: dict[tuple, int] = {}
+        for i, text in enumerate(data["text"]):
+            if not text or not text.strip():
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            line = lines.setdefault(key, len(lines))
+            box = (int(data["left"][i]), int(data["top"][i]), int(data["width"][i]), int(data["height"][i]))
+            out.append(Word(text.strip(), box, float(data["conf"][i]), line))
+        return out
+
+    def close(self) -> None:
+        pass
+
+
+_ENGINES = {
+    "tesserocr": TesserocrEngine,
+    "pytesseract": PytesseractEngine,
+}
+
+
+def create_engine(name: str = OCR_ENGINE):
+    """The named engine, or for ``auto`` tesserocr when installed, else pytesseract."""
+    names = ("tesserocr", "pytesseract") if name == "auto" else (name,)
+    errors = []
+    for n in names:
+        cls = _ENGINES.get(n)
+        if cls is None:
+            errors.append(f"unknown OCR_ENGINE {n!r}")
+            continue
+        try:
+            return cls()
+        except Exception as e:
+            errors.append(f"{n}: {e}")
+    raise RuntimeError("; ".join(errors))
+
+
+# ── Bands ─────────────────────────────────────────────────────────────────────
+
+def _row_edges(gray: Image.Image) -> list[float]:
+    """Horizontal edge pixels per row (text rows have many, gaps between lines few)."""
+    w, h = gray.size
+    if w < 2:
+        return [0.0] * h
+    # Neighbour difference via two crops (ImageChops.offset is several times slower)
+    diff = ImageChops.difference(gray.crop((1, 0, w, h)), gray.crop((0, 0, w - 1, h)))
+    edges = diff.point([1 if p > EDGE_LEVEL else 0 for p in range(256)])
+    # reduce() to one column averages each row
+    means = array("f", edges.convert("F").reduce((w - 1, 1)).tobytes())
+    return [m * (w - 1) for m in means]
+
+
+def split_bands(gray: Image.Image, *, min_h: int = BAND_MIN, max_h: int = BAND_MAX) -> list[tuple[int, int]]:
+    """Full-width bands (y0, y1) holding text, with blank stretches left out.
+
+    A row is quiet when it has hardly any edges. A band starts at the first
+    busy row and ends at the first quiet row past ``min_h`` (the quietest
+    row when it reaches ``max_h``), plus up to ``BAND_PAD`` quiet rows either
+    side. The cuts depend only on the content, so a block that scrolls gets
+    the same band and hits the cache.
+    """
+    counts = _row_edges(gray)
+    h = len(counts)
+    quiet_level = max(2.0, gray.width * 0.002)
+    bands = []
+    y = prev_end = 0
+    while y < h:
+        if counts[y] <= quiet_level:
+            y += 1
+            continue
+        start = y
+        window = range(start + min_h, min(start + max_h, h))
+        end = next((r for r in window if counts[r] <= quiet_level), None)
+        if end is None:
+            end = h if start + max_h >= h else min(reversed(window), key=counts.__getitem__)
+        # Pad with quiet rows only, so neighbouring bands never share text
+        top = start
+        while top > max(prev_end, start - BAND_PAD) and counts[top - 1] <= quiet_level:
+            top -= 1
+        bottom = end
+        while bottom < min(h, end + BAND_PAD) and counts[bottom] <= quiet_level:
+            bottom += 1
+        bands.append((top, bottom))
+        prev_end = y = bottom
+    return bands
+
+
+def _band_key(band: Image.Image) -> bytes:
+    return hashlib.blake2b(band.tobytes(), digest_size=16).digest() + band.size[0].to_bytes(4, "little")
+
+
+# ── Service ───────────────────────────────────────────────────────────────────
+
+class OcrService:
+    """OCR with a per-band cache over one long-lived engine."""
+
+    def __init__(self, engine=None, *, cache_size: int = CACHE_BANDS):
+        self._engine = engine
+        self._cache: OrderedDict[bytes, list[Word]] = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        """The engine, created on first use (RuntimeError when none is installed)."""
+        if self._engine is None:
+            self._engine = create_engine()
+            log.debug("OCR engine: %s", self._engine.name)
+        return self._engine
+
+    def read(self, img: Image.Image, *, until: str | None = None) -> OcrResult:
+        """OCR ``img``. With ``until``, stop as soon as a band contains that text."""
+        gray = img if img.mode == "L" else img.convert("L")
+        with self._lock:
+            engine = self.engine
+            todo = []                   # (index, y0, band image, key)
+            found: dict[int, list[Word]] = {}
+            result = OcrResult([])
+            for i, (y0, y1) in enumerate(split_bands(gray)):
+                band = gray.crop((0, y0, gray.width, y1))
+                key = _band_key(band)
+                words = self._cache.get(key)
+                if words is None:
+                    todo.append((i, y0, band, key))
+                    continue
+                self._cache.move_to_end(key)
+                result.cached_bands += 1
+                found[i] = _placed(words, i, y0)
+                if until and find_text(found[i], until):
+                    return self._finish(result, found, until)
+            step = engine.batch or len(todo) or 1
+            for n in range(0, len(todo), step):
+                chunk = todo[n:n + step]
+                for (i, y0, _, key), words in zip(chunk, self._ocr(engine, [b for _, _, b, _ in chunk])):
+                    self._cache[key] = words
+                    found[i] = _placed(words, i, y0)
+                result.ocr_bands += len(chunk)
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+                if until and any(find_text(found[i], until) for i, _, _, _ in chunk):
+                    break
+            return self._finish(result, found, until)
+
+    @staticmethod
+    def _finish(result: OcrResult, found: dict[int, list[Word]], until: str | None) -> OcrResult:
+        result.words = [w for i in sorted(found) for w in found[i]]
+        if until:
+            result.matches = find_text(result.words, until)
+        return result
+
+    @staticmethod
+    def _ocr(engine, bands: list[Image.Image]) -> list[list[Word]]:
+        """Band-local words for each band, in one engine call."""
+        if len(bands) == 1:
+            return [engine.words(bands[0])]
+        width = max(b.width for b in bands)
+        offsets, y = [], 0
+        for b in bands:
+            offsets.append(y)
+            y += b.height + SHEET_GAP
+        sheet = Image.new("L", (width, y - SHEET_GAP), 255)
+        for b, oy in zip(bands, offsets):
+            sheet.paste(b, (0, oy))
+        out: list[list[Word]] = [[] for _ in bands]
+        for w in engine.words(sheet):
+            cy = w.box[1] + w.box[3] // 2
+            k = max(j for j, oy in enumerate(offsets) if oy <= cy)
+            x, wy, ww, wh = w.box
+            out[k].append(Word(w.text, (x, wy - offsets[k], ww, wh), w.conf, w.line))
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            if self._engine is not None:
+                self._engine.close()
+                self._engine = None
+
+
+def _placed(words: list[Word], band: int, y0: int) -> list[Word]:
+    """Band-local words moved to frame coordinates, with lines kept apart per band."""
+    return [Word(w.text, (w.box[0], w.box[1] + y0, w.box[2], w.box[3]), w.conf, band * 10_000 + w.line)
+            for w in words]
+
+
+_service: OcrService | None = None
+_service_lock = threading.Lock()
+
+
+def get_ocr() -> OcrService:
+    """Process-wide OcrService (the engine is loaded on first read)."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = OcrService()
+    return _service
@@ -0,0 +1,214 @@
+"""Two-level page cache for fetch_url_text.
+
+- Memory: LRU of extracted text, bounded by total characters.
+- Disk: SQLite (``logs/page_cache.db``) with zlib-compressed raw HTML and
+  extracted text in separate columns, plus the validators (ETag /
+  Last-Modified) needed for conditional GET. Bounded by compressed bytes,
+  evicting least recently used pages.
+
+Entries younger than ``ttl`` are served without touching the network; older
+ones are revalidated, and a 304 reuses the stored text without re-extracting.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "page_cache.db")
+
+
+@dataclass
+class CachedPage:
+    text: str
+    etag: str = ""
+    last_modified: str = ""
+    fetched_at: float = 0.0
+
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _pack(s: str) -> bytes:
+    return zlib.compress(s.encode("utf-8"), 6)
+
+
+def _unpack(b: bytes | None) -> str:
+    return zlib.decompress(b).decode("utf-8") if b else ""
+
+
+class PageCache:
+    def __init__(
+        self,
+        db_path: str | None = DEFAULT_DB_PATH,
+        *,
+        ttl: float = 300,
+        max_memory_chars: int = 4_000_000,
+        max_disk_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_memory_chars = max_memory_chars
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._mem: OrderedDict[str, CachedPage] = OrderedDict()
+        self._mem_chars = 0
+        self._con: sqlite3.Connection | None = None
+        self._disk_failed = False
+        self._writes_since_trim = 0
+
+    # ── Disk ──────────────────────────────────────────────────────────────────
+
+    def _db(self) -> sqlite3.Connection | None:
+        """Open the SQLite store on first use (caller holds the lock)."""
+        if self._con is not None or self._disk_failed or not self.db_path:
+            return self._con
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            con = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL,
+                    accessed_at REAL,
+                    html BLOB,
+                    text BLOB,
+                    size INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages(accessed_at);
+            """)
+            self._con = con
+        except Exception as e:
+            log.warning("Page cache disk store unavailable (%s), using memory only", e)
+            self._disk_failed = True
+        return self._con
+
+    def _trim_disk(self, con: sqlite3.Connection):
+        total = con.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        excess = total - self.max_disk_bytes
+        freed = 0
+        doomed = []
+        for url, size in con.execute("SELECT url, size FROM pages ORDER BY accessed_at"):
+            doomed.append((url,))
+            freed += size or 0
+            if freed >= excess:
+                break
+        con.executemany("DELETE FROM pages WHERE url = ?", doomed)
+
+    # ── Memory LRU ────────────────────────────────────────────────────────────
+
+    def _remember(self, url: str, page: CachedPage):
+        old = self._mem.pop(url, None)
+        if old is not None:
+            self._mem_chars -= len(old.text)
+        self._mem[url] = page
+        self._mem_chars += len(page.text)
+        while self._mem_chars > self.max_memory_chars and len(self._mem) > 1:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_chars -= len(evicted.text)
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    def get(self, url: str) -> CachedPage | None:
+        """Cached page regardless of age (use ``is_fresh`` to decide on revalidation)."""
+        with self._lock:
+            page = self._mem.get(url)
+            if page is not None:
+                self._mem.move_to_end(url)
+                return page
+            con = self._db()
+            if con is None:
+                return None
+            try:
+                row = con.execute(
+                    "SELECT etag, last_modified, fetched_at, text FROM pages WHERE url = ?", (url,)
+                ).fetchone()
+                if row is None:
+                    return None
+                con.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+                con.commit()
+                page = CachedPage(_unpack(row[3]), row[0] or "", row[1] or "", row[2] or 0.0)
+            except Exception as e:
+                log.debug("Page cache read failed for %s: %s", url, e)
+                return None
+            self._remember(url, page)
+            return page
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.time() - page.fetched_at < self.ttl
+
+    def put(self, url: str, text: str, *, html: str = "", etag: str = "", last_modified: str = "") -> CachedPage:
+        now = time.time()
+        page = CachedPage(text, etag or "", last_modified or "", now)
+        with self._lock:
+            self._remember(url, page)
+            con = self._db()
+            if con is None:
+                return page
+            try:
+                html_b, text_b = _pack(html), _pack(text)
+                con.execute(
+                    "INSERT OR REPLACE INTO pages (url, etag, last_modified, fetched_at, accessed_at, html, text, size)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, page.etag, page.last_modified, now, now, html_b, text_b, len(html_b) + len(text_b)),
+                )
+                self._writes_since_trim += 1
+                if self._writes_since_trim >= 20:
+                    self._writes_since_trim = 0
+                    self._trim_disk(con)
+                con.commit()
+            except Exception as e:
+                log.debug("Page cache write failed for %s: %s", url, e)
+        return page
+
+    def touch(self, url: str, page: CachedPage) -> CachedPage:
+        """Mark a revalidated (304) page as fresh again."""
+        page.fetched_at = time.time()
+        with self._lock:
+            self._remember(url, page)
+            con = self._db()
+            if con is not None:
+                try:
+                    con.execute(
+                        "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                        (page.fetched_at, page.fetched_at, url),
+                    )
+                    con.commit()
+                except Exception as e:
+                    log.debug("Page cache touch failed for %s: %s", url, e)
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._mem_chars = 0
+            con = self._db()
+            if con is not None:
+                con.execute("DELETE FROM pages")
+                con.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {"memory_pages": len(self._mem), "memory_chars": self._mem_chars, "disk_pages": 0, "disk_bytes": 0}
+            con = self._db()
+            if con is not None:
+                n, size = con.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+                out.update(disk_pages=n, disk_bytes=size)
+            return out
@@ -0,0 +1,319 @@
+"""Template matching for find_image.
+
+- TemplateCache: templates decoded once (keyed by path, mtime and size),
+  with their scaled and downsampled versions built on demand and kept.
+- ncc(): normalized cross-correlation (``TM_CCOEFF_NORMED``); OpenCV when
+  installed, otherwise NumPy FFT correlation with integral-image variance.
+- TemplateMatcher.find(): coarse-to-fine search over several template
+  scales (for DPI-scaled displays), in colour or grey, inside an optional
+  region; returns every match above the threshold with its score.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from PIL import Image
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - optional fast matcher
+    cv2 = None
+
+# Template scales tried in order; 1.25-2.0 cover templates saved at 100%
+# and searched on a scaled display (and the reverse below 1.0)
+DEFAULT_SCALES = (1.0, 1.25, 1.5, 2.0, 0.8, 0.67)
+COARSE_SIDE = 12        # shorter template side kept at the coarse level
+MAX_FACTOR = 8          # strongest downsampling for the coarse pass
+DETAIL_KEPT = 0.85      # share of template contrast a coarse level must keep
+COARSE_SLACK = 0.15     # coarse scores this far below the threshold still get refined
+# (the best coarse peak of each scale is always refined: a template whose
+# edges fall between coarse pixels can score far lower there than at full size)
+OVERLAP = 0.3           # matches overlapping a better one by more than this (IoU) are dropped
+CACHE_TEMPLATES = 32
+
+Box = tuple[int, int, int, int]     # x, y, width, height
+
+
+@dataclass
+class TemplateMatch:
+    box: Box
+    score: float
+    scale: float = 1.0
+
+    @property
+    def center(self) -> tuple[int, int]:
+        x, y, w, h = self.box
+        return x + w // 2, y + h // 2
+
+
+def _array(img: Image.Image, grey: bool):
+    img = img.convert("L" if grey else "RGB")
+    return np.asarray(img, dtype=np.float32)
+
+
+class Template:
+    """A decoded template; its per-scale, per-level arrays are built once."""
+
+    def __init__(self, image: Image.Image):
+        self.image = image.convert("RGB")
+        self._levels: dict[tuple[float, int, bool], object] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.image.size
+
+    def scaled_size(self, scale: float) -> tuple[int, int]:
+        w, h = self.image.size
+        return max(1, round(w * scale)), max(1, round(h * scale))
+
+    def level(self, scale: float, factor: int, grey: bool):
+        """Array of the template resized by ``scale`` and then reduced by ``factor``."""
+        key = (scale, factor, grey)
+        with self._lock:
+            arr = self._levels.get(key)
+            if arr is None:
+                img = self.image
+                if scale != 1.0:
+                    img = img.resize(self.scaled_size(scale), Image.Resampling.BILINEAR)
+                if factor > 1:
+                    img = img.reduce(factor)
+                arr = self._levels[key] = _array(img, grey)
+        return arr
+
+    def coarse_factor(self, scale: float, grey: bool) -> int:
+        """Strongest reduction (up to COARSE_SIDE / MAX_FACTOR) that keeps the template's detail.
+
+        Low-contrast templates lose their structure when reduced hard; a
+        factor is accepted while the reduced copy keeps DETAIL_KEPT of the
+        full-size standard deviation.
+        """
+        tw, th = self.scaled_size(scale)
+        factor = max(1, min(MAX_FACTOR, min(tw, th) // COARSE_SIDE))
+        full = float(self.level(scale, 1, grey).std())
+        while factor > 1 and float(self.level(scale, factor, grey).std()) < DETAIL_KEPT * full:
+            factor //= 2
+        return factor
+
+
+class TemplateCache:
+    """Small LRU of decoded templates; an edited file is decoded again."""
+
+    def __init__(self, size: int = CACHE_TEMPLATES):
+        self._items: OrderedDict[tuple, Template] = OrderedDict()
+        self._size = size
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Template:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            tpl = self._items.get(key)
+            if tpl is not None:
+                self._items.move_to_end(key)
+                return tpl
+        with Image.open(path) as img:
+            tpl = Template(img)
+        with self._lock:
+            for old in [k for k in self._items if k[0] == path]:
+                del self._items[old]
+            self._items[key] = tpl
+            while len(self._items) > self._size:
+                self._items.popitem(last=False)
+        return tpl
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# ── Correlation ───────────────────────────────────────────────────────────────
+
+class _Prepared:
+    """An image set up for repeated NCC (NumPy path): spectra and integral images per channel."""
+
+    def __init__(self, image):
+        self.image = image if image.ndim == 3 else image[..., None]
+        self.shape = self.image.shape
+        self._spectra: list = []
+        self._sums: list = []
+
+    def _prepare(self) -> None:
+        H, W, _ = self.shape
+        for c in range(self.shape[2]):
+            ch = self.image[..., c].astype(np.float64)
+            self._spectra.append(np.fft.rfft2(self.image[..., c]))     # complex64 for float32 input
+            ii = np.zeros((H + 1, W + 1))
+            ii2 = np.zeros((H + 1, W + 1))
+            np.cumsum(np.cumsum(ch, axis=0), axis=1, out=ii[1:, 1:])
+            np.cumsum(np.cumsum(ch * ch, axis=0), axis=1, out=ii2[1:, 1:])
+            self._sums.append((ii, ii2))
+
+    def ncc(self, templ):
+        if templ.ndim == 2:
+            templ = templ[..., None]
+        H, W, C = self.shape
+        h, w = templ.shape[:2]
+        out_shape = (H - h + 1, W - w + 1)
+        t = templ.astype(np.float64) - templ.mean(axis=(0, 1))
+        t_norm = float(np.sqrt((t * t).sum()))
+        if t_norm < 1e-6:
+            return np.zeros(out_shape, dtype=np.float32)
+        if not self._spectra:
+            self._prepare()
+        spec = 0
+        var = np.zeros(out_shape)
+        n = float(h * w)
+        for c in range(C):
+            # Correlation as a product of spectra; an H x W transform is enough
+            # because only positions where the template fits are kept
+            spec = spec + self._spectra[c] * np.conj(np.fft.rfft2(t[..., c].astype(np.float32), s=(H, W)))
+            ii, ii2 = self._sums[c]
+            s1 = ii[h:, w:] - ii[:-h, w:] - ii[h:, :-w] + ii[:-h, :-w]
+            s2 = ii2[h:, w:] - ii2[:-h, w:] - ii2[h:, :-w] + ii2[:-h, :-w]
+            var += s2 - s1 * s1 / n
+        corr = np.fft.irfft2(spec, s=(H, W))[:out_shape[0], :out_shape[1]]
+        denom = np.sqrt(np.maximum(var, 0.0)) * t_norm
+        scores = np.zeros(out_shape, dtype=np.float32)
+        ok = denom > 1e-3 * t_norm
+        scores[ok] = corr[ok] / denom[ok]
+        return scores
+
+
+def prepare(image):
+    """``image`` in the form ncc() searches fastest (prepared once, searched many times)."""
+    return image if cv2 is not None else _Prepared(image)
+
+
+def ncc(image, templ):
+    """TM_CCOEFF_NORMED score for every position where ``templ`` fits in ``image``.
+
+    ``image`` is an array or the result of prepare().
+    """
+    if isinstance(image, _Prepared):
+        return image.ncc(templ)
+    if cv2 is not None:
+        return cv2.matchTemplate(image, templ, cv2.TM_CCOEFF_NORMED)
+    return _Prepared(image).ncc(templ)
+
+
+def _peaks(scores, floor: float, w: int, h: int, limit: int) -> list[tuple[int, int, float]]:
+    """Up to ``limit`` local maxima >= ``floor``, at least a template apart."""
+    s = scores.copy()
+    out = []
+    for _ in range(limit):
+        i = int(np.argmax(s))
+        y, x = divmod(i, s.shape[1])
+        v = float(s[y, x])
+        if v < floor:
+            break
+        out.append((x, y, v))
+        s[max(0, y - h // 2):y + h // 2 + 1, max(0, x - w // 2):x + w // 2 + 1] = -1.0
+    return out
+
+
+def _iou(a: Box, b: Box) -> float:
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    return inter / float(a[2] * a[3] + b[2] * b[3] - inter or 1)
+
+
+class TemplateMatcher:
+    """Finds cached templates in screen frames."""
+
+    def __init__(self, cache: TemplateCache | None = None):
+        self.cache = cache if cache is not None else TemplateCache()
+        # Reduced, prepared copies of the last searched frame: several
+        # find_image calls on the same captured frame share them
+        self._screen: tuple | None = None
+        self._lock = threading.Lock()
+
+    def _levels(self, screen: Image.Image, region: Box | None, grey: bool) -> dict:
+        with self._lock:
+            last = self._screen
+            if last is not None and last[0] is screen and last[1] == region and last[2] == grey:
+                return last[3]
+            levels: dict[int, object] = {}
+            self._screen = (screen, region, grey, levels)
+            return levels
+
+    def find(self, screen: Image.Image, template: "Template | str", *, region: Box | None = None,
+             scales=DEFAULT_SCALES, grey: bool = False, threshold: float = 0.8,
+             limit: int = 10) -> list[TemplateMatch]:
+        """Matches of ``template`` in ``screen`` (or ``region`` of it), best first.
+
+        Boxes are in ``screen`` pixels. Each scale is searched on a reduced
+        copy of both images first; candidates are then re-scored at full
+        resolution in a small window around them.
+        """
+        if np is None:
+            raise RuntimeError("template matching needs numpy (or opencv-python)")
+        tpl = self.cache.get(template) if isinstance(template, str) else template
+        reduced = self._levels(screen, region, grey)
+        ox = oy = 0
+        if region is not None:
+            x, y, w, h = region
+            screen = screen.crop((x, y, x + w, y + h))
+            ox, oy = x, y
+        sw, sh = screen.size
+        found: list[TemplateMatch] = []
+        for scale in scales:
+            tw, th = tpl.scaled_size(scale)
+            if tw > sw or th > sh or min(tw, th) < 4:
+                continue
+            factor = tpl.coarse_factor(scale, grey)
+            if factor not in reduced:
+                reduced[factor] = prepare(_array(screen.reduce(factor) if factor > 1 else screen, grey))
+            coarse_t = tpl.level(scale, factor, grey)
+            rh, rw = reduced[factor].shape[:2]
+            if coarse_t.shape[0] > rh or coarse_t.shape[1] > rw:
+                continue
+            coarse = ncc(reduced[factor], coarse_t)
+            floor = threshold - (COARSE_SLACK if factor > 1 else 0.0)
+            peaks = _peaks(coarse, floor, coarse_t.shape[1], coarse_t.shape[0], limit * 2)
+            if not peaks and factor > 1:
+                peaks = _peaks(coarse, -1.0, coarse_t.shape[1], coarse_t.shape[0], 1)
+            full_t = tpl.level(scale, 1, grey) if factor > 1 else None
+            for px, py, score in peaks:
+                x, y = px * factor, py * factor
+                if factor > 1:
+                    # Refine around the coarse hit at full resolution
+                    x0, y0 = max(0, min(x - factor, sw - tw)), max(0, min(y - factor, sh - th))
+                    x1, y1 = min(sw, x0 + tw + 2 * factor), min(sh, y0 + th + 2 * factor)
+                    fine = ncc(_array(screen.crop((x0, y0, x1, y1)), grey), full_t)
+                    j = int(np.argmax(fine))
+                    fy, fx = divmod(j, fine.shape[1])
+                    score = float(fine[fy, fx])
+                    x, y = x0 + fx, y0 + fy
+                if score >= threshold:
+                    found.append(TemplateMatch((x + ox, y + oy, tw, th), round(score, 4), scale))
+        found.sort(key=lambda m: m.score, reverse=True)
+        kept: list[TemplateMatch] = []
+        for m in found:
+            if all(_iou(m.box, k.box) <= OVERLAP for k in kept):
+                kept.append(m)
+                if len(kept) >= limit:
+                    break
+        return kept
+
+
+_matcher: TemplateMatcher | None = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher() -> TemplateMatcher:
+    """Process-wide TemplateMatcher (its template cache lives as long as the process)."""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                _matcher = TemplateMatcher()
+    return _matcher
@@ -0,0 +1,154 @@
+"""Name -> handler registry for executor tools.
+
+Built-in tools register with the ``tool`` decorator; skill tools are mirrored
+from ``SkillManager`` and re-synced only when its generation counter changes.
+Each entry carries its schema, concurrency class and argument validation, so
+dispatch is a single dict lookup and the tools schema lists are built once.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+CONCURRENCY_CLASSES = ("io", "cpu", "screen", "exclusive")
+
+
+@dataclass
+class ToolSpec:
+    name: str
+    handler: Callable[[dict], dict]
+    schema: dict | None = None
+    concurrency: str = "exclusive"
+    screen_lock: bool = False          # hold the executor's screen lock while running
+    validate: Callable[[dict], str | None] | None = None
+    skill: str = ""                    # owning skill, empty for built-ins
+    required: tuple[str, ...] = field(default=(), init=False)
+
+    def __post_init__(self):
+        if self.concurrency not in CONCURRENCY_CLASSES:
+            self.concurrency = "exclusive"
+        self.set_schema(self.schema)
+
+    def set_schema(self, schema: dict | None):
+        self.schema = schema
+        params = ((schema or {}).get("function") or {}).get("parameters") or {}
+        self.required = tuple(params.get("required") or ())
+
+    def check(self, args: dict) -> str | None:
+        """Return an error message if ``args`` are invalid, else None."""
+        missing = [k for k in self.required if k not in args]
+        if missing:
+            return f"缺少必需参数: {', '.join(missing)}"
+        if self.validate is not None:
+            return self.validate(args)
+        return None
+
+
+class ToolRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._builtins: dict[str, ToolSpec] = {}
+        self._builtin_order: list[str] = []
+        self._bg_excluded: frozenset[str] = frozenset()
+        self._skills: dict[str, ToolSpec] = {}
+        self._skill_manager = None
+        self._skill_gen = None
+        self._schema_cache: dict[bool, list[dict]] = {}
+
+    # ── Built-ins ─────────────────────────────────────────────────────────────
+
+    def tool(self, name: str, *, concurrency: str = "exclusive", screen_lock: bool = False,
+             validate: Callable[[dict], str | None] | None = None):
+        """Decorator registering ``fn(args) -> dict`` as the handler for ``name``."""
+        def _wrap(fn):
+            self._builtins[name] = ToolSpec(
+                name, fn, concurrency=concurrency, screen_lock=screen_lock, validate=validate,
+            )
+            return fn
+        return _wrap
+
+    def set_builtin_schema(self, schema: list[dict], *, bg_excluded=()) -> None:
+        """Attach schema entries to registered handlers; fixes built-in tool order."""
+        order = []
+        for entry in schema:
+            name = entry["function"]["name"]
+            spec = self._builtins.get(name)
+            if spec is None:
+                log.warning("Tool %s has a schema but no handler", name)
+                continue
+            spec.set_schema(entry)
+            order.append(name)
+        for name in self._builtins:
+            if name not in order:
+                log.warning("Tool %s has a handler but no schema", name)
+        with self._lock:
+            self._builtin_order = order
+            self._bg_excluded = frozenset(bg_excluded)
+            self._schema_cache.clear()
+
+    def builtin_schema(self, *, background: bool = False) -> list[dict]:
+        return [
+            self._builtins[n].schema for n in self._builtin_order
+            if not (background and n in self._bg_excluded)
+        ]
+
+    # ── Skills ────────────────────────────────────────────────────────────────
+
+    def attach_skills(self, skill_manager) -> None:
+        with self._lock:
+            self._skill_manager = skill_manager
+            self._skill_gen = None
+
+    def _sync_skills(self) -> None:
+        sm = self._skill_manager
+        if sm is None:
+            return
+        gen = getattr(sm, "generation", None)
+        if gen is not None and gen == self._skill_gen:
+            return
+        with self._lock:
+            if gen is not None and gen == self._skill_gen:
+                return
+            skills: dict[str, ToolSpec] = {}
+            # Sorted so the tools block stays byte-identical between runs
+            for entry in sorted(sm.tools_schema, key=lambda t: t.get("function", {}).get("name", "")):
+                name = entry.get("function", {}).get("name")
+                if not name or name in self._builtins:
+                    continue
+                skills[name] = ToolSpec(
+                    name,
+                    lambda args, _n=name: sm.execute(_n, args),
+                    schema=entry,
+                    concurrency=sm.tool_concurrency(name) or "exclusive",
+                    skill=sm.skill_for_tool(name) or "",
+                )
+            self._skills = skills
+            self._skill_gen = gen
+            self._schema_cache.clear()
+
+    # ── Lookup ────────────────────────────────────────────────────────────────
+
+    def get(self, name: str) -> ToolSpec | None:
+        spec = self._builtins.get(name)
+        if spec is not None:
+            return spec
+        self._sync_skills()
+        return self._skills.get(name)
+
+    def tools_schema(self, *, background: bool = False) -> list[dict]:
+        """Built-in tools followed by skill tools; cached until skills change."""
+        self._sync_skills()
+        with self._lock:
+            cached = self._schema_cache.get(background)
+            if cached is not None:
+                return cached
+            skill_tools = [
+                s.schema for s in self._skills.values()
+                if not (background and s.name in self._bg_excluded)
+            ]
+            cached = self.builtin_schema(background=background) + skill_tools
+            self._schema_cache[background] = cached
+            return cached
@@ -1,24 +1,24 @@
 import re
-import threading
 import time
 from html.parser import HTMLParser
 import urllib.parse
 
-import requests
+from actions.page_cache import PageCache
+from core import http_client
+from core.tracing import span
 
-_page_cache: dict[str, tuple[str, float]] = {}
-_page_cache_lock = threading.Lock()
-_PAGE_CACHE_TTL = 300  # 5 minutes
+_page_cache = PageCache()
 
 
 def search_ddg(query: str) -> list[dict]:
     """DuckDuckGo HTML search. Returns list of {title, url, snippet}."""
     try:
-        r = requests.get(
+        r = http_client.get(
             "https://html.duckduckgo.com/html/",
             params={"q": query},
             headers={"User-Agent": "Mozilla/5.0"},
             timeout=10,
+            retries=1,
         )
     except Exception:
         return []
@@ -66,7 +66,7 @@ def search_ddg(query: str) -> list[dict]:
 def search_bing(query: str) -> list[dict]:
     """Bing search fallback. Returns list of {title, url, snippet}."""
     try:
-        resp = requests.get(
+        resp = http_client.get(
             "https://www.bing.com/search",
             params={"q": query, "cc": "cn", "setLang": "zh-cn"},
             headers={
@@ -77,6 +77,7 @@ def search_bing(query: str) -> list[dict]:
                 )
             },
             timeout=10,
+            retries=1,
         )
     except Exception:
         return []
@@ -175,24 +176,47 @@ def extract_html_text(html: str) -> str:
 
 
 def fetch_url_text(url: str) -> str:
-    """Fetch a URL and extract its main text content, with a short in-memory cache."""
-    now = time.time()
-    with _page_cache_lock:
-        cached = _page_cache.get(url)
-        if cached and now - cached[1] < _PAGE_CACHE_TTL:
-            return cached[0]
+    """Fetch a URL and extract its main text content.
+
+    Served from the page cache while fresh; stale entries are revalidated with
+    a conditional GET, and a 304 reuses the cached text without re-extracting.
+    """
+    with span("web.fetch", cat="web", host=urllib.parse.urlparse(url).netloc) as sp:
+        text, source = _fetch_url_text(url)
+        sp.set(source=source, chars=len(text))
+        return text
+
+
+def _fetch_url_text(url: str) -> tuple[str, str]:
+    """fetch_url_text() plus where the text came from: cache, revalidated, network or stale."""
+    cached = _page_cache.get(url)
+    if cached is not None and _page_cache.is_fresh(cached):
+        return cached.text, "cache"
+
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if cached is not None:
+        headers.update(cached.validators())
 
     for attempt in range(3):
         try:
-            resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=15)
+            # Retries are handled here (any error, incl. extraction), not by the client
+            resp = http_client.get(url, headers=headers, timeout=15, retries=0)
+            if cached is not None and getattr(resp, "status_code", 200) == 304:
+                return _page_cache.touch(url, cached).text, "revalidated"
             resp.encoding = resp.apparent_encoding
-            text = extract_html_text(resp.text)
+            html = resp.text
+            text = extract_html_text(html)
             break
         except Exception:
             time.sleep(1.5 ** attempt)
     else:
-        return ""
-
-    with _page_cache_lock:
-        _page_cache[url] = (text, time.time())
-    return text
+        # Network down: a stale copy beats nothing
+        return (cached.text, "stale") if cached is not None else ("", "error")
+
+    resp_headers = getattr(resp, "headers", None) or {}
+    _page_cache.put(
+        url, text, html=html,
+        etag=resp_headers.get("ETag", ""),
+        last_modified=resp_headers.get("Last-Modified", ""),
+    )
+    return text, "network"
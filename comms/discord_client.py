@@ -23,12 +23,15 @@ import pyautogui
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from config import config, _save_state
-from actions.executor import SCREENSHOT_PATH, _task_mgr, execute, _skill_manager, get_tools_schema
+from actions.executor import SCREENSHOT_PATH, _task_mgr, execute_many, _skill_manager, get_tools_schema
 import actions.executor as _executor
 from core.adapter import UniversalLLM
 from core.brain import Brain
-from memory.store import MemoryStore
+from core.compactor import is_summary_message
+from memory.retention import start_retention
+from memory.store import get_store
 from core.op_log import undo_last
+from core.tracing import format_span, format_summary, get_tracer, span
 from comms.text_safety import is_numeric_spam_text, should_preserve_stream_text_on_tool_switch
 
 intents = discord.Intents.default()
@@ -80,7 +83,7 @@ class StarBotClient(discord.Client):
         self._model_list = {}
         self._pending_confirm: dict[int, asyncio.Future] = {}
         self._notify_channel = None
-        self._llm = UniversalLLM(config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL)
+        self._llm = UniversalLLM.from_config()
         self.tree = discord.app_commands.CommandTree(self)
         self._register_slash_commands()
 
@@ -110,6 +113,7 @@ class StarBotClient(discord.Client):
             embed.add_field(name="/tasks", value="查看后台任务列表", inline=False)
             embed.add_field(name="/config [key] [value]", value="查看/修改配置项", inline=False)
             embed.add_field(name="/rollback [n]", value="撤销最近 n 次文件操作（默认 1）", inline=False)
+            embed.add_field(name="/trace [export|clear]", value="查看最近的耗时记录（LLM、工具、记忆、网页）", inline=False)
             await interaction.response.send_message(embed=embed)
 
         # ── /status ────────────────────────────────────────────────────────
@@ -127,6 +131,7 @@ class StarBotClient(discord.Client):
             embed.add_field(name="内存", value=f"{mem.percent}% ({mem.used//(1024**3)}/{mem.total//(1024**3)} GB)", inline=True)
             embed.add_field(name="当前对话", value=task_str, inline=False)
             embed.add_field(name="后台任务", value=_task_mgr.summary(), inline=False)
+            self._add_trace_field(embed)
             embed.set_footer(text=self._footer(t0))
             await interaction.followup.send(embed=embed)
 
@@ -239,6 +244,7 @@ class StarBotClient(discord.Client):
                     description=(
                         f"**输入 tokens:** {u.get('input',0):,}\n"
                         f"**输出 tokens:** {u.get('output',0):,}\n"
+                        f"**缓存命中 tokens:** {self._cache_hit_text(u)}\n"
                         f"**API 调用次数:** {u.get('calls',0)}"
                     ),
                     color=0x3498db,
@@ -276,6 +282,15 @@ class StarBotClient(discord.Client):
             embed.set_footer(text=self._footer(t0))
             await interaction.followup.send(embed=embed)
 
+        # ── /trace ─────────────────────────────────────────────────────────
+        @self.tree.command(name="trace", description="查看最近的耗时记录（LLM、工具、记忆、网页）")
+        @discord.app_commands.describe(subcommand="留空查看；export 导出 Chrome trace 文件；clear 清空")
+        async def slash_trace(interaction: discord.Interaction, subcommand: str = ""):
+            if not self._is_owner_interaction(interaction):
+                return
+            embed, file = self._trace_reply(subcommand, time.time())
+            await interaction.response.send_message(embed=embed, **({"file": file} if file else {}))
+
         # ── /memory ────────────────────────────────────────────────────────
         @self.tree.command(name="memory", description="管理 AI 记忆 (子命令: list/search/delete/stats)")
         @discord.app_commands.describe(
@@ -295,19 +310,20 @@ class StarBotClient(discord.Client):
                 channel = interaction.channel
 
             await interaction.response.defer()
-            mem = MemoryStore()
+            mem = get_store()
             sub = subcommand.lower()
 
             if sub == "stats":
                 stats = mem.stats()
                 lines = "\n".join(f"**{cat}**: {cnt}" for cat, cnt in stats.items()) or "暂无记忆"
+                lines += self._storage_text(mem)
                 embed = discord.Embed(title="🧠 记忆统计", description=lines, color=0x3498db)
                 embed.set_footer(text=f"共 {sum(stats.values())} 条 | {self._footer(t0)}")
             elif sub == "search":
                 if not arg:
                     await interaction.followup.send("用法：`/memory search <关键词>`")
                     return
-                results = mem.search_multi(arg, limit=8)
+                results = mem.search_multi(arg, limit=8, count_access=False)
                 if not results:
                     embed = discord.Embed(description=f"未找到包含 `{arg}` 的记忆", color=0xe74c3c)
                 else:
@@ -428,7 +444,7 @@ class StarBotClient(discord.Client):
                     return
                 setattr(config, k, value)
                 if k in ("LLM_MODEL", "LLM_API_BASE", "LLM_API_KEY"):
-                    self._llm = UniversalLLM(config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL)
+                    self._llm = UniversalLLM.from_config()
                 _save_state({k: value})
                 embed = discord.Embed(description=f"✅ `{k}` 已更新为 `{value}`", color=0x2ecc71)
                 embed.set_footer(text=self._footer(t0))
@@ -610,7 +626,7 @@ class StarBotClient(discord.Client):
 
         # Keep recent history to avoid unbounded file growth.
         if len(out) > 200:
-            head = [m for m in out[:1] if m.get("role") == "system"]
+            head = [m for m in out[:2] if m.get("role") == "system"]
             tail = out[-199:]
             out = head + [m for m in tail if m.get("role") != "system"]
         return out
@@ -644,9 +660,9 @@ class StarBotClient(discord.Client):
                 if not isinstance(msg, dict):
                     continue
                 role = msg.get("role")
-                if role == "system":
+                if role == "system" and not is_summary_message(msg):
                     continue
-                if role not in {"user", "assistant", "tool"}:
+                if role not in {"system", "user", "assistant", "tool"}:
                     continue
                 item = {"role": role}
                 if "content" in msg:
@@ -664,6 +680,7 @@ class StarBotClient(discord.Client):
 
     async def on_ready(self):
         log.info("Discord Connected: %s (guilds: %s)", self.user, len(self.guilds))
+        start_retention(get_store())
         # 同步斜杠命令到所有服务器（guild sync 立即生效，global sync 最多 1 小时）
         for guild in self.guilds:
             try:
@@ -798,6 +815,9 @@ class StarBotClient(discord.Client):
             await self._cmd_config(message, text, t0)
         elif text == "/rollback" or text.startswith("/rollback "):
             await self._cmd_rollback(message, text, t0)
+        elif text == "/trace" or text.startswith("/trace "):
+            embed, file = self._trace_reply(text[6:], t0)
+            await message.reply(embed=embed, **({"file": file} if file else {}))
         else:
             self._model_list.pop(uid, None)
             running = self._active_session_handles.get(session_key)
@@ -834,6 +854,7 @@ class StarBotClient(discord.Client):
         embed.add_field(name="/tasks", value="查看后台任务列表", inline=False)
         embed.add_field(name="/config [key] [value]", value="查看/修改配置项", inline=False)
         embed.add_field(name="/rollback [n]", value="撤销最近 n 次文件操作（默认 1）", inline=False)
+        embed.add_field(name="/trace [export|clear]", value="查看最近的耗时记录（LLM、工具、记忆、网页）", inline=False)
         embed.add_field(name="/help", value="显示此帮助", inline=False)
         await message.reply(embed=embed)
 
@@ -847,9 +868,41 @@ class StarBotClient(discord.Client):
         embed.add_field(name="内存", value=f"{mem.percent}% ({mem.used // (1024**3)}/{mem.total // (1024**3)} GB)", inline=True)
         embed.add_field(name="当前对话", value=task_str, inline=False)
         embed.add_field(name="后台任务", value=bg_summary, inline=False)
+        self._add_trace_field(embed)
         embed.set_footer(text=self._footer(t0))
         await message.reply(embed=embed)
 
+    @staticmethod
+    def _add_trace_field(embed: discord.Embed) -> None:
+        """Slowest span names (by total time) for /status."""
+        text = format_summary(get_tracer().summary(), limit=5)
+        if text:
+            embed.add_field(name="耗时统计（/trace 查看明细）", value=text[:1024], inline=False)
+
+    def _trace_reply(self, sub: str, t0: float) -> tuple[discord.Embed, discord.File | None]:
+        """Embed (and for ``export`` a Chrome trace attachment) for /trace."""
+        tracer = get_tracer()
+        sub = sub.strip().lower()
+        if sub == "export":
+            path, count = tracer.export()
+            embed = discord.Embed(title="⏱️ 追踪已导出", description=f"{count} 条记录 → `{path}`\n"
+                                  "可在 chrome://tracing 或 ui.perfetto.dev 中打开", color=0x2ecc71)
+            embed.set_footer(text=self._footer(t0))
+            return embed, discord.File(path, filename=os.path.basename(path))
+        if sub == "clear":
+            tracer.clear()
+            embed = discord.Embed(description="已清空耗时记录", color=0x2ecc71)
+            return embed, None
+        summary = format_summary(tracer.summary()) or "暂无记录"
+        recent = "\n".join(format_span(sp) for sp in tracer.recent(15))
+        desc = summary + (f"\n\n**最近**\n```{recent[-2500:]}```" if recent else "")
+        embed = discord.Embed(title="⏱️ 耗时记录", description=desc[:4000], color=0x3498db)
+        footer = f"缓冲 {tracer.snapshot(top=0)['spans']} 条"
+        if tracer.path:
+            footer += f" | 文件 {tracer.path}"
+        embed.set_footer(text=f"{footer} | {self._footer(t0)}")
+        return embed, None
+
     async def _cmd_doctor(self, message: discord.Message, t0: float):
         """Check config, recommended installs, and feature availability."""
         embed = self._doctor_embed(t0)
@@ -937,64 +990,70 @@ class StarBotClient(discord.Client):
         loop = asyncio.get_event_loop()
         action_holder: list = []
 
-        def run_stream():
-            def on_chunk(chunk: str):
-                loop.call_soon_threadsafe(q.put_nowait, chunk)
-
-            def on_clear():
-                # LLM 切换到工具调用模式 → 通知主协程清除已显示的草稿文字
-                loop.call_soon_threadsafe(q.put_nowait, StarBotClient._CLEAR_SENTINEL)
+        def on_clear():
+            # LLM 切换到工具调用模式 → 通知主协程清除已显示的草稿文字
+            q.put_nowait(StarBotClient._CLEAR_SENTINEL)
 
-            action_holder.append(
-                brain._call_native_stream(on_chunk=on_chunk, on_clear=on_clear)
-            )
-            loop.call_soon_threadsafe(q.put_nowait, None)
+        async def run_stream():
+            # 直接在事件循环上 await 流，/stop 取消时会关闭 HTTP 流
+            try:
+                action_holder.append(
+                    await brain._acall_native_stream(on_chunk=q.put_nowait, on_clear=on_clear)
+                )
+            finally:
+                q.put_nowait(None)
 
-        stream_task = asyncio.create_task(asyncio.to_thread(run_stream))
+        stream_task = asyncio.create_task(run_stream())
         accumulated = ""
         started = False
         last_edit = 0.0
 
-        while True:
-            chunk = await q.get()
-            if chunk is None:
-                break
-
-            # ── 清除信号：LLM 已切换到工具调用 ───────────────────────────────
-            if chunk is StarBotClient._CLEAR_SENTINEL:
-                # 保留正常的 AI 文本（例如计划/解释），仅清理异常数字刷屏。
-                if accumulated and not should_preserve_stream_text_on_tool_switch(accumulated):
-                    log.warning(
-                        "_stream_response: 切换工具调用前清理数字刷屏内容（%d 字符）",
-                        len(accumulated),
-                    )
-                    accumulated = ""
-                    started = False
-                    try:
-                        await msg.edit(
-                            embed=discord.Embed(description="⠋  思考中…", color=0x5865f2),
-                            view=None,
+        try:
+            while True:
+                chunk = await q.get()
+                if chunk is None:
+                    break
+
+                # ── 清除信号：LLM 已切换到工具调用 ───────────────────────────────
+                if chunk is StarBotClient._CLEAR_SENTINEL:
+                    # 保留正常的 AI 文本（例如计划/解释），仅清理异常数字刷屏。
+                    if accumulated and not should_preserve_stream_text_on_tool_switch(accumulated):
+                        log.warning(
+                            "_stream_response: 切换工具调用前清理数字刷屏内容（%d 字符）",
+                            len(accumulated),
                         )
+                        accumulated = ""
+                        started = False
+                        try:
+                            await msg.edit(
+                                embed=discord.Embed(description="⠋  思考中…", color=0x5865f2),
+                                view=None,
+                            )
+                        except Exception:
+                            pass
+                    continue
+
+                if not started:
+                    started = True
+                    try:
+                        await msg.edit(view=None)   # 文字开始输出时移除旋转按钮
                     except Exception:
                         pass
-                continue
-
-            if not started:
-                started = True
-                try:
-                    await msg.edit(view=None)   # 文字开始输出时移除旋转按钮
-                except Exception:
-                    pass
-            accumulated += chunk
-            now = loop.time()
-            if now - last_edit >= 0.4:
-                embed = discord.Embed(description=accumulated[:4000] + " ▌", color=0x9b59b6)
-                embed.set_footer(text=self._footer(t0))
-                try:
-                    await msg.edit(embed=embed)
-                except Exception:
-                    pass
-                last_edit = now
+                accumulated += chunk
+                now = loop.time()
+                if now - last_edit >= 0.4:
+                    embed = discord.Embed(description=accumulated[:4000] + " ▌", color=0x9b59b6)
+                    embed.set_footer(text=self._footer(t0))
+                    try:
+                        with span("discord.edit", cat="discord", chars=len(accumulated)):
+                            await msg.edit(embed=embed)
+                    except Exception:
+                        pass
+                    last_edit = now
+        finally:
+            # 协程被 /stop 取消时，一并取消流任务（关闭 HTTP 连接）
+            if not stream_task.done():
+                stream_task.cancel()
 
         await stream_task
 
@@ -1022,7 +1081,8 @@ class StarBotClient(discord.Client):
             )
             embed.set_footer(text=self._footer(t0))
             try:
-                await msg.edit(embed=embed, view=None)
+                with span("discord.edit", cat="discord", chars=len(accumulated)):
+                    await msg.edit(embed=embed, view=None)
             except Exception:
                 pass
 
@@ -1091,9 +1151,9 @@ class StarBotClient(discord.Client):
                             keep_cur = True   # AI 输出了文字 → 这条消息要保留
                         elif not action:
                             # 流式阶段可能被垃圾输出过滤，立即回退到非流式再试一次
-                            action = await asyncio.to_thread(brain._call_native)
+                            action = await brain._acall_native()
                     else:
-                        action = await asyncio.to_thread(brain._call_native)
+                        action = await brain._acall_native()
                 except asyncio.CancelledError:
                     try:
                         await cur_msg.edit(
@@ -1200,9 +1260,7 @@ class StarBotClient(discord.Client):
 
                 # 执行工具
                 try:
-                    results = await asyncio.gather(
-                        *[asyncio.to_thread(execute, a) for a in safe_actions]
-                    )
+                    results = await asyncio.to_thread(execute_many, safe_actions)
                 finally:
                     await stop_anim()
 
@@ -1479,7 +1537,7 @@ class StarBotClient(discord.Client):
 
     async def _cmd_memory(self, message: discord.Message, text: str, t0: float):
         """Handle /memory [list|search|delete|stats] [arg]."""
-        mem = MemoryStore()
+        mem = get_store()
         parts = text.split(maxsplit=2)
         sub = parts[1].lower() if len(parts) > 1 else "list"
         arg = parts[2] if len(parts) > 2 else ""
@@ -1487,6 +1545,7 @@ class StarBotClient(discord.Client):
         if sub == "stats":
             stats = mem.stats()
             lines = "\n".join(f"**{cat}**: {cnt}" for cat, cnt in stats.items()) or "暂无记忆"
+            lines += self._storage_text(mem)
             total = sum(stats.values())
             embed = discord.Embed(title="🧠 记忆统计", description=lines, color=0x3498db)
             embed.set_footer(text=f"共 {total} 条 | {self._footer(t0)}")
@@ -1495,7 +1554,7 @@ class StarBotClient(discord.Client):
             if not arg:
                 await message.reply("用法：`/memory search <关键词>`")
                 return
-            results = mem.search_multi(arg, limit=8)
+            results = mem.search_multi(arg, limit=8, count_access=False)
             if not results:
                 embed = discord.Embed(description=f"未找到包含 `{arg}` 的记忆", color=0xe74c3c)
             else:
@@ -1548,6 +1607,28 @@ class StarBotClient(discord.Client):
         embed.set_footer(text=self._footer(t0))
         await message.reply(embed=embed)
 
+    @staticmethod
+    def _storage_text(mem) -> str:
+        """Database size / archive / reclaimed-space line for /memory stats."""
+        st = mem.storage_stats()
+        if not st:
+            return ""
+
+        def mb(key: str) -> str:
+            return f"{st[key] / 1048576:.1f} MB"
+
+        return (
+            f"\n\n💾 数据库 {mb('db_bytes')}（可回收 {mb('free_bytes')}）"
+            f"\n🗄️ 归档 {st['archived']} 条（{mb('archived_bytes')}），累计回收 {mb('reclaimed_bytes')}"
+            + (f"\n🕒 上次整理 {st['retention_last_run']} UTC" if st.get("retention_last_run") else "")
+        )
+
+    @staticmethod
+    def _cache_hit_text(u: dict) -> str:
+        cached, total = u.get("cached", 0) or 0, u.get("input", 0) or 0
+        rate = f"（{cached / total:.0%}）" if total else ""
+        return f"{cached:,}{rate}"
+
     async def _cmd_usage(self, message: discord.Message, brain, t0: float):
         """Show token usage for the current session brain."""
         if brain is None:
@@ -1557,6 +1638,7 @@ class StarBotClient(discord.Client):
             desc = (
                 f"**输入 tokens:** {u.get('input', 0):,}\n"
                 f"**输出 tokens:** {u.get('output', 0):,}\n"
+                f"**缓存命中 tokens:** {self._cache_hit_text(u)}\n"
                 f"**API 调用次数:** {u.get('calls', 0)}"
             )
             embed = discord.Embed(title="📊 Token 用量（本会话）", description=desc, color=0x3498db)
@@ -1603,7 +1685,7 @@ class StarBotClient(discord.Client):
                 return
             setattr(config, k, v)
             if k in ("LLM_MODEL", "LLM_API_BASE", "LLM_API_KEY"):
-                self._llm = UniversalLLM(config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL)
+                self._llm = UniversalLLM.from_config()
             _save_state({k: v})
             embed = discord.Embed(description=f"✅ `{k}` 已更新为 `{v}`", color=0x2ecc71)
             embed.set_footer(text=self._footer(t0))
@@ -7,7 +7,6 @@ import os
 import shlex
 import shutil
 import time
-import threading
 from pathlib import Path
 from typing import Any
 
@@ -17,6 +16,7 @@ except Exception:  # pragma: no cover - optional runtime dependency
     psutil = None
 
 from core.session_controller import SessionController
+from core.tracing import format_span, format_summary, get_tracer
 
 
 def _mask_secret(value: str) -> str:
@@ -68,9 +68,12 @@ class LocalClientService:
         self.controller = controller
 
         if memory is None:
-            from memory.store import MemoryStore
+            from memory.retention import start_retention
+            from memory.store import get_store
 
-            memory = MemoryStore()
+            memory = get_store()
+            # 按分类策略定期归档冷记忆、压缩数据库（替代原来的 6 小时清理线程）
+            start_retention(memory)
         self.memory = memory
 
         if skill_manager is None or task_mgr is None or screenshot_provider is None:
@@ -116,29 +119,6 @@ class LocalClientService:
             # 如果 actions.executor 尚未加载或结构不同，静默忽略，不影响主流程
             pass
 
-        # 周期性清理低重要度旧记忆，防止长期堆积“无关小事”
-        def _memory_housekeeping_loop():
-            while True:
-                try:
-                    # 清理 importance <= 3 且 30 天前的记忆
-                    deleted = getattr(self.memory, "cleanup_low_importance", lambda **_: 0)(
-                        max_age_days=30, importance_threshold=3
-                    )
-                    if deleted:
-                        log = getattr(__import__("logging"), "getLogger")(__name__)
-                        log.info("Memory housekeeping removed %d low-importance rows", deleted)
-                except Exception:
-                    # 清理失败不影响主程序
-                    pass
-                # 每 6 小时运行一次
-                time.sleep(6 * 60 * 60)
-
-        try:
-            t = threading.Thread(target=_memory_housekeeping_loop, daemon=True)
-            t.start()
-        except Exception:
-            pass
-
         if config_obj is None or config_module is None:
             import config as _config_module
             from config import config as _config_obj
@@ -220,7 +200,7 @@ class LocalClientService:
             return self._llm_client
         from core.adapter import UniversalLLM
 
-        return UniversalLLM(self.config.LLM_API_KEY, self.config.LLM_API_BASE, self.config.LLM_MODEL)
+        return UniversalLLM.from_config(self.config)
 
     # ------------------------------------------------------------------ chat/session
 
@@ -248,6 +228,19 @@ class LocalClientService:
             },
         )
 
+    def chat_event_cursor(self) -> int:
+        """Id of the newest chat event (where a fresh push stream starts)."""
+        return int(getattr(self.controller, "last_event_id", 0) or 0)
+
+    def wait_chat_events(self, after_id: int, *, timeout: float = 15.0, limit: int = 200) -> dict:
+        """Chat events after ``after_id``, blocking up to ``timeout`` for new ones (SSE)."""
+        events_since = getattr(self.controller, "events_since", None)
+        if events_since is None:
+            events, missed = self.controller.drain_events(limit=limit), False
+        else:
+            events, missed = events_since(after_id, limit=limit, timeout=timeout)
+        return self._result(True, data={"events": events, "missed": missed})
+
     def stop_chat(self) -> dict:
         self.controller.cancel()
         return self._result(True, message="Cancellation requested")
@@ -363,6 +356,35 @@ class LocalClientService:
                 "session_active": self.controller.has_session(),
                 "usage": usage,
                 "model": str(getattr(self.config, "LLM_MODEL", "")),
+                "trace": get_tracer().snapshot(),
+            },
+        )
+
+    def trace(self, sub: str = "", limit: int = 20) -> dict:
+        """Recent spans and per-name timing; ``export`` writes a Chrome trace file, ``clear`` empties the buffer."""
+        tracer = get_tracer()
+        sub = (sub or "").strip().lower()
+        if sub == "export":
+            path, count = tracer.export()
+            return self._result(True, message=f"Exported {count} spans to {path}", data={"path": path, "count": count})
+        if sub == "clear":
+            tracer.clear()
+            return self._result(True, message="Trace buffer cleared")
+        if sub:
+            return self._result(False, message="Usage: /trace [export|clear]", code="invalid")
+        summary = tracer.summary()
+        recent = tracer.recent(limit)
+        text = format_summary(summary) or "No spans recorded yet"
+        if recent:
+            text += "\n\n" + "\n".join(format_span(sp) for sp in recent)
+        return self._result(
+            True,
+            message=text,
+            data={
+                "summary": summary,
+                "recent": [{"name": sp.name, "cat": sp.cat, "start": sp.start, "ms": round(sp.ms, 1),
+                            "attrs": sp.attrs, "error": sp.error} for sp in recent],
+                "file": tracer.path,
             },
         )
 
@@ -521,7 +543,7 @@ class LocalClientService:
         q = (query or "").strip()
         if not q:
             return self._result(False, message="query is required", code="invalid")
-        rows = self.memory.search_multi(q, limit=max(1, min(int(limit), 50)))
+        rows = self.memory.search_multi(q, limit=max(1, min(int(limit), 50)), count_access=False)
         return self._result(True, data={"items": rows})
 
     def memory_delete(self, memory_id: int) -> dict:
@@ -529,7 +551,11 @@ class LocalClientService:
         return self._result(ok, message=("Deleted" if ok else "Delete failed"))
 
     def memory_stats(self) -> dict:
-        return self._result(True, data={"stats": self.memory.stats()})
+        data = {"stats": self.memory.stats()}
+        storage_stats = getattr(self.memory, "storage_stats", None)
+        if storage_stats is not None:
+            data["storage"] = storage_stats()
+        return self._result(True, data=data)
 
     # ------------------------------------------------------------------ skills
 
@@ -598,6 +624,7 @@ class LocalClientService:
             "/usage",
             "/tasks",
             "/rollback [n]",
+            "/trace [export|clear]",
         ]
         return self._result(True, data={"commands": commands})
 
@@ -627,6 +654,10 @@ class LocalClientService:
         if raw in {"/tasks"}:
             return self.tasks()
 
+        if raw == "/trace" or raw.startswith("/trace "):
+            parts = raw.split(maxsplit=1)
+            return self.trace(parts[1] if len(parts) > 1 else "")
+
         if raw.startswith("/rollback"):
             parts = raw.split(maxsplit=1)
             n = 1
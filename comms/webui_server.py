@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 import logging
 import threading
+import time
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
@@ -15,11 +16,24 @@ log = logging.getLogger(__name__)
 
 WEBUI_DIR = Path(__file__).resolve().parent.parent / "webui"
 
+# SSE: how long a stream waits for chat events before pushing a status snapshot
+_STATUS_INTERVAL = 5.0
+
 
 def _json_bytes(obj: dict) -> bytes:
     return json.dumps(obj, ensure_ascii=False).encode("utf-8")
 
 
+def _sse_bytes(data: dict, *, event: str = "", event_id: int | None = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
 class _ApiHandler(BaseHTTPRequestHandler):
     service_factory: Callable[[], LocalClientService] | None = None
     static_dir: Path = WEBUI_DIR
@@ -81,6 +95,59 @@ class _ApiHandler(BaseHTTPRequestHandler):
         except Exception:
             return {}
 
+    def _stream_events(self, qs: dict):
+        """Server-Sent Events push channel for chat events.
+
+        Each chat event is sent with its controller id; browsers reconnect with
+        ``Last-Event-ID`` and the stream resumes right after it. A fresh stream
+        starts at the newest event (the transcript is loaded separately).
+        ``event: status`` carries the /api/status payload every few seconds and
+        ``event: gap`` means the resume point fell out of the event buffer;
+        ``{"restarted": true}`` on it means ids started over (the backend was
+        restarted), so the client must forget its last id.
+        """
+        service = self.service
+        raw = self.headers.get("Last-Event-ID") or (qs.get("last_event_id") or [""])[0]
+        try:
+            last_id = int(raw)
+        except ValueError:
+            last_id = service.chat_event_cursor()
+
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("X-Accel-Buffering", "no")
+        self.end_headers()
+
+        stop = getattr(self.server, "stream_stop", None)
+        next_status = 0.0
+        try:
+            self.wfile.write(b"retry: 2000\n\n")
+            self.wfile.flush()
+            while not (stop is not None and stop.is_set()):
+                res = service.wait_chat_events(last_id, timeout=_STATUS_INTERVAL)
+                data = res.get("data") or {}
+                out = []
+                if data.get("missed"):
+                    cursor = service.chat_event_cursor()
+                    restarted = last_id > cursor
+                    out.append(_sse_bytes({"restarted": True} if restarted else {}, event="gap"))
+                    if restarted:
+                        last_id = cursor
+                for ev in data.get("events") or []:
+                    last_id = int(ev.get("id", last_id))
+                    out.append(_sse_bytes(ev, event_id=last_id))
+                now = time.monotonic()
+                if now >= next_status:
+                    next_status = now + _STATUS_INTERVAL
+                    out.append(_sse_bytes(service.status().get("data") or {}, event="status"))
+                if out:
+                    self.wfile.write(b"".join(out))
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionError):
+            log.debug("webui event stream closed by %s", self.client_address[0])
+
     # -------------------------------------------------------------- routing
 
     def do_GET(self):
@@ -90,6 +157,8 @@ class _ApiHandler(BaseHTTPRequestHandler):
 
         if path == "/api/ping":
             return self._send_json({"ok": True, "message": "pong"})
+        if path == "/api/chat/stream":
+            return self._stream_events(qs)
         if path == "/api/chat/events":
             limit = int((qs.get("limit") or ["200"])[0])
             return self._send_json(self.service.poll_chat_events(limit=limit))
@@ -97,6 +166,9 @@ class _ApiHandler(BaseHTTPRequestHandler):
             return self._send_json(self.service.chat_sessions())
         if path == "/api/status":
             return self._send_json(self.service.status())
+        if path == "/api/trace":
+            limit = int((qs.get("limit") or ["20"])[0])
+            return self._send_json(self.service.trace(limit=limit))
         if path == "/api/doctor":
             return self._send_json(self.service.doctor())
         if path == "/api/config":
@@ -214,6 +286,7 @@ class WebUiServer:
             return
         handler = self._build_handler()
         self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self._httpd.stream_stop = threading.Event()
         try:
             self.port = int(self._httpd.server_address[1])
         except Exception:
@@ -224,6 +297,7 @@ class WebUiServer:
     def stop(self):
         if self._httpd is None:
             return
+        self._httpd.stream_stop.set()
         self._httpd.shutdown()
         self._httpd.server_close()
         self._httpd = None
@@ -382,10 +382,18 @@ class _Config:
         self.LLM2_API_BASE = os.environ.get("LLM2_API_BASE", "")
         self.LLM2_API_KEY = os.environ.get("LLM2_API_KEY", "")
         self.LLM2_MODEL = os.environ.get("LLM2_MODEL", "")
+        # Failover tuning (core.llm_failover): seconds to first streamed token before
+        # giving up on an endpoint; hedge delay > 0 also starts LLM2 when LLM is slow;
+        # call timeout bounds a non-streaming request to LLM before trying LLM2
+        self.LLM_TTFT_TIMEOUT = float(os.environ.get("LLM_TTFT_TIMEOUT", "") or "20")
+        self.LLM_CALL_TIMEOUT = float(os.environ.get("LLM_CALL_TIMEOUT", "") or "60")
+        self.LLM_HEDGE_DELAY = float(os.environ.get("LLM_HEDGE_DELAY", "") or "0")
         self.DISCORD_BOT_TOKEN = os.environ.get("DISCORD_BOT_TOKEN", "")
         self.DISCORD_OWNER_ID = os.environ.get("DISCORD_OWNER_ID", "")
         self.DISCORD_CHANNEL_ID = int(os.environ.get("DISCORD_CHANNEL_ID", "0") or "0")
         self.DISCORD_PROXY = os.environ.get("DISCORD_PROXY", "")
+        # Outbound proxy for tools/skills (core.http_client); empty = direct / HTTP(S)_PROXY env
+        self.PROXY = os.environ.get("PROXY", "")
 
     def __getattr__(self, name):
         if name.startswith("_"):
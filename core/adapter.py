@@ -1,11 +1,105 @@
 import base64
-from openai import OpenAI
+import importlib.util
+import threading
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI
+
+from core.llm_failover import AsyncFailoverClient, Endpoint, FailoverClient, shared_health
+
+# HTTP/2 multiplexes concurrent streams from every channel over one connection
+# per host; only enabled when the optional ``h2`` package is installed.
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+_async_http = None
+_async_http_lock = threading.Lock()
+
+
+def shared_async_http_client():
+    """Process-wide async HTTP pool shared by every UniversalLLM.aclient.
+
+    Never closed per client, so connections stay warm across brains/channels.
+    Async connections belong to the event loop that opened them, so use it
+    from a single loop (the Discord client's).
+    """
+    global _async_http
+    if _async_http is None:
+        with _async_http_lock:
+            if _async_http is None:
+                _async_http = DefaultAsyncHttpxClient(http2=_HTTP2)
+    return _async_http
 
 
 class UniversalLLM:
-    def __init__(self, api_key: str, base_url: str, model_name: str):
+    def __init__(self, api_key: str, base_url: str, model_name: str, *,
+                 secondary: tuple[str, str, str] | None = None,
+                 ttft_timeout: float = 20.0, hedge_delay: float = 0.0, call_timeout: float = 60.0,
+                 breaker_threshold: int = 3, breaker_cooldown: float = 60.0):
+        """``secondary`` = (api_key, base_url, model) of a failover endpoint.
+
+        Without one, ``client`` is the plain OpenAI client. With one, ``client``
+        and ``aclient`` fail over between the endpoints (see core.llm_failover).
+        """
         self.model = model_name
+        self.api_key = api_key
+        self.base_url = base_url
         self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=120)
+        self._aclient = None
+        self.endpoints: list[Endpoint] = []
+        self._failover_opts = {"ttft_timeout": ttft_timeout, "hedge_delay": hedge_delay,
+                               "call_timeout": call_timeout}
+        if secondary:
+            key2, base2, model2 = secondary
+            breaker = {"threshold": breaker_threshold, "cooldown": breaker_cooldown}
+            # The primary passes the caller's model through (so a runtime
+            # ``llm.model = ...`` switch applies); the secondary only swaps in
+            # LLM2_MODEL when one is set
+            self.endpoints = [
+                Endpoint("primary", "", self.client,
+                         lambda: self._make_aclient(api_key, base_url),
+                         health=shared_health(base_url, model_name, **breaker)),
+                Endpoint("secondary", model2,
+                         OpenAI(api_key=key2, base_url=base2, timeout=120),
+                         lambda: self._make_aclient(key2, base2),
+                         health=shared_health(base2, model2 or model_name, **breaker)),
+            ]
+            self.client = FailoverClient(self.endpoints, **self._failover_opts)
+
+    @classmethod
+    def from_config(cls, cfg=None) -> "UniversalLLM":
+        """Primary endpoint from ``LLM_*``; failover to ``LLM2_*`` when it is configured."""
+        if cfg is None:
+            from config import config as cfg
+        secondary = None
+        if getattr(cfg, "LLM2_API_BASE", "") and getattr(cfg, "LLM2_API_KEY", ""):
+            secondary = (cfg.LLM2_API_KEY, cfg.LLM2_API_BASE, getattr(cfg, "LLM2_MODEL", ""))
+        return cls(
+            cfg.LLM_API_KEY, cfg.LLM_API_BASE, cfg.LLM_MODEL,
+            secondary=secondary,
+            ttft_timeout=float(getattr(cfg, "LLM_TTFT_TIMEOUT", 20.0) or 20.0),
+            hedge_delay=float(getattr(cfg, "LLM_HEDGE_DELAY", 0.0) or 0.0),
+            call_timeout=float(getattr(cfg, "LLM_CALL_TIMEOUT", 60.0) or 60.0),
+        )
+
+    @staticmethod
+    def _make_aclient(api_key: str, base_url: str) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key=api_key, base_url=base_url, timeout=120,
+            http_client=shared_async_http_client(),
+        )
+
+    @property
+    def aclient(self):
+        """Async client on the shared HTTP pool (created on first use)."""
+        if self._aclient is None:
+            if self.endpoints:
+                self._aclient = AsyncFailoverClient(self.endpoints, **self._failover_opts)
+            else:
+                self._aclient = self._make_aclient(self.api_key, self.base_url)
+        return self._aclient
+
+    def health(self) -> list[dict]:
+        """Per-endpoint breaker state and latency (empty without failover)."""
+        return [{"name": ep.name, "model": ep.model or self.model, **ep.health.snapshot()} for ep in self.endpoints]
 
     def chat(self, prompt: str) -> str:
         resp = self.client.chat.completions.create(
@@ -14,3 +108,9 @@ class UniversalLLM:
         )
         return resp.choices[0].message.content
 
+    async def achat(self, prompt: str) -> str:
+        resp = await self.aclient.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return resp.choices[0].message.content
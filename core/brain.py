@@ -2,17 +2,20 @@ import json
 import re
 import base64
 import logging
+from contextlib import contextmanager
 
 from core.adapter import UniversalLLM
-from actions.executor import TOOLS_SCHEMA, SCREENSHOT_PATH, execute, _skill_manager
-from memory.store import MemoryStore
-from config import config
+from core.compactor import ContextCompactor
+from core.tokens import TokenLedger, get_token_counter
+from core.tracing import span
+from actions.executor import TOOLS_SCHEMA, SCREENSHOT_PATH, execute_many, _skill_manager
+from memory.store import get_store
 
 log = logging.getLogger(__name__)
 
 _TOKEN_LIMIT = 30_000
+_SOFT_TOKEN_LIMIT = 20_000   # start background summarization above this
 _KEEP_TAIL = 12
-_COMPRESS_HEAD = 3
 _TOOL_RESULT_MAX = 500
 
 SYSTEM_PROMPT = """你是 Starbot，一个跑在用户电脑上的 AI 私人助手。
@@ -138,6 +141,75 @@ Since tool calling is not available, respond with a JSON block to invoke a tool:
 Output ONLY the JSON block, no other text."""
 
 
+class _StreamAccumulator:
+    """Folds streamed chat-completion chunks into the assistant message and action.
+
+    Shared by the sync and async streaming paths so both record usage, signal
+    on_clear and build tool calls identically.
+    """
+
+    def __init__(self, brain: "Brain", on_chunk=None, on_clear=None, sp=None):
+        self.brain = brain
+        self.on_chunk = on_chunk
+        self.on_clear = on_clear
+        self.span = sp          # tracing span; gets ttft_ms at the first delta
+        self.full_text = ""
+        self.tool_calls: dict[int, dict] = {}
+        self._tool_call_signalled = False   # 只触发一次 on_clear
+
+    def feed(self, chunk) -> None:
+        if getattr(chunk, "usage", None):
+            self.brain._record_usage(chunk.usage)
+        if not chunk.choices:
+            return
+        if self.span is not None and "ttft_ms" not in self.span.attrs:
+            self.span.mark("ttft")
+        delta = chunk.choices[0].delta
+
+        if delta.content:
+            self.full_text += delta.content
+            if self.on_chunk:
+                self.on_chunk(delta.content)
+
+        if delta.tool_calls:
+            # 第一次检测到工具调用：通知调用方清除已流式显示的草稿文字
+            if not self._tool_call_signalled:
+                self._tool_call_signalled = True
+                if self.on_clear:
+                    self.on_clear()
+            for tc in delta.tool_calls:
+                i = tc.index
+                if i not in self.tool_calls:
+                    self.tool_calls[i] = {"id": "", "name": "", "args": ""}
+                if tc.id:
+                    self.tool_calls[i]["id"] = tc.id
+                if tc.function.name:
+                    self.tool_calls[i]["name"] += tc.function.name
+                if tc.function.arguments:
+                    self.tool_calls[i]["args"] += tc.function.arguments
+
+    def finish(self) -> dict | list | None:
+        """Append the assistant message to the brain's history and return the action."""
+        full_text = self.full_text
+        if self.tool_calls:
+            calls = [self.tool_calls[i] for i in sorted(self.tool_calls)]
+            msg = {
+                "role": "assistant",
+                "content": full_text or None,
+                "tool_calls": [{"id": c["id"], "type": "function",
+                                "function": {"name": c["name"], "arguments": c["args"]}}
+                               for c in calls],
+            }
+            self.brain.messages.append({k: v for k, v in msg.items() if v is not None})
+            # 返回列表（多工具）或单个 dict（单工具，保持向后兼容）
+            actions = [{"name": c["name"], "arguments": c["args"], "id": c["id"]} for c in calls]
+            return actions if len(actions) > 1 else actions[0]
+        if full_text:
+            self.brain.messages.append({"role": "assistant", "content": full_text})
+            return {"text": full_text}
+        return None
+
+
 class Brain:
     # Tools that require user confirmation before execution
     DANGEROUS_TOOLS = frozenset({
@@ -147,45 +219,76 @@ class Brain:
 
     def __init__(self, llm: UniversalLLM | None = None, use_native_tools: bool = True, tools_schema: list | None = None,
                  confirm_callback=None):
-        self.llm = llm or UniversalLLM(
-            config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL,
-        )
+        self.llm = llm or UniversalLLM.from_config()
         self.use_native_tools = use_native_tools
         self._tools_schema = tools_schema if tools_schema is not None else TOOLS_SCHEMA
         self._confirm_callback = confirm_callback
-        self._memory = MemoryStore()
+        self._memory = get_store()
         # ReAct: track consecutive tool failures for retry hints
         self._fail_streak: int = 0
-        # Token usage tracking
-        self.usage: dict = {"input": 0, "output": 0, "calls": 0}
+        # Token usage tracking (cached = prompt tokens served from the provider's prefix cache)
+        self.usage: dict = {"input": 0, "output": 0, "calls": 0, "cached": 0}
+        # Per-message token cache, so budgeting only counts newly appended turns
+        self._token_ledger = TokenLedger()
+        # Folds evicted turns into a rolling summary instead of dropping them
+        self._compactor = ContextCompactor(keep_tail=_KEEP_TAIL)
+        # messages[0] stays byte-identical across sessions so provider prefix caching
+        # can hit; per-session blocks (preferences, skill recommendations) are sent
+        # as a separate system message right after it, see _request_messages().
         sys_content = SYSTEM_PROMPT if use_native_tools else SYSTEM_PROMPT + TEXT_MODE_SUFFIX
+        self.messages: list[dict] = [{"role": "system", "content": sys_content}]
+        self._context_blocks: dict[str, str] = {}
         prefs = self._memory.get_preferences()
         if prefs:
-            sys_content += "\n\n## 用户偏好\n" + "\n".join(f"- {p}" for p in prefs)
-        self.messages: list[dict] = [{"role": "system", "content": sys_content}]
+            self._context_blocks["preferences"] = "## 用户偏好\n" + "\n".join(f"- {p}" for p in prefs)
+
+    # ---- Request assembly ----
+    def _volatile_context(self) -> str:
+        return "\n\n".join(v for v in self._context_blocks.values() if v)
+
+    def _request_messages(self, messages: list[dict] | None = None) -> list[dict]:
+        """Stable system prompt, then per-session context, then the conversation."""
+        messages = self.messages if messages is None else messages
+        volatile = self._volatile_context()
+        if not volatile or not messages:
+            return messages
+        return [messages[0], {"role": "system", "content": volatile}] + messages[1:]
+
+    def _record_usage(self, usage) -> None:
+        if not usage:
+            return
+        self.usage["input"] += getattr(usage, "prompt_tokens", 0) or 0
+        self.usage["output"] += getattr(usage, "completion_tokens", 0) or 0
+        self.usage["calls"] += 1
+        # OpenAI: prompt_tokens_details.cached_tokens; DeepSeek: prompt_cache_hit_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details is not None else None
+        if not isinstance(cached, int):
+            cached = getattr(usage, "prompt_cache_hit_tokens", None)
+        if isinstance(cached, int):
+            self.usage["cached"] = self.usage.get("cached", 0) + cached
 
     # ---- Context compression ----
     def _estimate_tokens(self) -> int:
-        """Rough token estimate: ~4 chars per token for text, ~1000 tokens per image."""
-        total = 0
-        for msg in self.messages:
-            c = msg.get("content", "")
-            if isinstance(c, str):
-                total += len(c) // 4
-            elif isinstance(c, list):
-                for part in c:
-                    if isinstance(part, dict):
-                        if part.get("type") == "text":
-                            total += len(part.get("text", "")) // 4
-                        elif part.get("type") == "image_url":
-                            total += 1000
-            elif isinstance(c, dict):
-                total += len(json.dumps(c)) // 4
-        return total
+        """Token count of the current context (model tokenizer or CJK-aware estimate, ~1000 per image)."""
+        counter = get_token_counter(getattr(self.llm, "model", ""))
+        return self._token_ledger.total(self.messages, counter) + counter.count(self._volatile_context())
 
     def _compress_context(self):
-        """Remove old images and trim history when context is too large."""
-        if self._estimate_tokens() < _TOKEN_LIMIT:
+        """Fold old turns into a summary and trim history when context is too large.
+
+        Above the soft limit, older turns are summarized on a background thread
+        and swapped in on a later step; the hard-limit phases below never wait
+        for the LLM.
+        """
+        compacted = self._compactor.apply(self.messages)
+        if compacted is not None:
+            self.messages = compacted
+
+        tokens = self._estimate_tokens()
+        if tokens >= _SOFT_TOKEN_LIMIT:
+            self._compactor.start(self.messages, llm=self.llm)
+        if tokens < _TOKEN_LIMIT:
             return
 
         # Phase 1: Strip images from all but the last 4 messages
@@ -194,6 +297,7 @@ class Brain:
             if isinstance(c, list):
                 text_parts = [p for p in c if isinstance(p, dict) and p.get("type") == "text"]
                 msg["content"] = text_parts[0].get("text", "") if text_parts else "[image removed]"
+        self._token_ledger.invalidate()
 
         if self._estimate_tokens() < _TOKEN_LIMIT:
             return
@@ -204,17 +308,15 @@ class Brain:
                 content = msg.get("content", "")
                 if len(content) > _TOOL_RESULT_MAX:
                     msg["content"] = content[:_TOOL_RESULT_MAX] + "…[truncated]"
+        self._token_ledger.invalidate()
 
         if self._estimate_tokens() < _TOKEN_LIMIT:
             return
 
-        # Phase 3: Keep system + last N messages, but ensure no orphan tool messages
+        # Phase 3: Fold everything but the recent turns into an extractive summary
+        # (never cuts at a tool result, so tool_call/tool pairs stay intact)
         if len(self.messages) > 15:
-            tail = self.messages[-_KEEP_TAIL:]
-            # Drop leading tool messages that have no matching assistant tool_call
-            while tail and tail[0].get("role") == "tool":
-                tail = tail[1:]
-            self.messages = self.messages[:_COMPRESS_HEAD] + tail
+            self.messages = self._compactor.compact_now(self.messages)
 
     def _image_content(self, path: str) -> dict | None:
         try:
@@ -233,8 +335,8 @@ class Brain:
                 log.debug("skill recommendation hint failed: %s", e)
                 rec_hint = ""
             if rec_hint:
-                # 仅作为隐藏提示放在同一条 user 消息的前缀，供模型参考，不建议在回答中直接复述标签。
-                text = f"[Skill Recommendations]\n{rec_hint}\n\n{text}"
+                # 作为隐藏提示放在会话上下文块中（稳定前缀之后），供模型参考，不建议在回答中直接复述标签。
+                self._context_blocks["skills"] = f"[Skill Recommendations]\n{rec_hint}"
 
         # Process web UI attachments
         content_parts: list[dict] = []
@@ -291,34 +393,35 @@ class Brain:
                         return True
         return False
 
+    @contextmanager
+    def _llm_span(self, name: str):
+        """Tracing span for one model call: model, history length and the tokens it used."""
+        before_in, before_out = self.usage["input"], self.usage["output"]
+        with span(name, cat="llm", model=self.llm.model, messages=len(self.messages)) as sp:
+            yield sp
+            sp.set(input_tokens=self.usage["input"] - before_in,
+                   output_tokens=self.usage["output"] - before_out)
+
     # ---- Native tool calling mode ----
-    def _call_native(self) -> dict | list | None:
-        self._compress_context()
-        try:
-            resp = self.llm.client.chat.completions.create(
-                model=self.llm.model,
-                messages=self.messages,
-                tools=self._tools_schema,
-            )
-        except Exception as e:
-            # If the model doesn't support images, retry without them
-            if self._has_images() and ("image" in str(e).lower() or "vision" in str(e).lower() or "404" in str(e)):
-                log.warning("Model does not support images, retrying without: %s", e)
-                stripped = self._strip_images(self.messages)
-                resp = self.llm.client.chat.completions.create(
-                    model=self.llm.model,
-                    messages=stripped,
-                    tools=self._tools_schema,
-                )
-            else:
-                raise
+    def _native_kwargs(self, **extra) -> dict:
+        return {"model": self.llm.model, "messages": self._request_messages(), "tools": self._tools_schema, **extra}
+
+    def _native_fallback_kwargs(self, e: Exception, kwargs: dict) -> dict | None:
+        """Request kwargs to retry with after ``e``, or None to re-raise."""
+        # If the model doesn't support images, retry without them
+        if self._has_images() and ("image" in str(e).lower() or "vision" in str(e).lower() or "404" in str(e)):
+            log.warning("Model does not support images, retrying without: %s", e)
+            return {**kwargs, "messages": self._request_messages(self._strip_images(self.messages))}
+        if "stream_options" in kwargs and "stream_options" in str(e):
+            # Some OpenAI-compatible endpoints reject stream_options; usage is then untracked
+            return {k: v for k, v in kwargs.items() if k != "stream_options"}
+        return None
+
+    def _accept_native_response(self, resp) -> dict | list | None:
         if not resp.choices:
             return None
         # Track token usage
-        if resp.usage:
-            self.usage["input"] += resp.usage.prompt_tokens or 0
-            self.usage["output"] += resp.usage.completion_tokens or 0
-            self.usage["calls"] += 1
+        self._record_usage(resp.usage)
         msg = resp.choices[0].message
         self.messages.append(msg.model_dump(exclude_none=True))
         if msg.tool_calls:
@@ -329,6 +432,33 @@ class Brain:
             return {"text": msg.content}
         return None
 
+    def _call_native(self) -> dict | list | None:
+        self._compress_context()
+        kwargs = self._native_kwargs()
+        with self._llm_span("llm.call"):
+            try:
+                resp = self.llm.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                retry = self._native_fallback_kwargs(e, kwargs)
+                if retry is None:
+                    raise
+                resp = self.llm.client.chat.completions.create(**retry)
+            return self._accept_native_response(resp)
+
+    async def _acall_native(self) -> dict | list | None:
+        """Async _call_native on the shared AsyncOpenAI client (no worker thread)."""
+        self._compress_context()
+        kwargs = self._native_kwargs()
+        with self._llm_span("llm.call"):
+            try:
+                resp = await self.llm.aclient.chat.completions.create(**kwargs)
+            except Exception as e:
+                retry = self._native_fallback_kwargs(e, kwargs)
+                if retry is None:
+                    raise
+                resp = await self.llm.aclient.chat.completions.create(**retry)
+            return self._accept_native_response(resp)
+
     def _call_native_stream(self, on_chunk=None, on_clear=None, cancel_check=None) -> dict | None:
         """Stream version of _call_native. Calls on_chunk(text) with each text delta.
         Calls on_clear() once when tool calls are first detected (LLM switched from
@@ -336,80 +466,54 @@ class Brain:
         cancel_check: callable returning True if cancellation was requested.
         Returns list of tool calls or single text action."""
         self._compress_context()
-        try:
-            stream = self.llm.client.chat.completions.create(
-                model=self.llm.model,
-                messages=self.messages,
-                tools=self._tools_schema,
-                stream=True,
-            )
-        except Exception as e:
-            if self._has_images() and ("image" in str(e).lower() or "vision" in str(e).lower() or "404" in str(e)):
-                log.warning("Model does not support images (stream), retrying without: %s", e)
-                stripped = self._strip_images(self.messages)
-                stream = self.llm.client.chat.completions.create(
-                    model=self.llm.model,
-                    messages=stripped,
-                    tools=self._tools_schema,
-                    stream=True,
-                )
-            else:
-                raise
-        full_text = ""
-        tool_calls: dict[int, dict] = {}
-        _tool_call_signalled = False   # 只触发一次 on_clear
+        kwargs = self._native_kwargs(stream=True, stream_options={"include_usage": True})
+        with self._llm_span("llm.stream") as sp:
+            try:
+                stream = self.llm.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                retry = self._native_fallback_kwargs(e, kwargs)
+                if retry is None:
+                    raise
+                stream = self.llm.client.chat.completions.create(**retry)
+
+            acc = _StreamAccumulator(self, on_chunk, on_clear, sp)
+            for chunk in stream:
+                if cancel_check and cancel_check():
+                    # Abort streaming — close the stream and return None
+                    sp.set(cancelled=True)
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+                    return None
+                acc.feed(chunk)
+            return acc.finish()
+
+    async def _acall_native_stream(self, on_chunk=None, on_clear=None) -> dict | None:
+        """Async _call_native_stream. Cancelling the awaiting task closes the HTTP stream."""
+        self._compress_context()
+        kwargs = self._native_kwargs(stream=True, stream_options={"include_usage": True})
+        with self._llm_span("llm.stream") as sp:
+            try:
+                stream = await self.llm.aclient.chat.completions.create(**kwargs)
+            except Exception as e:
+                retry = self._native_fallback_kwargs(e, kwargs)
+                if retry is None:
+                    raise
+                stream = await self.llm.aclient.chat.completions.create(**retry)
 
-        for chunk in stream:
-            if cancel_check and cancel_check():
-                # Abort streaming — close the stream and return None
+            acc = _StreamAccumulator(self, on_chunk, on_clear, sp)
+            try:
+                async for chunk in stream:
+                    acc.feed(chunk)
+            except BaseException:
+                # CancelledError included: release the connection instead of draining it
                 try:
-                    stream.close()
+                    await stream.close()
                 except Exception:
                     pass
-                return None
-            if not chunk.choices:
-                continue
-            delta = chunk.choices[0].delta
-
-            if delta.content:
-                full_text += delta.content
-                if on_chunk:
-                    on_chunk(delta.content)
-
-            if delta.tool_calls:
-                # 第一次检测到工具调用：通知调用方清除已流式显示的草稿文字
-                if not _tool_call_signalled:
-                    _tool_call_signalled = True
-                    if on_clear:
-                        on_clear()
-                for tc in delta.tool_calls:
-                    i = tc.index
-                    if i not in tool_calls:
-                        tool_calls[i] = {"id": "", "name": "", "args": ""}
-                    if tc.id:
-                        tool_calls[i]["id"] = tc.id
-                    if tc.function.name:
-                        tool_calls[i]["name"] += tc.function.name
-                    if tc.function.arguments:
-                        tool_calls[i]["args"] += tc.function.arguments
-
-        if tool_calls:
-            calls = [tool_calls[i] for i in sorted(tool_calls)]
-            msg = {
-                "role": "assistant",
-                "content": full_text or None,
-                "tool_calls": [{"id": c["id"], "type": "function",
-                                "function": {"name": c["name"], "arguments": c["args"]}}
-                               for c in calls],
-            }
-            self.messages.append({k: v for k, v in msg.items() if v is not None})
-            # 返回列表（多工具）或单个 dict（单工具，保持向后兼容）
-            actions = [{"name": c["name"], "arguments": c["args"], "id": c["id"]} for c in calls]
-            return actions if len(actions) > 1 else actions[0]
-        if full_text:
-            self.messages.append({"role": "assistant", "content": full_text})
-            return {"text": full_text}
-        return None
+                raise
+            return acc.finish()
 
     def _feed_native_result(self, tool_id: str, result: dict, image_path: str | None = None):
         content = json.dumps(result, ensure_ascii=False)
@@ -420,12 +524,14 @@ class Brain:
     # ---- Text fallback mode (no tool calling support) ----
     def _call_text(self) -> dict | None:
         self._compress_context()
-        resp = self.llm.client.chat.completions.create(
-            model=self.llm.model,
-            messages=self.messages,
-        )
-        if not resp.choices:
-            return None
+        with self._llm_span("llm.call"):
+            resp = self.llm.client.chat.completions.create(
+                model=self.llm.model,
+                messages=self._request_messages(),
+            )
+            if not resp.choices:
+                return None
+            self._record_usage(resp.usage)
         text = resp.choices[0].message.content
         self.messages.append({"role": "assistant", "content": text})
         m = re.search(r"```json\s*(\{.*?\})\s*```", text[:8000], re.DOTALL)
@@ -470,11 +576,11 @@ class Brain:
             return result
 
         actions = action if isinstance(action, list) else [action]
-        results: list[dict] = []
-        for one_action in actions:
-            tool_name = one_action.get("name", "")
 
-            # ── Confirmation gate for dangerous tools ─────────────────────
+        # ── Confirmation gate for dangerous tools (sequential, in call order) ──
+        denied: dict[int, dict] = {}
+        for i, one_action in enumerate(actions):
+            tool_name = one_action.get("name", "")
             if tool_name in self.DANGEROUS_TOOLS and self._confirm_callback:
                 try:
                     args_str = one_action.get("arguments", "{}")
@@ -484,18 +590,26 @@ class Brain:
                         display_args = args_str
                 except Exception:
                     display_args = one_action.get("arguments", {})
-                approved = self._confirm_callback(tool_name, display_args)
-                if not approved:
-                    denied_result = {"ok": False, "result": f"用户拒绝执行 {tool_name}"}
-                    if self.use_native_tools:
-                        self._feed_native_result(one_action.get("id", ""), denied_result, None)
-                    else:
-                        self._feed_text_result(denied_result, None)
-                    results.append(denied_result)
-                    continue
-            # ──────────────────────────────────────────────────────────────
+                if not self._confirm_callback(tool_name, display_args):
+                    denied[i] = {"ok": False, "result": f"用户拒绝执行 {tool_name}"}
+        # ──────────────────────────────────────────────────────────────────────
+
+        # Independent tools run concurrently; results come back in call order
+        approved = [a for i, a in enumerate(actions) if i not in denied]
+        executed = iter(execute_many(approved))
+
+        results: list[dict] = []
+        for i, one_action in enumerate(actions):
+            if i in denied:
+                denied_result = denied[i]
+                if self.use_native_tools:
+                    self._feed_native_result(one_action.get("id", ""), denied_result, None)
+                else:
+                    self._feed_text_result(denied_result, None)
+                results.append(denied_result)
+                continue
 
-            result = execute(one_action)
+            result = next(executed)
             image_path = result.get("image")
             feed_result = {k: v for k, v in result.items() if k != "image"}
 
@@ -0,0 +1,203 @@
+"""Summarizing context compaction for Brain.
+
+Instead of dropping old turns, evicted history is folded into a single rolling
+summary, a system message placed right after the system prompt (so it never
+forms a second user turn next to a kept user message):
+
+    [system] [system: summary] [kept turns ...]
+
+The summary is produced by the LLM when one is available, otherwise by an
+extractive pass over the evicted messages (user asks, assistant text, tool
+calls and their results). Eviction cuts before a user or assistant message,
+never at a ``tool`` result, so assistant ``tool_calls`` messages are never
+separated from their results; a single long tool loop
+(``[system, user, (assistant, tool) × N]``) can still be compacted.
+
+``start()`` runs the summarization on a background thread; ``apply()`` swaps
+the finished summary in on a later step without waiting. ``compact_now()`` is
+the synchronous, LLM-free fallback used when the hard limit is reached.
+"""
+
+import json
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+SUMMARY_TAG = "[Conversation Summary]"
+
+_LINE_MAX = 200
+_TRANSCRIPT_MAX = 12_000
+
+
+def is_summary_message(msg) -> bool:
+    # Sessions saved before the summary moved to a system message carry it as a user message
+    return (
+        isinstance(msg, dict)
+        and msg.get("role") in ("system", "user")
+        and isinstance(msg.get("content"), str)
+        and msg["content"].startswith(SUMMARY_TAG)
+    )
+
+
+def _text_of(msg: dict) -> str:
+    c = msg.get("content")
+    if isinstance(c, str):
+        return c
+    if isinstance(c, list):
+        return " ".join(
+            str(p.get("text", "")) for p in c if isinstance(p, dict) and p.get("type") == "text"
+        )
+    return ""
+
+
+def _clip(text: str, n: int = _LINE_MAX) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= n else text[:n] + "…"
+
+
+def _render_line(msg: dict) -> str:
+    role = msg.get("role")
+    if role == "user":
+        text = _text_of(msg)
+        if text.startswith("[Skill Recommendations]"):
+            text = text.split("\n\n", 1)[-1]
+        return f"用户: {_clip(text)}" if text.strip() else ""
+    if role == "assistant":
+        parts = []
+        text = _text_of(msg)
+        if text.strip():
+            parts.append(f"助手: {_clip(text)}")
+        for tc in msg.get("tool_calls") or []:
+            fn = (tc.get("function") or {}) if isinstance(tc, dict) else {}
+            parts.append(f"调用 {fn.get('name', '?')}({_clip(fn.get('arguments', ''), 120)})")
+        return "\n".join(parts)
+    if role == "tool":
+        raw = _text_of(msg)
+        try:
+            data = json.loads(raw)
+            if isinstance(data, dict):
+                ok = "成功" if data.get("ok", True) else "失败"
+                raw = f"{ok} {data.get('result', '')}"
+        except (ValueError, TypeError):
+            pass
+        return f"  结果: {_clip(raw)}"
+    return ""
+
+
+class ContextCompactor:
+    def __init__(self, *, keep_tail: int = 12, max_summary_chars: int = 4000):
+        self.keep_tail = keep_tail
+        self.max_summary_chars = max_summary_chars
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pending: tuple | None = None   # (start, cut, first_obj, cut_obj, summary)
+
+    # ── Planning ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _start_index(messages: list[dict]) -> int:
+        return 2 if len(messages) > 1 and is_summary_message(messages[1]) else 1
+
+    def split_point(self, messages: list[dict]) -> int:
+        """Index of the first kept message, a user or assistant turn (0 = nothing to evict)."""
+        start = self._start_index(messages)
+        target = len(messages) - self.keep_tail
+        if target <= start:
+            return 0
+        for i in range(target, start, -1):
+            if messages[i].get("role") in ("user", "assistant"):
+                return i
+        for i in range(target + 1, len(messages) - 1):
+            if messages[i].get("role") in ("user", "assistant"):
+                return i
+        return 0
+
+    # ── Summaries ─────────────────────────────────────────────────────────────
+
+    def extractive_summary(self, evicted: list[dict], previous: str = "") -> str:
+        lines = [ln for ln in (_render_line(m) for m in evicted) if ln]
+        body = "\n".join(([previous.strip()] if previous.strip() else []) + lines)
+        if len(body) > self.max_summary_chars:
+            # Keep the opening (goal/plan) and the most recent findings
+            head = self.max_summary_chars // 3
+            body = body[:head] + "\n…\n" + body[-(self.max_summary_chars - head - 3):]
+        return body
+
+    def summarize(self, evicted: list[dict], previous: str = "", llm=None) -> str:
+        """LLM summary of evicted turns, falling back to the extractive summary."""
+        extract = self.extractive_summary(evicted, previous)
+        if llm is None:
+            return extract
+        transcript = "\n".join(ln for ln in (_render_line(m) for m in evicted) if ln)
+        prompt = (
+            "将以下较早的对话历史压缩成一份简洁摘要，供后续对话继续使用。必须保留：用户目标与计划、"
+            "已完成的步骤、工具调用得到的关键事实/数据/URL/文件路径、未完成事项。不要编造。\n\n"
+            + (f"## 已有摘要\n{previous}\n\n" if previous.strip() else "")
+            + f"## 新增历史\n{transcript[-_TRANSCRIPT_MAX:]}"
+        )
+        try:
+            out = llm.chat(prompt)
+        except Exception as e:
+            log.debug("LLM compaction failed, using extractive summary: %s", e)
+            return extract
+        if not isinstance(out, str) or not out.strip():
+            return extract
+        return out.strip()[: self.max_summary_chars]
+
+    @staticmethod
+    def _fold(messages: list[dict], cut: int, summary: str) -> list[dict]:
+        return [messages[0], {"role": "system", "content": f"{SUMMARY_TAG}\n{summary}"}] + messages[cut:]
+
+    # ── Background / synchronous entry points ─────────────────────────────────
+
+    @property
+    def busy(self) -> bool:
+        with self._lock:
+            return self._pending is not None or bool(self._thread and self._thread.is_alive())
+
+    def start(self, messages: list[dict], llm=None) -> bool:
+        """Summarize the evictable prefix on a background thread. Returns True if started."""
+        if self.busy:
+            return False
+        cut = self.split_point(messages)
+        if not cut:
+            return False
+        start = self._start_index(messages)
+        previous = _text_of(messages[1])[len(SUMMARY_TAG):].strip() if start == 2 else ""
+        evicted = list(messages[start:cut])
+        first_obj, cut_obj = messages[start], messages[cut]
+
+        def _run():
+            summary = self.summarize(evicted, previous, llm)
+            with self._lock:
+                self._pending = (start, cut, first_obj, cut_obj, summary)
+
+        t = threading.Thread(target=_run, daemon=True, name="starbot-compactor")
+        with self._lock:
+            self._thread = t
+        t.start()
+        return True
+
+    def apply(self, messages: list[dict]) -> list[dict] | None:
+        """Return compacted messages if a background summary is ready and still valid."""
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return None
+        start, cut, first_obj, cut_obj, summary = pending
+        if len(messages) <= cut or messages[start] is not first_obj or messages[cut] is not cut_obj:
+            log.debug("Discarding stale compaction result")
+            return None
+        return self._fold(messages, cut, summary)
+
+    def compact_now(self, messages: list[dict]) -> list[dict]:
+        """Synchronous extractive compaction (no LLM call)."""
+        cut = self.split_point(messages)
+        if not cut:
+            return messages
+        start = self._start_index(messages)
+        previous = _text_of(messages[1])[len(SUMMARY_TAG):].strip() if start == 2 else ""
+        with self._lock:
+            self._pending = None
+        return self._fold(messages, cut, self.extractive_summary(messages[start:cut], previous))
@@ -0,0 +1,147 @@
+"""Shared pooled HTTP client for tools and skills.
+
+Usage:
+    from core import http_client
+    r = http_client.get(url, params={...}, timeout=10)
+
+One ``requests.Session`` is shared process-wide, so connections (and TLS
+sessions) to the same host are kept alive and reused instead of paying a new
+handshake per call. On top of that the client applies:
+
+- the proxy from ``config.PROXY`` (``HTTP(S)_PROXY`` env vars still work),
+- a per-host concurrency limit, so parallel tools don't open dozens of
+  sockets to one site,
+- a retry/backoff policy: connection errors are retried for every method,
+  read timeouts and 429/5xx responses only for idempotent methods.
+"""
+
+import logging
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = "Mozilla/5.0"
+_RETRY_STATUS = frozenset({429, 502, 503, 504})
+_IDEMPOTENT = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+_MAX_RETRY_AFTER = 10.0
+
+
+def _config_proxy() -> str:
+    try:
+        from config import config
+        return str(getattr(config, "PROXY", "") or "")
+    except Exception:
+        return ""
+
+
+class HttpClient:
+    def __init__(
+        self,
+        *,
+        pool_maxsize: int = 16,
+        per_host_limit: int = 6,
+        retries: int = 2,
+        backoff: float = 0.5,
+        timeout: float = 15,
+        proxy: str | None = None,
+    ):
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._proxy = proxy
+        self._lock = threading.Lock()
+        self._host_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = DEFAULT_USER_AGENT
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=pool_maxsize, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def proxies(self) -> dict | None:
+        proxy = self._proxy if self._proxy is not None else _config_proxy()
+        return {"http": proxy, "https": proxy} if proxy else None
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = (urllib.parse.urlsplit(url).hostname or "").lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return slot
+
+    def _delay(self, attempt: int, resp: requests.Response | None = None) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), _MAX_RETRY_AFTER)
+        return self.backoff * (2 ** attempt)
+
+    def request(self, method: str, url: str, *, retries: int | None = None, **kwargs) -> requests.Response:
+        """Send a request through the shared session; raises the last error when retries run out."""
+        method = method.upper()
+        retries = self.retries if retries is None else retries
+        kwargs.setdefault("timeout", self.timeout)
+        if "proxies" not in kwargs:
+            proxies = self.proxies()
+            if proxies:
+                kwargs["proxies"] = proxies
+        idempotent = method in _IDEMPOTENT
+        slot = self._slot(url)
+        attempt = 0
+        while True:
+            resp = None
+            try:
+                with slot:
+                    resp = self._session.request(method, url, **kwargs)
+                if resp.status_code not in _RETRY_STATUS or not idempotent or attempt >= retries:
+                    return resp
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # A read timeout on POST may mean the server already acted on it
+                if (not idempotent and isinstance(e, requests.ReadTimeout)) or attempt >= retries:
+                    raise
+                log.debug("HTTP %s %s failed (%s), retrying", method, url, e)
+            delay = self._delay(attempt, resp)
+            if resp is not None:
+                resp.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self._session.close()
+
+
+_client: HttpClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return get_client().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_client().request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return get_client().request("POST", url, **kwargs)
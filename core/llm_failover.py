@@ -0,0 +1,447 @@
+"""Endpoint failover for UniversalLLM.
+
+With a secondary endpoint configured (``LLM2_*``), ``UniversalLLM.client`` /
+``aclient`` are replaced by the failover clients below. They expose the same
+``chat.completions.create(**kwargs)`` call Brain already uses and add:
+
+- per-endpoint health (consecutive failures, EWMA time-to-first-token) with a
+  circuit breaker: after ``threshold`` consecutive failures an endpoint is
+  skipped for ``cooldown`` seconds, then gets a single half-open trial. The
+  health is shared process-wide per (base_url, model), see shared_health();
+- failover on connection errors, timeouts, 429 and 5xx responses. Other
+  errors (400 for unsupported images, bad parameters...) are raised as-is so
+  the caller's own fallbacks keep working;
+- a time-to-first-token deadline for streams: an endpoint that has not sent
+  its first chunk within ``ttft_timeout`` seconds counts as failed;
+- a per-attempt deadline for non-streaming calls: every endpoint but the last
+  gets ``call_timeout`` seconds (and no SDK retries) before the next is tried;
+- optional hedging for streams: if the current endpoint has not produced a
+  chunk after ``hedge_delay`` seconds, the next one is started as well and the
+  first stream to yield a chunk wins; the loser is closed.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+
+log = logging.getLogger(__name__)
+
+_RETRY_STATUS = frozenset({408, 409, 429})
+
+# Worker threads that wait for the first chunk of sync streams (hedging needs
+# two in flight; abandoned attempts may linger until their own timeout)
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="starbot-llm")
+
+
+class LLMUnavailableError(RuntimeError):
+    """Every endpoint failed or missed its first-token deadline."""
+
+
+def is_retryable(e: BaseException) -> bool:
+    """True for failures another endpoint might not have (network, timeout, 429, 5xx)."""
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    try:
+        import openai
+    except Exception:
+        return False
+    if isinstance(e, openai.APIConnectionError):    # includes APITimeoutError
+        return True
+    status = getattr(e, "status_code", None)
+    return isinstance(status, int) and (status >= 500 or status in _RETRY_STATUS)
+
+
+class EndpointHealth:
+    """Consecutive-failure circuit breaker plus latency stats for one endpoint."""
+
+    def __init__(self, *, threshold: int = 3, cooldown: float = 60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.successes = 0
+        self.total_failures = 0
+        self.open_until = 0.0
+        self.half_open = False
+        self.ttft_ewma: float | None = None
+        self.last_error = ""
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.open_until and time.monotonic() < self.open_until:
+                return "open"
+            return "half_open" if self.open_until else "closed"
+
+    def allow(self) -> bool:
+        """Whether a request may go to this endpoint now (claims the half-open trial)."""
+        with self._lock:
+            if not self.open_until:
+                return True
+            if time.monotonic() < self.open_until or self.half_open:
+                return False
+            self.half_open = True
+            return True
+
+    def record_success(self, ttft: float | None = None) -> None:
+        with self._lock:
+            self.failures = 0
+            self.successes += 1
+            self.open_until = 0.0
+            self.half_open = False
+            if ttft is not None:
+                self.ttft_ewma = ttft if self.ttft_ewma is None else 0.8 * self.ttft_ewma + 0.2 * ttft
+
+    def record_failure(self, error: BaseException | str) -> None:
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            self.last_error = str(error)[:200]
+            if self.half_open or self.failures >= self.threshold:
+                self.open_until = time.monotonic() + self.cooldown
+            self.half_open = False
+
+    def snapshot(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "failures": self.failures,
+                "successes": self.successes,
+                "total_failures": self.total_failures,
+                "ttft_ms": round(self.ttft_ewma * 1000) if self.ttft_ewma is not None else None,
+                "last_error": self.last_error,
+            }
+
+
+_health: dict[tuple[str, str], EndpointHealth] = {}
+_health_lock = threading.Lock()
+
+
+def shared_health(base_url: str, model: str, *, threshold: int = 3, cooldown: float = 60.0) -> EndpointHealth:
+    """Process-wide EndpointHealth for (base_url, model).
+
+    Every UniversalLLM (Discord, Web UI, executor summaries, skills) builds its
+    own clients; sharing the breaker means an endpoint that is down is skipped
+    by all of them, not rediscovered by each one.
+    """
+    key = (base_url.rstrip("/"), model)
+    with _health_lock:
+        health = _health.get(key)
+        if health is None:
+            health = _health[key] = EndpointHealth(threshold=threshold, cooldown=cooldown)
+        return health
+
+
+class Endpoint:
+    """One OpenAI-compatible endpoint. ``model`` replaces the request's model;
+    empty keeps whatever the caller asked for."""
+
+    def __init__(self, name: str, model: str, client, aclient_factory=None, *,
+                 threshold: int = 3, cooldown: float = 60.0, health: EndpointHealth | None = None):
+        self.name = name
+        self.model = model
+        self.client = client
+        self._aclient_factory = aclient_factory
+        self._aclient = None
+        self.health = health or EndpointHealth(threshold=threshold, cooldown=cooldown)
+
+    @property
+    def aclient(self):
+        if self._aclient is None:
+            self._aclient = self._aclient_factory()
+        return self._aclient
+
+    def request_kwargs(self, kwargs: dict) -> dict:
+        return {**kwargs, "model": self.model} if self.model else dict(kwargs)
+
+
+def _candidates(endpoints: list[Endpoint]) -> list[Endpoint]:
+    """Endpoints whose breaker admits a request, in priority order (all of them if none does)."""
+    allowed = [ep for ep in endpoints if ep.health.allow()]
+    return allowed or list(endpoints)
+
+
+def _unavailable(errors: list[tuple[str, BaseException]]) -> LLMUnavailableError:
+    detail = "; ".join(f"{name}: {e}" for name, e in errors) or "no endpoint available"
+    err = LLMUnavailableError(f"所有 LLM 端点均不可用 ({detail})")
+    if errors:
+        err.__cause__ = errors[-1][1]
+    return err
+
+
+class _PeekedStream:
+    """Sync stream whose first chunk was already read while racing endpoints."""
+
+    def __init__(self, stream, it, first, endpoint: Endpoint):
+        self._stream = stream
+        self._it = it
+        self._first = first
+        self.endpoint = endpoint
+
+    def __iter__(self):
+        if self._first is not None:
+            first, self._first = self._first, None
+            yield first
+        yield from self._it
+
+    def close(self):
+        self._stream.close()
+
+
+class _APeekedStream:
+    """Async counterpart of _PeekedStream."""
+
+    def __init__(self, stream, it, first, endpoint: Endpoint):
+        self._stream = stream
+        self._it = it
+        self._first = first
+        self.endpoint = endpoint
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._first is not None:
+            first, self._first = self._first, None
+            return first
+        return await self._it.__anext__()
+
+    async def close(self):
+        await self._stream.close()
+
+
+def _open_first(ep: Endpoint, kwargs: dict):
+    stream = ep.client.chat.completions.create(**ep.request_kwargs(kwargs))
+    it = iter(stream)
+    try:
+        first = next(it, None)
+    except BaseException:
+        stream.close()
+        raise
+    return stream, it, first
+
+
+def _attempt_client(client, timeout: float):
+    """``client`` bounded to ``timeout`` seconds without SDK retries (failover is the retry)."""
+    if timeout <= 0:
+        return client
+    return client.with_options(timeout=timeout, max_retries=0)
+
+
+def _close_when_done(fut):
+    def _close(f):
+        if not f.cancelled() and f.exception() is None:
+            try:
+                f.result()[0].close()
+            except Exception:
+                pass
+    fut.add_done_callback(_close)
+
+
+class FailoverClient:
+    """Drop-in for ``OpenAI`` exposing ``chat.completions.create`` with failover.
+
+    Other attributes (``with_options``, ``models`` ...) go to the primary client.
+    """
+
+    def __init__(self, endpoints: list[Endpoint], *, ttft_timeout: float = 20.0, hedge_delay: float = 0.0,
+                 call_timeout: float = 60.0):
+        self.endpoints = endpoints
+        self.ttft_timeout = ttft_timeout
+        self.hedge_delay = hedge_delay
+        self.call_timeout = call_timeout
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def __getattr__(self, name):
+        return getattr(self.endpoints[0].client, name)
+
+    def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return self._create_stream(kwargs)
+        errors = []
+        candidates = _candidates(self.endpoints)
+        for ep in candidates:
+            # The last endpoint keeps the full client timeout: nothing to fail over to
+            client = ep.client if ep is candidates[-1] else _attempt_client(ep.client, self.call_timeout)
+            try:
+                resp = client.chat.completions.create(**ep.request_kwargs(kwargs))
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                log.warning("LLM endpoint %s failed, trying next: %s", ep.name, e)
+                ep.health.record_failure(e)
+                errors.append((ep.name, e))
+                continue
+            ep.health.record_success()
+            return resp
+        raise _unavailable(errors)
+
+    def _create_stream(self, kwargs: dict):
+        queue = _candidates(self.endpoints)
+        pending: dict = {}      # future -> (endpoint, started)
+        errors = []
+        last_launch = 0.0
+
+        def launch():
+            nonlocal last_launch
+            ep = queue.pop(0)
+            last_launch = time.monotonic()
+            pending[_pool.submit(_open_first, ep, kwargs)] = (ep, last_launch)
+
+        launch()
+        while pending:
+            now = time.monotonic()
+            wake = min(started + self.ttft_timeout for _, started in pending.values())
+            if self.hedge_delay > 0 and queue:
+                wake = min(wake, last_launch + self.hedge_delay)
+            done, _ = wait(list(pending), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for fut in done:
+                ep, started = pending.pop(fut)
+                try:
+                    stream, it, first = fut.result()
+                except Exception as e:
+                    if not is_retryable(e):
+                        for other in pending:
+                            _close_when_done(other)
+                        raise
+                    log.warning("LLM endpoint %s failed, trying next: %s", ep.name, e)
+                    ep.health.record_failure(e)
+                    errors.append((ep.name, e))
+                    if queue and not pending:
+                        launch()
+                    continue
+                ep.health.record_success(time.monotonic() - started)
+                for other in pending:
+                    _close_when_done(other)
+                return _PeekedStream(stream, it, first, ep)
+            now = time.monotonic()
+            for fut, (ep, started) in list(pending.items()):
+                if now - started >= self.ttft_timeout:
+                    del pending[fut]
+                    _close_when_done(fut)
+                    e = TimeoutError(f"no first token within {self.ttft_timeout:g}s")
+                    log.warning("LLM endpoint %s: %s", ep.name, e)
+                    ep.health.record_failure(e)
+                    errors.append((ep.name, e))
+            if queue and (not pending or (self.hedge_delay > 0 and now - last_launch >= self.hedge_delay)):
+                if pending:
+                    log.info("LLM hedge: starting %s alongside the slow endpoint", queue[0].name)
+                launch()
+        raise _unavailable(errors)
+
+
+class AsyncFailoverClient:
+    """Async drop-in for ``AsyncOpenAI``; losing or late attempts are cancelled."""
+
+    def __init__(self, endpoints: list[Endpoint], *, ttft_timeout: float = 20.0, hedge_delay: float = 0.0,
+                 call_timeout: float = 60.0):
+        self.endpoints = endpoints
+        self.ttft_timeout = ttft_timeout
+        self.hedge_delay = hedge_delay
+        self.call_timeout = call_timeout
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def __getattr__(self, name):
+        return getattr(self.endpoints[0].aclient, name)
+
+    async def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return await self._create_stream(kwargs)
+        errors = []
+        candidates = _candidates(self.endpoints)
+        for ep in candidates:
+            client = ep.aclient if ep is candidates[-1] else _attempt_client(ep.aclient, self.call_timeout)
+            try:
+                resp = await client.chat.completions.create(**ep.request_kwargs(kwargs))
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                log.warning("LLM endpoint %s failed, trying next: %s", ep.name, e)
+                ep.health.record_failure(e)
+                errors.append((ep.name, e))
+                continue
+            ep.health.record_success()
+            return resp
+        raise _unavailable(errors)
+
+    @staticmethod
+    async def _open_first(ep: Endpoint, kwargs: dict):
+        stream = await ep.aclient.chat.completions.create(**ep.request_kwargs(kwargs))
+        it = stream.__aiter__()
+        try:
+            try:
+                first = await it.__anext__()
+            except StopAsyncIteration:
+                first = None
+        except BaseException:
+            await stream.close()
+            raise
+        return stream, it, first
+
+    async def _create_stream(self, kwargs: dict):
+        queue = _candidates(self.endpoints)
+        pending: dict = {}      # task -> (endpoint, started)
+        errors = []
+        last_launch = 0.0
+        loop = asyncio.get_running_loop()
+
+        def launch():
+            nonlocal last_launch
+            ep = queue.pop(0)
+            last_launch = loop.time()
+            pending[asyncio.ensure_future(self._open_first(ep, kwargs))] = (ep, last_launch)
+
+        def cancel_pending():
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    # Finished in the same wait() as the winner: close its stream
+                    asyncio.ensure_future(task.result()[0].close())
+            pending.clear()
+
+        launch()
+        try:
+            while pending:
+                wake = min(started + self.ttft_timeout for _, started in pending.values())
+                if self.hedge_delay > 0 and queue:
+                    wake = min(wake, last_launch + self.hedge_delay)
+                done, _ = await asyncio.wait(
+                    list(pending), timeout=max(0.0, wake - loop.time()), return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    ep, started = pending.pop(task)
+                    try:
+                        stream, it, first = task.result()
+                    except Exception as e:
+                        if not is_retryable(e):
+                            raise
+                        log.warning("LLM endpoint %s failed, trying next: %s", ep.name, e)
+                        ep.health.record_failure(e)
+                        errors.append((ep.name, e))
+                        if queue and not pending:
+                            launch()
+                        continue
+                    ep.health.record_success(loop.time() - started)
+                    return _APeekedStream(stream, it, first, ep)
+                now = loop.time()
+                for task, (ep, started) in list(pending.items()):
+                    if now - started >= self.ttft_timeout:
+                        del pending[task]
+                        task.cancel()
+                        e = TimeoutError(f"no first token within {self.ttft_timeout:g}s")
+                        log.warning("LLM endpoint %s: %s", ep.name, e)
+                        ep.health.record_failure(e)
+                        errors.append((ep.name, e))
+                if queue and (not pending or (self.hedge_delay > 0 and now - last_launch >= self.hedge_delay)):
+                    if pending:
+                        log.info("LLM hedge: starting %s alongside the slow endpoint", queue[0].name)
+                    launch()
+        finally:
+            # Winner returned, hard error or caller cancelled: drop the other attempts
+            cancel_pending()
+        raise _unavailable(errors)
@@ -6,15 +6,17 @@ import mimetypes
 import threading
 import time
 import uuid
+from collections import deque
 from pathlib import Path
-from queue import Empty, Queue
 from typing import Any, Callable
 
+from core.compactor import is_summary_message
 
 Event = dict[str, Any]
 
 _BASE_DIR = Path(__file__).resolve().parent.parent
 _SESSIONS_FILE = _BASE_DIR / "logs" / "local_sessions.json"
+_EVENT_BUFFER = 2000
 
 
 def _default_brain_factory():
@@ -43,7 +45,12 @@ class SessionController:
         self._brain = None
         self._worker: threading.Thread | None = None
         self._cancel = threading.Event()
-        self._events: Queue[Event] = Queue()
+        # Event log: ids increase monotonically; the last _EVENT_BUFFER events are
+        # kept so push clients (SSE) can resume from the id they last saw.
+        self._events: deque[Event] = deque(maxlen=_EVENT_BUFFER)
+        self._event_cond = threading.Condition()
+        self._last_event_id = 0
+        self._drain_cursor = 0
         self._lock = threading.Lock()
         # Confirmation gate for dangerous tools
         self._confirm_event = threading.Event()
@@ -69,35 +76,66 @@ class SessionController:
     def usage_snapshot(self) -> dict[str, Any]:
         brain = self._brain
         if brain is None:
-            return {"input": 0, "output": 0, "calls": 0}
+            return {"input": 0, "output": 0, "calls": 0, "cached": 0}
         usage = getattr(brain, "usage", None)
         if isinstance(usage, dict):
             return {
                 "input": int(usage.get("input", 0) or 0),
                 "output": int(usage.get("output", 0) or 0),
                 "calls": int(usage.get("calls", 0) or 0),
+                "cached": int(usage.get("cached", 0) or 0),
             }
-        return {"input": 0, "output": 0, "calls": 0}
+        return {"input": 0, "output": 0, "calls": 0, "cached": 0}
 
     # ------------------------------------------------------------------ events
 
     def _emit(self, type_: str, **payload):
-        self._events.put(
-            {
-                "type": type_,
-                "time": time.time(),
-                **payload,
-            }
-        )
+        with self._event_cond:
+            self._last_event_id += 1
+            self._events.append(
+                {
+                    "id": self._last_event_id,
+                    "type": type_,
+                    "time": time.time(),
+                    **payload,
+                }
+            )
+            self._event_cond.notify_all()
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_event_id
+
+    def _events_after(self, after_id: int, limit: int) -> list[Event]:
+        # Caller holds _event_cond; ids in the deque are contiguous
+        if not self._events or after_id >= self._last_event_id:
+            return []
+        start = max(0, after_id - self._events[0]["id"] + 1)
+        return [self._events[i] for i in range(start, min(len(self._events), start + max(1, limit)))]
 
     def drain_events(self, limit: int = 200) -> list[Event]:
-        out: list[Event] = []
-        for _ in range(max(1, limit)):
-            try:
-                out.append(self._events.get_nowait())
-            except Empty:
-                break
-        return out
+        """Events not yet returned by a previous drain_events() call (polling clients)."""
+        with self._event_cond:
+            out = self._events_after(self._drain_cursor, limit)
+            if out:
+                self._drain_cursor = out[-1]["id"]
+            return out
+
+    def events_since(self, after_id: int, *, limit: int = 200, timeout: float | None = None) -> tuple[list[Event], bool]:
+        """Events with id > ``after_id``, waiting up to ``timeout`` seconds for one.
+
+        Does not affect drain_events(). Returns ``(events, missed)`` where
+        ``missed`` is True if events after ``after_id`` already fell out of the
+        buffer, or ``after_id`` is ahead of this process's ids (it came from
+        before a restart), so the client should reload its transcript.
+        """
+        with self._event_cond:
+            if after_id > self._last_event_id:
+                return [], True
+            if timeout and after_id >= self._last_event_id:
+                self._event_cond.wait_for(lambda: self._last_event_id > after_id, timeout=timeout)
+            missed = bool(self._events) and after_id < self._events[0]["id"] - 1
+            return self._events_after(after_id, limit), missed
 
     # ------------------------------------------------------------------ persistence
 
@@ -177,9 +215,9 @@ class SessionController:
                         if not isinstance(m, dict):
                             continue
                         role = m.get("role")
-                        if role == "system":
+                        if role == "system" and not is_summary_message(m):
                             continue
-                        if role not in {"user", "assistant", "tool"}:
+                        if role not in {"system", "user", "assistant", "tool"}:
                             continue
                         restored.append({
                             "role": role,
@@ -212,7 +250,7 @@ class SessionController:
     def _session_title_from_brain(self, brain: Any, fallback: str = "新会话") -> str:
         try:
             for msg in getattr(brain, "messages", [])[1:]:
-                if isinstance(msg, dict) and msg.get("role") == "user":
+                if isinstance(msg, dict) and msg.get("role") == "user" and not is_summary_message(msg):
                     text = self._message_to_text(msg).strip()
                     if text:
                         return text[:28]
@@ -315,7 +353,7 @@ class SessionController:
             if not isinstance(msg, dict):
                 continue
             role = msg.get("role")
-            if role not in {"user", "assistant"}:
+            if role not in {"user", "assistant"} or is_summary_message(msg):
                 continue
             text = self._message_to_text(msg).strip()
             if not text:
@@ -27,6 +27,8 @@ from urllib.parse import urlparse
 
 import requests
 
+from core.tracing import span
+
 log = logging.getLogger(__name__)
 
 _BASE_DIR = Path(__file__).resolve().parent.parent
@@ -337,6 +339,7 @@ class SkillManager:
         self._skill_source_kinds: dict[str, str] = {} # source classifier
         self._skill_keywords: dict[str, set[str]] = {}# recommendation keywords
         self._skill_reco_text: dict[str, str] = {}    # searchable text blob
+        self._generation = 0                          # bumped whenever the tool set changes
 
         self._load_all()
 
@@ -552,6 +555,7 @@ class SkillManager:
                 if old_owner and old_owner != name:
                     log.warning("Tool name collision: %s (%s -> %s)", tool_name, old_owner, name)
                 self._tool_index[tool_name] = name
+            self._generation += 1
 
         return name
 
@@ -641,6 +645,7 @@ class SkillManager:
             self._skill_source_kinds.clear()
             self._skill_keywords.clear()
             self._skill_reco_text.clear()
+            self._generation += 1
         self._load_all()
 
     # --------------------------------------------------------------- install
@@ -928,6 +933,7 @@ class SkillManager:
                 for tn in tool_names:
                     if tn and self._tool_index.get(tn) == target_key:
                         self._tool_index.pop(tn, None)
+            self._generation += 1
 
         if target_path:
             try:
@@ -1146,11 +1152,37 @@ class SkillManager:
         mod = self._skills.get(skill_name)
         if mod is None:
             return None
-        try:
-            return mod.execute(tool_name, args)
-        except Exception as e:
-            log.error("Skill %s raised during execute(%s): %s", skill_name, tool_name, e)
-            return {"ok": False, "result": f"Skill 执行出错: {e}"}
+        with span(f"skill.{skill_name}", cat="skill", tool=tool_name):
+            try:
+                return mod.execute(tool_name, args)
+            except Exception as e:
+                log.error("Skill %s raised during execute(%s): %s", skill_name, tool_name, e)
+                return {"ok": False, "result": f"Skill 执行出错: {e}"}
+
+    @property
+    def generation(self) -> int:
+        """Counter that changes whenever skills (and so their tools) are added or removed."""
+        return self._generation
+
+    def skill_for_tool(self, tool_name: str) -> str | None:
+        with self._lock:
+            return self._tool_index.get(tool_name)
+
+    def tool_concurrency(self, tool_name: str) -> str | None:
+        """Concurrency class declared by the owning skill's META["concurrency"].
+
+        The value is either one class for all of the skill's tools or a
+        ``{tool_name: class}`` mapping. Returns None when undeclared.
+        """
+        with self._lock:
+            skill_name = self._tool_index.get(tool_name)
+            if skill_name is None:
+                return None
+            meta = self._skill_meta.get(skill_name) or {}
+        decl = meta.get("concurrency")
+        if isinstance(decl, dict):
+            decl = decl.get(tool_name)
+        return decl if isinstance(decl, str) else None
 
     # ---------------------------------------------------------------- query
 
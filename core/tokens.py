@@ -0,0 +1,182 @@
+"""Token counting for context budgeting.
+
+Usage in Brain:
+    from core.tokens import TokenLedger, get_token_counter
+    ledger = TokenLedger()
+    total = ledger.total(messages, get_token_counter(model))
+
+A real tokenizer (``tiktoken``) is used when it is installed and knows the
+model; otherwise a CJK-aware estimator calibrated per model family is used.
+Per-message counts are cached by ``TokenLedger`` so each step only counts the
+messages appended since the last call.
+"""
+
+import json
+import logging
+import threading
+
+try:
+    import tiktoken  # type: ignore
+except Exception:  # pragma: no cover - optional runtime dependency
+    tiktoken = None
+
+log = logging.getLogger(__name__)
+
+IMAGE_TOKENS = 1000
+
+# Tokens per CJK character, by model family (first matching prefix wins).
+# Chinese-first vocabularies pack ~1.6 chars per token; cl100k-era and
+# Claude tokenizers spend more than one token per character.
+_CJK_RATES: tuple[tuple[str, float], ...] = (
+    ("deepseek", 0.6),
+    ("qwen", 0.6),
+    ("glm", 0.6),
+    ("moonshot", 0.6),
+    ("kimi", 0.6),
+    ("yi-", 0.6),
+    ("gpt-4o", 0.8),
+    ("gpt-4.1", 0.8),
+    ("gpt-5", 0.8),
+    ("o1", 0.8),
+    ("o3", 0.8),
+    ("o4", 0.8),
+    ("gpt-4", 1.2),
+    ("gpt-3.5", 1.2),
+    ("claude", 1.2),
+)
+_DEFAULT_CJK_RATE = 1.0
+
+
+def _is_cjk(ch: str) -> bool:
+    return (
+        "一" <= ch <= "鿿"
+        or "㐀" <= ch <= "䶿"
+        or "぀" <= ch <= "ヿ"
+        or "가" <= ch <= "힯"
+        or "＀" <= ch <= "￯"
+        or "　" <= ch <= "〿"
+    )
+
+
+class EstimateCounter:
+    """Character-class estimator: ~4 ASCII chars per token, CJK by model rate."""
+
+    def __init__(self, cjk_rate: float = _DEFAULT_CJK_RATE):
+        self.cjk_rate = cjk_rate
+        self.name = f"estimate(cjk={cjk_rate})"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if text.isascii():
+            return len(text) // 4
+        ascii_n = cjk_n = other_n = 0
+        for ch in text:
+            if ch < "\x80":
+                ascii_n += 1
+            elif _is_cjk(ch):
+                cjk_n += 1
+            else:
+                other_n += 1
+        return int(ascii_n / 4 + cjk_n * self.cjk_rate + other_n / 2)
+
+
+class TiktokenCounter:
+    """Exact counts via tiktoken for models it knows."""
+
+    def __init__(self, encoding):
+        self._enc = encoding
+        self.name = f"tiktoken({encoding.name})"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self._enc.encode(text, disallowed_special=()))
+
+
+_counters: dict[str, object] = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(model: str):
+    """Return a cached counter for ``model`` (tiktoken if available, else estimator)."""
+    key = str(model or "").strip().lower()
+    with _counters_lock:
+        counter = _counters.get(key)
+        if counter is not None:
+            return counter
+    counter = None
+    if tiktoken is not None and key:
+        try:
+            counter = TiktokenCounter(tiktoken.encoding_for_model(key))
+        except Exception:
+            counter = None
+    if counter is None:
+        rate = next((r for prefix, r in _CJK_RATES if key.startswith(prefix)), _DEFAULT_CJK_RATE)
+        counter = EstimateCounter(rate)
+    with _counters_lock:
+        _counters.setdefault(key, counter)
+        return _counters[key]
+
+
+def count_message(msg: dict, counter) -> int:
+    """Tokens for one chat message: text content, images, and tool-call arguments."""
+    total = 0
+    c = msg.get("content", "")
+    if isinstance(c, str):
+        total += counter.count(c)
+    elif isinstance(c, list):
+        for part in c:
+            if isinstance(part, dict):
+                if part.get("type") == "text":
+                    total += counter.count(part.get("text", ""))
+                elif part.get("type") == "image_url":
+                    total += IMAGE_TOKENS
+    elif isinstance(c, dict):
+        total += counter.count(json.dumps(c))
+    for tc in msg.get("tool_calls") or []:
+        fn = tc.get("function") if isinstance(tc, dict) else None
+        if isinstance(fn, dict):
+            total += counter.count(str(fn.get("name") or ""))
+            total += counter.count(str(fn.get("arguments") or ""))
+    return total
+
+
+class TokenLedger:
+    """Incremental per-message token cache for a growing message list.
+
+    Appends are counted on the next ``total()`` call; replacing the list,
+    popping from it or swapping the counter triggers a recount. Callers that
+    mutate message contents in place must call ``invalidate()``.
+    """
+
+    def __init__(self):
+        self._messages: list | None = None
+        self._counter = None
+        self._counts: list[int] = []
+        self._last: dict | None = None
+        self._sum = 0
+
+    def invalidate(self):
+        self._messages = None
+
+    def total(self, messages: list[dict], counter) -> int:
+        n = len(self._counts)
+        if (
+            messages is not self._messages
+            or counter is not self._counter
+            or len(messages) < n
+            or (n and messages[n - 1] is not self._last)
+        ):
+            self._messages = messages
+            self._counter = counter
+            self._counts = []
+            self._sum = 0
+            n = 0
+        for msg in messages[n:]:
+            k = count_message(msg, counter) if isinstance(msg, dict) else 0
+            self._counts.append(k)
+            self._sum += k
+        if messages:
+            self._last = messages[-1]
+        return self._sum
@@ -0,0 +1,266 @@
+"""Lightweight tracing: timed spans kept in a ring buffer.
+
+Usage:
+    from core.tracing import span, traced
+
+    with span("tool.screenshot", cat="tool", args_size=42) as sp:
+        result = ...
+        sp.set(result_size=len(result))
+
+    @traced("memory.search", cat="memory", count="rows")
+    def search(...): ...
+
+Every span records its wall-clock start, duration, thread and a few
+attributes (tool name, payload sizes, row counts, time to first token).
+The last ``TRACE_BUFFER`` spans stay in memory for ``/trace`` and
+``/status``; with ``TRACE_FILE`` set each span is also appended to that
+file as one Chrome trace event per line. ``chrome_trace()`` wraps events
+(from the buffer or such a file) into a document that chrome://tracing and
+Perfetto open.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+_LOG_DIR = Path(__file__).resolve().parent.parent / "logs"
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, "") or default)
+    except ValueError:
+        return default
+
+
+TRACE_BUFFER = _int_env("TRACE_BUFFER", 2000)   # spans kept in memory; 0 turns tracing off
+TRACE_FILE = os.environ.get("TRACE_FILE", "").strip()
+
+
+@dataclass
+class Span:
+    name: str
+    cat: str = ""
+    start: float = 0.0          # time.time() at entry
+    duration: float = 0.0       # seconds
+    tid: int = 0
+    attrs: dict = field(default_factory=dict)
+    error: str = ""
+    _t0: float = field(default=0.0, repr=False)
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def mark(self, label: str) -> None:
+        """Record the time since the span started as ``<label>_ms`` (e.g. ``ttft_ms``)."""
+        self.attrs[f"{label}_ms"] = round((time.perf_counter() - self._t0) * 1000, 1)
+
+    @property
+    def ms(self) -> float:
+        return self.duration * 1000
+
+    def to_event(self, pid: int) -> dict:
+        """Chrome trace "complete" event (timestamps in microseconds)."""
+        args = dict(self.attrs)
+        if self.error:
+            args["error"] = self.error
+        return {
+            "name": self.name,
+            "cat": self.cat or "starbot",
+            "ph": "X",
+            "ts": int(self.start * 1_000_000),
+            "dur": max(1, int(self.duration * 1_000_000)),
+            "pid": pid,
+            "tid": self.tid,
+            "args": args,
+        }
+
+
+def _percentile(sorted_ms: list[float], q: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    i = min(len(sorted_ms) - 1, max(0, round(q * (len(sorted_ms) - 1))))
+    return sorted_ms[i]
+
+
+class Tracer:
+    """Collects spans into a bounded buffer and, optionally, a trace file."""
+
+    def __init__(self, size: int = TRACE_BUFFER, path: str = TRACE_FILE):
+        self._spans: deque[Span] = deque(maxlen=max(0, size))
+        self.path = path
+        self.enabled = size > 0 or bool(path)
+        self._file = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, cat: str = "", **attrs):
+        sp = Span(name, cat, time.time(), tid=threading.get_native_id(), attrs=attrs,
+                  _t0=time.perf_counter())
+        try:
+            yield sp
+        except BaseException as e:
+            sp.error = type(e).__name__
+            raise
+        finally:
+            sp.duration = time.perf_counter() - sp._t0
+            if self.enabled:
+                self.record(sp)
+
+    def record(self, sp: Span) -> None:
+        with self._lock:
+            self._spans.append(sp)
+            if self.path:
+                self._write(sp)
+
+    def _write(self, sp: Span) -> None:
+        try:
+            if self._file is None:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(sp.to_event(self._pid), ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+        except Exception as e:
+            log.warning("Trace file %s disabled: %s", self.path, e)
+            self.path = ""
+
+    def recent(self, limit: int = 20, prefix: str = "") -> list[Span]:
+        """The newest ``limit`` spans (oldest first), optionally only names starting with ``prefix``."""
+        with self._lock:
+            spans = [s for s in self._spans if s.name.startswith(prefix)] if prefix else list(self._spans)
+        return spans[-limit:] if limit > 0 else spans
+
+    def summary(self, prefix: str = "") -> list[dict]:
+        """Per-name count, p50/p95/max and total milliseconds over the buffer, by total time."""
+        groups: dict[str, list[Span]] = {}
+        for sp in self.recent(0, prefix):
+            groups.setdefault(sp.name, []).append(sp)
+        rows = []
+        for name, spans in groups.items():
+            ms = sorted(s.ms for s in spans)
+            rows.append({
+                "name": name,
+                "count": len(ms),
+                "p50_ms": round(_percentile(ms, 0.5), 1),
+                "p95_ms": round(_percentile(ms, 0.95), 1),
+                "max_ms": round(ms[-1], 1),
+                "total_ms": round(sum(ms), 1),
+                "errors": sum(1 for s in spans if s.error),
+            })
+        rows.sort(key=lambda r: r["total_ms"], reverse=True)
+        return rows
+
+    def snapshot(self, top: int = 5) -> dict:
+        """Compact view for status payloads."""
+        with self._lock:
+            count = len(self._spans)
+        return {
+            "enabled": self.enabled,
+            "spans": count,
+            "file": self.path,
+            "top": self.summary()[:top],
+        }
+
+    def chrome_trace(self) -> dict:
+        """The buffered spans as a Chrome trace document."""
+        return chrome_trace(sp.to_event(self._pid) for sp in self.recent(0))
+
+    def export(self, path: str = "") -> tuple[str, int]:
+        """Write the buffer as Chrome trace JSON (default ``logs/trace_<time>.json``).
+
+        Returns the path and the number of events written.
+        """
+        path = path or str(_LOG_DIR / time.strftime("trace_%Y%m%d_%H%M%S.json"))
+        doc = self.chrome_trace()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(doc, ensure_ascii=False, default=str), encoding="utf-8")
+        return path, len(doc["traceEvents"])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except Exception:
+                    pass
+                self._file = None
+
+
+def chrome_trace(events) -> dict:
+    """Wrap trace events (dicts, or lines of a TRACE_FILE) into a Chrome trace document."""
+    out = []
+    for ev in events:
+        if isinstance(ev, str):
+            ev = ev.strip()
+            if not ev:
+                continue
+            ev = json.loads(ev)
+        out.append(ev)
+    return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+
+def format_summary(rows: list[dict], limit: int = 10) -> str:
+    """One line per span name, for chat replies."""
+    lines = []
+    for r in rows[:limit]:
+        err = f"，失败 {r['errors']}" if r["errors"] else ""
+        lines.append(f"{r['name']}: {r['count']} 次，p50 {r['p50_ms']:.0f} ms，p95 {r['p95_ms']:.0f} ms，"
+                     f"合计 {r['total_ms'] / 1000:.1f} s{err}")
+    return "\n".join(lines)
+
+
+def format_span(sp: Span) -> str:
+    """``HH:MM:SS name 123 ms key=value ...`` for chat replies."""
+    attrs = " ".join(f"{k}={v}" for k, v in sp.attrs.items() if k != "model")
+    err = f" ✗ {sp.error}" if sp.error else ""
+    return f"{time.strftime('%H:%M:%S', time.localtime(sp.start))} {sp.name} {sp.ms:.0f} ms {attrs}".rstrip() + err
+
+
+_tracer: Tracer | None = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Process-wide Tracer."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
+
+
+def span(name: str, cat: str = "", **attrs):
+    """Context manager timing a block into the process-wide tracer."""
+    return get_tracer().span(name, cat, **attrs)
+
+
+def traced(name: str, cat: str = "", count: str = ""):
+    """Decorator form of span(); with ``count`` the result's len() is recorded under that attribute."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, cat) as sp:
+                out = fn(*args, **kwargs)
+                if count:
+                    try:
+                        sp.set(**{count: len(out)})
+                    except TypeError:
+                        pass
+                return out
+        return wrapper
+    return deco
@@ -2,8 +2,6 @@ import time
 import logging
 import pyautogui
 
-from config import config
-
 log = logging.getLogger(__name__)
 from core.adapter import UniversalLLM
 from core.brain import Brain
@@ -20,32 +18,16 @@ class WorkerLoop:
         self.step_count = 0
 
     def _init_llms(self):
-        self.primary_llm = UniversalLLM(
-            config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL,
-        )
-        self.secondary_llm = None
-        if config.LLM2_API_BASE and config.LLM2_API_KEY:
-            self.secondary_llm = UniversalLLM(
-                config.LLM2_API_KEY, config.LLM2_API_BASE, config.LLM2_MODEL,
-            )
+        # Failover to LLM2_* (circuit breaker, first-token deadline, hedging) lives in the adapter
+        self.primary_llm = UniversalLLM.from_config()
         self.active_llm = self.primary_llm
 
-    def _failover(self) -> bool:
-        if self.secondary_llm and self.active_llm is not self.secondary_llm:
-            log.info("[Failover] -> secondary: %s", self.secondary_llm.model)
-            self.active_llm = self.secondary_llm
-            self.brain.llm = self.secondary_llm
-            return True
-        return False
-
     def run_once(self) -> bool:
         """Run one step. Returns False if task is done or model stopped."""
         try:
             result = self.brain.step()
         except Exception as e:
             log.error("[Error] %s", e)
-            if self._failover():
-                return True
             return False
 
         if not result:
@@ -0,0 +1,57 @@
+"""Word list and stopwords for memory.segment.
+
+A compact list of everyday and technical words is enough for max-match to
+split recall queries sensibly; unknown runs are kept as out-of-vocabulary chunks, so
+names and new terms still reach the search. Add domain words to WORDS
+(whitespace separated) when a query splits badly.
+"""
+
+WORDS = """
+一下 一些 一个 一起 一直 一样 一般 一定 一次 一点 一种 不是 不要 不会 不能 不过 不同 不错 不用 什么 怎么 怎样
+怎么样 为什么 东西 事情 为了 因为 所以 但是 可是 而且 然后 如果 虽然 或者 还是 还有 已经 正在 可以 应该 需要 能够 可能
+这个 那个 这些 那些 这样 那样 这里 那里 哪里 哪个 哪些 自己 我们 你们 他们 她们 它们 大家 别人 有人 有些
+今天 明天 昨天 后天 前天 今年 明年 去年 现在 以前 以后 之前 之后 刚才 最近 最后 最好 最新 开始 结束 时候 时间
+早上 上午 中午 下午 晚上 周末 周一 周二 周三 周四 周五 周六 周日 星期 小时 分钟 月份 日期 每天 每周 每月
+帮忙 帮助 告诉 知道 觉得 认为 希望 喜欢 讨厌 记得 记住 忘记 相关 有关 关于 对于 根据 通过 按照 比如 例如
+学习 复习 记录 笔记 总结 摘要 知识 知识点 经验 教训 问题 答案 方法 办法 步骤 流程 原因 结果 目标 计划 任务
+待办 事项 提醒 日程 安排 会议 项目 需求 功能 特性 版本 更新 升级 发布 上线 部署 回滚 测试 调试 修复 优化
+性能 稳定 安全 隐私 权限 账号 密码 登录 注册 用户 客户 管理员 设置 配置 配置文件 参数 选项 默认 模式 主题
+界面 窗口 按钮 菜单 页面 网页 网站 链接 地址 浏览器 标签页 书签 搜索 搜索引擎 下载 上传 文件 文件夹 目录 路径
+图片 照片 截图 截屏 屏幕 视频 音频 音乐 声音 字幕 语音 文字 文本 文档 表格 表单 邮件 邮箱 消息 通知 聊天 对话
+电脑 手机 平板 键盘 鼠标 快捷键 剪贴板 桌面 系统 操作系统 进程 线程 线程池 协程 异步 同步 并发 并行 队列 锁
+编程 程序 代码 脚本 函数 变量 常量 类型 对象 接口 模块 包 库 框架 插件 扩展 技能 工具 命令 命令行 终端
+异步编程 机器学习 深度学习 神经网络 人工智能 大模型 语言模型 模型 训练 推理 数据 数据库 数据集 数据结构 算法
+索引 缓存 内存 磁盘 硬盘 存储 备份 恢复 压缩 解压 加密 解密 编码 解码 格式 转换 导入 导出 迁移 清理
+服务器 客户端 服务端 前端 后端 接口文档 网络 网络请求 请求 响应 协议 代理 端口 域名 证书 防火墙 带宽 延迟
+吞吐 吞吐量 容器 镜像 集群 节点 虚拟机 云服务 日志 监控 报警 告警 错误 异常 崩溃 卡顿 超时 重试 失败 成功
+内存泄漏 性能优化 正则表达式 爬虫 定时任务 向量 向量检索 检索 召回 排序 分词 全文搜索 全文检索 事务 查询 语句
+视频学习 知识库 记忆 偏好 习惯 风格 语言 中文 英文 翻译 词典 单词 句子 段落 文章 新闻 天气 股票 汇率 价格
+购物 订单 快递 外卖 餐厅 咖啡 早餐 午餐 晚餐 运动 跑步 爬山 游泳 健身 睡觉 休息 旅行 旅游 出差 机票 酒店
+火车 地铁 公交 开车 天气预报 温度 下雨 下雪 生日 节日 假期 春节 家人 朋友 同事 老师 学生 学校 公司 工作
+工资 报告 演示 幻灯片 截止 截止日期 进度 状态 统计 分析 报表 图表 可视化 设计 原型 架构 重构 文档化 注释
+仓库 分支 合并 提交 冲突 拉取 推送 代码审查 单元测试 集成测试 持续集成 环境 环境变量 依赖 安装 卸载 虚拟环境
+游戏 电影 电视剧 动漫 小说 书籍 阅读 写作 绘画 摄影 音乐会 博客 论坛 社区 频道 服务器列表 机器人 助手
+自动 自动化 手动 批量 定时 实时 离线 在线 本地 远程 云端 免费 付费 订阅 会员 效率 质量 体验 反馈 建议 意见
+重要 紧急 简单 复杂 详细 简洁 清楚 准确 正确 错误信息 提示 提示词 上下文 令牌 额度 用量 费用 成本 预算
+"""
+
+# Dropped from keywords: too frequent in queries to narrow a search
+STOPWORDS = frozenset("""
+的 了 是 在 我 你 他 她 它 们 这 那 哪 个 些 和 与 及 或 把 被 给 让 对 从 到 向 也 都 就 还 又 很 太 最 更
+吗 呢 吧 啊 呀 哦 嗯 么 一 不 没 要 会 能 想 去 来 做 用 上 下 中 里 后 前 等 之 其 该 每 各 过 着 得 地 帮 找
+看 说 问 查 请 将 于 为 以 而 但 并 且 所 如 若 则 即 既 再 才 只 已 曾 刚 正 非 无 有 可 点 次 年 月 日
+一下 一些 一个 一点 一种 一次 什么 怎么 怎样 怎么样 为什么 为了 因为 所以 但是 可是 而且 然后 如果 虽然 或者
+还是 还有 已经 正在 可以 应该 需要 能够 可能 这个 那个 这些 那些 这样 那样 这里 那里 哪里 哪个 哪些 自己
+我们 你们 他们 她们 它们 大家 别人 有人 有些 帮忙 帮助 告诉 知道 觉得 认为 希望 记得 相关 有关 关于 对于
+根据 通过 按照 比如 例如 现在 以前 以后 之前 之后 刚才 最近 东西 事情 时候 一起 一直 一样 一般 一定
+不是 不要 不会 不能 不过 不用
+""".split())
+
+EN_STOPWORDS = frozenset("""
+the and for with that this what which who whom whose when where why how are was were been being have has had
+does did doing can could should would will shall may might must about above after again against all any both
+each few from further here into its just more most not now off once only other our out over own same some such
+than then there these they those too under until very you your yours she her him his them their ours itself
+also please tell show find give get let make know want need like remember recall search look help thing things
+something anything everything use used using
+""".split())
@@ -0,0 +1,82 @@
+"""Duplicate and near-duplicate detection for MemoryStore.save.
+
+- content_hash: exact key (SHA-1 of the first 200 characters after the
+  source header, see below), backed by a unique index on
+  ``memories(category, content_hash)``.
+- MinHash/LSH: 16 min-hashes over the same features as the hashing embedder
+  (English words, CJK characters and bigrams), grouped into 8 bands of 2.
+  Each band is hashed to one integer in ``memory_minhash``; memories sharing
+  any band are candidates, confirmed by exact Jaccard similarity. A pair at
+  Jaccard 0.7 shares a band >99% of the time, at 0.1 about 8%.
+
+Learning skills prefix every point with a source header such as
+``[视频学习][tag][platform] 《title》 作者:… | 视频URL:… |`` or
+``[topic] [来源:…]``. The header is left out of the features (otherwise two
+different points from one video look alike) and mixed into the band keys
+instead, so only memories with the same header are compared.
+"""
+
+import hashlib
+import os
+import re
+import random
+import struct
+
+from memory.vector_index import feature_hash, text_features
+
+# What save() does with a near-duplicate: "merge" into it, "skip" the new one, or "off"
+NEAR_DUP_POLICY = os.environ.get("MEMORY_NEAR_DUP", "merge").strip().lower() or "merge"
+
+DEDUP_PREFIX = 200          # characters that make up the exact-duplicate key
+NEAR_DUP_JACCARD = 0.7      # feature-set similarity treated as a near-duplicate
+MIN_FEATURES = 8            # shorter texts are only checked for exact duplicates
+BANDS = 8
+ROWS_PER_BAND = 2
+
+# Feature hashes are already uniform, so XOR with a random mask is a cheap
+# stand-in for a random permutation of the hash space.
+_rng = random.Random(0x5EED)
+_MASKS = [_rng.getrandbits(64) for _ in range(BANDS * ROWS_PER_BAND)]
+
+
+# Leading "[...]" tags, optionally followed by a "… | …URL:… |" source line
+_SOURCE_RE = re.compile(r"(?:\[[^\[\]\n]{1,80}\]\s*)+(?:[^|\n]{0,200}\|[^|\n]{0,40}URL:[^|\n]{0,200}\|\s*)?")
+
+
+def source_prefix(text: str) -> str:
+    """The source header a learning skill put in front of ``text`` ("" if none)."""
+    m = _SOURCE_RE.match(text)
+    return m.group() if m else ""
+
+
+def content_hash(content: str) -> str:
+    end = len(source_prefix(content)) + DEDUP_PREFIX
+    return hashlib.sha1(content[:end].encode("utf-8")).hexdigest()
+
+
+def shingles(text: str) -> frozenset[str]:
+    return frozenset(text_features(text[len(source_prefix(text)):]))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def band_keys(feats: frozenset[str], category: str = "", source: str = "") -> list[int] | None:
+    """One signed 64-bit key per LSH band, or None when the text is too short to compare.
+
+    The category and source header are mixed into the keys, so each bucket
+    only holds memories of one category from one source.
+    """
+    if len(feats) < MIN_FEATURES:
+        return None
+    hashes = [feature_hash(f) for f in feats]
+    mins = [min(h ^ m for h in hashes) for m in _MASKS]
+    keys = []
+    for i in range(BANDS):
+        chunk = struct.pack(f"<B{ROWS_PER_BAND}Q", i, *mins[i * ROWS_PER_BAND:(i + 1) * ROWS_PER_BAND])
+        chunk += category.encode("utf-8") + b"\0" + source.strip().encode("utf-8")
+        keys.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True))
+    return keys
@@ -0,0 +1,161 @@
+"""Retention engine for the memory store.
+
+Per-category policies decide when hot memories become cold. Cold rows are
+moved into the compressed ``memories_archive`` table, which sits outside
+FTS, vector recall and dedup, and archived rows are purged later. After a
+large move the store compacts itself (FTS ``optimize`` + incremental
+VACUUM) and records the reclaimed bytes for ``/memory stats``.
+
+By default only the old housekeeping rule applies (importance <= 3, older
+than 30 days), archiving instead of deleting. ``MEMORY_RETENTION`` adds or
+changes per-category policies, e.g. ``todo=14,knowledge=365,bug=off``
+(archive after N days, ``off`` = never); an enabled category starts from
+its preset below. ``MEMORY_RETENTION=off`` disables the background schedule.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+
+from memory.store import CATEGORIES, MemoryStore, get_store
+
+log = logging.getLogger(__name__)
+
+RETENTION_ENV = os.environ.get("MEMORY_RETENTION", "").strip()
+
+_DAY = 86400
+_BATCH = 500
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    category: str                       # one of CATEGORIES, or "*" for all of them
+    archive_after_days: int | None      # None = never archive
+    max_importance: int = 10            # only rows at or below this importance
+    unaccessed_only: bool = False       # keep anything recall has ever returned
+    purge_after_days: int | None = None  # drop from the archive this long after archiving
+
+
+DEFAULT_POLICIES: tuple[RetentionPolicy, ...] = (
+    # The old 6-hourly housekeeping rule, archiving instead of deleting
+    RetentionPolicy("*", 30, max_importance=3, purge_after_days=365),
+)
+
+# Limits used when MEMORY_RETENTION turns a category on (the days come from the entry)
+CATEGORY_PRESETS: dict[str, RetentionPolicy] = {
+    "todo": RetentionPolicy("todo", 30, purge_after_days=180),
+    "bug": RetentionPolicy("bug", 90, max_importance=7),
+    "experience": RetentionPolicy("experience", 120, max_importance=6, unaccessed_only=True),
+    "knowledge": RetentionPolicy("knowledge", 180, max_importance=6, unaccessed_only=True),
+    "project": RetentionPolicy("project", 365, max_importance=6, unaccessed_only=True),
+}
+
+
+def policies_from_env(spec: str = RETENTION_ENV,
+                      base: tuple[RetentionPolicy, ...] = DEFAULT_POLICIES) -> tuple[RetentionPolicy, ...]:
+    """Add or change category policies from ``category=days|off`` entries."""
+    policies = {p.category: p for p in base}
+    for part in spec.split(","):
+        cat, _, value = part.partition("=")
+        cat, value = cat.strip().lower(), value.strip().lower()
+        if cat not in CATEGORIES or not value:
+            continue
+        if value == "off":
+            days = None
+        elif value.isdigit():
+            days = int(value)
+        else:
+            log.warning("Ignoring MEMORY_RETENTION entry %r", part)
+            continue
+        preset = policies.get(cat) or CATEGORY_PRESETS.get(cat) or RetentionPolicy(cat, None)
+        policies[cat] = replace(preset, archive_after_days=days)
+    return tuple(policies.values())
+
+
+def _utc(ts: float) -> str:
+    """Timestamp in the same format as SQLite's CURRENT_TIMESTAMP, so comparisons use the index."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts))
+
+
+class RetentionEngine:
+    """Applies retention policies to a store, once or on a background schedule."""
+
+    def __init__(self, store: MemoryStore, policies: tuple[RetentionPolicy, ...] | None = None, *,
+                 interval: float = 6 * 3600, compact_threshold: int = 500):
+        self.store = store
+        self.policies = policies if policies is not None else policies_from_env()
+        self.interval = interval
+        self.compact_threshold = compact_threshold    # rows moved/purged before compacting
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def run_once(self, now: float | None = None) -> dict:
+        """Archive and purge per policy; compact after large changes. Returns a report."""
+        now = time.time() if now is None else now
+        archived = purged = 0
+        for policy in self.policies:
+            cats = CATEGORIES if policy.category == "*" else (policy.category,)
+            for cat in cats:
+                if policy.archive_after_days is not None:
+                    before = _utc(now - policy.archive_after_days * _DAY)
+                    while True:
+                        n = self.store.archive(
+                            cat, before, max_importance=policy.max_importance,
+                            unaccessed_only=policy.unaccessed_only, limit=_BATCH,
+                        )
+                        archived += n
+                        if n < _BATCH or self._stop.is_set():
+                            break
+                if policy.purge_after_days is not None:
+                    purged += self.store.purge_archive(
+                        cat, _utc(now - policy.purge_after_days * _DAY), max_importance=policy.max_importance,
+                    )
+        reclaimed = 0
+        if archived + purged >= self.compact_threshold:
+            reclaimed = self.store.compact()
+        self.store.set_meta("retention_last_run", _utc(now))
+        if archived or purged:
+            log.info("Memory retention: archived %d, purged %d, reclaimed %d bytes", archived, purged, reclaimed)
+        return {"archived": archived, "purged": purged, "reclaimed_bytes": reclaimed}
+
+    def _loop(self, initial_delay: float) -> None:
+        if self._stop.wait(initial_delay):
+            return
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                log.warning("Memory retention run failed: %s", e)
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self, initial_delay: float = 300.0) -> None:
+        """Run on a daemon thread: first after ``initial_delay`` seconds, then every ``interval``."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(initial_delay,), daemon=True, name="starbot-memory-retention",
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_engine: RetentionEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def start_retention(store: MemoryStore | None = None) -> RetentionEngine | None:
+    """Start the process-wide retention schedule once (None when MEMORY_RETENTION=off)."""
+    global _engine
+    if RETENTION_ENV.lower() == "off":
+        return None
+    with _engine_lock:
+        if _engine is None:
+            _engine = RetentionEngine(store or get_store())
+            _engine.start()
+    return _engine
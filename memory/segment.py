@@ -0,0 +1,171 @@
+"""Keyword extraction for memory recall.
+
+- Segmenter: bidirectional maximum matching over a trie of the bundled word
+  list (memory.cjk_words). Runs of characters the dictionary doesn't know are
+  kept together as out-of-vocabulary chunks, so names and new terms survive.
+  ``MEMORY_SEGMENTER=jieba`` uses jieba instead when it is installed.
+- query_keywords(): stopword-filtered keywords for a query, cached per query.
+  MemoryStore orders them by IDF learned from its own contents.
+"""
+
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+
+from memory.cjk_words import EN_STOPWORDS, STOPWORDS, WORDS
+
+try:
+    import jieba
+except Exception:
+    jieba = None
+
+log = logging.getLogger(__name__)
+
+# "trie" (bundled dictionary) or "jieba"
+SEGMENTER = os.environ.get("MEMORY_SEGMENTER", "trie").strip().lower() or "trie"
+if SEGMENTER == "jieba" and jieba is None:
+    log.warning("MEMORY_SEGMENTER=jieba but jieba is not installed; using the bundled dictionary")
+
+MAX_OOV_CHUNK = 4           # unknown runs longer than this are split into chunks
+_CJK_RUN_RE = re.compile(r"[\u4e00-\u9fff]+")
+_EN_RE = re.compile(r"[a-zA-Z][a-zA-Z0-9]{2,}")
+_END = ""                   # trie key marking the end of a word
+
+
+class Trie:
+    """Character trie (nested dicts) with forward/backward longest-match lookup."""
+
+    def __init__(self, words=()):
+        self._root: dict = {}
+        self._rev: dict = {}        # reversed words, for backward matching
+        self.max_len = 1
+        for w in words:
+            self.add(w)
+
+    def add(self, word: str) -> None:
+        if not word:
+            return
+        for root, text in ((self._root, word), (self._rev, word[::-1])):
+            node = root
+            for ch in text:
+                node = node.setdefault(ch, {})
+            node[_END] = True
+        self.max_len = max(self.max_len, len(word))
+
+    def __contains__(self, word: str) -> bool:
+        node = self._root
+        for ch in word:
+            node = node.get(ch)
+            if node is None:
+                return False
+        return _END in node
+
+    def _longest(self, root: dict, text: str, start: int, step: int) -> int:
+        """Length of the longest word starting at ``start`` walking by ``step`` (1 if none)."""
+        node, best, i, n = root, 1, start, 0
+        while 0 <= i < len(text):
+            node = node.get(text[i])
+            if node is None:
+                break
+            n += 1
+            if _END in node:
+                best = n
+            i += step
+        return best
+
+    def forward(self, text: str) -> list[str]:
+        out, i = [], 0
+        while i < len(text):
+            n = self._longest(self._root, text, i, 1)
+            out.append(text[i:i + n])
+            i += n
+        return out
+
+    def backward(self, text: str) -> list[str]:
+        out, i = [], len(text)
+        while i > 0:
+            n = self._longest(self._rev, text, i - 1, -1)
+            out.append(text[i - n:i])
+            i -= n
+        out.reverse()
+        return out
+
+    def segment(self, text: str) -> list[str]:
+        """Bidirectional max-match: fewer words wins, then fewer single characters, then backward."""
+        fwd, bwd = self.forward(text), self.backward(text)
+        if len(fwd) != len(bwd):
+            return fwd if len(fwd) < len(bwd) else bwd
+        singles = lambda seg: sum(1 for w in seg if len(w) == 1)  # noqa: E731
+        return fwd if singles(fwd) < singles(bwd) else bwd
+
+
+_trie: Trie | None = None
+_trie_lock = threading.Lock()
+
+
+def get_trie() -> Trie:
+    """Process-wide trie over the bundled word list (built on first use)."""
+    global _trie
+    if _trie is None:
+        with _trie_lock:
+            if _trie is None:
+                _trie = Trie(WORDS.split())
+    return _trie
+
+
+def _segment_run(run: str) -> list[str]:
+    if SEGMENTER == "jieba" and jieba is not None:
+        return jieba.lcut(run)
+    return get_trie().segment(run)
+
+
+def _cjk_words(run: str) -> list[str]:
+    """Content words of one CJK run: dictionary words plus merged unknown characters."""
+    out: list[str] = []
+    oov = ""
+    for w in _segment_run(run) + [""]:
+        if len(w) == 1 and w not in STOPWORDS:
+            oov += w
+            continue
+        if len(oov) > 1:
+            out.extend(oov[i:i + MAX_OOV_CHUNK] for i in range(0, len(oov), MAX_OOV_CHUNK))
+        oov = ""
+        if len(w) > 1 and w not in STOPWORDS:
+            out.append(w)
+    return [w for w in out if len(w) > 1]
+
+
+def terms(text: str) -> list[str]:
+    """Distinct content terms of ``text`` in order: CJK words and English words (lower-cased)."""
+    seen: set[str] = set()
+    out: list[str] = []
+    for run in _CJK_RUN_RE.findall(text):
+        for w in _cjk_words(run):
+            if w not in seen:
+                seen.add(w)
+                out.append(w)
+    for w in _EN_RE.findall(text):
+        w = w.lower()
+        if w not in seen and w not in EN_STOPWORDS:
+            seen.add(w)
+            out.append(w)
+    return out
+
+
+@lru_cache(maxsize=2048)
+def query_keywords(query: str) -> tuple[str, ...]:
+    """Search keywords for a query, ≥3-char ones (trigram FTS can use them) first.
+
+    Falls back to the query's words including stopwords, then to its first
+    12 characters, so a query never comes back empty.
+    """
+    kws = terms(query)
+    if not kws:
+        words = [w for run in _CJK_RUN_RE.findall(query) for w in _segment_run(run)] + _EN_RE.findall(query)
+        kws = list(dict.fromkeys(w for w in words if len(w) > 1))[:4]
+    if not kws:
+        fallback = query.strip()[:12]
+        kws = [fallback] if fallback else []
+    return tuple(sorted(kws, key=lambda w: len(w) < 3))
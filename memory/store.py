@@ -1,11 +1,21 @@
 import math
+import queue
 import sqlite3
 import os
-import re
 import time
 import threading
 import logging
+import weakref
+import atexit
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
+
+from core.tracing import traced
+from memory.dedup import NEAR_DUP_JACCARD, NEAR_DUP_POLICY, band_keys, content_hash, jaccard, shingles, source_prefix
+from memory.segment import query_keywords, terms
+from memory.vector_index import VECTOR_SEARCH, VectorIndex, get_embedder, pack, unpack
 
 log = logging.getLogger(__name__)
 
@@ -14,19 +24,137 @@ DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "starbot_memo
 # All valid memory categories
 CATEGORIES = ("preference", "knowledge", "project", "experience", "bug", "todo")
 
+# Ranking used by the recall engine, evaluated inside SQLite:
+# importance * exp(-age_days / 30) — same 30-day decay as _relevance_score.
+_DECAY_SQL = (
+    "COALESCE(m.importance, 5) * exp(MIN(0, COALESCE(julianday(m.created_at), julianday('now'))"
+    " - julianday('now')) / 30.0)"
+)
+_RECALL_MAX_KEYWORDS = 12
+_RRF_K = 60                 # reciprocal-rank-fusion constant for hybrid recall
+_SYNC_BACKFILL_MAX = 500    # embed fewer missing vectors inline, more in the background
+_NEAR_DUP_CANDIDATES = 32   # LSH candidates verified per save
+_NEAR_DUP_BUCKET = 64       # newest ids read per LSH band
+_READ_POOL_SIZE = 4         # read-only connections shared by searches/listing/stats
+_ACCESS_FLUSH_INTERVAL = 5.0  # seconds access-count bumps are buffered before one UPDATE batch
+_SYNC_TERM_STATS_MAX = 5000   # count term frequencies inline below this many rows, else in the background
+_IDF_MIN_DOCS = 50           # below this, document frequencies say too little to drop terms
+_COMMON_TERM_RATIO = 0.5     # query terms found in more than this share of memories are dropped
+_PREF_CACHE_TTL = 300.0      # writes through the store invalidate at once; this only catches other processes
+# Bump whenever _init_db or a _migrate_* step changes, so existing databases re-run them once
+_SCHEMA_VERSION = 2
+# Version of content_hash() and band_keys(); a change re-keys existing rows once
+_DEDUP_VERSION = "2"
+
+
+# Every open store, so buffered access counts are flushed at interpreter exit
+_live_stores: "weakref.WeakSet[MemoryStore]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all_access() -> None:
+    for store in list(_live_stores):
+        store.flush_access()
+    close_store()
+
 
 class MemoryStore:
-    def __init__(self, db_path: str = DB_PATH):
+    def __init__(self, db_path: str = DB_PATH, *, vector_search: bool | None = None,
+                 near_dup: str | None = None):
+        """``near_dup``: what save() does with a near-duplicate of an existing
+        memory — "merge" (default), "skip" or "off" (see memory.dedup)."""
         self.db_path = db_path
+        self.near_dup = near_dup or NEAR_DUP_POLICY
+        self._minhash_busy = False
+        self._vector_search = VECTOR_SEARCH if vector_search is None else vector_search
+        self._vindex: VectorIndex | None = None
+        self._vindex_lock = threading.Lock()
+        # Document frequency of each segmenter term across memories (for IDF)
+        self._term_df: dict[str, int] | None = None
+        self._term_docs = 0
+        self._term_loading = False
+        self._term_lock = threading.Lock()
         self._pref_cache: list[str] = []
         self._pref_cache_time: float = 0
+        self._pref_gen = 0      # bumped by every write, so a read that raced one isn't cached
+        # One writer connection behind _lock; reads use a pool of read-only
+        # connections, which WAL lets run alongside the writer
         self._lock = threading.Lock()
         self._con = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
         self._con.execute("PRAGMA journal_mode=WAL")
         self._con.execute("PRAGMA synchronous=NORMAL")
-        self._init_db()
-        self._migrate_schema()
-        self._migrate_fts_trigram()
+        self._ensure_sql_functions(self._con)
+        # Write-behind buffer for access_count increments (id -> pending hits)
+        self._access_pending: dict[int, int] = {}
+        self._access_lock = threading.Lock()
+        self._access_timer: threading.Timer | None = None
+        _live_stores.add(self)
+        self._readers: queue.Queue | None = None if db_path in ("", ":memory:") else queue.Queue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        if not self._schema_current():
+            self._init_db()
+            self._migrate_schema()
+            self._migrate_fts_trigram()
+            self._migrate_content_hash()
+            self._mark_schema_current()
+        self._backfill_minhash()
+
+    @staticmethod
+    def _ensure_sql_functions(con: sqlite3.Connection) -> None:
+        """Register exp() when SQLite was built without its math functions."""
+        try:
+            con.execute("SELECT exp(0)")
+        except sqlite3.OperationalError:
+            con.create_function("exp", 1, math.exp, deterministic=True)
+
+    # ── Connections ───────────────────────────────────────────────────────────
+
+    def _open_reader(self) -> sqlite3.Connection:
+        con = sqlite3.connect(
+            Path(self.db_path).resolve().as_uri() + "?mode=ro", uri=True, timeout=10, check_same_thread=False,
+        )
+        self._ensure_sql_functions(con)
+        return con
+
+    @contextmanager
+    def _read(self):
+        """Borrow a read-only connection from the pool (opened lazily, at most
+        _READ_POOL_SIZE). In-memory databases read through the writer."""
+        if self._readers is None:
+            with self._lock:
+                yield self._con
+            return
+        try:
+            con = self._readers.get_nowait()
+        except queue.Empty:
+            con = None
+            with self._reader_lock:
+                if self._reader_count < _READ_POOL_SIZE:
+                    self._reader_count += 1
+                    try:
+                        con = self._open_reader()
+                    except sqlite3.Error:
+                        self._reader_count -= 1
+                        raise
+            if con is None:
+                con = self._readers.get()
+        try:
+            yield con
+        finally:
+            self._readers.put(con)
+
+    def close(self) -> None:
+        """Flush buffered access counts, then close the writer and every pooled reader."""
+        self.flush_access()
+        with self._lock:
+            self._con.close()
+        if self._readers is not None:
+            while True:
+                try:
+                    self._readers.get_nowait().close()
+                except queue.Empty:
+                    break
 
     # ── Schema ────────────────────────────────────────────────────────────────
 
@@ -44,7 +172,19 @@ class MemoryStore:
                     key TEXT PRIMARY KEY,
                     value TEXT
                 );
-                CREATE INDEX IF NOT EXISTS idx_memories_category ON memories(category);
+                CREATE INDEX IF NOT EXISTS idx_memories_category_created ON memories(category, created_at);
+                DROP INDEX IF EXISTS idx_memories_category;
+                CREATE TABLE IF NOT EXISTS memories_archive (
+                    id INTEGER PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    content BLOB NOT NULL,
+                    importance INTEGER,
+                    access_count INTEGER,
+                    created_at TIMESTAMP,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_memories_archive_category
+                    ON memories_archive(category, archived_at);
                 CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
                     content, content_rowid='id'
                 );
@@ -54,13 +194,57 @@ class MemoryStore:
                 CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
                     DELETE FROM memories_fts WHERE rowid = old.id;
                 END;
+                CREATE TABLE IF NOT EXISTS memory_vectors (
+                    id INTEGER PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    vec BLOB NOT NULL
+                );
+                CREATE TRIGGER IF NOT EXISTS memories_vd AFTER DELETE ON memories BEGIN
+                    DELETE FROM memory_vectors WHERE id = old.id;
+                END;
+                CREATE TABLE IF NOT EXISTS memory_minhash (
+                    key INTEGER NOT NULL,
+                    id INTEGER NOT NULL,
+                    PRIMARY KEY (key, id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_memory_minhash_id ON memory_minhash(id);
+                CREATE TRIGGER IF NOT EXISTS memories_md AFTER DELETE ON memories BEGIN
+                    DELETE FROM memory_minhash WHERE id = old.id;
+                END;
             """)
 
+    def _schema_current(self) -> bool:
+        """True when this database already went through every migration step."""
+        try:
+            with self._lock:
+                row = self._con.execute("SELECT value FROM db_meta WHERE key='schema_version'").fetchone()
+        except sqlite3.Error:
+            return False        # fresh database: no db_meta yet
+        return bool(row) and row[0] == str(_SCHEMA_VERSION)
+
+    def _mark_schema_current(self) -> None:
+        """Record the schema version, unless a migration was skipped (e.g. no trigram
+        support in this SQLite) — then the steps run again on the next open."""
+        try:
+            with self._lock:
+                done = dict(self._con.execute(
+                    "SELECT key, value FROM db_meta WHERE key IN ('fts_tokenizer', 'content_hash')"
+                ).fetchall())
+                if done.get("fts_tokenizer") != "trigram" or done.get("content_hash") != _DEDUP_VERSION:
+                    return
+                self._con.execute(
+                    "INSERT OR REPLACE INTO db_meta(key, value) VALUES('schema_version', ?)", (str(_SCHEMA_VERSION),)
+                )
+                self._con.commit()
+        except sqlite3.Error as e:
+            log.debug("schema version update skipped: %s", e)
+
     def _migrate_schema(self):
         """Add columns that were introduced after the original table was created."""
         for sql in (
             "ALTER TABLE memories ADD COLUMN access_count INTEGER DEFAULT 0",
             "ALTER TABLE memories ADD COLUMN importance INTEGER DEFAULT 5",
+            "ALTER TABLE memories ADD COLUMN content_hash TEXT",
         ):
             try:
                 with self._lock:
@@ -101,37 +285,313 @@ class MemoryStore:
         except sqlite3.Error as e:
             log.debug("FTS trigram migration skipped (old SQLite?): %s", e)
 
+    def _migrate_content_hash(self):
+        """One-time backfill of content_hash, then the unique index on it.
+
+        Rows that already duplicate an earlier row keep a NULL hash (NULLs are
+        exempt from the unique index); nothing is deleted. Runs again when
+        _DEDUP_VERSION changes, and then also drops the LSH keys so
+        _backfill_minhash recomputes them.
+        """
+        try:
+            with self._lock:
+                row = self._con.execute(
+                    "SELECT value FROM db_meta WHERE key='content_hash'"
+                ).fetchone()
+                if row and row[0] == _DEDUP_VERSION:
+                    return
+                seen: set[tuple[str, str]] = set()
+                updates = []
+                for mid, category, content in self._con.execute(
+                    "SELECT id, category, content FROM memories ORDER BY id"
+                ).fetchall():
+                    key = (category, content_hash(content or ""))
+                    if key not in seen:
+                        seen.add(key)
+                        updates.append((key[1], mid))
+                self._con.execute("UPDATE memories SET content_hash = NULL")
+                self._con.executemany("UPDATE memories SET content_hash=? WHERE id=?", updates)
+                if row:
+                    self._con.execute("DELETE FROM memory_minhash")
+                    self._con.execute("DELETE FROM db_meta WHERE key='minhash_max_id'")
+                self._con.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_memories_content_hash
+                        ON memories(category, content_hash)
+                """)
+                self._con.execute(
+                    "INSERT OR REPLACE INTO db_meta(key, value) VALUES('content_hash', ?)", (_DEDUP_VERSION,)
+                )
+                self._con.commit()
+            log.info("Memory content hashes backfilled (%d rows)", len(updates))
+        except sqlite3.Error as e:
+            log.debug("content_hash migration skipped: %s", e)
+
+    def _backfill_minhash(self):
+        """Compute LSH band keys for memories saved before near-dup detection.
+
+        Progress is a high-water mark (``minhash_max_id`` in db_meta) that
+        save() also advances while no backfill is running.
+        """
+        try:
+            with self._lock:
+                row = self._con.execute("SELECT value FROM db_meta WHERE key='minhash_max_id'").fetchone()
+                mark = int(row[0]) if row else 0
+                pending = self._con.execute(
+                    "SELECT COUNT(*) FROM memories WHERE id > ?", (mark,)
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            log.debug("minhash backfill skipped: %s", e)
+            return
+        if not pending:
+            return
+        self._minhash_busy = True
+        if pending <= _SYNC_BACKFILL_MAX:
+            self._minhash_batches(mark)
+        else:
+            threading.Thread(
+                target=self._minhash_batches, args=(mark,),
+                daemon=True, name="starbot-memory-minhash",
+            ).start()
+
+    def _minhash_batches(self, mark: int) -> None:
+        done = 0
+        while True:
+            try:
+                with self._lock:
+                    rows = self._con.execute(
+                        "SELECT id, category, content FROM memories WHERE id > ? ORDER BY id LIMIT 512", (mark,)
+                    ).fetchall()
+                if not rows:
+                    break
+                keys = []
+                for mid, category, content in rows:
+                    content = content or ""
+                    keys.extend((k, mid) for k in band_keys(shingles(content), category, source_prefix(content)) or ())
+                mark = rows[-1][0]
+                with self._lock:
+                    self._con.executemany("INSERT OR IGNORE INTO memory_minhash (key, id) VALUES (?, ?)", keys)
+                    self._con.execute(
+                        "INSERT OR REPLACE INTO db_meta(key, value) VALUES('minhash_max_id', ?)", (str(mark),)
+                    )
+                    self._con.commit()
+                done += len(rows)
+            except sqlite3.Error as e:
+                log.debug("minhash backfill error: %s", e)
+                break
+        self._minhash_busy = False
+        log.debug("minhash backfill: %d memories indexed", done)
+
     # ── Write ─────────────────────────────────────────────────────────────────
 
     def save(self, category: str, content: str, importance: int = 5) -> bool:
-        """Insert memory. Returns False if exact duplicate already exists.
+        """Insert memory. Returns False if a duplicate already exists.
+
+        Exact duplicates (same category and ``content_hash``: the source
+        header plus the first 200 chars after it) are dropped; near-duplicates
+        are merged into or skipped per ``self.near_dup``.
 
         Args:
             category:   One of CATEGORIES (preference/knowledge/project/experience/bug/todo).
             content:    The text to store.
             importance: Relevance weight 1-10 (default 5). Higher = retrieved first.
         """
-        if category not in CATEGORIES:
-            category = "knowledge"
-        importance = max(1, min(10, int(importance)))
+        return self.upsert(category, content, importance)[0] == "inserted"
+
+    @traced("memory.upsert", cat="memory")
+    def upsert(self, category: str, content: str, importance: int = 5, *,
+               near_dup: str | None = None) -> tuple[str, int | None]:
+        """Save with dedup and report what happened.
+
+        Returns (status, id): status is "inserted", "duplicate" (exact match),
+        "merged" (folded into a near-duplicate, whose id is returned),
+        "skipped" (near-duplicate, policy "skip") or "error" (id None).
+        """
+        return self.save_many([(category, content, importance)], near_dup=near_dup)[0]
+
+    @traced("memory.save_many", cat="memory", count="items")
+    def save_many(self, items, *, near_dup: str | None = None) -> list[tuple[str, int | None]]:
+        """Save a batch of memories in one transaction.
+
+        ``items`` are (category, content) or (category, content, importance)
+        tuples. Exact duplicates are looked up in one query; items that repeat
+        (or nearly repeat) an earlier item of the same batch are handled as if
+        that item were already stored. Returns one (status, id) per item, as
+        upsert() does.
+        """
+        policy = near_dup or self.near_dup
+        batch = []
+        for item in items:
+            category, content = item[0], item[1]
+            if category not in CATEGORIES:
+                category = "knowledge"
+            importance = max(1, min(10, int(item[2]))) if len(item) > 2 else 5
+            feats = shingles(content)
+            batch.append({
+                "category": category, "content": content, "importance": importance,
+                "digest": content_hash(content), "feats": feats,
+                "keys": band_keys(feats, category, source_prefix(content)) or [],
+            })
+        if not batch:
+            return []
+        # status per item; the id is either a row id or, for items resolved
+        # against another batch item, that item's index in ``ref``
+        status: list[str] = []
+        ids: list[int | None] = []
+        ref: list[int | None] = []
+        reembed: list[tuple[int, str]] = []
         try:
             with self._lock:
-                dup = self._con.execute(
-                    "SELECT id FROM memories WHERE category=? AND substr(content,1,200)=?",
-                    (category, content[:200]),
-                ).fetchone()
-                if dup:
-                    return False
-                self._con.execute(
-                    "INSERT INTO memories (category, content, importance) VALUES (?, ?, ?)",
-                    (category, content, importance),
-                )
+                existing = self._ids_by_hash({(b["category"], b["digest"]) for b in batch})
+                pending: dict[tuple[str, str], int] = {}   # (category, hash) -> batch index to insert
+                buckets: dict[int, list[int]] = {}          # band key -> batch indexes to insert
+                for i, b in enumerate(batch):
+                    key = (b["category"], b["digest"])
+                    if key in existing or key in pending:
+                        status.append("duplicate")
+                        ids.append(existing.get(key))
+                        ref.append(pending.get(key))
+                        continue
+                    if policy in ("merge", "skip"):
+                        j = self._batch_near_dup(batch, buckets, b)
+                        if j is not None:
+                            if policy == "merge":
+                                self._merge_pending(batch, pending, buckets, j, b)
+                            status.append("merged" if policy == "merge" else "skipped")
+                            ids.append(None)
+                            ref.append(j)
+                            continue
+                        near = self._find_near_dup(b["category"], b["feats"], b["keys"])
+                        if near is not None:
+                            if policy == "merge":
+                                self._merge_into(near, b["content"], b["digest"], b["importance"], b["keys"])
+                                existing[key] = near[0]
+                                reembed.append((near[0], b["content"]))
+                            status.append("merged" if policy == "merge" else "skipped")
+                            ids.append(near[0])
+                            ref.append(None)
+                            continue
+                    pending[key] = i
+                    for k in b["keys"]:
+                        buckets.setdefault(k, []).append(i)
+                    status.append("inserted")
+                    ids.append(None)
+                    ref.append(i)
+                new_ids = self._insert_pending([batch[j] for j in sorted(pending.values())])
                 self._con.commit()
-            self._pref_cache_time = 0
-            return True
         except sqlite3.Error as e:
             log.debug("memory save error: %s", e)
-            return False
+            try:
+                self._con.rollback()
+            except sqlite3.Error:
+                pass
+            return [("error", None)] * len(batch)
+        row_of = {j: new_ids[(batch[j]["category"], batch[j]["digest"])] for j in pending.values()}
+        out = [(s, ids[i] if ref[i] is None else row_of[ref[i]]) for i, s in enumerate(status)]
+        if any(s in ("inserted", "merged") for s in status):
+            self._invalidate_preferences()
+        self._embed_new([(row_of[j], batch[j]["content"]) for j in sorted(pending.values())] + reembed)
+        self._add_terms([batch[j]["content"] for j in pending.values()])
+        return out
+
+    def _ids_by_hash(self, pairs: set[tuple[str, str]]) -> dict[tuple[str, str], int]:
+        """Row ids for (category, content_hash) pairs, via the unique index."""
+        found: dict[tuple[str, str], int] = {}
+        cats = sorted({c for c, _ in pairs})
+        hashes = sorted({h for _, h in pairs})
+        for s in range(0, len(hashes), 500):
+            chunk = hashes[s:s + 500]
+            rows = self._con.execute(
+                f"SELECT category, content_hash, id FROM memories "
+                f"WHERE category IN ({','.join('?' * len(cats))}) AND content_hash IN ({','.join('?' * len(chunk))})",
+                (*cats, *chunk),
+            ).fetchall()
+            found.update({(c, h): mid for c, h, mid in rows if (c, h) in pairs})
+        return found
+
+    @staticmethod
+    def _batch_near_dup(batch: list[dict], buckets: dict[int, list[int]], b: dict) -> int | None:
+        """Index of an earlier batch item (to be inserted) that ``b`` nearly duplicates."""
+        best, best_sim = None, NEAR_DUP_JACCARD
+        for j in {j for k in b["keys"] for j in buckets.get(k, ())}:
+            sim = jaccard(b["feats"], batch[j]["feats"])
+            if sim >= best_sim:
+                best, best_sim = j, sim
+        return best
+
+    @staticmethod
+    def _merge_pending(batch: list[dict], pending: dict, buckets: dict, j: int, b: dict) -> None:
+        """_merge_into for a row that is not inserted yet."""
+        target = batch[j]
+        target["importance"] = max(target["importance"], b["importance"])
+        del pending[(target["category"], target["digest"])]
+        pending[(b["category"], b["digest"])] = j
+        for k in b["keys"]:
+            buckets.setdefault(k, []).append(j)
+        target.update(content=b["content"], digest=b["digest"], feats=b["feats"], keys=b["keys"])
+
+    def _insert_pending(self, rows: list[dict]) -> dict[tuple[str, str], int]:
+        """Insert new rows and their LSH keys (caller holds the lock and commits)."""
+        if not rows:
+            return {}
+        self._con.executemany(
+            "INSERT INTO memories (category, content, importance, content_hash) VALUES (?, ?, ?, ?)",
+            [(r["category"], r["content"], r["importance"], r["digest"]) for r in rows],
+        )
+        new_ids = self._ids_by_hash({(r["category"], r["digest"]) for r in rows})
+        self._con.executemany(
+            "INSERT OR IGNORE INTO memory_minhash (key, id) VALUES (?, ?)",
+            [(k, new_ids[(r["category"], r["digest"])]) for r in rows for k in r["keys"]],
+        )
+        if not self._minhash_busy:
+            self._con.execute(
+                "INSERT OR REPLACE INTO db_meta(key, value) VALUES('minhash_max_id', ?)",
+                (str(max(new_ids.values())),),
+            )
+        return new_ids
+
+    def _find_near_dup(self, category: str, feats: frozenset, keys: list[int]) -> tuple | None:
+        """(id, content, importance) of the most similar memory sharing an LSH band, if similar enough.
+
+        Candidates sharing the most bands are verified first.
+        """
+        if not keys:
+            return None
+        # Buckets are per category and source (see band_keys); read only the
+        # newest ids of each so a crowded bucket can't turn a save into a scan
+        per_band = " UNION ALL ".join(
+            f"SELECT * FROM (SELECT id FROM memory_minhash WHERE key=? ORDER BY id DESC LIMIT {_NEAR_DUP_BUCKET})"
+            for _ in keys
+        )
+        rows = self._con.execute(
+            f"SELECT m.id, m.content, m.importance FROM ({per_band}) c "
+            f"JOIN memories m ON m.id = c.id WHERE m.category = ? "
+            f"GROUP BY m.id ORDER BY COUNT(*) DESC LIMIT {_NEAR_DUP_CANDIDATES}",
+            (*keys, category),
+        ).fetchall()
+        best, best_sim = None, NEAR_DUP_JACCARD
+        for row in rows:
+            sim = jaccard(feats, shingles(row[1] or ""))
+            if sim >= best_sim:
+                best, best_sim = row, sim
+        return best
+
+    def _merge_into(self, near: tuple, content: str, digest: str, importance: int, keys: list[int]) -> None:
+        """Fold a near-duplicate into an existing row (caller holds the lock and commits).
+
+        The row takes the new text — a reworded memory is often a corrected
+        one (a changed preference, a new version number), so the newer
+        statement wins — and keeps the higher importance with a fresh created_at.
+        """
+        mid, _old_content, old_importance = near
+        importance = max(importance, old_importance or 5)
+        self._con.execute(
+            "UPDATE memories SET content=?, content_hash=?, importance=?, created_at=CURRENT_TIMESTAMP "
+            "WHERE id=?",
+            (content, digest, importance, mid),
+        )
+        self._con.execute("UPDATE memories_fts SET content=? WHERE rowid=?", (content, mid))
+        self._con.execute("DELETE FROM memory_minhash WHERE id=?", (mid,))
+        self._con.executemany("INSERT OR IGNORE INTO memory_minhash (key, id) VALUES (?, ?)", [(k, mid) for k in keys])
 
     def delete_by_id(self, memory_id: int) -> bool:
         """Delete a single memory by its primary key."""
@@ -139,7 +599,9 @@ class MemoryStore:
             with self._lock:
                 self._con.execute("DELETE FROM memories WHERE id=?", (memory_id,))
                 self._con.commit()
-            self._pref_cache_time = 0
+            self._invalidate_preferences()
+            if self._vindex is not None:
+                self._vindex.remove(memory_id)
             return True
         except sqlite3.Error as e:
             log.debug("memory delete error: %s", e)
@@ -151,7 +613,9 @@ class MemoryStore:
             with self._lock:
                 cur = self._con.execute("DELETE FROM memories WHERE category=?", (category,))
                 self._con.commit()
-            self._pref_cache_time = 0
+            self._invalidate_preferences()
+            self._vindex = None   # rebuilt from memory_vectors on next recall
+            self._term_df = None
             return cur.rowcount
         except sqlite3.Error as e:
             log.debug("memory delete_by_category error: %s", e)
@@ -163,25 +627,27 @@ class MemoryStore:
             with self._lock:
                 cur = self._con.execute("DELETE FROM memories")
                 self._con.commit()
-            self._pref_cache = []
-            self._pref_cache_time = 0
+            self._invalidate_preferences()
+            self._vindex = None   # rebuilt from memory_vectors on next recall
+            self._term_df = None
             return cur.rowcount
         except sqlite3.Error as e:
             log.debug("memory clear_all error: %s", e)
             return 0
 
+    @traced("memory.list", cat="memory", count="rows")
     def list_by_category(self, category: str = "", limit: int = 20) -> list[dict]:
         """Return memories filtered by category (or all if empty), newest first."""
         try:
-            with self._lock:
+            with self._read() as con:
                 if category:
-                    rows = self._con.execute(
+                    rows = con.execute(
                         "SELECT id, category, content, importance, created_at FROM memories "
                         "WHERE category=? ORDER BY created_at DESC LIMIT ?",
                         (category, limit),
                     ).fetchall()
                 else:
-                    rows = self._con.execute(
+                    rows = con.execute(
                         "SELECT id, category, content, importance, created_at FROM memories "
                         "ORDER BY created_at DESC LIMIT ?",
                         (limit,),
@@ -198,8 +664,8 @@ class MemoryStore:
     def stats(self) -> dict:
         """Return memory count grouped by category."""
         try:
-            with self._lock:
-                rows = self._con.execute(
+            with self._read() as con:
+                rows = con.execute(
                     "SELECT category, COUNT(*) FROM memories GROUP BY category ORDER BY COUNT(*) DESC"
                 ).fetchall()
             return {r[0]: r[1] for r in rows}
@@ -207,6 +673,19 @@ class MemoryStore:
             log.debug("memory stats error: %s", e)
             return {}
 
+    def category_stats(self) -> dict:
+        """Return {category: {"count": n, "last": newest created_at}}, largest first."""
+        try:
+            with self._read() as con:
+                rows = con.execute(
+                    "SELECT category, COUNT(*), MAX(created_at) FROM memories "
+                    "GROUP BY category ORDER BY COUNT(*) DESC"
+                ).fetchall()
+            return {r[0]: {"count": r[1], "last": r[2]} for r in rows}
+        except sqlite3.Error as e:
+            log.debug("memory stats error: %s", e)
+            return {}
+
     # ── Housekeeping / cleanup ────────────────────────────────────────────────
 
     def cleanup_low_importance(self, *, max_age_days: int = 30, importance_threshold: int = 3) -> int:
@@ -223,50 +702,384 @@ class MemoryStore:
                     """
                     DELETE FROM memories
                     WHERE importance <= ?
-                      AND datetime(created_at) <= datetime('now', ?)
+                      AND created_at <= datetime('now', ?)
                     """,
                     (importance_threshold, f"-{int(max_age_days)} days"),
                 )
                 self._con.commit()
-            self._pref_cache_time = 0
+            self._invalidate_preferences()
+            self._vindex = None
+            self._term_df = None
             return cur.rowcount
         except sqlite3.Error as e:
             log.debug("memory cleanup_low_importance error: %s", e)
             return 0
 
+    # ── Archive / retention ───────────────────────────────────────────────────
+    # Cold memories move to memories_archive (zlib-compressed, outside FTS,
+    # vectors and dedup); memory.retention decides what is cold.
+
+    def archive(self, category: str, before: str, *, max_importance: int = 10,
+                unaccessed_only: bool = False, limit: int = 500) -> int:
+        """Move up to ``limit`` memories of ``category`` created before ``before``
+        ('YYYY-MM-DD HH:MM:SS', UTC) into the archive. Returns rows moved."""
+        self.flush_access()
+        where = "category=? AND created_at < ? AND COALESCE(importance, 5) <= ?"
+        if unaccessed_only:
+            where += " AND COALESCE(access_count, 0) = 0"
+        try:
+            with self._lock:
+                rows = self._con.execute(
+                    f"SELECT id, category, content, importance, access_count, created_at FROM memories "
+                    f"WHERE {where} ORDER BY created_at LIMIT ?",
+                    (category, before, int(max_importance), int(limit)),
+                ).fetchall()
+                if not rows:
+                    return 0
+                self._con.executemany(
+                    "INSERT OR REPLACE INTO memories_archive "
+                    "(id, category, content, importance, access_count, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(r[0], r[1], zlib.compress((r[2] or "").encode("utf-8"), 6), r[3], r[4], r[5]) for r in rows],
+                )
+                self._con.execute(
+                    f"DELETE FROM memories WHERE id IN ({','.join('?' * len(rows))})", [r[0] for r in rows],
+                )
+                self._con.commit()
+        except sqlite3.Error as e:
+            log.debug("memory archive error: %s", e)
+            return 0
+        self._invalidate_preferences()
+        self._vindex = None
+        self._term_df = None
+        return len(rows)
+
+    def purge_archive(self, category: str, before: str, *, max_importance: int = 10) -> int:
+        """Permanently delete archived memories of ``category`` archived before ``before``."""
+        try:
+            with self._lock:
+                cur = self._con.execute(
+                    "DELETE FROM memories_archive WHERE category=? AND archived_at < ? "
+                    "AND COALESCE(importance, 5) <= ?",
+                    (category, before, int(max_importance)),
+                )
+                self._con.commit()
+            return cur.rowcount
+        except sqlite3.Error as e:
+            log.debug("memory purge_archive error: %s", e)
+            return 0
+
+    def restore_archived(self, memory_id: int) -> bool:
+        """Move an archived memory back into the hot table (same id)."""
+        try:
+            with self._lock:
+                row = self._con.execute(
+                    "SELECT category, content, importance, access_count, created_at FROM memories_archive WHERE id=?",
+                    (memory_id,),
+                ).fetchone()
+                if not row:
+                    return False
+                category, content = row[0], zlib.decompress(row[1]).decode("utf-8")
+                keys = band_keys(shingles(content), category, source_prefix(content)) or []
+                try:
+                    self._con.execute(
+                        "INSERT INTO memories (id, category, content, importance, access_count, created_at, content_hash) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (memory_id, category, content, row[2], row[3], row[4], content_hash(content)),
+                    )
+                    self._con.executemany(
+                        "INSERT OR IGNORE INTO memory_minhash (key, id) VALUES (?, ?)", [(k, memory_id) for k in keys],
+                    )
+                    restored = True
+                except sqlite3.IntegrityError:
+                    restored = False        # the same text was saved again since; keep that copy
+                self._con.execute("DELETE FROM memories_archive WHERE id=?", (memory_id,))
+                self._con.commit()
+        except sqlite3.Error as e:
+            log.debug("memory restore error: %s", e)
+            return False
+        self._invalidate_preferences()
+        if restored:
+            self._embed_new([(memory_id, content)])
+        return True
+
+    def compact(self) -> int:
+        """Merge FTS segments and give free pages back to the OS. Returns bytes reclaimed.
+
+        The first run switches the file to incremental auto-vacuum, which
+        needs one full VACUUM; later runs are incremental.
+        """
+        self.flush_access()
+        try:
+            with self._lock:
+                page_size = self._con.execute("PRAGMA page_size").fetchone()[0]
+                before = self._con.execute("PRAGMA page_count").fetchone()[0]
+                self._con.execute("INSERT INTO memories_fts(memories_fts) VALUES('optimize')")
+                self._con.commit()
+                if self._con.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                    self._con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                    self._con.execute("VACUUM")
+                else:
+                    self._con.execute("PRAGMA incremental_vacuum").fetchall()
+                self._con.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+                after = self._con.execute("PRAGMA page_count").fetchone()[0]
+                reclaimed = max(0, before - after) * page_size
+                self._con.execute(
+                    "INSERT INTO db_meta(key, value) VALUES('reclaimed_bytes', ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value",
+                    (str(reclaimed),),
+                )
+                self._con.commit()
+        except sqlite3.Error as e:
+            log.debug("memory compact error: %s", e)
+            return 0
+        return reclaimed
+
+    def set_meta(self, key: str, value: str) -> None:
+        try:
+            with self._lock:
+                self._con.execute("INSERT OR REPLACE INTO db_meta(key, value) VALUES(?, ?)", (key, str(value)))
+                self._con.commit()
+        except sqlite3.Error as e:
+            log.debug("memory meta error: %s", e)
+
+    def storage_stats(self) -> dict:
+        """File size, free pages, archive size and retention bookkeeping for /memory stats."""
+        try:
+            with self._read() as con:
+                page_size = con.execute("PRAGMA page_size").fetchone()[0]
+                pages = con.execute("PRAGMA page_count").fetchone()[0]
+                free = con.execute("PRAGMA freelist_count").fetchone()[0]
+                archived, archived_bytes = con.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(length(content)), 0) FROM memories_archive"
+                ).fetchone()
+                meta = dict(con.execute(
+                    "SELECT key, value FROM db_meta WHERE key IN ('reclaimed_bytes', 'retention_last_run')"
+                ).fetchall())
+        except sqlite3.Error as e:
+            log.debug("memory storage stats error: %s", e)
+            return {}
+        return {
+            "db_bytes": pages * page_size,
+            "free_bytes": free * page_size,
+            "archived": archived,
+            "archived_bytes": archived_bytes,
+            "reclaimed_bytes": int(meta.get("reclaimed_bytes") or 0),
+            "retention_last_run": meta.get("retention_last_run", ""),
+        }
+
+    # ── Vector index ──────────────────────────────────────────────────────────
+
+    def _store_vectors(self, model: str, pairs: list[tuple[int, list[float]]]) -> None:
+        with self._lock:
+            self._con.executemany(
+                "INSERT OR REPLACE INTO memory_vectors (id, model, vec) VALUES (?, ?, ?)",
+                [(mid, model, pack(vec)) for mid, vec in pairs],
+            )
+            self._con.commit()
+
+    def _embed_new(self, items: list[tuple[int, str]]) -> None:
+        """Embed freshly saved memories, persist the vectors and add them to a loaded index."""
+        if not self._vector_search or not items:
+            return
+        try:
+            emb = get_embedder()
+            pairs = list(zip((mid for mid, _ in items), emb.embed([c for _, c in items])))
+            self._store_vectors(emb.name, pairs)
+        except Exception as e:
+            log.debug("memory embedding error: %s", e)
+            return
+        if self._vindex is not None:
+            self._vindex.add_many(pairs)
+
+    def _backfill_vectors(self, index: VectorIndex, missing: list[tuple[int, str]], model: str) -> None:
+        emb = get_embedder()
+        for i in range(0, len(missing), 256):
+            if self._vindex is not index:
+                return      # index was dropped (bulk delete); the next load backfills
+            batch = missing[i:i + 256]
+            try:
+                pairs = list(zip((mid for mid, _ in batch), emb.embed([c for _, c in batch])))
+                self._store_vectors(model, pairs)
+            except Exception as e:
+                log.debug("memory vector backfill error: %s", e)
+                return
+            index.add_many(pairs)
+        log.debug("memory vector backfill: %d memories embedded", len(missing))
+
+    def _vector_index(self, *, sync: bool = False) -> VectorIndex | None:
+        """The in-memory index, loaded from memory_vectors on first use.
+
+        Memories without a stored vector are embedded inline when there are
+        few of them (or ``sync`` is set), otherwise on a background thread.
+        """
+        if not self._vector_search:
+            return None
+        index = self._vindex
+        if index is not None:
+            return index
+        with self._vindex_lock:
+            if self._vindex is not None:
+                return self._vindex
+            emb = get_embedder()
+            try:
+                with self._read() as con:
+                    stored = con.execute(
+                        "SELECT id, vec FROM memory_vectors WHERE model=?", (emb.name,)
+                    ).fetchall()
+                    missing = con.execute(
+                        "SELECT m.id, m.content FROM memories m "
+                        "LEFT JOIN memory_vectors v ON v.id = m.id AND v.model = ? "
+                        "WHERE v.id IS NULL",
+                        (emb.name,),
+                    ).fetchall()
+            except sqlite3.Error as e:
+                log.debug("memory vector index load error: %s", e)
+                return None
+            index = VectorIndex(emb.dim)
+            index.add_many((mid, unpack(blob)) for mid, blob in stored)
+            self._vindex = index
+        if sync or len(missing) <= _SYNC_BACKFILL_MAX:
+            self._backfill_vectors(index, missing, emb.name)
+        else:
+            threading.Thread(
+                target=self._backfill_vectors, args=(index, missing, emb.name),
+                daemon=True, name="starbot-memory-vectors",
+            ).start()
+        return index
+
+    def _recall_vector(self, query: str, limit: int, category: str | None) -> list[dict]:
+        """Nearest memories to the query embedding, best first."""
+        index = self._vector_index()
+        if index is None or not len(index):
+            return []
+        try:
+            emb = get_embedder()
+            hits = index.search(emb.embed([query])[0], k=limit * 3 if category else limit,
+                                min_score=emb.min_score)
+        except Exception as e:
+            log.debug("vector recall error: %s", e)
+            return []
+        if not hits:
+            return []
+        ids = [mid for mid, _ in hits]
+        try:
+            with self._read() as con:
+                rows = con.execute(
+                    f"SELECT id, category, content, importance, created_at FROM memories "
+                    f"WHERE id IN ({','.join('?' * len(ids))})",
+                    ids,
+                ).fetchall()
+        except sqlite3.Error as e:
+            log.debug("vector recall fetch error: %s", e)
+            return []
+        by_id = {item["id"]: item for item in self._rows_to_items(rows)}
+        items = [by_id[mid] for mid in ids if mid in by_id]
+        if category:
+            items = [it for it in items if it["category"] == category]
+        return items[:limit]
+
+    @staticmethod
+    def _fuse(*ranked_lists: list[dict]) -> list[dict]:
+        """Reciprocal rank fusion of ranked result lists (earlier lists win ties)."""
+        scores: dict[int, float] = {}
+        items: dict[int, dict] = {}
+        for ranked in ranked_lists:
+            for rank, item in enumerate(ranked):
+                mid = item["id"]
+                items.setdefault(mid, item)
+                scores[mid] = scores.get(mid, 0.0) + 1.0 / (_RRF_K + rank)
+        order = sorted(items, key=lambda mid: scores[mid], reverse=True)
+        return [items[mid] for mid in order]
+
     # ── Keyword extraction ────────────────────────────────────────────────────
 
     @staticmethod
     def _keywords(query: str) -> list[str]:
         """Extract distinct search keywords from a natural-language query.
 
-        Returns a deduplicated list ordered by usefulness:
-        - Chinese segments of 3-6 chars (long enough for trigram FTS, short enough to match)
-        - Chinese segments of 2 chars  (too short for trigram FTS, but fine for LIKE)
-        - English words of 3+ chars
-        - If nothing found: the first 12 chars of the query as a last resort
+        Chinese is segmented into dictionary words (see memory.segment), so
+        function-word runs like "最近学习了什么" no longer become keywords.
+        Stopwords are dropped; keywords of 3+ chars (usable by trigram FTS)
+        come before 2-char ones (LIKE only). If nothing is left, the first
+        12 chars of the query are used as a last resort. Cached per query.
+        """
+        return list(query_keywords(query))
+
+    def _ranked_keywords(self, query: str) -> tuple[list[str], dict[str, float]]:
+        """Keywords ordered by IDF within the FTS/LIKE groups, plus their IDF weights.
 
-        We intentionally limit Chinese segments to ≤6 chars to avoid picking up
-        function-word runs like "最近学习了什么" as a single useless keyword.
+        Terms found in most memories are dropped once the store is big enough
+        for that to be meaningful. Before term statistics are available the
+        segmenter's order is kept and the weights are empty.
         """
-        # Split on non-CJK non-ASCII boundaries to isolate runs of each type
-        zh3 = re.findall(r'[\u4e00-\u9fff]{3,6}', query)   # best for FTS5 trigram
-        zh2 = re.findall(r'[\u4e00-\u9fff]{2}',   query)   # LIKE only (trigram needs ≥3)
-        en  = re.findall(r'[a-zA-Z]{3,}',          query)
+        kws = self._keywords(query)
+        stats = self._term_stats()
+        if stats is None:
+            return kws, {}
+        df, docs = stats
+        idf = {kw: math.log((docs + 1) / (df.get(kw.lower(), 0) + 1)) + 1.0 for kw in kws}
+        if docs >= _IDF_MIN_DOCS:
+            kws = [kw for kw in kws if df.get(kw.lower(), 0) <= _COMMON_TERM_RATIO * docs] or kws
+        kws.sort(key=lambda kw: (len(kw) < 3, -idf[kw]))
+        return kws, idf
 
-        seen: set[str] = set()
-        result: list[str] = []
-        for kw in zh3 + en + zh2:          # zh3/en first — better for FTS
-            kw_lower = kw.lower()
-            if kw_lower not in seen and kw.strip():
-                seen.add(kw_lower)
-                result.append(kw)
-
-        if not result:
-            fallback = query.strip()[:12]
-            if fallback:
-                result.append(fallback)
-        return result
+    def _term_stats(self) -> tuple[dict[str, int], int] | None:
+        """(document frequency per term, number of memories), counted on first use.
+
+        Small stores are counted inline; large ones on a background thread,
+        returning None until it finishes. Saves keep the counts current;
+        bulk deletes drop them so they are recounted.
+        """
+        df = self._term_df
+        if df is not None:
+            return df, self._term_docs
+        with self._term_lock:
+            if self._term_loading:
+                return None
+            self._term_loading = True
+        try:
+            with self._read() as con:
+                n = con.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+        except sqlite3.Error as e:
+            log.debug("memory term stats error: %s", e)
+            self._term_loading = False
+            return None
+        if n <= _SYNC_TERM_STATS_MAX:
+            self._load_term_stats()
+            return (self._term_df, self._term_docs) if self._term_df is not None else None
+        threading.Thread(target=self._load_term_stats, daemon=True, name="starbot-memory-terms").start()
+        return None
+
+    def _load_term_stats(self) -> None:
+        df: dict[str, int] = {}
+        docs = 0
+        try:
+            with self._read() as con:
+                for (content,) in con.execute("SELECT content FROM memories"):
+                    docs += 1
+                    for t in terms(content or ""):
+                        df[t] = df.get(t, 0) + 1
+        except sqlite3.Error as e:
+            log.debug("memory term stats error: %s", e)
+            df = None
+        with self._term_lock:
+            if df is not None:
+                self._term_df, self._term_docs = df, docs
+            self._term_loading = False
+        log.debug("memory term stats: %d terms over %d memories", len(df or ()), docs)
+
+    def _add_terms(self, contents: list[str]) -> None:
+        """Count newly saved memories into loaded term statistics."""
+        if not contents:
+            return
+        with self._term_lock:
+            df = self._term_df
+            if df is None:
+                return      # counted when the statistics are loaded
+            for content in contents:
+                for t in terms(content):
+                    df[t] = df.get(t, 0) + 1
+            self._term_docs += len(contents)
 
     # ── Core search ───────────────────────────────────────────────────────────
 
@@ -298,9 +1111,9 @@ class MemoryStore:
             return []
         try:
             safe = token.replace('"', '""')
-            with self._lock:
+            with self._read() as con:
                 if category:
-                    rows = self._con.execute(
+                    rows = con.execute(
                         """SELECT id, category, content, importance, created_at FROM memories
                            WHERE category=? AND id IN (
                                SELECT rowid FROM memories_fts
@@ -310,7 +1123,7 @@ class MemoryStore:
                         (category, f'"{safe}"', limit * 2),   # over-fetch, then re-rank
                     ).fetchall()
                 else:
-                    rows = self._con.execute(
+                    rows = con.execute(
                         """SELECT id, category, content, importance, created_at FROM memories
                            WHERE id IN (
                                SELECT rowid FROM memories_fts
@@ -333,16 +1146,16 @@ class MemoryStore:
     def _like_one(self, token: str, limit: int, category: str | None = None) -> list[dict]:
         """Single-keyword LIKE search — always works, no minimum length."""
         try:
-            with self._lock:
+            with self._read() as con:
                 if category:
-                    rows = self._con.execute(
+                    rows = con.execute(
                         """SELECT id, category, content, importance, created_at FROM memories
                            WHERE category=? AND content LIKE ?
                            LIMIT ?""",
                         (category, f"%{token}%", limit * 2),
                     ).fetchall()
                 else:
-                    rows = self._con.execute(
+                    rows = con.execute(
                         """SELECT id, category, content, importance, created_at FROM memories
                            WHERE content LIKE ?
                            LIMIT ?""",
@@ -359,38 +1172,117 @@ class MemoryStore:
             log.debug("LIKE search error for %r: %s", token, e)
             return []
 
-    def search(self, query: str, limit: int = 5) -> list[dict]:
+    @traced("memory.search", cat="memory", count="rows")
+    def search(self, query: str, limit: int = 5, *, count_access: bool = True) -> list[dict]:
         """Search for a single keyword (the best one extracted from query).
 
         Tries FTS5 first for ranking quality; falls back to LIKE if FTS
         returns nothing or the keyword is too short for trigram.
+        ``count_access=False`` for browsing/lookups that shouldn't count as use.
         """
-        kws = self._keywords(query)
+        kws, _ = self._ranked_keywords(query)
         token = kws[0] if kws else query[:12]
 
         results = self._fts_one(token, limit)
         if results:
-            self._bump_access([r["id"] for r in results if "id" in r])
+            if count_access:
+                self._bump_access([r["id"] for r in results if "id" in r])
             return results
 
         return self._like_one(token, limit)
 
-    def search_multi(self, query: str, limit: int = 8, category: str | None = None) -> list[dict]:
+    @staticmethod
+    def _fts_match_expr(keywords: list[str]) -> str:
+        """One FTS5 MATCH expression: OR of phrase-quoted keywords (≥3 chars for trigram)."""
+        return " OR ".join(
+            '"' + kw.replace('"', '""') + '"' for kw in keywords if len(kw) >= 3
+        )
+
+    @staticmethod
+    def _rows_to_items(rows) -> list[dict]:
+        return [
+            {"id": r[0], "category": r[1], "content": r[2],
+             "importance": r[3] or 5, "created_at": r[4]}
+            for r in rows
+        ]
+
+    def _recall_fts(self, match: str, limit: int, category: str | None) -> list[dict]:
+        """Top-k for a MATCH expression ranked by bm25 × importance × time decay."""
+        try:
+            with self._read() as con:
+                rows = con.execute(
+                    f"""WITH hits AS (
+                            SELECT rowid AS id, bm25(memories_fts) AS bm
+                            FROM memories_fts WHERE memories_fts MATCH ?1
+                        )
+                        SELECT m.id, m.category, m.content, m.importance, m.created_at
+                        FROM hits JOIN memories m ON m.id = hits.id
+                        WHERE (?2 IS NULL OR m.category = ?2)
+                        ORDER BY -hits.bm * {_DECAY_SQL} DESC
+                        LIMIT ?3""",
+                    (match, category, limit),
+                ).fetchall()
+            return self._rows_to_items(rows)
+        except sqlite3.Error as e:
+            log.debug("FTS recall error for %r: %s", match, e)
+            return []
+
+    def _recall_like(self, tokens: list[str], limit: int, category: str | None,
+                     weights: dict[str, float] | None = None) -> list[dict]:
+        """One LIKE query OR-ing all tokens, ranked by importance × time decay.
+
+        With ``weights`` (token -> IDF) and several tokens, rows are also
+        scored by the summed weight of the tokens they contain.
+        """
+        if not tokens:
+            return []
+        where = " OR ".join("m.content LIKE ?" for _ in tokens)
+        params: list = [f"%{t}%" for t in tokens]
+        if category:
+            where = f"m.category = ? AND ({where})"
+            params.insert(0, category)
+        order = _DECAY_SQL
+        if weights and len(tokens) > 1:
+            matched = " + ".join(f"(m.content LIKE ?) * {float(weights.get(t, 1.0)):.4f}" for t in tokens)
+            order = f"({matched}) * {_DECAY_SQL}"
+            params += [f"%{t}%" for t in tokens]
+        try:
+            with self._read() as con:
+                rows = con.execute(
+                    f"SELECT m.id, m.category, m.content, m.importance, m.created_at "
+                    f"FROM memories m WHERE {where} ORDER BY {order} DESC LIMIT ?",
+                    (*params, limit),
+                ).fetchall()
+            return self._rows_to_items(rows)
+        except sqlite3.Error as e:
+            log.debug("LIKE recall error for %r: %s", tokens, e)
+            return []
+
+    @traced("memory.search_multi", cat="memory", count="rows")
+    def search_multi(self, query: str, limit: int = 8, category: str | None = None, *,
+                     count_access: bool = True) -> list[dict]:
         """Multi-keyword search — the main entry-point for memory recall.
 
-        Extracts every meaningful keyword from the query and searches for
-        each one independently (FTS → LIKE), merging and deduplicating
-        results by content prefix.  This handles natural-language queries
-        like "帮我找关于Python异步编程的学习笔记" correctly.
+        Segments the query into keywords (stopwords and store-wide common
+        terms dropped, rarest first) and recalls them all in one FTS5 query
+        (OR of phrases), ranked in SQL by bm25 combined with importance and
+        time decay. Keywords too short for the trigram index (2-char Chinese)
+        or an empty FTS result fall back to a single LIKE query, weighted by
+        keyword IDF. When the vector index is enabled, nearest neighbours of the
+        query embedding are fused in by reciprocal rank, so paraphrases that
+        share no keyword are still found. Results are deduplicated by content
+        prefix. ``count_access=False`` keeps UI browsing out of access_count.
         """
-        keywords = self._keywords(query)
-        seen: set[str] = set()
-        results: list[dict] = []
+        keywords, idf = self._ranked_keywords(query)
+        keywords = keywords[:_RECALL_MAX_KEYWORDS]
 
         cat = (category or "").strip().lower() or None
         if cat and cat not in CATEGORIES:
             cat = None
 
+        results: list[dict] = []
+        seen: set[str] = set()
+
         def _add(items: list) -> None:
             for item in items:
                 key = item.get("content", "")[:120]
@@ -398,57 +1290,92 @@ class MemoryStore:
                     seen.add(key)
                     results.append(item)
 
-        for kw in keywords[:8]:
-            if len(results) >= limit:
-                break
-            need = max(2, limit - len(results))
-            # FTS first, then LIKE if FTS gives nothing
-            found = self._fts_one(kw, need, category=cat) or self._like_one(kw, need, category=cat)
-            _add(found)
+        lexical: list[dict] = []
+        match = self._fts_match_expr(keywords)
+        if match:
+            lexical = self._recall_fts(match, limit, cat)
+        if len(lexical) < limit:
+            # Short keywords can't use trigram FTS; long ones only if FTS found nothing
+            like_tokens = [kw for kw in keywords if len(kw) < 3 or not lexical]
+            known = {item["id"] for item in lexical}
+            lexical += [item for item in self._recall_like(like_tokens, limit - len(lexical), cat, idf)
+                        if item["id"] not in known]
+        semantic = self._recall_vector(query, limit, cat)
+        _add(self._fuse(lexical, semantic) if semantic else lexical)
 
-        # Bump access counts once for all found items
-        if results:
+        results = results[:limit]
+        if results and count_access:
             self._bump_access([r["id"] for r in results if "id" in r])
-        return results[:limit]
+        return results
 
     def _bump_access(self, ids: list[int]) -> None:
-        """Increment access_count for matched memories by id (best-effort)."""
+        """Buffer access_count increments; a timer writes them in one transaction.
+
+        Keeps the UPDATE + commit off the recall path.
+        """
         if not ids:
             return
+        with self._access_lock:
+            for mid in ids:
+                self._access_pending[mid] = self._access_pending.get(mid, 0) + 1
+            if self._access_timer is None:
+                self._access_timer = threading.Timer(_ACCESS_FLUSH_INTERVAL, self.flush_access)
+                self._access_timer.daemon = True
+                self._access_timer.start()
+
+    def flush_access(self) -> None:
+        """Write buffered access counts now (also runs at interpreter exit)."""
+        with self._access_lock:
+            pending, self._access_pending = self._access_pending, {}
+            timer, self._access_timer = self._access_timer, None
+        if timer is not None:
+            timer.cancel()
+        if not pending:
+            return
         try:
             with self._lock:
-                self._con.execute(
-                    f"UPDATE memories SET access_count=access_count+1 "
-                    f"WHERE id IN ({','.join('?' * len(ids))})",
-                    ids,
+                self._con.executemany(
+                    "UPDATE memories SET access_count=access_count+? WHERE id=?",
+                    [(n, mid) for mid, n in pending.items()],
                 )
                 self._con.commit()
-        except sqlite3.Error:
-            pass
+        except sqlite3.Error as e:
+            log.debug("memory access flush error: %s", e)
 
     # ── Convenience ───────────────────────────────────────────────────────────
 
     def get_relevant(self, task: str, limit: int = 8) -> list[str]:
         return [r["content"] for r in self.search_multi(task, limit)]
 
+    @traced("memory.preferences", cat="memory", count="rows")
     def get_preferences(self) -> list[str]:
-        if self._pref_cache and time.time() - self._pref_cache_time < 300:
+        """Preference memories, most used first. Cached until a write through this store
+        (or _PREF_CACHE_TTL, for writes from other processes); an empty result is cached too."""
+        if self._pref_cache_time and time.time() - self._pref_cache_time < _PREF_CACHE_TTL:
             return self._pref_cache
+        gen = self._pref_gen
         try:
-            with self._lock:
-                rows = self._con.execute(
+            with self._read() as con:
+                rows = con.execute(
                     "SELECT content FROM memories WHERE category='preference' "
                     "ORDER BY access_count DESC, created_at DESC"
                 ).fetchall()
-            self._pref_cache = [r[0] for r in rows]
-            self._pref_cache_time = time.time()
-            return self._pref_cache
         except sqlite3.Error as e:
             log.debug("memory get_preferences error: %s", e)
             return self._pref_cache
+        prefs = [r[0] for r in rows]
+        if gen == self._pref_gen:
+            self._pref_cache = prefs
+            self._pref_cache_time = time.time()
+        return prefs
+
+    def _invalidate_preferences(self) -> None:
+        self._pref_gen += 1
+        self._pref_cache_time = 0
 
     def cleanup_old(self, keep_days: int = 30):
         """删除超过 keep_days 天且 access_count=0 的旧记忆。"""
+        self.flush_access()
         try:
             with self._lock:
                 self._con.execute(
@@ -457,5 +1384,35 @@ class MemoryStore:
                     (f"-{keep_days} days",),
                 )
                 self._con.commit()
+            self._invalidate_preferences()
+            self._vindex = None   # rebuilt from memory_vectors on next recall
+            self._term_df = None
         except sqlite3.Error as e:
             log.debug("memory cleanup error: %s", e)
+
+
+_store: MemoryStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> MemoryStore:
+    """Process-wide MemoryStore on DB_PATH, shared by Brain, tools, skills and clients.
+
+    Opened on first use; schema setup and migrations run then, once per process
+    (and are skipped entirely for a database already at _SCHEMA_VERSION).
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MemoryStore(DB_PATH)
+    return _store
+
+
+def close_store() -> None:
+    """Flush and close the shared store (runs at exit); the next get_store() reopens it."""
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
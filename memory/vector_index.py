@@ -0,0 +1,281 @@
+"""Embedding vectors for semantic memory recall.
+
+- Embedders: a small sentence-transformers model when ``MEMORY_EMBED_MODEL``
+  names one and the package is installed, otherwise a dependency-free
+  hashing-trick embedder (English words + CJK character uni/bigrams). The
+  hashing embedder catches reworded text that shares words or characters
+  but not a contiguous trigram; a real model also catches synonyms.
+- VectorIndex: in-process cosine index. Brute force over a NumPy matrix for
+  small stores, IVF (k-means coarse lists, probing the nearest few) once it
+  grows past ``ivf_threshold``. Without NumPy it falls back to pure Python.
+
+Vectors are persisted by MemoryStore in the ``memory_vectors`` table of the
+memory database, so the index is rebuilt on startup without re-embedding.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except Exception:
+    SentenceTransformer = None
+
+log = logging.getLogger(__name__)
+
+# Empty = hashing embedder; e.g. "paraphrase-multilingual-MiniLM-L12-v2"
+EMBED_MODEL = os.environ.get("MEMORY_EMBED_MODEL", "")
+# "0" disables vector recall entirely
+VECTOR_SEARCH = os.environ.get("MEMORY_VECTOR_SEARCH", "1") != "0"
+
+_WORD_RE = re.compile(r"[a-zA-Z][a-zA-Z0-9_+#.-]*|\d+")
+_CJK_RUN_RE = re.compile(r"[\u4e00-\u9fff]+")
+
+
+def text_features(text: str) -> dict[str, float]:
+    """Weighted bag of features: English words, CJK characters and CJK bigrams."""
+    feats: dict[str, float] = {}
+    for w in _WORD_RE.findall(text.lower()):
+        if len(w) > 1:
+            feats["w:" + w] = feats.get("w:" + w, 0.0) + 1.0
+    for run in _CJK_RUN_RE.findall(text):
+        for ch in run:
+            feats["c:" + ch] = feats.get("c:" + ch, 0.0) + 0.5
+        for i in range(len(run) - 1):
+            bg = "b:" + run[i:i + 2]
+            feats[bg] = feats.get(bg, 0.0) + 1.0
+    return feats
+
+
+def feature_hash(feat: str) -> int:
+    """Stable unsigned 64-bit hash of a feature string."""
+    return int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HashingEmbedder:
+    """Signed feature hashing into ``dim`` buckets, L2-normalised."""
+
+    min_score = 0.3     # cosine below this is treated as unrelated
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hash-v1-{dim}"
+
+    def _embed_one(self, text: str) -> list[float]:
+        vec = [0.0] * self.dim
+        for feat, weight in text_features(text).items():
+            h = feature_hash(feat)
+            vec[h % self.dim] += weight if (h >> 63) & 1 else -weight
+        norm = math.sqrt(sum(v * v for v in vec))
+        return [v / norm for v in vec] if norm else vec
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed_one(t) for t in texts]
+
+
+class SentenceEmbedder:
+    """sentence-transformers model on CPU (normalised embeddings)."""
+
+    min_score = 0.45
+
+    def __init__(self, model_name: str):
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = int(self._model.get_sentence_embedding_dimension())
+        self.name = f"st:{model_name}"
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        out = self._model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
+        return [list(map(float, v)) for v in out]
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    """Process-wide embedder (model loading is expensive)."""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                emb = None
+                if EMBED_MODEL and SentenceTransformer is not None:
+                    try:
+                        emb = SentenceEmbedder(EMBED_MODEL)
+                    except Exception as e:
+                        log.warning("Embedding model %s unavailable, using hashing embedder: %s", EMBED_MODEL, e)
+                _embedder = emb or HashingEmbedder()
+    return _embedder
+
+
+def pack(vec) -> bytes:
+    return array("f", vec).tobytes()
+
+
+def unpack(blob: bytes) -> list[float]:
+    a = array("f")
+    a.frombytes(blob)
+    return a.tolist()
+
+
+class VectorIndex:
+    """Cosine-similarity index over unit vectors keyed by memory id.
+
+    Rows are append-only; removals leave a tombstone that is dropped when the
+    IVF lists are rebuilt.
+    """
+
+    def __init__(self, dim: int, *, ivf_threshold: int = 20_000, nprobe: int = 8):
+        self.dim = dim
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._pos: dict[int, int] = {}          # memory id -> row
+        self._ids: list[int] = []               # row -> memory id (-1 = removed)
+        self._rows = 0
+        self._mat = np.zeros((0, dim), dtype=np.float32) if np is not None else None
+        self._py: list[list[float]] = []        # rows when NumPy is missing
+        self._centroids = None
+        self._lists: list = []
+        self._ivf_rows = 0                      # rows covered by the IVF lists
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    @property
+    def uses_ivf(self) -> bool:
+        return self._centroids is not None
+
+    def add(self, memory_id: int, vec) -> None:
+        self.add_many([(memory_id, vec)])
+
+    def add_many(self, items) -> None:
+        items = list(items)
+        if not items:
+            return
+        with self._lock:
+            for mid, _ in items:
+                old = self._pos.pop(mid, None)
+                if old is not None:
+                    self._ids[old] = -1
+                    self._clear_row(old)
+            start = self._rows
+            if np is not None:
+                block = np.asarray([v for _, v in items], dtype=np.float32).reshape(len(items), self.dim)
+                need = start + len(items)
+                if need > self._mat.shape[0]:
+                    grown = np.zeros((max(need, self._mat.shape[0] * 2, 256), self.dim), dtype=np.float32)
+                    grown[:start] = self._mat[:start]
+                    self._mat = grown
+                self._mat[start:need] = block
+            else:
+                self._py.extend(list(v) for _, v in items)
+            for i, (mid, _) in enumerate(items):
+                self._pos[mid] = start + i
+                self._ids.append(mid)
+            self._rows = start + len(items)
+            self._maybe_rebuild_ivf()
+
+    def remove(self, memory_id: int) -> None:
+        with self._lock:
+            row = self._pos.pop(memory_id, None)
+            if row is not None:
+                self._ids[row] = -1
+                self._clear_row(row)
+
+    def _clear_row(self, row: int) -> None:
+        if np is not None:
+            self._mat[row] = 0.0
+        else:
+            self._py[row] = [0.0] * self.dim
+
+    # ── IVF ───────────────────────────────────────────────────────────────────
+
+    def _maybe_rebuild_ivf(self) -> None:
+        if np is None or len(self._pos) < self.ivf_threshold:
+            self._centroids = None
+            return
+        if self._centroids is not None and self._rows - self._ivf_rows < 0.25 * max(self._ivf_rows, 1):
+            return
+        self._compact()
+        n = self._rows
+        mat = self._mat[:n]
+        nlist = max(8, int(math.sqrt(n)))
+        rng = np.random.default_rng(0)
+        sample = mat[rng.choice(n, min(n, nlist * 40), replace=False)]
+        cents = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(8):
+            assign = np.argmax(sample @ cents.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    v = members.mean(axis=0)
+                    cents[c] = v / (np.linalg.norm(v) + 1e-9)
+        assign = np.empty(n, dtype=np.int64)
+        for s in range(0, n, 8192):
+            assign[s:s + 8192] = np.argmax(mat[s:s + 8192] @ cents.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(nlist)]
+        self._centroids = cents
+        self._ivf_rows = n
+        log.debug("Vector index: built IVF with %d lists over %d rows", nlist, n)
+
+    def _compact(self) -> None:
+        keep = [r for r, mid in enumerate(self._ids[:self._rows]) if mid >= 0]
+        if len(keep) == self._rows:
+            return
+        self._mat = self._mat[keep].copy()
+        self._ids = [self._ids[r] for r in keep]
+        self._pos = {mid: r for r, mid in enumerate(self._ids)}
+        self._rows = len(keep)
+
+    # ── Query ─────────────────────────────────────────────────────────────────
+
+    def search(self, query_vec, k: int = 10, min_score: float = 0.0) -> list[tuple[int, float]]:
+        """Top ``k`` (memory_id, cosine) pairs with score ≥ ``min_score``."""
+        with self._lock:
+            if not self._pos:
+                return []
+            if np is None:
+                scored = [
+                    (sum(a * b for a, b in zip(row, query_vec)), r)
+                    for r, row in enumerate(self._py) if self._ids[r] >= 0
+                ]
+                scored.sort(reverse=True)
+                return [(self._ids[r], s) for s, r in scored[:k] if s >= min_score]
+            q = np.asarray(query_vec, dtype=np.float32)
+            if self._centroids is not None:
+                probe = np.argsort(-(self._centroids @ q))[: self.nprobe]
+                rows = np.concatenate(
+                    [self._lists[c] for c in probe] + [np.arange(self._ivf_rows, self._rows)]
+                )
+                scores = self._mat[rows] @ q
+            else:
+                rows = None
+                scores = self._mat[: self._rows] @ q
+            kk = min(k, len(scores))
+            if kk == 0:
+                return []
+            top = np.argpartition(-scores, kk - 1)[:kk]
+            top = top[np.argsort(-scores[top])]
+            out = []
+            for i in top:
+                s = float(scores[i])
+                if s < min_score:
+                    break
+                row = int(rows[i]) if rows is not None else int(i)
+                mid = self._ids[row]
+                if mid >= 0:
+                    out.append((mid, s))
+            return out
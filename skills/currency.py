@@ -5,6 +5,7 @@ META = {
     "version": "1.0.0",
     "description": "实时汇率换算（open.er-api.com，无需 API Key，每小时缓存）",
     "author": "starbot",
+    "concurrency": "io",
 }
 
 TOOLS = [
@@ -67,7 +68,7 @@ _CURRENCY_NAMES = {
 
 
 def _get_rates(base: str) -> dict:
-    import requests
+    from core import http_client
 
     base = base.upper()
     now = time.time()
@@ -75,7 +76,7 @@ def _get_rates(base: str) -> dict:
         if base in _cache and now - _cache[base]["time"] < _CACHE_TTL:
             return _cache[base]["rates"]
 
-    r = requests.get(
+    r = http_client.get(
         f"https://open.er-api.com/v6/latest/{base}",
         timeout=10,
     )
@@ -7,6 +7,8 @@ Skill format requirements:
 - META dict with name, version, description, author
 - TOOLS list using OpenAI function-calling schema
 - execute(name, args) -> dict handler
+- optional META["concurrency"]: "io" | "cpu" | "screen" | "exclusive" (default),
+  or a {tool_name: class} dict; io/cpu tools may run in parallel with others
 """
 
 META = {
@@ -14,6 +16,7 @@ META = {
     "version": "1.0.0",
     "description": "示例 skill：echo 和 timestamp 两个演示工具",
     "author": "starbot",
+    "concurrency": "io",
 }
 
 TOOLS = [
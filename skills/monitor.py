@@ -173,27 +173,15 @@ def _next_id(prefix: str) -> str:
     return f"{prefix}{_counter:03d}"
 
 
-def _get_proxies():
-    try:
-        from config import config
-        proxy = getattr(config, "PROXY", None)
-        if proxy:
-            return {"http": proxy, "https": proxy}
-    except Exception:
-        pass
-    return None
-
-
 # ── Stock price fetcher ───────────────────────────────────────────────────────
 
 def _fetch_price(symbol: str) -> float | None:
-    import requests
+    from core import http_client
     try:
-        r = requests.get(
+        r = http_client.get(
             f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}",
             params={"interval": "1d", "range": "1d"},
             headers=_YF_HEADERS,
-            proxies=_get_proxies(),
             timeout=10,
         )
         r.raise_for_status()
@@ -211,9 +199,8 @@ def _fetch_price(symbol: str) -> float | None:
 
 def _get_advice(symbol: str, price: float, condition: str, threshold: float, note: str) -> str:
     try:
-        from config import config
         from core.adapter import UniversalLLM
-        llm = UniversalLLM(config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL)
+        llm = UniversalLLM.from_config()
         prompt = (
             f"股票 {symbol} 当前价格 {price:.4f}，刚刚触发了监控条件"
             f"（{condition} 阈值 {threshold}）。"
@@ -358,7 +345,7 @@ def _stock_monitor_thread(mid: str) -> None:
 
 
 def _webpage_monitor_thread(mid: str) -> None:
-    import requests
+    from core import http_client
     from core.notifier import notify
     from html.parser import HTMLParser
     import re
@@ -386,8 +373,7 @@ def _webpage_monitor_thread(mid: str) -> None:
 
     def _page_has_keyword(u: str) -> bool | None:
         try:
-            r = requests.get(u, timeout=15, proxies=_get_proxies(),
-                             headers={"User-Agent": "Mozilla/5.0"})
+            r = http_client.get(u, timeout=15, headers={"User-Agent": "Mozilla/5.0"})
             p = _Strip()
             p.feed(r.text)
             return keyword.lower() in p.text().lower()
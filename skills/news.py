@@ -5,6 +5,7 @@ META = {
     "version": "1.0.0",
     "description": "新闻聚合：按分类获取最新头条、解析任意 RSS 源、HackerNews 热帖",
     "author": "starbot",
+    "concurrency": "io",
 }
 
 TOOLS = [
@@ -146,24 +147,13 @@ _HEADERS = {
 }
 
 
-def _get_proxies():
-    try:
-        from config import config
-        proxy = getattr(config, "PROXY", None)
-        if proxy:
-            return {"http": proxy, "https": proxy}
-    except Exception:
-        pass
-    return None
-
-
 def _parse_rss(url: str, max_items: int = 10) -> list[dict]:
-    import requests
+    from core import http_client
     import xml.etree.ElementTree as ET
     from html import unescape
     import re
 
-    r = requests.get(url, headers=_HEADERS, proxies=_get_proxies(), timeout=10)
+    r = http_client.get(url, headers=_HEADERS, timeout=10)
     r.raise_for_status()
     r.encoding = "utf-8"
 
@@ -303,7 +293,7 @@ def execute(name: str, args: dict) -> dict:
         return {"ok": True, "result": "\n".join(lines)}
 
     if name == "hacker_news":
-        import requests
+        from core import http_client
 
         feed_type = args.get("feed_type", "top")
         max_items = min(int(args.get("max_items", 10)), 30)
@@ -311,9 +301,8 @@ def execute(name: str, args: dict) -> dict:
         endpoint = endpoint_map.get(feed_type, "topstories")
 
         try:
-            r = requests.get(
+            r = http_client.get(
                 f"https://hacker-news.firebaseio.com/v0/{endpoint}.json",
-                proxies=_get_proxies(),
                 timeout=10,
             )
             ids = r.json()[:max_items]
@@ -324,9 +313,8 @@ def execute(name: str, args: dict) -> dict:
 
         def _fetch_story(story_id):
             try:
-                r = requests.get(
+                r = http_client.get(
                     f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json",
-                    proxies=_get_proxies(),
                     timeout=8,
                 )
                 return r.json()
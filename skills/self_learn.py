@@ -101,51 +101,25 @@ TOOLS = [
     },
 ]
 
-import sqlite3
-
-_mem_path: str | None = None
-
-
 def _get_mem():
-    """Lazy-import MemoryStore to avoid circular imports at load time."""
-    from memory.store import MemoryStore
-    return MemoryStore()
+    """Lazy-import the shared MemoryStore to avoid circular imports at load time."""
+    from memory.store import get_store
+    return get_store()
 
 
 def _get_llm():
     """Lazy-init LLM client."""
-    from config import config
     from core.adapter import UniversalLLM
-    return UniversalLLM(config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL)
+    return UniversalLLM.from_config()
 
 
 def _db_stats() -> dict:
-    """Query memory DB for category stats directly."""
-    from memory.store import DB_PATH
-    try:
-        con = sqlite3.connect(DB_PATH, timeout=5)
-        rows = con.execute(
-            "SELECT category, COUNT(*) as n, MAX(created_at) as last "
-            "FROM memories GROUP BY category ORDER BY n DESC"
-        ).fetchall()
-        con.close()
-        return {r[0]: {"count": r[1], "last": r[2]} for r in rows}
-    except Exception:
-        return {}
+    """Category stats from the shared memory store."""
+    return _get_mem().category_stats()
 
 
 def _db_recent(n: int = 10) -> list[dict]:
-    from memory.store import DB_PATH
-    try:
-        con = sqlite3.connect(DB_PATH, timeout=5)
-        rows = con.execute(
-            "SELECT category, content, created_at FROM memories "
-            "ORDER BY created_at DESC LIMIT ?", (n,)
-        ).fetchall()
-        con.close()
-        return [{"category": r[0], "content": r[1], "created_at": r[2]} for r in rows]
-    except Exception:
-        return []
+    return _get_mem().list_by_category("", limit=n)
 
 
 def execute(name: str, args: dict) -> dict:
@@ -267,6 +241,7 @@ def execute(name: str, args: dict) -> dict:
 
         # Parse JSON array from LLM response
         import re, json
+        from collections import Counter
         match = re.search(r"\[.*?\]", raw_result, re.DOTALL)
         if not match:
             return {"ok": False, "result": f"LLM 输出格式异常，无法解析:\n{raw_result[:300]}"}
@@ -280,21 +255,19 @@ def execute(name: str, args: dict) -> dict:
             return {"ok": True, "result": "未从文本中提炼到有效知识点"}
 
         mem = _get_mem()
-        saved = 0
-        skipped = 0
         prefix = f"[{topic}]" + (f" [来源:{source[:50]}]" if source else "")
-        for point in points:
-            if isinstance(point, str) and len(point.strip()) > 10:
-                content = f"{prefix} {point.strip()}"
-                if mem.save(category, content):
-                    saved += 1
-                else:
-                    skipped += 1
+        # Keep every distilled point; only exact repeats are skipped
+        counts = Counter(status for status, _ in mem.save_many([
+            (category, f"{prefix} {point.strip()}")
+            for point in points
+            if isinstance(point, str) and len(point.strip()) > 10
+        ], near_dup="off"))
+        failed = f"，写入失败：{counts['error']} 条" if counts["error"] else ""
 
         lines = [
             f"✅ 知识提炼完成：{topic}",
             f"  提炼知识点：{len(points)} 条",
-            f"  新增入库：{saved} 条，已存在跳过：{skipped} 条",
+            f"  新增入库：{counts['inserted']} 条，已存在跳过：{counts['duplicate']} 条{failed}",
             f"  存入类别：{category}",
             "",
             "📌 提炼内容预览：",
@@ -134,20 +134,9 @@ _HEADERS = {
 }
 
 
-def _get_proxies():
-    try:
-        from config import config
-        proxy = getattr(config, "PROXY", None)
-        if proxy:
-            return {"http": proxy, "https": proxy}
-    except Exception:
-        pass
-    return None
-
-
 def _fetch(url: str, timeout: int = 10) -> str:
-    import requests
-    r = requests.get(url, headers=_HEADERS, proxies=_get_proxies(), timeout=timeout)
+    from core import http_client
+    r = http_client.get(url, headers=_HEADERS, timeout=timeout)
     r.raise_for_status()
     r.encoding = r.apparent_encoding or "utf-8"
     return r.text
@@ -192,9 +181,9 @@ def _extract_text(html: str, max_chars: int = 6000) -> str:
 # ── wiki_lookup ─────────────────────────────────────────────────────────────
 
 def _wiki_summary(query: str, lang: str) -> dict:
-    import requests
+    from core import http_client
     url = f"https://{lang}.wikipedia.org/api/rest_v1/page/summary/{quote(query)}"
-    r = requests.get(url, headers=_HEADERS, proxies=_get_proxies(), timeout=10)
+    r = http_client.get(url, headers=_HEADERS, timeout=10)
     if r.status_code == 404:
         return {}
     r.raise_for_status()
@@ -202,15 +191,14 @@ def _wiki_summary(query: str, lang: str) -> dict:
 
 
 def _wiki_search(query: str, lang: str, limit: int = 5) -> list[dict]:
-    import requests
-    r = requests.get(
+    from core import http_client
+    r = http_client.get(
         f"https://{lang}.wikipedia.org/w/api.php",
         params={
             "action": "query", "list": "search",
             "srsearch": query, "format": "json", "srlimit": limit,
         },
         headers=_HEADERS,
-        proxies=_get_proxies(),
         timeout=10,
     )
     r.raise_for_status()
@@ -218,8 +206,8 @@ def _wiki_search(query: str, lang: str, limit: int = 5) -> list[dict]:
 
 
 def _wiki_full(title: str, lang: str, max_chars: int = 6000) -> str:
-    import requests
-    r = requests.get(
+    from core import http_client
+    r = http_client.get(
         f"https://{lang}.wikipedia.org/w/api.php",
         params={
             "action": "query", "titles": title, "prop": "extracts",
@@ -227,7 +215,6 @@ def _wiki_full(title: str, lang: str, max_chars: int = 6000) -> str:
             "format": "json",
         },
         headers=_HEADERS,
-        proxies=_get_proxies(),
         timeout=10,
     )
     r.raise_for_status()
@@ -315,7 +302,7 @@ def _render_table(rows: list[list[str]], max_rows: int = 30) -> str:
 
 def _crawl(start_url: str, keyword: str, max_pages: int, same_domain: bool) -> list[dict]:
     from collections import deque
-    import requests
+    from core import http_client
 
     domain = urlparse(start_url).netloc
     visited: set[str] = set()
@@ -328,7 +315,7 @@ def _crawl(start_url: str, keyword: str, max_pages: int, same_domain: bool) -> l
             continue
         visited.add(url)
         try:
-            r = requests.get(url, headers=_HEADERS, proxies=_get_proxies(), timeout=8)
+            r = http_client.get(url, headers=_HEADERS, timeout=8)
             html = r.text
         except Exception:
             continue
@@ -5,6 +5,7 @@ META = {
     "version": "1.0.0",
     "description": "股票/ETF/指数行情查询（Yahoo Finance，无需 API Key，支持 A股/港股/美股）",
     "author": "starbot",
+    "concurrency": "io",
 }
 
 TOOLS = [
@@ -109,25 +110,13 @@ _INDICES = [
 ]
 
 
-def _get_proxies() -> dict | None:
-    try:
-        from config import config
-        proxy = getattr(config, "PROXY", None)
-        if proxy:
-            return {"http": proxy, "https": proxy}
-    except Exception:
-        pass
-    return None
-
-
 def _yf_get(url: str, params: dict | None = None) -> dict:
-    import requests
+    from core import http_client
 
-    r = requests.get(
+    r = http_client.get(
         url,
         params=params,
         headers=_HEADERS,
-        proxies=_get_proxies(),
         timeout=10,
     )
     r.raise_for_status()
@@ -5,6 +5,7 @@ META = {
     "version": "1.0.0",
     "description": "多语言翻译与语言检测（MyMemory 免费 API，无需注册，支持 50+ 种语言）",
     "author": "starbot",
+    "concurrency": "io",
 }
 
 TOOLS = [
@@ -118,7 +119,7 @@ _LANG_NAMES = {
 
 def _mymemory_translate(text: str, to_lang: str, from_lang: str = "auto") -> dict:
     """Call MyMemory API. Returns {translated, detected_lang, match}."""
-    import requests
+    from core import http_client
 
     # MyMemory uses | separator for langpair
     if from_lang == "auto":
@@ -127,7 +128,7 @@ def _mymemory_translate(text: str, to_lang: str, from_lang: str = "auto") -> dic
     else:
         langpair = f"{from_lang}|{to_lang}"
 
-    r = requests.get(
+    r = http_client.get(
         "https://api.mymemory.translated.net/get",
         params={"q": text[:500], "langpair": langpair},
         timeout=10,
@@ -188,8 +189,8 @@ def execute(name: str, args: dict) -> dict:
 
         # Use MyMemory to detect by translating a tiny bit
         try:
-            import requests
-            r = requests.get(
+            from core import http_client
+            r = http_client.get(
                 "https://api.mymemory.translated.net/get",
                 params={"q": text[:50], "langpair": "|en"},
                 timeout=10,
@@ -175,6 +175,7 @@ import subprocess
 import sys
 import tempfile
 import time
+from collections import Counter
 
 log = logging.getLogger(__name__)
 
@@ -249,21 +250,20 @@ def _ytdlp_with_cookie_fallback(*args, timeout: int = 120) -> subprocess.Complet
 
 
 def _get_mem():
-    from memory.store import MemoryStore
-    return MemoryStore()
+    from memory.store import get_store
+    return get_store()
 
 
 def _get_llm():
-    from config import config
     from core.adapter import UniversalLLM
-    return UniversalLLM(config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL)
+    return UniversalLLM.from_config()
 
 
 def _is_learned(url: str) -> bool:
     if url in _LEARNED_URLS:
         return True
     mem = _get_mem()
-    results = mem.search(f"视频URL:{url[:60]}", limit=3)
+    results = mem.search(f"视频URL:{url[:60]}", limit=3, count_access=False)
     if any(url[:50] in r.get("content", "") for r in results):
         _LEARNED_URLS.add(url)
         return True
@@ -534,9 +534,8 @@ def _analyze_thumbnail(url: str, info: dict, work_dir: str) -> str:
 
     # Call vision LLM
     try:
-        from config import config
         from core.adapter import UniversalLLM
-        llm = UniversalLLM(config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL)
+        llm = UniversalLLM.from_config()
 
         title = info.get("title", "")
         prompt = (
@@ -582,8 +581,7 @@ def _summarize_video(
 ) -> str:
     """Generate structured notes from transcript + metadata."""
     from core.adapter import UniversalLLM
-    from config import config
-    llm = UniversalLLM(config.LLM_API_KEY, config.LLM_API_BASE, config.LLM_MODEL)
+    llm = UniversalLLM.from_config()
 
     title = info.get("title", "未知视频")
     channel = info.get("uploader") or info.get("channel") or ""
@@ -720,14 +718,14 @@ def _do_learn(url: str, topic: str, lang: str, whisper_model: str,
     url_short = url[:80]
 
     prefix = f"[视频学习][{tag}][{platform}] 《{title}》 作者:{channel} | 视频URL:{url_short} |"
-    saved, skipped = 0, 0
-    for point in points:
-        if isinstance(point, str) and len(point.strip()) > 5:
-            content = f"{prefix} {point.strip()}"
-            if mem.save("knowledge", content):
-                saved += 1
-            else:
-                skipped += 1
+    # Every point of the summary is kept, even if two read alike; only exact
+    # repeats (e.g. learning the same video again) are skipped
+    counts = Counter(status for status, _ in mem.save_many([
+        ("knowledge", f"{prefix} {point.strip()}")
+        for point in points
+        if isinstance(point, str) and len(point.strip()) > 5
+    ], near_dup="off"))
+    failed = f"，写入失败：{counts['error']} 条" if counts["error"] else ""
 
     _LEARNED_URLS.add(url)
 
@@ -735,7 +733,7 @@ def _do_learn(url: str, topic: str, lang: str, whisper_model: str,
         f"\n✅ 学习完成！",
         f"   来源：{transcript_source}",
         f"   提炼要点：{len(points)} 条",
-        f"   新增记忆：{saved} 条（已存在跳过：{skipped} 条）",
+        f"   新增记忆：{counts['inserted']} 条（已存在跳过：{counts['duplicate']} 条{failed}）",
         f"   学习标签：{tag}",
         "",
         "📌 要点预览：",
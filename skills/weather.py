@@ -5,6 +5,7 @@ META = {
     "version": "1.0.0",
     "description": "天气查询（wttr.in，无需 API Key）",
     "author": "starbot",
+    "concurrency": "io",
 }
 
 TOOLS = [
@@ -52,14 +53,14 @@ def execute(name: str, args: dict) -> dict:
     if name != "get_weather":
         return {"ok": False, "result": f"Unknown tool: {name}"}
 
-    import requests
+    from core import http_client
     from urllib.parse import quote
 
     city = args["city"]
     days = max(1, min(int(args.get("days", 1)), 3))
 
     try:
-        r = requests.get(
+        r = http_client.get(
             f"https://wttr.in/{quote(city)}?format=j1",
             headers={"User-Agent": "curl/8.0"},
             timeout=10,
@@ -93,3 +93,28 @@ class TestUniversalLLMChat:
             llm = UniversalLLM("key", "https://api.example.com/v1", "model")
         with pytest.raises(Exception, match="API error"):
             llm.chat("Will this fail?")
+
+
+class TestUniversalLLMAsync:
+    def test_async_clients_share_one_http_pool(self):
+        with patch("core.adapter.OpenAI"), patch("core.adapter.AsyncOpenAI") as MockAsync, \
+             patch("core.adapter._async_http", None):
+            from core.adapter import UniversalLLM
+            a = UniversalLLM("k", "https://a.com/v1", "m")
+            b = UniversalLLM("k", "https://b.com/v1", "m")
+            assert a.aclient is a.aclient
+            b.aclient
+        pools = [c[1]["http_client"] for c in MockAsync.call_args_list]
+        assert len(pools) == 2 and pools[0] is pools[1]
+
+    def test_achat_awaits_async_client(self):
+        import asyncio
+        from unittest.mock import AsyncMock
+        mock_aclient = MagicMock()
+        mock_resp = MagicMock()
+        mock_resp.choices[0].message.content = "async hi"
+        mock_aclient.chat.completions.create = AsyncMock(return_value=mock_resp)
+        with patch("core.adapter.OpenAI"), patch("core.adapter.AsyncOpenAI", return_value=mock_aclient):
+            from core.adapter import UniversalLLM
+            llm = UniversalLLM("key", "https://api.example.com/v1", "test-model")
+            assert asyncio.run(llm.achat("hi")) == "async hi"
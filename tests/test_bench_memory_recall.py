@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import time
+
+from tools.bench_memory_recall import make_corpus, run
+
+
+def test_corpus_is_deterministic_and_mixed(monkeypatch):
+    rows = make_corpus(50)
+    # created_at must not depend on the wall clock
+    monkeypatch.setattr(time, "time", lambda: 0.0)
+    assert rows == make_corpus(50)
+    assert max(r[3] for r in rows) < "2026-01-01"
+    assert any(any("一" <= ch <= "鿿" for ch in r[1]) for r in rows)
+    assert all(1 <= r[2] <= 10 for r in rows)
+
+
+def test_small_run_reports_both_paths():
+    report = run(rows=300, queries=5, limit=5)
+    assert report["rows"] == 300
+    for key in ("legacy", "search_multi"):
+        assert set(report[key]) == {"p50_ms", "p99_ms", "mean_ms"}
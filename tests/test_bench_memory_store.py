@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import json
+
+from tools.bench_memory_store import OPS, compare, main, run
+
+
+def _report(rows: int, **p50) -> dict:
+    return {"rows": rows, "ops": {k: {"p50_ms": v, "p99_ms": v, "mean_ms": v, "n": 1} for k, v in p50.items()}}
+
+
+def test_small_run_reports_every_operation():
+    report = run(rows=200, queries=5, saves=5, migrations=1)
+    assert report["rows"] == 200
+    assert set(report["ops"]) == set(OPS)
+    assert report["ops"]["save"]["n"] == 5
+    assert all(s["p50_ms"] > 0 for s in report["ops"].values())
+
+
+def test_compare_flags_only_slowdowns_beyond_tolerance():
+    baseline = [_report(1000, save=1.0, search_multi=2.0), _report(10_000, save=1.0)]
+    current = [_report(1000, save=1.2, search_multi=3.0), _report(100_000, save=50.0)]
+    problems = compare(baseline, current, max_regression=0.25)
+    assert len(problems) == 1 and "search_multi" in problems[0]
+
+
+def test_main_writes_json_and_fails_on_regression(tmp_path):
+    out = tmp_path / "now.json"
+    baseline = tmp_path / "old.json"
+    baseline.write_text(json.dumps({"results": [_report(150, list_by_category=1e-6)]}), encoding="utf-8")
+    argv = ["--rows", "150", "--queries", "3", "--saves", "2", "--migrations", "1", "--json", str(out)]
+    assert main(argv + ["--baseline", str(baseline)]) == 1
+    data = json.loads(out.read_text(encoding="utf-8"))
+    assert data["results"][0]["rows"] == 150 and data["sqlite"]
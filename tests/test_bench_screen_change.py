@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import json
+
+from tools.bench_screen_change import SCENARIOS, main, make_sequence, run
+
+
+def test_sequences_have_requested_frames():
+    seq = make_sequence("video", 3, 160, 90)
+    assert len(seq) == 3 and seq[0].size == (160, 90) and seq[0].mode == "L"
+
+
+def test_small_run_reports_every_scenario():
+    report = run(frames=4, size=(320, 180))
+    assert set(report["scenarios"]) == set(SCENARIOS)
+    corners = report["scenarios"]["corners"]
+    # The bounding box of two tiny corner changes spans the whole frame
+    assert corners["legacy"]["mean_ratio"] == 1.0 and corners["legacy"]["key_frames"] == 3
+    assert corners["pil"]["mean_ratio"] < 0.01 and corners["pil"]["key_frames"] == 0
+    assert report["scenarios"]["video"]["pil"]["key_frames"] == 3
+    assert report["scenarios"]["static"]["pil"]["key_frames"] == 0
+
+
+def test_main_writes_json(tmp_path):
+    out = tmp_path / "screen.json"
+    assert main(["--size", "160x90", "--frames", "3", "--json", str(out)]) == 0
+    data = json.loads(out.read_text(encoding="utf-8"))
+    assert data["results"][0]["size"] == "160x90"
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from actions import template_match as tm
+from tools.bench_template_match import PATHS, SCALES, main, make_icons, run
+
+pytestmark = pytest.mark.skipif(tm.np is None, reason="numpy not installed")
+
+
+def test_icons_are_distinct():
+    icons = make_icons()
+    assert len(icons) == 4 and len({i.tobytes() for i in icons}) == 4
+
+
+def test_small_run_reports_every_path():
+    report = run(trials=2, size=(320, 240))
+    assert set(report["scales"]) == {str(s) for s in SCALES}
+    for per in report["scales"].values():
+        assert set(per) == set(PATHS)
+        assert per["warm"]["hit_rate"] == 1.0 and per["roi"]["hit_rate"] == 1.0
+    assert report["scales"]["1.5"]["legacy"]["hit_rate"] == 0.0
+
+
+def test_main_writes_json(tmp_path):
+    out = tmp_path / "tm.json"
+    assert main(["--size", "320x240", "--trials", "1", "--json", str(out)]) == 0
+    data = json.loads(out.read_text(encoding="utf-8"))
+    assert data["results"][0]["size"] == "320x240"
@@ -23,7 +23,7 @@ def make_brain(prefs=None, relevant=None, use_native_tools=True):
     llm = make_mock_llm()
     mem = make_mock_memory(prefs=prefs, relevant=relevant)
 
-    with patch("core.brain.MemoryStore", return_value=mem), \
+    with patch("core.brain.get_store", return_value=mem), \
          patch("core.brain.TOOLS_SCHEMA", []):
         from core.brain import Brain
         brain = Brain(llm=llm, use_native_tools=use_native_tools, tools_schema=[])
@@ -40,11 +40,19 @@ class TestBrainInit:
         brain = make_brain()
         assert brain.messages[0]["role"] == "system"
 
-    def test_system_message_appends_preferences(self):
+    def test_preferences_sent_after_stable_system_prompt(self):
         brain = make_brain(prefs=["I prefer dark mode", "Use Python 3.11"])
-        system_content = brain.messages[0]["content"]
-        assert "I prefer dark mode" in system_content
-        assert "Use Python 3.11" in system_content
+        assert "I prefer dark mode" not in brain.messages[0]["content"]
+        request = brain._request_messages()
+        assert request[0] is brain.messages[0]
+        assert request[1]["role"] == "system"
+        assert "I prefer dark mode" in request[1]["content"]
+        assert "Use Python 3.11" in request[1]["content"]
+
+    def test_system_prompt_identical_across_sessions(self):
+        a = make_brain(prefs=["I prefer dark mode"])
+        b = make_brain(prefs=[])
+        assert a.messages[0]["content"] == b.messages[0]["content"]
 
     def test_no_preferences_no_preference_section(self):
         brain = make_brain(prefs=[])
@@ -204,6 +212,34 @@ class TestBrainCompressContext:
         # After compression, total tokens should be reduced
         assert brain._estimate_tokens() < 25 * (1000 + 500)
 
+    def test_compress_enforces_limit_on_a_single_tool_loop(self):
+        from core.brain import _TOKEN_LIMIT
+        brain = make_brain()
+        brain.messages = [brain.messages[0], {"role": "user", "content": "research the topic"}]
+        for i in range(20):
+            brain.messages.append({"role": "assistant", "tool_calls": [{
+                "id": f"c{i}", "type": "function",
+                "function": {"name": "type_text", "arguments": json.dumps({"text": "Z" * 8000})},
+            }]})
+            brain.messages.append({"role": "tool", "tool_call_id": f"c{i}", "content": "R" * 8000})
+        assert brain._estimate_tokens() > _TOKEN_LIMIT
+        brain._compress_context()
+        assert brain._estimate_tokens() < _TOKEN_LIMIT
+        kept = brain.messages[2:]
+        assert kept[0]["role"] == "assistant"
+        ids = {tc["id"] for m in kept for tc in m.get("tool_calls") or []}
+        assert all(m["tool_call_id"] in ids for m in kept if m["role"] == "tool")
+
+    def test_compress_folds_dropped_turns_into_summary(self):
+        from core.compactor import is_summary_message
+        brain = make_brain()
+        self._make_large_messages(brain, n=30, chars_per_msg=6000)
+        brain.messages[1]["content"] = "plan: step one " + "X" * 6000
+        brain._compress_context()
+        assert brain.messages[0]["role"] == "system"
+        assert is_summary_message(brain.messages[1])
+        assert "plan: step one" in brain.messages[1]["content"]
+
 
 # ---------------------------------------------------------------------------
 # _call_text() - text fallback mode
@@ -300,3 +336,131 @@ class TestBrainCallNative:
         last = brain.messages[-1]
         assert last["role"] == "tool"
         assert last["tool_call_id"] == "call_xyz"
+
+
+class TestBrainUsage:
+    def test_cached_prompt_tokens_are_recorded(self):
+        brain = make_brain()
+        usage = MagicMock()
+        usage.prompt_tokens = 1000
+        usage.completion_tokens = 50
+        usage.prompt_tokens_details.cached_tokens = 800
+        brain._record_usage(usage)
+        assert brain.usage == {"input": 1000, "output": 50, "calls": 1, "cached": 800}
+
+    def test_deepseek_cache_hit_field_is_recorded(self):
+        brain = make_brain()
+        usage = MagicMock(spec=["prompt_tokens", "completion_tokens", "prompt_cache_hit_tokens"])
+        usage.prompt_tokens = 600
+        usage.completion_tokens = 10
+        usage.prompt_cache_hit_tokens = 512
+        brain._record_usage(usage)
+        assert brain.usage["cached"] == 512
+
+
+class TestBrainAsyncStream:
+    @staticmethod
+    def _chunk(content=None, tool_calls=None, usage=None):
+        from types import SimpleNamespace
+        choices = [] if content is None and tool_calls is None else [
+            SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=tool_calls))
+        ]
+        return SimpleNamespace(choices=choices, usage=usage)
+
+    class _FakeStream:
+        def __init__(self, chunks, hang=False):
+            self.chunks = list(chunks)
+            self.hang = hang
+            self.closed = False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            import asyncio
+            if self.chunks:
+                return self.chunks.pop(0)
+            if self.hang:
+                await asyncio.sleep(3600)
+            raise StopAsyncIteration
+
+        async def close(self):
+            self.closed = True
+
+    def _with_stream(self, brain, stream):
+        from unittest.mock import AsyncMock
+        brain.llm.aclient.chat.completions.create = AsyncMock(return_value=stream)
+        return stream
+
+    def test_text_deltas_reach_on_chunk_and_history(self):
+        import asyncio
+        brain = make_brain()
+        self._with_stream(brain, self._FakeStream([self._chunk("Hel"), self._chunk("lo")]))
+        seen = []
+        result = asyncio.run(brain._acall_native_stream(on_chunk=seen.append))
+        assert result == {"text": "Hello"}
+        assert seen == ["Hel", "lo"]
+        assert brain.messages[-1] == {"role": "assistant", "content": "Hello"}
+
+    def test_tool_call_deltas_are_assembled(self):
+        import asyncio
+        from types import SimpleNamespace
+        brain = make_brain()
+
+        def tc(name=None, args=None, id=None):
+            return SimpleNamespace(index=0, id=id, function=SimpleNamespace(name=name, arguments=args))
+
+        self._with_stream(brain, self._FakeStream([
+            self._chunk(tool_calls=[tc("fetch_page", '{"url":', "call_1")]),
+            self._chunk(tool_calls=[tc(args=' "x"}')]),
+        ]))
+        cleared = []
+        result = asyncio.run(brain._acall_native_stream(on_clear=lambda: cleared.append(1)))
+        assert result == {"name": "fetch_page", "arguments": '{"url": "x"}', "id": "call_1"}
+        assert cleared == [1]
+
+    def test_cancel_closes_http_stream(self):
+        import asyncio
+        brain = make_brain()
+        stream = self._with_stream(brain, self._FakeStream([self._chunk("partial")], hang=True))
+
+        async def run():
+            seen = []
+            task = asyncio.create_task(brain._acall_native_stream(on_chunk=seen.append))
+            while not seen:
+                await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        assert stream.closed is True
+        assert brain.messages[-1]["role"] != "assistant"
+
+
+class TestBrainProcessAction:
+    def test_parallel_results_fed_in_call_order(self):
+        brain = make_brain()
+        actions = [
+            {"id": "a", "name": "fetch_page", "arguments": "{}"},
+            {"id": "b", "name": "web_search", "arguments": "{}"},
+        ]
+        outs = [{"ok": True, "result": "page"}, {"ok": True, "result": "hits"}]
+        with patch("core.brain.execute_many", return_value=outs) as em:
+            merged = brain._process_action(actions)
+        em.assert_called_once_with(actions)
+        assert [m["tool_call_id"] for m in brain.messages if m["role"] == "tool"] == ["a", "b"]
+        assert merged["results"] == outs
+
+    def test_denied_tool_is_not_executed(self):
+        brain = make_brain()
+        brain._confirm_callback = lambda name, args: False
+        actions = [
+            {"id": "a", "name": "run_command", "arguments": "{}"},
+            {"id": "b", "name": "fetch_page", "arguments": "{}"},
+        ]
+        with patch("core.brain.execute_many", return_value=[{"ok": True, "result": "page"}]) as em:
+            merged = brain._process_action(actions)
+        em.assert_called_once_with([actions[1]])
+        assert [m["tool_call_id"] for m in brain.messages if m["role"] == "tool"] == ["a", "b"]
+        assert merged["ok"] is False
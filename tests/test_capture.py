@@ -0,0 +1,263 @@
+"""Tests for actions/capture.py (capture backends, dirty rectangles, screenshot rendering)."""
+from unittest.mock import patch
+
+import pytest
+
+from PIL import Image, ImageDraw
+
+from actions import capture, executor
+from actions.capture import FrameBuffer, ScreenCapture, dirty_rects, measure_change, render_screenshot
+
+
+def _draw(fb: FrameBuffer, box, color=(255, 255, 255)):
+    ImageDraw.Draw(fb.image).rectangle(box, fill=color)
+
+
+class TestDirtyRects:
+    def test_identical_frames_have_no_dirty_rects(self):
+        img = Image.new("RGB", (256, 128), (10, 20, 30))
+        assert dirty_rects(img, img.copy()) == []
+
+    def test_single_pixel_marks_its_tile(self):
+        a = Image.new("RGB", (256, 128))
+        b = a.copy()
+        b.putpixel((70, 40), (255, 255, 255))
+        assert dirty_rects(a, b, tile=32) == [(64, 32, 32, 32)]
+
+    def test_changes_below_threshold_are_ignored(self):
+        a = Image.new("RGB", (128, 128), (100, 100, 100))
+        b = Image.new("RGB", (128, 128), (105, 105, 105))
+        assert dirty_rects(a, b, threshold=10) == []
+
+    def test_tiles_merge_into_rectangles(self):
+        fb = FrameBuffer(256, 256)
+        before = fb.grab()
+        _draw(fb, (40, 40, 100, 120))    # tiles x 32..128, y 32..128
+        _draw(fb, (200, 200, 210, 210))
+        assert dirty_rects(before, fb.grab(), tile=32) == [(32, 32, 96, 96), (192, 192, 32, 32)]
+
+    def test_size_change_is_one_full_rect(self):
+        assert dirty_rects(Image.new("RGB", (64, 64)), Image.new("RGB", (80, 60))) == [(0, 0, 80, 60)]
+
+    def test_odd_tile_sizes(self):
+        a = Image.new("RGB", (100, 100))
+        b = a.copy()
+        b.putpixel((99, 99), (255, 0, 0))
+        assert dirty_rects(a, b, tile=25) == [(75, 75, 25, 25)]
+        assert dirty_rects(a, b, tile=24) == [(96, 96, 4, 4)]
+
+
+class TestMeasureChange:
+    def _corners(self):
+        a = Image.new("L", (200, 100))
+        b = a.copy()
+        ImageDraw.Draw(b).rectangle((0, 0, 3, 3), fill=255)          # 16 px top-left
+        ImageDraw.Draw(b).rectangle((196, 96, 199, 99), fill=255)    # 16 px bottom-right
+        return a, b
+
+    def test_ratio_counts_pixels_not_bounding_box(self):
+        a, b = self._corners()
+        change = measure_change(a, b, tile=20)
+        assert change.ratio == 32 / 20000
+        assert (change.cols, change.rows) == (10, 5)
+        assert change.tiles == [(0, 0), (9, 4)]
+        assert change.tile_ratio == 2 / 50
+
+    def test_min_pixels_drops_sparse_cells(self):
+        a, b = self._corners()
+        b.putpixel((100, 50), 255)
+        assert len(measure_change(a, b, tile=20).tiles) == 3
+        assert measure_change(a, b, tile=20, min_pixels=4).tiles == [(0, 0), (9, 4)]
+
+    def test_pil_fallback_matches_numpy(self):
+        a, b = self._corners()
+        b.putpixel((57, 33), 200)
+        with_np = measure_change(a, b, tile=16, min_pixels=1)
+        with patch.object(capture, "np", None):
+            without = measure_change(a, b, tile=16, min_pixels=1)
+            assert measure_change(a, a.copy()).ratio == 0.0
+        assert (without.ratio, without.mask) == (with_np.ratio, with_np.mask)
+
+    def test_sizes_must_match(self):
+        with pytest.raises(ValueError):
+            measure_change(Image.new("L", (10, 10)), Image.new("L", (12, 10)))
+
+
+class TestScreenCapture:
+    def test_first_grab_is_all_new_then_diffs(self):
+        fb = FrameBuffer(128, 128)
+        cap = ScreenCapture(fb, tile=32)
+        first = cap.grab()
+        assert first.dirty is None and first.changed and first.dirty_ratio() == 1.0
+        assert not cap.grab().changed
+        _draw(fb, (0, 0, 10, 10))
+        frame = cap.grab()
+        assert frame.dirty == [(0, 0, 32, 32)]
+        assert frame.dirty_bbox() == (0, 0, 32, 32)
+        assert frame.dirty_ratio() == 1 / 16
+
+    def test_since_compares_against_given_frame(self):
+        fb = FrameBuffer(128, 128)
+        cap = ScreenCapture(fb, tile=32)
+        base = cap.grab()
+        _draw(fb, (0, 0, 10, 10))
+        cap.grab()                                  # moves the default baseline
+        assert not cap.grab().changed
+        assert cap.grab(since=base).dirty == [(0, 0, 32, 32)]
+
+    def test_region_grabs_leave_the_baseline(self):
+        fb = FrameBuffer(128, 128)
+        cap = ScreenCapture(fb, tile=32)
+        cap.grab()
+        _draw(fb, (100, 100, 120, 120))
+        region = cap.grab((96, 96, 32, 32))
+        assert region.image.size == (32, 32) and region.region == (96, 96, 32, 32)
+        assert cap.grab().dirty == [(96, 96, 32, 32)]
+
+    def test_reset_forgets_baseline(self):
+        cap = ScreenCapture(FrameBuffer(64, 64))
+        cap.grab()
+        cap.grab(baseline="shot")
+        cap.reset()
+        assert cap.grab().dirty is None
+        assert cap.grab(baseline="shot").dirty is None
+
+    def test_named_baseline_ignores_other_grabs(self):
+        fb = FrameBuffer(128, 128)
+        cap = ScreenCapture(fb, tile=32)
+        assert cap.grab(baseline="shot").dirty is None
+        _draw(fb, (0, 0, 10, 10))
+        assert cap.grab().dirty == [(0, 0, 32, 32)]     # e.g. an OCR grab
+        assert cap.latest(max_age=10) is not None
+        assert cap.grab(baseline="shot").dirty == [(0, 0, 32, 32)]
+        assert cap.grab(baseline="shot").dirty == []
+
+
+class TestBackends:
+    def test_named_backend(self):
+        assert isinstance(capture.create_backend("framebuffer"), FrameBuffer)
+
+    def test_unknown_name_falls_back_to_pyautogui(self):
+        assert isinstance(capture.create_backend("nope"), capture.PyAutoGuiBackend)
+
+
+class TestRendering:
+    def test_overlay_is_cached_per_size(self):
+        capture.grid_overlay.cache_clear()
+        a = capture.grid_overlay((960, 540), (1920, 1080))
+        b = capture.grid_overlay((960, 540), (1920, 1080))
+        assert a is b and a.mode == "RGBA"
+        assert capture.grid_overlay.cache_info().hits == 1
+
+    def test_render_screenshot_downscales_and_writes_jpeg(self, tmp_path):
+        src = Image.new("RGB", (1920, 1080), (0, 0, 255))
+        path = tmp_path / "screen.jpg"
+        size = render_screenshot(src, str(path), screen_size=(1920, 1080), max_width=960)
+        assert size == (960, 540)
+        with Image.open(path) as out:
+            assert out.format == "JPEG" and out.size == (960, 540)
+            r, g, b = out.getpixel((0, 300))            # on the x=0 grid line
+            assert r > 100 and r > g            # JPEG blurs the 1px line, but red shows
+        assert src.getpixel((0, 300)) == (0, 0, 255)    # source left untouched
+
+
+class TestScreenshotTool:
+    def _run(self, tmp_path, cap, **args):
+        with patch.object(executor, "get_capture", return_value=cap), \
+             patch.object(executor, "SCREENSHOT_PATH", str(tmp_path / "screen.jpg")), \
+             patch.object(executor.pyautogui, "size", return_value=(256, 256)):
+            return executor._tool_screenshot(args)
+
+    def test_reports_changed_areas(self, tmp_path):
+        fb = FrameBuffer(256, 256)
+        cap = ScreenCapture(fb, tile=32)
+        first = self._run(tmp_path, cap)
+        assert first["ok"] and "changed" not in first
+        _draw(fb, (0, 0, 40, 10))
+        second = self._run(tmp_path, cap)
+        assert second["changed"] == [[0, 0, 64, 32]]
+        assert second["image"].endswith("screen.jpg")
+
+    def test_changed_only_sends_the_changed_area(self, tmp_path):
+        fb = FrameBuffer(256, 256)
+        cap = ScreenCapture(fb, tile=32)
+        self._run(tmp_path, cap)
+        unchanged = self._run(tmp_path, cap, changed_only=True)
+        assert unchanged["changed"] == [] and "image" not in unchanged
+        _draw(fb, (200, 200, 220, 220))
+        res = self._run(tmp_path, cap, changed_only=True)
+        assert res["changed"] == [[192, 192, 32, 32]]
+        assert res["image"].endswith("screen_changed.jpg")
+        assert "192,192" in res["result"]
+
+    def test_other_screen_tools_do_not_hide_changes(self, tmp_path):
+        fb = FrameBuffer(256, 256)
+        cap = ScreenCapture(fb, tile=32)
+        self._run(tmp_path, cap)
+        _draw(fb, (200, 200, 220, 220))
+        cap.grab()                                  # read_screen_text / wait_for_text
+        cap.latest(max_age=10)                      # find_image
+        res = self._run(tmp_path, cap, changed_only=True)
+        assert res["changed"] == [[192, 192, 32, 32]]
+
+
+class _Clock:
+    """Stands in for the time module: sleep() advances time() instantly."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class _Scripted(FrameBuffer):
+    """FrameBuffer that applies the next scripted drawing before each grab."""
+
+    def __init__(self, steps):
+        super().__init__(960, 540)
+        self.steps = list(steps)
+
+    def grab(self, region=None):
+        if self.steps:
+            step = self.steps.pop(0)
+            if step:
+                _draw(self, *step)
+        return super().grab(region)
+
+
+class TestWatchScreen:
+    def test_key_frames_by_changed_cells(self, tmp_path):
+        steps = [
+            None,
+            ((0, 0, 3, 3),),                        # tiny change in one corner
+            ((956, 536, 959, 539),),                # and the other: still not a key frame
+            ((100, 100, 600, 300), (0, 0, 255)),    # a large panel appears
+            None,
+        ]
+        cap = ScreenCapture(_Scripted(steps))
+        with patch.object(executor, "get_capture", return_value=cap), \
+             patch.object(executor, "SCREENSHOT_PATH", str(tmp_path / "screen.jpg")), \
+             patch.object(executor, "time", _Clock()):
+            res = executor._tool_watch_screen({"duration": 5, "interval": 1})
+        assert res["ok"]
+        assert [f["t"] for f in res["frames"]] == [0.0, 3.0]
+        assert res["frames"][1]["tiles"] > 100 and 0.1 < res["frames"][1]["changed"] < 0.3
+        assert res["image"].endswith("screen_watch.jpg")
+        with Image.open(res["image"]) as sheet:
+            assert sheet.width == 960
+        assert not (tmp_path / "frames").exists()
+
+    def test_only_the_newest_frames_are_kept(self, tmp_path):
+        colors = [(i * 20,) * 3 for i in range(12)]
+        cap = ScreenCapture(_Scripted([((0, 0, 959, 539), c) for c in colors]))
+        with patch.object(executor, "get_capture", return_value=cap), \
+             patch.object(executor, "SCREENSHOT_PATH", str(tmp_path / "screen.jpg")), \
+             patch.object(executor, "_WATCH_MAX_FRAMES", 3), \
+             patch.object(executor, "time", _Clock()):
+            res = executor._tool_watch_screen({"duration": 12, "interval": 1})
+        assert len(res["frames"]) == 12
+        assert "last 3" in res["result"]
@@ -0,0 +1,131 @@
+"""Tests for core/compactor.py - ContextCompactor."""
+import json
+import time
+from unittest.mock import MagicMock
+
+from core.compactor import SUMMARY_TAG, ContextCompactor, is_summary_message
+
+
+def _history(turns=10):
+    msgs = [{"role": "system", "content": "sys"}]
+    for i in range(turns):
+        msgs.append({"role": "user", "content": f"question {i}"})
+        msgs.append({
+            "role": "assistant",
+            "tool_calls": [{"id": f"c{i}", "type": "function",
+                            "function": {"name": "fetch_page", "arguments": json.dumps({"url": f"https://x/{i}"})}}],
+        })
+        msgs.append({"role": "tool", "tool_call_id": f"c{i}",
+                     "content": json.dumps({"ok": True, "result": f"finding {i}"})})
+        msgs.append({"role": "assistant", "content": f"answer {i}"})
+    return msgs
+
+
+def _assert_pairs_intact(msgs):
+    open_ids: set[str] = set()
+    for m in msgs:
+        if m.get("role") == "assistant":
+            open_ids |= {tc["id"] for tc in m.get("tool_calls") or []}
+        if m.get("role") == "tool":
+            assert m["tool_call_id"] in open_ids
+
+
+def _wait_idle(comp, timeout=2.0):
+    end = time.time() + timeout
+    while comp._thread and comp._thread.is_alive() and time.time() < end:
+        time.sleep(0.01)
+
+
+class TestSplitPoint:
+    def test_cut_never_lands_on_a_tool_result(self):
+        msgs = _history()
+        for keep in range(3, 20):
+            cut = ContextCompactor(keep_tail=keep).split_point(msgs)
+            assert cut > 1 and msgs[cut]["role"] in ("user", "assistant")
+            _assert_pairs_intact(msgs[cut:])
+
+    def test_tool_loop_without_user_turns_is_cut_before_an_assistant(self):
+        msgs = [{"role": "system", "content": "sys"}, {"role": "user", "content": "research x"}]
+        for m in _history(10)[1:]:
+            if m["role"] != "user":
+                msgs.append(m)
+        cut = ContextCompactor(keep_tail=6).split_point(msgs)
+        assert cut > 2 and msgs[cut]["role"] == "assistant"
+        _assert_pairs_intact(msgs[cut:])
+
+    def test_short_history_has_nothing_to_evict(self):
+        assert ContextCompactor(keep_tail=12).split_point(_history(2)) == 0
+
+
+class TestCompactNow:
+    def test_folds_old_turns_into_summary(self):
+        msgs = _history()
+        out = ContextCompactor(keep_tail=6).compact_now(msgs)
+        assert out[0]["role"] == "system"
+        assert is_summary_message(out[1])
+        assert "finding 0" in out[1]["content"]
+        assert "fetch_page" in out[1]["content"]
+        assert len(out) < len(msgs)
+        _assert_pairs_intact(out)
+
+    def test_summary_does_not_add_a_second_user_turn(self):
+        msgs = _history()
+        for keep in range(4, 20):
+            out = ContextCompactor(keep_tail=keep).compact_now(msgs)
+            assert out[1]["role"] == "system"
+            roles = [m["role"] for m in out]
+            assert not any(a == b == "user" for a, b in zip(roles, roles[1:]))
+
+    def test_user_role_summary_from_old_sessions_is_recognised(self):
+        old = [{"role": "system", "content": "sys"}, {"role": "user", "content": f"{SUMMARY_TAG}\nfinding old"}]
+        out = ContextCompactor(keep_tail=6).compact_now(old + _history()[1:])
+        assert sum(1 for m in out if is_summary_message(m)) == 1
+        assert "finding old" in out[1]["content"]
+
+    def test_previous_summary_is_rolled_forward(self):
+        comp = ContextCompactor(keep_tail=6)
+        once = comp.compact_now(_history())
+        once.extend(_history(6)[1:])
+        twice = comp.compact_now(once)
+        assert sum(1 for m in twice if is_summary_message(m)) == 1
+        assert "finding 0" in twice[1]["content"]
+
+    def test_summary_is_bounded(self):
+        comp = ContextCompactor(keep_tail=6, max_summary_chars=300)
+        out = comp.compact_now(_history(40))
+        assert len(out[1]["content"]) <= 300 + len(SUMMARY_TAG) + 2
+
+
+class TestBackgroundCompaction:
+    def test_llm_summary_applied_on_later_step(self):
+        llm = MagicMock()
+        llm.chat.return_value = "plan: fetch pages; found 10 facts"
+        comp = ContextCompactor(keep_tail=6)
+        msgs = _history()
+        assert comp.start(msgs, llm=llm) is True
+        _wait_idle(comp)
+        out = comp.apply(msgs)
+        assert out is not None
+        assert out[1]["content"].endswith("plan: fetch pages; found 10 facts")
+        _assert_pairs_intact(out)
+
+    def test_llm_failure_falls_back_to_extractive(self):
+        llm = MagicMock()
+        llm.chat.side_effect = RuntimeError("down")
+        comp = ContextCompactor(keep_tail=6)
+        msgs = _history()
+        comp.start(msgs, llm=llm)
+        _wait_idle(comp)
+        out = comp.apply(msgs)
+        assert "finding 0" in out[1]["content"]
+
+    def test_stale_result_is_discarded(self):
+        comp = ContextCompactor(keep_tail=6)
+        msgs = _history()
+        comp.start(msgs)
+        _wait_idle(comp)
+        replaced = [msgs[0]] + [dict(m) for m in msgs[1:]]
+        assert comp.apply(replaced) is None
+
+    def test_apply_without_pending_returns_none(self):
+        assert ContextCompactor().apply(_history()) is None
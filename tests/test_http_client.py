@@ -0,0 +1,97 @@
+"""Tests for core/http_client.py - shared pooled HTTP client."""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from core import http_client
+from core.http_client import HttpClient
+
+
+def _resp(status=200, headers=None):
+    return SimpleNamespace(status_code=status, headers=headers or {}, close=lambda: None, text="ok")
+
+
+class _FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        out = self.outcomes.pop(0)
+        if isinstance(out, Exception):
+            raise out
+        return out
+
+
+def _client(outcomes, **kw):
+    c = HttpClient(backoff=0, proxy="", **kw)
+    c._session = _FakeSession(outcomes)
+    return c
+
+
+def test_client_is_process_wide():
+    assert http_client.get_client() is http_client.get_client()
+
+
+def test_retries_connection_errors_then_succeeds():
+    c = _client([requests.ConnectionError("reset"), _resp(200)], retries=2)
+    assert c.get("https://a.test/x").status_code == 200
+    assert len(c._session.calls) == 2
+
+
+def test_raises_after_retries_exhausted():
+    c = _client([requests.ConnectionError("down")] * 3, retries=2)
+    with pytest.raises(requests.ConnectionError):
+        c.get("https://a.test/x")
+    assert len(c._session.calls) == 3
+
+
+def test_retryable_status_only_for_idempotent_methods():
+    c = _client([_resp(503), _resp(200)], retries=1)
+    assert c.get("https://a.test").status_code == 200
+    c = _client([_resp(503)], retries=1)
+    assert c.post("https://a.test").status_code == 503
+    assert len(c._session.calls) == 1
+
+
+def test_post_read_timeout_is_not_retried():
+    c = _client([requests.ReadTimeout("slow"), _resp(200)], retries=2)
+    with pytest.raises(requests.ReadTimeout):
+        c.post("https://a.test")
+
+
+def test_proxy_and_default_timeout_applied():
+    c = _client([_resp(200)])
+    c._proxy = "http://127.0.0.1:7890"
+    c.get("https://a.test")
+    kwargs = c._session.calls[0][2]
+    assert kwargs["proxies"] == {"http": "http://127.0.0.1:7890", "https": "http://127.0.0.1:7890"}
+    assert kwargs["timeout"] == c.timeout
+
+
+def test_per_host_concurrency_limit():
+    active = {"n": 0, "peak": 0}
+    lock = threading.Lock()
+
+    class _SlowSession:
+        def request(self, method, url, **kwargs):
+            with lock:
+                active["n"] += 1
+                active["peak"] = max(active["peak"], active["n"])
+            time.sleep(0.03)
+            with lock:
+                active["n"] -= 1
+            return _resp(200)
+
+    c = HttpClient(per_host_limit=2, proxy="")
+    c._session = _SlowSession()
+    threads = [threading.Thread(target=c.get, args=("https://same.test/",)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert active["peak"] == 2
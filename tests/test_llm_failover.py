@@ -0,0 +1,318 @@
+"""Tests for core/llm_failover.py - endpoint failover, circuit breaker and hedging."""
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from core import llm_failover
+from core.llm_failover import (
+    AsyncFailoverClient,
+    Endpoint,
+    EndpointHealth,
+    FailoverClient,
+    LLMUnavailableError,
+    is_retryable,
+)
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class _FakeStream:
+    def __init__(self, chunks, delay=0.0):
+        self.chunks = chunks
+        self.delay = delay
+        self.closed = False
+
+    def __iter__(self):
+        if self.delay:
+            time.sleep(self.delay)
+        yield from self.chunks
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeAsyncStream:
+    def __init__(self, chunks, delay=0.0):
+        self.chunks = list(chunks)
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+            self.delay = 0.0
+        if not self.chunks:
+            raise StopAsyncIteration
+        return self.chunks.pop(0)
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeClient:
+    """``delay`` makes non-stream calls slow: past the ``with_options`` timeout they time out."""
+
+    def __init__(self, *, resp=None, stream=None, error=None, is_async=False, delay=0.0):
+        self.resp, self.stream, self.error = resp, stream, error
+        self.delay = delay
+        self.timeout = None
+        self.calls = []
+        self.options = []
+        self.is_async = is_async
+        create = self._acreate if is_async else self._create
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+    def with_options(self, **opts):
+        self.options.append(opts)
+        bounded = _FakeClient(resp=self.resp, stream=self.stream, error=self.error,
+                              is_async=self.is_async, delay=self.delay)
+        bounded.calls, bounded.timeout = self.calls, opts.get("timeout")
+        return bounded
+
+    def _deadline(self):
+        """Seconds the call takes and whether it times out."""
+        if self.timeout is not None and self.delay > self.timeout:
+            return self.timeout, True
+        return self.delay, False
+
+    def _respond(self, kwargs, timed_out=False):
+        self.calls.append(kwargs)
+        if timed_out:
+            raise TimeoutError("request timed out")
+        if self.error:
+            raise self.error
+        return self.stream if kwargs.get("stream") else self.resp
+
+    def _create(self, **kwargs):
+        if kwargs.get("stream") or not self.delay:
+            return self._respond(kwargs)
+        pause, timed_out = self._deadline()
+        time.sleep(pause)
+        return self._respond(kwargs, timed_out)
+
+    async def _acreate(self, **kwargs):
+        if kwargs.get("stream") or not self.delay:
+            return self._respond(kwargs)
+        pause, timed_out = self._deadline()
+        await asyncio.sleep(pause)
+        return self._respond(kwargs, timed_out)
+
+
+def _endpoints(primary, secondary, **kw):
+    return [
+        Endpoint("primary", "model-a", primary, lambda: primary, **kw),
+        Endpoint("secondary", "model-b", secondary, lambda: secondary, **kw),
+    ]
+
+
+class TestEndpointHealth:
+    def test_breaker_opens_after_threshold_and_half_opens_after_cooldown(self):
+        h = EndpointHealth(threshold=2, cooldown=0.05)
+        h.record_failure("x")
+        assert h.allow() and h.state == "closed"
+        h.record_failure("x")
+        assert h.state == "open" and not h.allow()
+        time.sleep(0.06)
+        assert h.allow()            # single half-open trial
+        assert not h.allow()
+        h.record_success(0.2)
+        assert h.state == "closed" and h.snapshot()["ttft_ms"] == 200
+
+    def test_failed_half_open_trial_reopens(self):
+        h = EndpointHealth(threshold=1, cooldown=0.05)
+        h.record_failure("x")
+        time.sleep(0.06)
+        assert h.allow()
+        h.record_failure("again")
+        assert h.state == "open"
+
+    def test_retryable_classification(self):
+        assert is_retryable(TimeoutError())
+        assert is_retryable(_StatusError(503))
+        assert is_retryable(_StatusError(429))
+        assert not is_retryable(_StatusError(400))
+        assert not is_retryable(ValueError("bad"))
+
+
+class TestFailoverClient:
+    def test_non_stream_fails_over_and_uses_secondary_model(self):
+        primary = _FakeClient(error=_StatusError(502))
+        secondary = _FakeClient(resp="ok")
+        client = FailoverClient(_endpoints(primary, secondary))
+        assert client.chat.completions.create(model="model-a", messages=[]) == "ok"
+        assert secondary.calls[0]["model"] == "model-b"
+        assert client.endpoints[0].health.failures == 1
+
+    def test_non_retryable_error_is_raised_without_failover(self):
+        primary = _FakeClient(error=_StatusError(400))
+        secondary = _FakeClient(resp="ok")
+        client = FailoverClient(_endpoints(primary, secondary))
+        with pytest.raises(_StatusError):
+            client.chat.completions.create(model="model-a", messages=[])
+        assert secondary.calls == []
+
+    def test_open_breaker_skips_primary(self):
+        primary = _FakeClient(error=_StatusError(503))
+        secondary = _FakeClient(resp="ok")
+        client = FailoverClient(_endpoints(primary, secondary, threshold=1, cooldown=60))
+        client.chat.completions.create(messages=[])
+        client.chat.completions.create(messages=[])
+        assert len(primary.calls) == 1 and len(secondary.calls) == 2
+
+    def test_all_endpoints_failing_raises_unavailable(self):
+        client = FailoverClient(_endpoints(_FakeClient(error=TimeoutError()), _FakeClient(error=TimeoutError())))
+        with pytest.raises(LLMUnavailableError):
+            client.chat.completions.create(messages=[])
+
+    def test_non_stream_slow_primary_misses_call_deadline(self):
+        primary = _FakeClient(resp="late", delay=2.0)
+        secondary = _FakeClient(resp="ok")
+        client = FailoverClient(_endpoints(primary, secondary), call_timeout=0.1)
+        t0 = time.monotonic()
+        assert client.chat.completions.create(messages=[]) == "ok"
+        assert time.monotonic() - t0 < 1.0
+        assert primary.options == [{"timeout": 0.1, "max_retries": 0}]
+        # The last endpoint keeps its full client timeout
+        assert secondary.options == []
+        assert client.endpoints[0].health.failures == 1
+
+    def test_stream_missing_ttft_deadline_moves_to_secondary(self):
+        slow = _FakeStream(["late"], delay=0.5)
+        primary = _FakeClient(stream=slow)
+        secondary = _FakeClient(stream=_FakeStream(["b1", "b2"]))
+        client = FailoverClient(_endpoints(primary, secondary), ttft_timeout=0.1)
+        stream = client.chat.completions.create(messages=[], stream=True)
+        assert list(stream) == ["b1", "b2"]
+        assert client.endpoints[0].health.failures == 1
+        time.sleep(0.6)
+        assert slow.closed
+
+    def test_stream_hedge_takes_first_token(self):
+        primary = _FakeClient(stream=_FakeStream(["a"], delay=0.5))
+        secondary = _FakeClient(stream=_FakeStream(["b"]))
+        client = FailoverClient(_endpoints(primary, secondary), ttft_timeout=5, hedge_delay=0.05)
+        t0 = time.monotonic()
+        stream = client.chat.completions.create(messages=[], stream=True)
+        assert time.monotonic() - t0 < 0.4
+        assert list(stream) == ["b"]
+        assert stream.endpoint.name == "secondary"
+        # Being out-raced is not a failure
+        assert client.endpoints[0].health.failures == 0
+
+    def test_fast_primary_never_starts_hedge(self):
+        primary = _FakeClient(stream=_FakeStream(["a1", "a2"]))
+        secondary = _FakeClient(stream=_FakeStream(["b"]))
+        client = FailoverClient(_endpoints(primary, secondary), hedge_delay=0.2)
+        assert list(client.chat.completions.create(messages=[], stream=True)) == ["a1", "a2"]
+        assert secondary.calls == []
+
+
+class TestAsyncFailoverClient:
+    def test_async_hedge_cancels_slow_primary(self):
+        primary = _FakeClient(stream=_FakeAsyncStream(["a"], delay=1.0), is_async=True)
+        secondary = _FakeClient(stream=_FakeAsyncStream(["b1", "b2"]), is_async=True)
+        client = AsyncFailoverClient(_endpoints(primary, secondary), hedge_delay=0.05)
+
+        async def run():
+            stream = await client.chat.completions.create(messages=[], stream=True)
+            return [c async for c in stream]
+
+        t0 = time.monotonic()
+        assert asyncio.run(run()) == ["b1", "b2"]
+        assert time.monotonic() - t0 < 0.5
+        assert primary.stream.closed      # cancelled while waiting for its first chunk
+
+    def test_async_non_stream_slow_primary_misses_call_deadline(self):
+        primary = _FakeClient(resp="late", delay=2.0, is_async=True)
+        secondary = _FakeClient(resp="ok", is_async=True)
+        client = AsyncFailoverClient(_endpoints(primary, secondary), call_timeout=0.1)
+        t0 = time.monotonic()
+        assert asyncio.run(client.chat.completions.create(messages=[])) == "ok"
+        assert time.monotonic() - t0 < 1.0
+        assert client.endpoints[0].health.failures == 1
+
+    def test_async_non_stream_failover(self):
+        primary = _FakeClient(error=_StatusError(500), is_async=True)
+        secondary = _FakeClient(resp="ok", is_async=True)
+        client = AsyncFailoverClient(_endpoints(primary, secondary))
+        assert asyncio.run(client.chat.completions.create(messages=[])) == "ok"
+
+
+class TestUniversalLLMFromConfig:
+    @pytest.fixture(autouse=True)
+    def _fresh_health(self):
+        with patch.dict(llm_failover._health, clear=True):
+            yield
+
+    def _cfg(self, **kw):
+        base = dict(LLM_API_KEY="k", LLM_API_BASE="https://a/v1", LLM_MODEL="m1",
+                    LLM2_API_KEY="", LLM2_API_BASE="", LLM2_MODEL="",
+                    LLM_TTFT_TIMEOUT=20.0, LLM_HEDGE_DELAY=0.0, LLM_CALL_TIMEOUT=60.0)
+        base.update(kw)
+        return SimpleNamespace(**base)
+
+    def test_without_secondary_client_is_plain_openai(self):
+        with patch("core.adapter.OpenAI") as MockOpenAI:
+            from core.adapter import UniversalLLM
+            llm = UniversalLLM.from_config(self._cfg())
+        assert llm.client is MockOpenAI.return_value
+        assert llm.health() == []
+
+    def test_secondary_enables_failover_client(self):
+        with patch("core.adapter.OpenAI"):
+            from core.adapter import UniversalLLM
+            llm = UniversalLLM.from_config(self._cfg(
+                LLM2_API_KEY="k2", LLM2_API_BASE="https://b/v1", LLM2_MODEL="m2", LLM_HEDGE_DELAY=1.5,
+                LLM_CALL_TIMEOUT=30.0,
+            ))
+        assert isinstance(llm.client, FailoverClient)
+        assert llm.client.hedge_delay == 1.5 and llm.client.call_timeout == 30.0
+        assert [h["model"] for h in llm.health()] == ["m1", "m2"]
+        assert isinstance(llm.aclient, AsyncFailoverClient)
+
+    def test_runtime_model_switch_reaches_both_endpoints(self):
+        primary = _FakeClient(error=_StatusError(502))
+        secondary = _FakeClient(resp=SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))]))
+        with patch("core.adapter.OpenAI", side_effect=[primary, secondary]):
+            from core.adapter import UniversalLLM
+            llm = UniversalLLM.from_config(self._cfg(LLM2_API_KEY="k2", LLM2_API_BASE="https://b/v1"))
+        llm.model = "m3"                    # e.g. Discord /model
+        assert llm.chat("hi") == "ok"
+        assert primary.calls[0]["model"] == "m3" and secondary.calls[0]["model"] == "m3"
+        assert [h["model"] for h in llm.health()] == ["m3", "m3"]
+
+    def test_secondary_model_only_replaces_when_set(self):
+        primary = _FakeClient(error=_StatusError(502))
+        secondary = _FakeClient(resp=SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))]))
+        with patch("core.adapter.OpenAI", side_effect=[primary, secondary]):
+            from core.adapter import UniversalLLM
+            llm = UniversalLLM.from_config(self._cfg(
+                LLM2_API_KEY="k2", LLM2_API_BASE="https://b/v1", LLM2_MODEL="m2",
+            ))
+        llm.model = "m3"
+        llm.chat("hi")
+        assert primary.calls[0]["model"] == "m3" and secondary.calls[0]["model"] == "m2"
+
+    def test_breaker_state_is_shared_across_instances(self):
+        cfg = self._cfg(LLM2_API_KEY="k2", LLM2_API_BASE="https://b/v1", LLM2_MODEL="m2")
+        with patch("core.adapter.OpenAI"):
+            from core.adapter import UniversalLLM
+            a, b = UniversalLLM.from_config(cfg), UniversalLLM.from_config(cfg)
+            other = UniversalLLM.from_config(self._cfg(
+                LLM_MODEL="m9", LLM2_API_KEY="k2", LLM2_API_BASE="https://b/v1", LLM2_MODEL="m2",
+            ))
+        for _ in range(3):
+            a.endpoints[0].health.record_failure("down")
+        assert b.health()[0]["state"] == "open"
+        assert other.health()[0]["state"] == "closed"       # another model on the same host
+        assert other.endpoints[1].health is a.endpoints[1].health
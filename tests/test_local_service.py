@@ -43,11 +43,13 @@ class FakeController:
 class FakeMemory:
     def __init__(self):
         self.deleted = []
+        self.search_calls = []
 
     def list_by_category(self, category="", limit=20):
         return [{"id": 1, "category": category or "knowledge", "content": "abc", "importance": 5}]
 
-    def search_multi(self, query, limit=8):
+    def search_multi(self, query, limit=8, category=None, *, count_access=True):
+        self.search_calls.append({"query": query, "count_access": count_access})
         return [{"id": 2, "category": "knowledge", "content": f"hit:{query}", "score": 1.2}]
 
     def delete_by_id(self, memory_id: int):
@@ -148,6 +150,14 @@ def test_local_service_chat_and_command_router():
     assert r4["data"]["items"][0]["name"] == "Demo"
 
 
+def test_local_service_memory_search_does_not_count_access():
+    svc = make_service()
+    r = svc.memory_search("abc")
+    assert r["ok"] is True
+    assert r["data"]["items"][0]["content"] == "hit:abc"
+    assert svc.memory.search_calls == [{"query": "abc", "count_access": False}]
+
+
 def test_local_service_config_set_and_bulk_update():
     svc = make_service()
     mod = svc._config_module
@@ -193,3 +203,26 @@ def test_local_service_command_config_get_and_rollback():
     assert r2["ok"] is True
     assert r2["message"] == "rolled"
 
+
+
+def test_local_service_trace_command_and_status():
+    from unittest.mock import patch
+
+    from core import tracing
+
+    svc = make_service()
+    tracer = tracing.Tracer(size=50, path="")
+    with patch.object(tracing, "_tracer", tracer):
+        with tracer.span("tool.screenshot", cat="tool"):
+            pass
+        r = svc.exec_command("/trace")
+        assert r["ok"] is True
+        assert r["data"]["summary"][0]["name"] == "tool.screenshot"
+        assert r["data"]["recent"][0]["name"] == "tool.screenshot"
+        assert "tool.screenshot" in r["message"]
+
+        assert svc.status()["data"]["trace"]["spans"] == 1
+        assert svc.exec_command("/trace clear")["ok"] is True
+        assert tracer.recent(0) == []
+        assert svc.exec_command("/trace nope")["ok"] is False
+        assert "/trace [export|clear]" in svc.help_info()["data"]["commands"]
@@ -149,6 +149,26 @@ class TestMemoryStorePreferences:
         prefs = store.get_preferences()
         assert "I prefer terminal over GUI." in prefs
 
+    def test_empty_preferences_are_cached_until_a_write(self, store):
+        assert store.get_preferences() == []
+        with sqlite3.connect(store.db_path) as conn:     # another process writing
+            conn.execute("INSERT INTO memories (category, content) VALUES ('preference', 'Written elsewhere')")
+        assert store.get_preferences() == []
+        store.save("preference", "Written through the store")
+        assert set(store.get_preferences()) == {"Written elsewhere", "Written through the store"}
+
+    def test_read_racing_a_write_is_not_cached(self, store):
+        store.save("preference", "Before the write")
+        real_read = store._read
+
+        def racing_read():
+            store._invalidate_preferences()      # a write lands while the query runs
+            return real_read()
+
+        with patch.object(store, "_read", racing_read):
+            store.get_preferences()
+        assert store._pref_cache_time == 0
+
     def test_multiple_preferences_all_returned(self, store):
         entries = ["Prefers dark mode", "Prefers Python", "Prefers short answers"]
         for e in entries:
@@ -177,3 +197,422 @@ class TestMemoryStoreCleanup:
         store.cleanup_old(keep_days=30)
         results = store.search("Ancient knowledge", limit=5)
         assert results == []
+
+    def test_cleanup_old_drops_cached_preferences(self, store):
+        store.save("preference", "Prefers an old editor")
+        assert store.get_preferences() == ["Prefers an old editor"]     # cached
+        with sqlite3.connect(store.db_path) as conn:
+            conn.execute("UPDATE memories SET created_at = datetime('now', '-60 days')")
+        store.cleanup_old(keep_days=30)
+        assert store.get_preferences() == []
+
+
+# ---------------------------------------------------------------------------
+# Read pool
+# ---------------------------------------------------------------------------
+
+class TestMemoryStoreReadPool:
+    def test_reads_do_not_wait_for_the_writer_lock(self, store):
+        store.save("knowledge", "Readable while a write is in progress")
+        with store._lock:       # e.g. a long save_many on another thread
+            assert store.list_by_category("knowledge")[0]["content"] == "Readable while a write is in progress"
+            assert store.stats() == {"knowledge": 1}
+            assert store._recall_fts(store._fts_match_expr(["readable"]), 3, None)
+
+    def test_readers_are_read_only_and_bounded(self, store):
+        import memory.store as ms
+        with store._read() as con:
+            with pytest.raises(sqlite3.OperationalError):
+                con.execute("DELETE FROM memories")
+        borrowed = []
+        for _ in range(ms._READ_POOL_SIZE):
+            cm = store._read()
+            borrowed.append((cm, cm.__enter__()))
+        assert store._reader_count == ms._READ_POOL_SIZE
+        for cm, _ in borrowed:
+            cm.__exit__(None, None, None)
+        assert store._readers.qsize() == ms._READ_POOL_SIZE
+
+    def test_category_stats(self, store):
+        store.save("knowledge", "one")
+        store.save("knowledge", "two")
+        store.save("bug", "three")
+        stats = store.category_stats()
+        assert list(stats) == ["knowledge", "bug"]
+        assert stats["knowledge"]["count"] == 2 and stats["bug"]["last"]
+
+    def test_get_store_is_shared(self, tmp_path):
+        import memory.store as ms
+        with patch.object(ms, "_store", None), patch.object(ms, "DB_PATH", str(tmp_path / "shared.db")):
+            first = ms.get_store()
+            assert ms.get_store() is first
+            assert first.db_path == str(tmp_path / "shared.db")
+
+    def test_close_store_reopens_on_next_use(self, tmp_path):
+        import memory.store as ms
+        with patch.object(ms, "_store", None), patch.object(ms, "DB_PATH", str(tmp_path / "shared.db")):
+            first = ms.get_store()
+            first.save("knowledge", "Survives close_store")
+            ms.close_store()
+            second = ms.get_store()
+            assert second is not first
+            assert second.list_by_category()[0]["content"] == "Survives close_store"
+            ms.close_store()
+
+    def test_migrations_skipped_when_schema_is_current(self, store):
+        with patch.object(MemoryStore, "_init_db") as init_db, \
+                patch.object(MemoryStore, "_migrate_schema") as migrate:
+            reopened = MemoryStore(db_path=store.db_path)
+        init_db.assert_not_called()
+        migrate.assert_not_called()
+        assert reopened._schema_current()
+
+    def test_in_memory_db_reads_through_writer(self):
+        store = MemoryStore(db_path=":memory:")
+        store.save("knowledge", "In-memory database")
+        assert store.list_by_category()[0]["content"] == "In-memory database"
+
+
+# ---------------------------------------------------------------------------
+# Write-behind access counts
+# ---------------------------------------------------------------------------
+
+class TestMemoryStoreAccessCounts:
+    def _counts(self, store):
+        with sqlite3.connect(store.db_path) as conn:
+            return dict(conn.execute("SELECT content, access_count FROM memories"))
+
+    def test_recall_buffers_bumps_without_writing(self, store):
+        store.save("knowledge", "Buffered access counting")
+        statements = []
+        store._con.set_trace_callback(statements.append)
+        store.search_multi("buffered access", limit=3)
+        store.search_multi("buffered access", limit=3)
+        store._con.set_trace_callback(None)
+        assert not any("UPDATE" in q or "COMMIT" in q for q in statements)
+        assert self._counts(store)["Buffered access counting"] == 0
+        store.flush_access()
+        assert self._counts(store)["Buffered access counting"] == 2
+
+    def test_timer_flushes_in_background(self, store):
+        import memory.store as ms
+        store.save("knowledge", "Flushed by the timer")
+        with patch.object(ms, "_ACCESS_FLUSH_INTERVAL", 0.05):
+            store.search("Flushed by the timer")
+        time.sleep(0.3)
+        assert self._counts(store)["Flushed by the timer"] == 1
+
+    def test_browse_reads_are_not_counted(self, store):
+        store.save("preference", "Likes dark mode in every editor")
+        store.search_multi("dark mode", limit=3, count_access=False)
+        store.search("dark mode", count_access=False)
+        store.flush_access()
+        assert self._counts(store)["Likes dark mode in every editor"] == 0
+
+    def test_cleanup_old_sees_buffered_access(self, store):
+        store.save("knowledge", "Old but recently recalled")
+        with sqlite3.connect(store.db_path) as conn:
+            conn.execute("UPDATE memories SET created_at = datetime('now', '-60 days')")
+        store.search_multi("recently recalled", limit=3)
+        store.cleanup_old(keep_days=30)
+        assert "Old but recently recalled" in self._counts(store)
+
+
+# ---------------------------------------------------------------------------
+# search_multi() recall engine
+# ---------------------------------------------------------------------------
+
+class TestMemoryStoreRecall:
+    def test_multiple_keywords_recalled_in_one_query(self, store):
+        store.save("knowledge", "Python asyncio event loop basics")
+        store.save("knowledge", "Docker compose networking notes")
+        store.save("knowledge", "Gardening tips for spring")
+        statements = []
+        with store._read() as con:      # the pool hands the same reader back to this thread
+            con.set_trace_callback(statements.append)
+        results = store.search_multi("python docker", limit=5)
+        with store._read() as con:
+            con.set_trace_callback(None)
+        contents = [r["content"] for r in results]
+        assert "Python asyncio event loop basics" in contents
+        assert "Docker compose networking notes" in contents
+        assert "Gardening tips for spring" not in contents
+        assert sum(1 for q in statements if "MATCH" in q) == 1
+        assert not any("LIKE" in q for q in statements)
+
+    def test_importance_and_recency_rank_first(self, store):
+        store.save("knowledge", "Redis cache eviction notes (old)", importance=5)
+        store.save("knowledge", "Redis cache eviction notes (important)", importance=9)
+        with sqlite3.connect(store.db_path) as conn:
+            conn.execute("UPDATE memories SET created_at = datetime('now', '-90 days') WHERE content LIKE '%(old)%'")
+        results = store.search_multi("redis eviction", limit=2)
+        assert results[0]["content"].endswith("(important)")
+
+    def test_category_filter(self, store):
+        store.save("knowledge", "Rust ownership rules")
+        store.save("bug", "Rust borrow checker bug in parser")
+        results = store.search_multi("rust", limit=5, category="bug")
+        assert [r["category"] for r in results] == ["bug"]
+
+    def test_short_chinese_keyword_uses_like_fallback(self, store):
+        store.save("knowledge", "周末去爬山")
+        results = store.search_multi("爬山", limit=5)
+        assert [r["content"] for r in results] == ["周末去爬山"]
+
+    def test_fts_special_characters_do_not_raise(self, store):
+        store.save("knowledge", 'He said "hello" OR goodbye')
+        assert isinstance(store.search_multi('"hello" OR NEAR(', limit=5), list)
+
+    def test_keywords_ranked_by_idf_and_common_terms_dropped(self, tmp_path):
+        store = MemoryStore(db_path=str(tmp_path / "idf.db"), near_dup="off")
+        store.save_many([("project", f"项目周报第{i}期") for i in range(60)] + [("project", "数据库迁移方案")])
+        keywords, idf = store._ranked_keywords("项目的数据库和迁移")
+        assert "项目" not in keywords          # in almost every memory
+        assert keywords[0] == "数据库" and idf["迁移"] > idf["项目"]
+
+    def test_term_stats_follow_saves_and_bulk_deletes(self, store):
+        store.save("knowledge", "向量检索的笔记")
+        df, docs = store._term_stats()
+        assert docs == 1 and df["向量检索"] == 1
+        store.save("knowledge", "向量检索和全文检索")
+        assert store._term_stats()[0]["向量检索"] == 2
+        store.delete_by_category("knowledge")
+        assert store._term_stats() == ({}, 0)
+
+    def test_like_fallback_ranks_rare_keyword_first(self, tmp_path):
+        store = MemoryStore(db_path=str(tmp_path / "like.db"), vector_search=False, near_dup="off")
+        store.save_many([("experience", f"第{i}次喝咖啡") for i in range(5)] + [("experience", "周末爬山")])
+        results = store.search_multi("咖啡 爬山", limit=3)
+        assert results[0]["content"] == "周末爬山"
+
+
+# ---------------------------------------------------------------------------
+# Vector index / hybrid recall
+# ---------------------------------------------------------------------------
+
+class TestMemoryStoreVectors:
+    def test_vector_recall_finds_memory_without_keyword_match(self, store):
+        store.save("knowledge", "UI design guidelines for AI tools")
+        store.save("knowledge", "Gardening tips for spring")
+        # "AI"/"UI" are too short for keyword extraction and don't appear as a phrase
+        results = store.search_multi("AI UI", limit=5)
+        assert [r["content"] for r in results] == ["UI design guidelines for AI tools"]
+
+    def test_vectors_persist_and_follow_deletes(self, store):
+        store.save("knowledge", "Vectors are stored next to memories")
+        store.save("knowledge", "Second memory")
+        with sqlite3.connect(store.db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM memory_vectors").fetchone()[0] == 2
+        mid = store.list_by_category("knowledge")[0]["id"]
+        store.delete_by_id(mid)
+        with sqlite3.connect(store.db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM memory_vectors").fetchone()[0] == 1
+        reopened = MemoryStore(db_path=store.db_path)
+        assert len(reopened._vector_index()) == 1
+
+    def test_missing_vectors_are_backfilled(self, tmp_path):
+        plain = MemoryStore(db_path=str(tmp_path / "m.db"), vector_search=False)
+        plain.save("knowledge", "Saved before vectors were enabled")
+        store = MemoryStore(db_path=plain.db_path)
+        assert len(store._vector_index()) == 1
+
+    def test_disabled_vector_search_skips_embedding(self, tmp_path):
+        store = MemoryStore(db_path=str(tmp_path / "m.db"), vector_search=False)
+        store.save("knowledge", "No vectors here")
+        assert store._vector_index() is None
+
+
+# ---------------------------------------------------------------------------
+# Exact / near-duplicate detection
+# ---------------------------------------------------------------------------
+
+_FACT = "Python 的 asyncio 事件循环在单线程里调度协程，遇到 await 时让出控制权给其他任务"
+_FACT_REWORDED = "Python 的 asyncio 事件循环在单线程里调度协程，遇到 await 时会让出控制权给其它任务（无需多线程）"
+
+
+class TestMemoryStoreDedup:
+    def test_exact_duplicate_lookup_uses_content_hash_index(self, store):
+        store.save("knowledge", "Indexed dedup")
+        plan = store._con.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM memories WHERE category=? AND content_hash=?", ("knowledge", "x"),
+        ).fetchall()
+        assert any("idx_memories_content_hash" in row[-1] for row in plan)
+        assert store.upsert("knowledge", "Indexed dedup")[0] == "duplicate"
+
+    def test_near_duplicate_is_merged_into_existing_row(self, store):
+        assert store.save("knowledge", _FACT, importance=4) is True
+        status, mid = store.upsert("knowledge", _FACT_REWORDED, importance=8)
+        rows = store.list_by_category("knowledge")
+        assert status == "merged"
+        assert [(r["id"], r["content"], r["importance"]) for r in rows] == [(mid, _FACT_REWORDED, 8)]
+        # FTS follows the merged text
+        assert store.search("无需多线程", limit=5)[0]["id"] == mid
+
+    def test_newer_near_duplicate_text_wins(self, store):
+        store.save("knowledge", _FACT_REWORDED)
+        assert store.save("knowledge", _FACT) is False
+        assert [r["content"] for r in store.list_by_category("knowledge")] == [_FACT]
+
+    @pytest.mark.parametrize("category, old, new", [
+        ("preference", "用户喜欢在 VS Code 中使用深色主题，并且字体大小设为 14",
+         "用户喜欢在 VS Code 中使用浅色主题，并且字体大小设为 14"),
+        ("todo", "周五下午三点前把季度报表发给张经理审核", "周五下午三点前把季度报表发给李经理审核"),
+        ("knowledge", "项目的 CI 流水线使用 Python 3.11 运行全部单元测试和类型检查",
+         "项目的 CI 流水线使用 Python 3.12 运行全部单元测试和类型检查"),
+    ])
+    def test_same_length_correction_is_not_lost(self, store, category, old, new):
+        store.save(category, old)
+        assert store.upsert(category, new)[0] == "merged"
+        assert [r["content"] for r in store.list_by_category(category)] == [new]
+
+    def test_skip_and_off_policies(self, tmp_path):
+        skip = MemoryStore(db_path=str(tmp_path / "skip.db"), near_dup="skip")
+        skip.save("knowledge", _FACT)
+        assert skip.upsert("knowledge", _FACT_REWORDED)[0] == "skipped"
+        assert [r["content"] for r in skip.list_by_category("knowledge")] == [_FACT]
+        off = MemoryStore(db_path=str(tmp_path / "off.db"), near_dup="off")
+        off.save("knowledge", _FACT)
+        assert off.save("knowledge", _FACT_REWORDED) is True
+
+    def test_unrelated_and_other_category_are_not_near_duplicates(self, store):
+        store.save("knowledge", _FACT)
+        assert store.save("knowledge", "SQLite 的 WAL 模式允许读写并发，写入先追加到日志文件再定期 checkpoint") is True
+        assert store.save("experience", _FACT_REWORDED) is True
+
+    def test_migration_backfills_hashes_and_signatures(self, tmp_path):
+        db = str(tmp_path / "old.db")
+        with sqlite3.connect(db) as conn:
+            conn.execute(
+                "CREATE TABLE memories (id INTEGER PRIMARY KEY AUTOINCREMENT, category TEXT NOT NULL, "
+                "content TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+                "access_count INTEGER DEFAULT 0, importance INTEGER DEFAULT 5)"
+            )
+            conn.executemany(
+                "INSERT INTO memories (category, content) VALUES (?, ?)",
+                [("knowledge", _FACT), ("knowledge", _FACT), ("bug", "old bug")],
+            )
+        store = MemoryStore(db_path=db)
+        with sqlite3.connect(db) as conn:
+            hashes = [r[0] for r in conn.execute("SELECT content_hash FROM memories ORDER BY id")]
+            signed = conn.execute("SELECT COUNT(DISTINCT id) FROM memory_minhash").fetchone()[0]
+        assert hashes[0] and hashes[1] is None and hashes[2]    # duplicate row kept, left unhashed
+        assert signed == 2                                       # "old bug" is too short to sign
+        assert store.upsert("knowledge", _FACT_REWORDED)[0] == "merged"
+
+    def test_points_from_one_source_are_not_near_duplicates(self, store):
+        prefix = ("[视频学习][Python 异步编程][Youtube] 《asyncio 并发实战：从入门到精通》 作者:Async Academy "
+                  "| 视频URL:https://www.youtube.com/watch?v=abcdefghijk |")
+        # Short points: the shared header alone puts them at Jaccard ~0.7
+        points = ["gather 并发运行多个协程", "Semaphore 限制并发数量", "wait_for 设置超时",
+                  "Queue 传递任务", "create_task 立即调度协程"]
+        results = store.save_many([("knowledge", f"{prefix} {p}") for p in points])
+        assert [s for s, _ in results] == ["inserted"] * 5
+        assert store.upsert("knowledge", f"{prefix} {_FACT}")[0] == "inserted"
+        assert store.upsert("knowledge", f"{prefix} {_FACT_REWORDED}")[0] == "merged"
+        assert store.upsert("knowledge", f"[视频学习][别的课程][Youtube] {_FACT_REWORDED}")[0] == "inserted"
+
+    def test_long_source_header_does_not_hide_the_point(self, store):
+        prefix = f"[视频学习][{'很长的标题' * 10}] 《{'很长的标题' * 20}》 作者:someone | 视频URL:https://example.com/v |"
+        assert len(prefix) > 200
+        assert store.save("knowledge", f"{prefix} 第一个要点") is True
+        assert store.save("knowledge", f"{prefix} 第二个要点") is True
+        assert store.save("knowledge", f"{prefix} 第二个要点") is False
+
+    def test_old_dedup_keys_are_rebuilt(self, tmp_path):
+        db = str(tmp_path / "v1.db")
+        MemoryStore(db_path=db).close()
+        with sqlite3.connect(db) as conn:
+            conn.execute("INSERT INTO memories (category, content, content_hash) VALUES ('knowledge', ?, 'stale')",
+                         (_FACT,))
+            conn.execute("INSERT INTO memory_minhash (key, id) VALUES (1, 1)")
+            conn.execute("UPDATE db_meta SET value='1' WHERE key IN ('schema_version', 'content_hash')")
+        store = MemoryStore(db_path=db)
+        with sqlite3.connect(db) as conn:
+            assert conn.execute("SELECT content_hash FROM memories").fetchone()[0] != "stale"
+            assert conn.execute("SELECT COUNT(*) FROM memory_minhash WHERE key=1").fetchone()[0] == 0
+            assert conn.execute("SELECT value FROM db_meta WHERE key='content_hash'").fetchone()[0] == "2"
+        assert store.upsert("knowledge", _FACT_REWORDED)[0] == "merged"
+        store.close()
+
+    def test_delete_removes_signatures(self, store):
+        store.save("knowledge", _FACT)
+        store.delete_by_id(store.list_by_category("knowledge")[0]["id"])
+        assert store._con.execute("SELECT COUNT(*) FROM memory_minhash").fetchone()[0] == 0
+
+
+class TestMemoryStoreSaveMany:
+    def test_batch_statuses_and_single_commit(self, store):
+        existing_id = store.upsert("knowledge", "Already stored")[1]
+        statements = []
+        store._con.set_trace_callback(statements.append)
+        results = store.save_many([
+            ("knowledge", "Already stored"),
+            ("knowledge", "First new point", 8),
+            ("knowledge", "First new point"),
+            ("knowledge", _FACT),
+            ("knowledge", _FACT_REWORDED),
+            ("not-a-category", "Second new point"),
+        ])
+        store._con.set_trace_callback(None)
+        assert [s for s, _ in results] == ["duplicate", "inserted", "duplicate", "inserted", "merged", "inserted"]
+        assert results[0][1] == existing_id
+        assert results[2][1] == results[1][1]
+        assert results[4][1] == results[3][1]
+        assert sum(1 for q in statements if q.strip().upper() == "COMMIT") == 2   # memories + vectors
+        rows = {r["id"]: r for r in store.list_by_category("knowledge")}
+        assert rows[results[1][1]]["importance"] == 8
+        assert rows[results[3][1]]["content"] == _FACT_REWORDED      # later item won the in-batch merge
+        assert len(rows) == 4
+
+    def test_batch_rows_are_searchable_and_embedded(self, store):
+        results = store.save_many([("knowledge", "Kubernetes pod eviction"), ("bug", "Kubernetes crash loop")])
+        assert [s for s, _ in results] == ["inserted", "inserted"]
+        assert {r["id"] for r in store.search_multi("kubernetes", limit=5)} == {mid for _, mid in results}
+        assert len(store._vector_index()) == 2
+
+    def test_empty_batch_and_db_error(self, store):
+        assert store.save_many([]) == []
+        store._con.close()
+        assert store.save_many([("knowledge", "a"), ("knowledge", "b")]) == [("error", None)] * 2
+
+
+class TestVectorIndex:
+    def _unit(self, rng, dim):
+        v = [rng.gauss(0, 1) for _ in range(dim)]
+        n = sum(x * x for x in v) ** 0.5
+        return [x / n for x in v]
+
+    def _check_index(self, index, n=300, dim=16):
+        import random
+        rng = random.Random(3)
+        vecs = {i: self._unit(rng, dim) for i in range(n)}
+        index.add_many(vecs.items())
+        for i in (0, 7, n - 1):
+            assert index.search(vecs[i], k=3)[0][0] == i
+        index.remove(7)
+        assert all(mid != 7 for mid, _ in index.search(vecs[7], k=5))
+        return vecs
+
+    def test_brute_force(self):
+        from memory.vector_index import VectorIndex
+        self._check_index(VectorIndex(16))
+
+    def test_ivf(self):
+        from memory import vector_index
+        if vector_index.np is None:
+            pytest.skip("numpy not installed")
+        index = vector_index.VectorIndex(16, ivf_threshold=100, nprobe=4)
+        self._check_index(index)
+        assert index.uses_ivf
+
+    def test_pure_python_fallback(self):
+        from memory import vector_index
+        with patch.object(vector_index, "np", None):
+            self._check_index(vector_index.VectorIndex(16), n=50)
+
+    def test_hashing_embedder_is_stable_and_normalised(self):
+        from memory.vector_index import HashingEmbedder
+        emb = HashingEmbedder(dim=64)
+        a, b = emb.embed(["用户喜欢深色主题", "用户喜欢深色主题"])
+        assert a == b
+        assert abs(sum(x * x for x in a) - 1.0) < 1e-6
@@ -0,0 +1,171 @@
+"""Tests for actions/ocr.py with a stand-in engine (no Tesseract needed)."""
+from unittest.mock import patch
+
+from PIL import Image, ImageDraw
+
+from actions import executor, ocr
+from actions.capture import FrameBuffer, ScreenCapture
+from actions.ocr import OcrService, Word, find_text, split_bands
+
+
+class FakeEngine:
+    """'Reads' striped blocks: each grey level in ``legend`` is one word."""
+
+    name = "fake"
+
+    def __init__(self, legend: dict[int, str], batch: int = 0):
+        self.legend = legend
+        self.batch = batch
+        self.calls: list[tuple[int, int]] = []
+
+    def words(self, img):
+        self.calls.append(img.size)
+        found = []
+        for level, text in self.legend.items():
+            box = img.point(lambda p, v=level: 255 if p == v else 0).getbbox()
+            if box:
+                found.append((box[1], box[0], text, box))
+        found.sort()
+        tops = sorted({top for top, _, _, _ in found})
+        return [Word(text, (b[0], b[1], b[2] - b[0], b[3] - b[1]), 90.0, tops.index(top))
+                for top, _, text, b in found]
+
+    def close(self):
+        pass
+
+
+def _word(img, x, y, level, w=60, h=14):
+    """A block of vertical stripes: edge-dense like a run of glyphs."""
+    draw = ImageDraw.Draw(img)
+    fill = level if img.mode == "L" else (level,) * 3
+    for sx in range(x, x + w, 4):
+        draw.rectangle((sx, y, sx + 1, y + h), fill=fill)
+
+
+def _screen(height=400):
+    return Image.new("L", (640, height), 255)
+
+
+class TestFindText:
+    def test_match_spans_words_and_ignores_spaces(self):
+        words = [
+            Word("保", (10, 10, 10, 12), line=0), Word("存", (22, 10, 10, 12), line=0),
+            Word("文件", (34, 10, 20, 12), line=0), Word("保存", (10, 40, 20, 12), line=1),
+        ]
+        hits = find_text(words, "存 文件")
+        assert len(hits) == 1 and hits[0].box == (22, 10, 32, 12) and hits[0].text == "存文件"
+        assert [m.box[1] for m in find_text(words, "保存")] == [10, 40]
+        assert find_text(words, "") == []
+
+    def test_text_joins_cjk_without_spaces(self):
+        res = ocr.OcrResult([Word("打", (0, 0, 1, 1)), Word("开", (0, 0, 1, 1)), Word("file", (0, 0, 1, 1))])
+        assert res.text == "打开 file"
+
+
+class TestBands:
+    def test_bands_wrap_text_and_skip_blank_rows(self):
+        img = _screen(300)
+        _word(img, 20, 40, 10)
+        _word(img, 20, 120, 20)
+        assert split_bands(img, min_h=8, max_h=100) == [(36, 59), (116, 139)]
+
+    def test_lines_are_grouped_up_to_min_height(self):
+        img = _screen(300)
+        for y in (40, 60, 80):
+            _word(img, 20, y, 10)
+        assert split_bands(img, min_h=24, max_h=100) == [(36, 79), (79, 108)]
+
+    def test_tall_blocks_are_cut_at_max_height(self):
+        img = _screen(300)
+        _word(img, 0, 0, 10, w=640, h=299)
+        bands = split_bands(img, min_h=24, max_h=100)
+        assert [b[1] for b in bands] == [99, 198, 297, 300]
+
+
+class TestOcrService:
+    def test_unchanged_bands_come_from_the_cache(self):
+        engine = FakeEngine({10: "保存", 20: "取消", 30: "新的"})
+        svc = OcrService(engine)
+        img = _screen()
+        _word(img, 20, 40, 10)
+        _word(img, 20, 200, 20)
+        first = svc.read(img)
+        assert first.ocr_bands == 2 and first.cached_bands == 0
+        assert first.text == "保存\n取消"
+        assert len(engine.calls) == 1            # batched into one engine call
+        assert svc.read(img).ocr_bands == 0
+        _word(img, 300, 300, 30)
+        third = svc.read(img)
+        assert (third.ocr_bands, third.cached_bands) == (1, 2)
+        assert [w.text for w in third.words] == ["保存", "取消", "新的"]
+        assert third.words[2].box[:2] == (300, 300)
+
+    def test_scrolled_content_reuses_band_results(self):
+        engine = FakeEngine({10: "保存"})
+        svc = OcrService(engine)
+        img = _screen()
+        _word(img, 20, 40, 10)
+        svc.read(img)
+        moved = _screen()
+        moved.paste(img.crop((0, 0, 640, 100)), (0, 100))
+        res = svc.read(moved)
+        assert res.ocr_bands == 0 and res.words[0].box[1] == 140
+
+    def test_until_stops_at_the_first_matching_band(self):
+        engine = FakeEngine({10: "保存", 20: "取消", 30: "确定"}, batch=1)
+        svc = OcrService(engine)
+        img = _screen()
+        _word(img, 20, 40, 10)
+        _word(img, 20, 200, 20)
+        _word(img, 20, 330, 30)
+        res = svc.read(img, until="取消")
+        assert res.ocr_bands == 2 and len(engine.calls) == 2
+        assert res.matches and res.matches[0].center == (49, 207)
+
+    def test_cache_is_bounded(self):
+        svc = OcrService(FakeEngine({10: "a"}), cache_size=2)
+        for y in (20, 100, 180, 260):
+            img = _screen()
+            _word(img, 20, y, 10, w=20 + y)
+            svc.read(img)
+        assert len(svc._cache) == 2
+
+    def test_missing_engine_raises(self):
+        with patch.object(ocr, "tesserocr", None), patch.object(ocr, "pytesseract", None):
+            try:
+                OcrService().engine
+            except RuntimeError as e:
+                assert "pytesseract" in str(e)
+            else:
+                raise AssertionError("expected RuntimeError")
+
+
+class TestScreenTools:
+    def _patches(self, fb, engine):
+        return (
+            patch.object(executor, "get_capture", return_value=ScreenCapture(fb)),
+            patch.object(executor, "get_ocr", return_value=OcrService(engine)),
+            patch.object(executor.pyautogui, "size", return_value=fb.size()),
+        )
+
+    def test_wait_for_text_returns_click_point(self):
+        fb = FrameBuffer(640, 400, color=(255, 255, 255))
+        _word(fb.image, 100, 200, 10)
+        engine = FakeEngine({10: "下载完成"})
+        a, b, c = self._patches(fb, engine)
+        with a, b, c:
+            res = executor._tool_wait_for_text({"text": "下载完成", "timeout": 2})
+        assert res["ok"] and (res["x"], res["y"]) == (129, 207)
+
+    def test_read_screen_text_find(self):
+        fb = FrameBuffer(640, 400, color=(255, 255, 255))
+        _word(fb.image, 100, 200, 10)
+        _word(fb.image, 100, 300, 20)
+        engine = FakeEngine({10: "确定", 20: "取消"})
+        a, b, c = self._patches(fb, engine)
+        with a, b, c:
+            assert executor._tool_read_screen_text({})["result"] == "确定\n取消"
+            found = executor._tool_read_screen_text({"find": "取消"})
+            missing = executor._tool_read_screen_text({"find": "关闭"})
+        assert found["ok"] and found["matches"] == [{"text": "取消", "x": 129, "y": 307, "box": [100, 300, 58, 15]}]
+        assert not missing["ok"]
@@ -0,0 +1,46 @@
+"""Tests for actions/page_cache.py - PageCache."""
+import os
+
+from actions.page_cache import PageCache
+
+
+def test_memory_lru_is_bounded_by_size():
+    cache = PageCache(db_path=None, max_memory_chars=10)
+    cache.put("a", "12345")
+    cache.put("b", "12345")
+    cache.get("a")               # a becomes most recently used
+    cache.put("c", "12345")
+    assert cache.get("b") is None
+    assert cache.get("a").text == "12345"
+    assert cache.get("c").text == "12345"
+
+
+def test_disk_store_survives_restart(tmp_path):
+    db = str(tmp_path / "pages.db")
+    first = PageCache(db_path=db)
+    first.put("https://x.test", "hello", html="<p>hello</p>", etag='"e1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+
+    second = PageCache(db_path=db)
+    page = second.get("https://x.test")
+    assert page.text == "hello"
+    assert page.validators() == {
+        "If-None-Match": '"e1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+
+def test_freshness_and_touch(tmp_path):
+    cache = PageCache(db_path=str(tmp_path / "pages.db"), ttl=60)
+    page = cache.put("u", "t")
+    assert cache.is_fresh(page)
+    page.fetched_at = 0
+    assert not cache.is_fresh(page)
+    cache.touch("u", page)
+    assert cache.is_fresh(PageCache(db_path=str(tmp_path / "pages.db"), ttl=60).get("u"))
+
+
+def test_disk_is_trimmed_to_budget(tmp_path):
+    cache = PageCache(db_path=str(tmp_path / "pages.db"), max_disk_bytes=2_000)
+    for i in range(40):
+        cache.put(f"u{i}", os.urandom(200).hex())
+    assert cache.stats()["disk_bytes"] <= 2_000 + 1_000
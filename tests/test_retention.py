@@ -0,0 +1,106 @@
+"""Tests for memory/retention.py and the MemoryStore archive/compaction helpers."""
+import sqlite3
+import time
+
+import pytest
+
+from memory.retention import RetentionEngine, RetentionPolicy, policies_from_env, _utc
+from memory.store import MemoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MemoryStore(db_path=str(tmp_path / "retention.db"))
+
+
+def _age(store, content_like: str, days: int) -> None:
+    with sqlite3.connect(store.db_path) as conn:
+        conn.execute(
+            "UPDATE memories SET created_at = datetime('now', ?) WHERE content LIKE ?",
+            (f"-{days} days", content_like),
+        )
+
+
+class TestArchive:
+    def test_archive_moves_rows_out_of_hot_search(self, store):
+        store.save("todo", "Renew the passport before the trip", importance=5)
+        _age(store, "%passport%", 40)
+        assert store.archive("todo", _utc(time.time() - 30 * 86400)) == 1
+        assert store.list_by_category("todo") == []
+        assert store.search_multi("passport", limit=5) == []
+        with sqlite3.connect(store.db_path) as conn:
+            blob = conn.execute("SELECT content FROM memories_archive").fetchone()[0]
+            fts = conn.execute("SELECT COUNT(*) FROM memories_fts").fetchone()[0]
+        assert isinstance(blob, bytes) and b"passport" not in blob      # compressed
+        assert fts == 0
+        assert store.storage_stats()["archived"] == 1
+
+    def test_restore_brings_memory_back(self, store):
+        store.save("bug", "Crash when the config file is empty")
+        mid = store.list_by_category("bug")[0]["id"]
+        _age(store, "%config file%", 100)
+        store.archive("bug", _utc(time.time()))
+        assert store.restore_archived(mid) is True
+        assert [r["id"] for r in store.search_multi("config file crash", limit=3)] == [mid]
+        assert store.storage_stats()["archived"] == 0
+
+    def test_archive_query_uses_category_created_index(self, store):
+        plan = store._con.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM memories WHERE category=? AND created_at < ? ORDER BY created_at",
+            ("todo", "2020-01-01 00:00:00"),
+        ).fetchall()
+        assert any("idx_memories_category_created" in row[-1] for row in plan)
+
+
+class TestRetentionEngine:
+    def test_default_only_archives_low_importance(self, store):
+        store.save("todo", "Old todo item stays", importance=5)
+        store.save("bug", "Old minor bug goes cold", importance=2)
+        store.save("knowledge", "Recent trivia stays", importance=1)
+        with sqlite3.connect(store.db_path) as conn:
+            conn.execute("UPDATE memories SET created_at = datetime('now', '-60 days') "
+                         "WHERE content NOT LIKE 'Recent%'")
+        report = RetentionEngine(store, policies_from_env("")).run_once()
+        hot = {r["content"] for r in store.list_by_category()}
+        assert report["archived"] == 1
+        assert hot == {"Old todo item stays", "Recent trivia stays"}
+        assert store.storage_stats()["retention_last_run"]
+
+    def test_policies_per_category(self, store):
+        store.save("todo", "Old todo item to archive")
+        store.save("preference", "Prefers concise answers", importance=8)
+        store.save("knowledge", "Recalled knowledge stays hot", importance=5)
+        store.save("knowledge", "Never recalled knowledge goes cold", importance=5)
+        with sqlite3.connect(store.db_path) as conn:
+            conn.execute("UPDATE memories SET created_at = datetime('now', '-400 days')")
+            conn.execute("UPDATE memories SET access_count = 3 WHERE content LIKE 'Recalled%'")
+        report = RetentionEngine(store, policies_from_env("todo=30,knowledge=180")).run_once()
+        hot = {r["content"] for r in store.list_by_category()}
+        assert report["archived"] == 2
+        assert hot == {"Prefers concise answers", "Recalled knowledge stays hot"}
+
+    def test_purge_after_days(self, store):
+        store.save("todo", "Purged eventually")
+        _age(store, "%Purged%", 60)
+        engine = RetentionEngine(store, (RetentionPolicy("todo", 30, purge_after_days=10),))
+        assert engine.run_once()["archived"] == 1
+        assert engine.run_once(now=time.time() + 11 * 86400)["purged"] == 1
+        assert store.storage_stats()["archived"] == 0
+
+    def test_large_move_compacts_and_reports_reclaimed_bytes(self, store):
+        store.save_many([("experience", f"Experience note {i} " + "x" * 400) for i in range(600)])
+        _age(store, "Experience note%", 200)
+        engine = RetentionEngine(store, (RetentionPolicy("experience", 30, purge_after_days=0),),
+                                 compact_threshold=100)
+        report = engine.run_once(now=time.time() + 1)
+        assert report["archived"] == 600 and report["purged"] == 600
+        assert report["reclaimed_bytes"] > 0
+        assert store.storage_stats()["reclaimed_bytes"] == report["reclaimed_bytes"]
+        assert store._con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2     # incremental from now on
+
+    def test_env_overrides(self):
+        policies = {p.category: p for p in policies_from_env("todo=14, bug=off, knowledge=x, nope=3")}
+        assert policies["todo"].archive_after_days == 14 and policies["todo"].purge_after_days == 180
+        assert policies["bug"].archive_after_days is None
+        assert "knowledge" not in policies and "nope" not in policies
+        assert policies["*"].max_importance == 3
@@ -0,0 +1,47 @@
+"""Tests for memory/segment.py (CJK segmentation and query keywords)."""
+from unittest.mock import patch
+
+import memory.segment as seg
+from memory.segment import Trie, query_keywords, terms
+
+
+class TestTrie:
+    def test_max_match_prefers_longest_words(self):
+        trie = Trie(["机器", "学习", "机器学习", "习惯"])
+        assert trie.forward("机器学习") == ["机器学习"]
+        assert "机器学习" in trie and "机器学" not in trie
+
+    def test_bidirectional_picks_fewer_words(self):
+        trie = Trie(["研究", "研究生", "生命", "起源"])
+        # forward: 研究生/命/起源 (3 words); backward: 研究/生命/起源 (3 words, no singles)
+        assert trie.segment("研究生命起源") == ["研究", "生命", "起源"]
+
+
+class TestKeywords:
+    def test_function_word_runs_are_not_keywords(self):
+        assert query_keywords("最近学习了什么") == ("学习",)
+        assert query_keywords("帮我找一下异步编程和数据库相关的笔记") == ("异步编程", "数据库", "笔记")
+
+    def test_unknown_characters_are_kept_together(self):
+        assert query_keywords("张三丰的剑法") == ("张三丰", "剑法")
+        assert query_keywords("周末去爬山") == ("周末", "爬山")
+
+    def test_english_stopwords_and_case(self):
+        assert query_keywords("How do I use Docker with Python") == ("docker", "python")
+
+    def test_fallbacks_never_return_empty(self):
+        assert query_keywords("怎么样") == ("怎么样",)
+        assert query_keywords("AI UI") == ("AI UI",)
+        assert query_keywords("   ") == ()
+
+    def test_terms_are_distinct(self):
+        assert terms("数据库 数据库 sqlite SQLite") == ["数据库", "sqlite"]
+
+    def test_jieba_backend_is_used_when_selected(self):
+        class FakeJieba:
+            @staticmethod
+            def lcut(text):
+                return [text[:2], text[2:]]
+
+        with patch.object(seg, "SEGMENTER", "jieba"), patch.object(seg, "jieba", FakeJieba):
+            assert terms("深色模式") == ["深色", "模式"]
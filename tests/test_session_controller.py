@@ -136,3 +136,70 @@ def test_session_controller_reset_reuses_rules():
     _drain_until_idle(ctrl)
     assert created["count"] == 2
 
+
+
+def test_session_controller_event_ids_support_resume():
+    ctrl = SessionController(brain_factory=lambda: FakeBrain([]), max_steps=1)
+    start = ctrl.last_event_id
+    ctrl._emit("status", text="a")
+    ctrl._emit("status", text="b")
+    events, missed = ctrl.events_since(start)
+    assert [e["text"] for e in events] == ["a", "b"]
+    assert events[1]["id"] == events[0]["id"] + 1 and missed is False
+    # Resuming after the first id replays only what came after it
+    events, _ = ctrl.events_since(events[0]["id"])
+    assert [e["text"] for e in events] == ["b"]
+    # Push readers do not consume the polling queue
+    assert [e["text"] for e in ctrl.drain_events()][-2:] == ["a", "b"]
+    assert ctrl.drain_events() == []
+
+
+def test_session_controller_events_since_waits_for_new_event():
+    import threading
+
+    ctrl = SessionController(brain_factory=lambda: FakeBrain([]), max_steps=1)
+    start = ctrl.last_event_id
+    threading.Timer(0.05, lambda: ctrl._emit("status", text="later")).start()
+    t0 = time.time()
+    events, _ = ctrl.events_since(start, timeout=2.0)
+    assert [e["text"] for e in events] == ["later"]
+    assert time.time() - t0 < 1.0
+
+
+def test_session_controller_reports_missed_events():
+    import core.session_controller as sc
+
+    ctrl = SessionController(brain_factory=lambda: FakeBrain([]), max_steps=1)
+    for i in range(sc._EVENT_BUFFER + 5):
+        ctrl._emit("status", text=str(i))
+    events, missed = ctrl.events_since(1)
+    assert missed is True
+    assert len(events) == 200
+
+
+def test_session_controller_resume_id_from_before_a_restart_is_missed():
+    ctrl = SessionController(brain_factory=lambda: FakeBrain([]), max_steps=1)
+    ctrl._emit("status", text="a")
+    t0 = time.time()
+    events, missed = ctrl.events_since(ctrl.last_event_id + 50, timeout=2.0)
+    assert events == [] and missed is True
+    assert time.time() - t0 < 1.0
+
+
+def test_session_restore_keeps_the_compaction_summary(tmp_path, monkeypatch):
+    import json
+
+    from core import session_controller
+    from core.compactor import SUMMARY_TAG
+
+    path = tmp_path / "sessions.json"
+    path.write_text(json.dumps({"current_session_id": "s1", "sessions": {"s1": {"id": "s1", "messages": [
+        {"role": "system", "content": "old prompt"},
+        {"role": "system", "content": f"{SUMMARY_TAG}\nearlier findings"},
+        {"role": "user", "content": "next question"},
+    ]}}}), encoding="utf-8")
+    monkeypatch.setattr(session_controller, "_SESSIONS_FILE", path)
+    ctrl = SessionController(brain_factory=FakeBrain)
+    assert [m["role"] for m in ctrl._brain.messages] == ["system", "system", "user"]
+    assert ctrl._brain.messages[0]["content"] == "x"
+    assert ctrl._brain.messages[1]["content"].endswith("earlier findings")
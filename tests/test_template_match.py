@@ -0,0 +1,189 @@
+"""Tests for actions/template_match.py and the find_image tool."""
+import os
+from unittest.mock import patch
+
+import pytest
+from PIL import Image, ImageDraw
+
+from actions import executor
+from actions import template_match as tm
+from actions.capture import FrameBuffer, ScreenCapture
+
+needs_numpy = pytest.mark.skipif(tm.np is None, reason="numpy not installed")
+
+
+def _icon(side=40, fill=(40, 90, 200), fg=(230, 200, 40)):
+    img = Image.new("RGB", (side, side), fill)
+    draw = ImageDraw.Draw(img)
+    draw.polygon([(side // 2, 4), (side - 4, side - 4), (4, side - 4)], fill=fg)
+    draw.rectangle((side // 2 - 3, side // 2, side // 2 + 3, side - 8), fill=(0, 0, 0))
+    return img
+
+
+def _screen(w=480, h=320):
+    img = Image.effect_noise((w, h), 30).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((30, 30, 300, 200), fill=(235, 235, 235), outline=(60, 60, 60))
+    for y in range(40, 190, 18):
+        draw.text((40, y), "lorem ipsum dolor", fill=(30, 30, 30))
+    return img
+
+
+def _scaled(img, scale):
+    return img.resize((round(img.width * scale), round(img.height * scale)), Image.Resampling.BILINEAR)
+
+
+@needs_numpy
+class TestNcc:
+    def test_matches_brute_force(self):
+        np = tm.np
+        rng = np.random.default_rng(1)
+        image = rng.random((30, 40, 3)).astype(np.float32) * 255
+        templ = image[7:17, 12:20].copy()
+        scores = tm.ncc(tm.prepare(image), templ)
+        assert scores.shape == (21, 33)
+        t = templ - templ.mean(axis=(0, 1))
+        y, x = 3, 5
+        win = image[y:y + 10, x:x + 8]
+        w = win - win.mean(axis=(0, 1))
+        expected = (w * t).sum() / np.sqrt((w * w).sum() * (t * t).sum())
+        assert abs(scores[y, x] - expected) < 1e-3
+        assert np.unravel_index(np.argmax(scores), scores.shape) == (7, 12)
+
+    def test_flat_template_scores_zero(self):
+        np = tm.np
+        scores = tm.ncc(np.ones((20, 20), np.float32), np.full((5, 5), 7.0, np.float32))
+        assert float(abs(scores).max()) == 0.0
+
+
+@needs_numpy
+class TestMatcher:
+    @pytest.mark.parametrize("scale", [1.0, 1.25, 1.5])
+    def test_finds_scaled_template(self, scale):
+        icon = _icon()
+        screen = _screen()
+        placed = _scaled(icon, scale)
+        screen.paste(placed, (333, 211))
+        matches = tm.TemplateMatcher().find(screen, tm.Template(icon))
+        assert matches and matches[0].scale == scale
+        assert matches[0].box == (333, 211, placed.width, placed.height)
+        assert matches[0].score > 0.95
+
+    def test_single_scale_misses_scaled_icon(self):
+        screen = _screen()
+        screen.paste(_scaled(_icon(), 1.5), (320, 200))
+        assert tm.TemplateMatcher().find(screen, tm.Template(_icon()), scales=(1.0,)) == []
+
+    def test_region_and_multiple_matches(self):
+        icon = _icon()
+        screen = _screen()
+        for x in (20, 330):
+            screen.paste(icon, (x, 250))
+        matcher = tm.TemplateMatcher()
+        both = matcher.find(screen, tm.Template(icon))
+        assert sorted(m.box[0] for m in both) == [20, 330]
+        right = matcher.find(screen, tm.Template(icon), region=(300, 200, 150, 110))
+        assert [m.box for m in right] == [(330, 250, 40, 40)]
+        assert len(matcher.find(screen, tm.Template(icon), limit=1)) == 1
+
+    def test_grayscale(self):
+        icon = _icon()
+        screen = _screen()
+        screen.paste(_scaled(icon, 1.25), (100, 220))
+        matches = tm.TemplateMatcher().find(screen, tm.Template(icon), grey=True)
+        assert matches and matches[0].box[:2] == (100, 220)
+
+    def test_reduced_screen_is_reused_for_the_same_frame(self):
+        icon = _icon()
+        screen = _screen()
+        screen.paste(icon, (200, 100))
+        matcher = tm.TemplateMatcher()
+        matcher.find(screen, tm.Template(icon), scales=(1.0,))
+        levels = matcher._screen[3]
+        assert levels
+        matcher.find(screen, tm.Template(_icon(fill=(200, 40, 40))), scales=(1.0,))
+        assert matcher._screen[3] is levels
+        matcher.find(screen.copy(), tm.Template(icon), scales=(1.0,))
+        assert matcher._screen[3] is not levels
+
+
+class TestTemplateCache:
+    def test_decoded_once_and_reloaded_when_edited(self, tmp_path):
+        path = tmp_path / "icon.png"
+        _icon().save(path)
+        cache = tm.TemplateCache(size=2)
+        first = cache.get(str(path))
+        assert cache.get(str(path)) is first
+        _icon(side=48).save(path)
+        os.utime(path, ns=(1, 1))
+        second = cache.get(str(path))
+        assert second is not first and second.size == (48, 48)
+        assert len(cache) == 1
+
+    def test_bounded(self, tmp_path):
+        cache = tm.TemplateCache(size=2)
+        for i in range(3):
+            p = tmp_path / f"{i}.png"
+            _icon().save(p)
+            cache.get(str(p))
+        assert len(cache) == 2
+
+
+class TestLatestFrame:
+    def test_recent_frame_is_reused(self):
+        cap = ScreenCapture(FrameBuffer(64, 48))
+        first = cap.grab()
+        assert cap.latest(max_age=10) is first
+        assert cap.latest(max_age=-1) is not first
+
+    def test_invalidated_frame_is_not_reused(self):
+        cap = ScreenCapture(FrameBuffer(64, 48))
+        first = cap.grab()
+        cap.invalidate()
+        fresh = cap.latest(max_age=10)
+        assert fresh is not first
+        assert cap.latest(max_age=10) is fresh
+
+
+class TestFindImageTool:
+    def _run(self, fb, args):
+        with patch.object(executor, "get_capture", return_value=ScreenCapture(fb)), \
+                patch.object(executor, "get_matcher", return_value=tm.TemplateMatcher()), \
+                patch.object(executor.pyautogui, "size", return_value=fb.size()):
+            return executor._tool_find_image(args)
+
+    @needs_numpy
+    def test_find_after_click_sees_the_new_screen(self, tmp_path):
+        path = tmp_path / "icon.png"
+        _icon().save(path)
+        fb = FrameBuffer(480, 320)
+        fb.image.paste(_screen())
+        cap = ScreenCapture(fb)
+        with patch("actions.capture._capture", cap), \
+                patch.object(executor, "get_capture", return_value=cap), \
+                patch.object(executor, "get_matcher", return_value=tm.TemplateMatcher()), \
+                patch.object(executor.pyautogui, "size", return_value=fb.size()), \
+                patch.object(executor, "mouse_click", side_effect=lambda *a: fb.image.paste(_icon(), (300, 200))):
+            cap.grab(baseline="screenshot")                     # screenshot
+            executor._tool_click({"x": 10, "y": 10})            # opens the dialog with the icon
+            res = executor._tool_find_image({"image_path": str(path)})
+        assert res["ok"] and (res["x"], res["y"]) == (320, 220)
+
+    def test_missing_template(self, tmp_path):
+        res = executor._tool_find_image({"image_path": str(tmp_path / "none.png")})
+        assert not res["ok"] and "不存在" in res["result"]
+
+    @needs_numpy
+    def test_returns_click_point_and_matches(self, tmp_path):
+        path = tmp_path / "icon.png"
+        _icon().save(path)
+        fb = FrameBuffer(480, 320)
+        fb.image.paste(_screen())
+        fb.image.paste(_scaled(_icon(), 1.25), (300, 200))
+        res = self._run(fb, {"image_path": str(path)})
+        assert res["ok"] and (res["x"], res["y"]) == (325, 225)
+        assert res["matches"][0]["scale"] == 1.25 and res["matches"][0]["box"] == [300, 200, 50, 50]
+        outside = self._run(fb, {"image_path": str(path), "region": [0, 0, 200, 150]})
+        assert not outside["ok"]
+        bad = self._run(fb, {"image_path": str(path), "region": [1000, 1000, 10, 10]})
+        assert not bad["ok"] and "region" in bad["result"]
@@ -0,0 +1,101 @@
+"""Tests for core/tokens.py - token counters and TokenLedger."""
+from unittest.mock import patch
+
+from core import tokens
+from core.tokens import EstimateCounter, TokenLedger, count_message, get_token_counter
+
+
+class TestEstimateCounter:
+    def test_ascii_text_is_four_chars_per_token(self):
+        assert EstimateCounter().count("A" * 400) == 100
+
+    def test_empty_text_counts_zero(self):
+        assert EstimateCounter().count("") == 0
+
+    def test_cjk_text_uses_model_rate(self):
+        text = "你好世界" * 25  # 100 CJK chars
+        assert EstimateCounter(cjk_rate=1.0).count(text) == 100
+        assert EstimateCounter(cjk_rate=0.6).count(text) == 60
+
+    def test_mixed_text_sums_both_classes(self):
+        text = "A" * 40 + "中" * 10
+        assert EstimateCounter(cjk_rate=1.0).count(text) == 20
+
+
+class TestGetTokenCounter:
+    def test_unknown_model_falls_back_to_estimator(self):
+        with patch.object(tokens, "tiktoken", None):
+            tokens._counters.clear()
+            counter = get_token_counter("some-local-model")
+        assert isinstance(counter, EstimateCounter)
+        assert counter.cjk_rate == 1.0
+
+    def test_model_family_selects_cjk_rate(self):
+        with patch.object(tokens, "tiktoken", None):
+            tokens._counters.clear()
+            assert get_token_counter("deepseek-chat").cjk_rate == 0.6
+            assert get_token_counter("claude-sonnet-4-20250514").cjk_rate == 1.2
+
+    def test_counter_is_cached_per_model(self):
+        with patch.object(tokens, "tiktoken", None):
+            tokens._counters.clear()
+            assert get_token_counter("m1") is get_token_counter("M1")
+
+
+class TestCountMessage:
+    def test_tool_call_arguments_are_counted(self):
+        msg = {
+            "role": "assistant",
+            "tool_calls": [{"id": "c1", "type": "function",
+                            "function": {"name": "web_search", "arguments": "A" * 400}}],
+        }
+        assert count_message(msg, EstimateCounter()) >= 100
+
+    def test_image_part_counts_fixed_tokens(self):
+        msg = {"role": "user", "content": [{"type": "image_url", "image_url": {"url": "x"}}]}
+        assert count_message(msg, EstimateCounter()) == tokens.IMAGE_TOKENS
+
+
+class _CountingCounter(EstimateCounter):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def count(self, text):
+        self.calls += 1
+        return super().count(text)
+
+
+class TestTokenLedger:
+    def test_only_new_messages_are_counted(self):
+        counter = _CountingCounter()
+        ledger = TokenLedger()
+        msgs = [{"role": "user", "content": "A" * 40} for _ in range(10)]
+        assert ledger.total(msgs, counter) == 100
+        assert counter.calls == 10
+        msgs.append({"role": "assistant", "content": "B" * 40})
+        assert ledger.total(msgs, counter) == 110
+        assert counter.calls == 11
+
+    def test_pop_triggers_recount(self):
+        ledger = TokenLedger()
+        counter = EstimateCounter()
+        msgs = [{"role": "user", "content": "A" * 40}, {"role": "assistant", "content": "B" * 400}]
+        assert ledger.total(msgs, counter) == 110
+        msgs.pop()
+        assert ledger.total(msgs, counter) == 10
+
+    def test_new_list_triggers_recount(self):
+        ledger = TokenLedger()
+        counter = EstimateCounter()
+        ledger.total([{"role": "user", "content": "A" * 400}], counter)
+        assert ledger.total([{"role": "user", "content": "A" * 40}], counter) == 10
+
+    def test_invalidate_picks_up_in_place_edits(self):
+        ledger = TokenLedger()
+        counter = EstimateCounter()
+        msgs = [{"role": "tool", "content": "A" * 400}]
+        ledger.total(msgs, counter)
+        msgs[0]["content"] = "A" * 40
+        ledger.invalidate()
+        assert ledger.total(msgs, counter) == 10
@@ -0,0 +1,96 @@
+"""Tests for actions/executor.py - execute_many() concurrency classes."""
+import threading
+import time
+from unittest.mock import patch
+
+from actions import executor
+
+
+def _action(name, i=0):
+    return {"id": f"c{i}", "name": name, "arguments": {"i": i}}
+
+
+class _Recorder:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.events: list[tuple[str, str, int]] = []
+        self.active = 0
+        self.peak = 0
+
+    def __call__(self, action):
+        i = action["arguments"]["i"]
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.events.append(("start", action["name"], i))
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+            self.events.append(("end", action["name"], i))
+        return {"ok": True, "result": f"{action['name']}#{i}"}
+
+
+def test_io_tools_overlap_and_keep_order():
+    rec = _Recorder()
+    actions = [_action("fetch_page", 0), _action("fetch_page", 1), _action("memory_recall", 2)]
+    with patch.object(executor, "execute", rec):
+        results = executor.execute_many(actions)
+    assert [r["result"] for r in results] == ["fetch_page#0", "fetch_page#1", "memory_recall#2"]
+    assert rec.peak >= 2
+
+
+def test_screen_tools_run_one_at_a_time_in_order():
+    rec = _Recorder(delay=0.01)
+    actions = [_action("click", 0), _action("type_text", 1), _action("screenshot", 2)]
+    with patch.object(executor, "execute", rec):
+        executor.execute_many(actions)
+    assert rec.peak == 1
+    assert [i for kind, _, i in rec.events if kind == "start"] == [0, 1, 2]
+
+
+def test_wait_stays_in_order_with_screen_actions():
+    rec = _Recorder(delay=0.01)
+    actions = [_action("click", 0), _action("wait", 1), _action("screenshot", 2)]
+    with patch.object(executor, "execute", rec):
+        executor.execute_many(actions)
+    order = [(kind, i) for kind, _, i in rec.events]
+    assert order.index(("end", 0)) < order.index(("start", 1))
+    assert order.index(("end", 1)) < order.index(("start", 2))
+
+
+def test_exclusive_tool_is_a_barrier():
+    rec = _Recorder(delay=0.02)
+    actions = [_action("fetch_page", 0), _action("file_write", 1), _action("fetch_page", 2)]
+    with patch.object(executor, "execute", rec):
+        executor.execute_many(actions)
+    order = [(kind, i) for kind, _, i in rec.events]
+    assert order.index(("end", 0)) < order.index(("start", 1))
+    assert order.index(("end", 1)) < order.index(("start", 2))
+
+
+def test_unknown_tools_default_to_exclusive():
+    assert executor.tool_concurrency("no_such_tool") == "exclusive"
+    assert executor.tool_concurrency("run_command") == "exclusive"
+    assert executor.tool_concurrency("web_search") == "io"
+
+
+def test_tool_exception_becomes_error_result():
+    def boom(action):
+        raise RuntimeError("kaput")
+
+    with patch.object(executor, "execute", boom):
+        results = executor.execute_many([_action("fetch_page", 0), _action("web_search", 1)])
+    assert all(r["ok"] is False and "kaput" in r["result"] for r in results)
+
+
+def test_every_builtin_schema_entry_has_a_handler():
+    names = [t["function"]["name"] for t in executor.TOOLS_SCHEMA]
+    assert all(executor._registry.get(n) is not None for n in names)
+    assert executor.get_tools_schema()[: len(names)] == executor.TOOLS_SCHEMA
+
+
+def test_missing_required_argument_is_reported():
+    result = executor.execute({"name": "fetch_page", "arguments": {}})
+    assert result["ok"] is False
+    assert "url" in result["result"]
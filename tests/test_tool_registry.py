@@ -0,0 +1,91 @@
+"""Tests for actions/tool_registry.py - ToolRegistry."""
+from actions.tool_registry import ToolRegistry
+
+
+def _schema(name, required=()):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": name,
+            "parameters": {"type": "object", "properties": {}, "required": list(required)},
+        },
+    }
+
+
+class _FakeSkills:
+    def __init__(self, tools, concurrency=None):
+        self.generation = 1
+        self.tools = tools
+        self.concurrency = concurrency or {}
+        self.calls = []
+
+    @property
+    def tools_schema(self):
+        return [_schema(n) for n in self.tools]
+
+    def tool_concurrency(self, name):
+        return self.concurrency.get(name)
+
+    def skill_for_tool(self, name):
+        return "fake" if name in self.tools else None
+
+    def execute(self, name, args):
+        self.calls.append((name, args))
+        return {"ok": True, "result": name}
+
+
+def _registry(skills=None):
+    reg = ToolRegistry()
+
+    @reg.tool("alpha", concurrency="io")
+    def _alpha(args):
+        return {"ok": True, "result": "a"}
+
+    @reg.tool("beta", screen_lock=True, concurrency="screen")
+    def _beta(args):
+        return {"ok": True, "result": "b"}
+
+    reg.set_builtin_schema([_schema("alpha", required=["q"]), _schema("beta")], bg_excluded={"beta"})
+    if skills is not None:
+        reg.attach_skills(skills)
+    return reg
+
+
+def test_builtin_lookup_and_required_args():
+    reg = _registry()
+    spec = reg.get("alpha")
+    assert spec.concurrency == "io"
+    assert "q" in spec.check({})
+    assert spec.check({"q": 1}) is None
+    assert reg.get("missing") is None
+
+
+def test_skill_tools_dispatch_through_skill_manager():
+    skills = _FakeSkills(["zeta", "gamma"], concurrency={"gamma": "io"})
+    reg = _registry(skills)
+    assert reg.get("gamma").concurrency == "io"
+    assert reg.get("zeta").concurrency == "exclusive"
+    assert reg.get("zeta").handler({"x": 1}) == {"ok": True, "result": "zeta"}
+    assert skills.calls == [("zeta", {"x": 1})]
+
+
+def test_schema_is_cached_until_skills_change():
+    skills = _FakeSkills(["zeta", "gamma"])
+    reg = _registry(skills)
+    first = reg.tools_schema()
+    assert [t["function"]["name"] for t in first] == ["alpha", "beta", "gamma", "zeta"]
+    assert reg.tools_schema() is first
+    skills.tools.append("delta")
+    skills.generation += 1
+    assert [t["function"]["name"] for t in reg.tools_schema()][-3:] == ["delta", "gamma", "zeta"]
+
+
+def test_background_schema_excludes_screen_tools():
+    reg = _registry(_FakeSkills([]))
+    assert [t["function"]["name"] for t in reg.tools_schema(background=True)] == ["alpha"]
+
+
+def test_invalid_concurrency_falls_back_to_exclusive():
+    reg = _registry(_FakeSkills(["zeta"], concurrency={"zeta": "bogus"}))
+    assert reg.get("zeta").concurrency == "exclusive"
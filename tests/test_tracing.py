@@ -0,0 +1,137 @@
+"""Tests for core/tracing.py and the spans recorded around LLM calls, tools, memory and fetches."""
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from core import tracing
+from core.tracing import Tracer, chrome_trace, format_span, format_summary, traced
+
+
+@pytest.fixture
+def tracer():
+    t = Tracer(size=100, path="")
+    with patch.object(tracing, "_tracer", t):
+        yield t
+
+
+class TestTracer:
+    def test_span_records_duration_and_attributes(self, tracer):
+        with tracer.span("tool.x", cat="tool", args_size=3) as sp:
+            sp.set(result_size=10)
+            sp.mark("lock_wait")
+        (rec,) = tracer.recent()
+        assert rec.name == "tool.x" and rec.cat == "tool"
+        assert rec.attrs["args_size"] == 3 and rec.attrs["result_size"] == 10
+        assert rec.attrs["lock_wait_ms"] >= 0 and rec.duration >= 0 and not rec.error
+
+    def test_exception_is_recorded_and_reraised(self, tracer):
+        with pytest.raises(KeyError):
+            with tracer.span("boom"):
+                raise KeyError("x")
+        assert tracer.recent()[0].error == "KeyError"
+
+    def test_buffer_is_bounded(self):
+        t = Tracer(size=3, path="")
+        for i in range(5):
+            with t.span(f"s{i}"):
+                pass
+        assert [s.name for s in t.recent(0)] == ["s2", "s3", "s4"]
+        assert [s.name for s in t.recent(2)] == ["s3", "s4"]
+
+    def test_disabled_tracer_keeps_nothing(self):
+        t = Tracer(size=0, path="")
+        with t.span("x") as sp:
+            sp.set(a=1)
+        assert not t.enabled and t.recent(0) == []
+
+    def test_summary_orders_by_total_time(self):
+        t = Tracer(size=100, path="")
+        for name, ms in [("fast", 1), ("fast", 3), ("slow", 50), ("fast", 2)]:
+            t.record(tracing.Span(name, duration=ms / 1000))
+        rows = t.summary()
+        assert [r["name"] for r in rows] == ["slow", "fast"]
+        fast = rows[1]
+        assert (fast["count"], fast["p50_ms"], fast["max_ms"], fast["total_ms"]) == (3, 2.0, 3.0, 6.0)
+        assert "fast: 3 次" in format_summary(rows)
+        assert t.snapshot(top=1)["top"][0]["name"] == "slow"
+
+    def test_trace_file_holds_chrome_events(self, tmp_path):
+        path = tmp_path / "trace.jsonl"
+        t = Tracer(size=10, path=str(path))
+        with t.span("llm.stream", cat="llm", model="m"):
+            pass
+        with t.span("tool.y"):
+            pass
+        t.close()
+        lines = path.read_text(encoding="utf-8").splitlines()
+        ev = json.loads(lines[0])
+        assert ev["ph"] == "X" and ev["name"] == "llm.stream" and ev["cat"] == "llm"
+        assert ev["dur"] >= 1 and ev["args"] == {"model": "m"}
+        doc = chrome_trace(lines)
+        assert [e["name"] for e in doc["traceEvents"]] == ["llm.stream", "tool.y"]
+
+    def test_export_writes_buffer(self, tmp_path):
+        t = Tracer(size=10, path="")
+        with t.span("a"):
+            pass
+        path, count = t.export(str(tmp_path / "out.json"))
+        assert count == 1
+        assert json.loads(open(path, encoding="utf-8").read())["traceEvents"][0]["name"] == "a"
+
+    def test_traced_records_result_length(self, tracer):
+        @traced("memory.search", cat="memory", count="rows")
+        def search(q):
+            return [q, q]
+
+        assert search("x") == ["x", "x"]
+        rec = tracer.recent()[0]
+        assert rec.name == "memory.search" and rec.attrs == {"rows": 2}
+        assert "memory.search" in format_span(rec) and "rows=2" in format_span(rec)
+
+
+class TestInstrumentation:
+    def test_execute_records_tool_span(self, tracer):
+        from actions import executor
+        res = executor.execute({"name": "no_such_tool", "arguments": '{"a": 1}'})
+        assert not res["ok"]
+        rec = tracer.recent()[-1]
+        assert rec.name == "tool.no_such_tool" and rec.cat == "tool"
+        assert rec.attrs["args_size"] == 8 and rec.attrs["ok"] is False
+        assert rec.attrs["result_size"] == len(res["result"])
+
+    def test_stream_span_has_ttft_and_tokens(self, tracer):
+        from tests.test_brain import TestBrainAsyncStream, make_brain
+        brain = make_brain()
+        usage = SimpleNamespace(prompt_tokens=120, completion_tokens=7)
+        chunks = [TestBrainAsyncStream._chunk("Hi"), TestBrainAsyncStream._chunk(usage=usage)]
+        brain.llm.aclient.chat.completions.create = AsyncMock(
+            return_value=TestBrainAsyncStream._FakeStream(chunks))
+        asyncio.run(brain._acall_native_stream())
+        rec = [s for s in tracer.recent(0) if s.cat == "llm"][-1]
+        assert rec.name == "llm.stream" and rec.attrs["model"] == "test-model"
+        assert "ttft_ms" in rec.attrs
+        assert (rec.attrs["input_tokens"], rec.attrs["output_tokens"]) == (120, 7)
+
+    def test_fetch_url_text_records_source(self, tracer):
+        from actions import web_helpers
+        with patch.object(web_helpers, "_fetch_url_text", return_value=("hello", "cache")):
+            assert web_helpers.fetch_url_text("https://example.com/a") == "hello"
+        rec = tracer.recent()[-1]
+        assert rec.name == "web.fetch"
+        assert rec.attrs == {"host": "example.com", "source": "cache", "chars": 5}
+
+    def test_memory_queries_are_traced(self, tracer, tmp_path):
+        from memory.store import MemoryStore
+        store = MemoryStore(db_path=str(tmp_path / "m.db"))
+        try:
+            store.save("knowledge", "tracing spans record durations", 5)
+            store.search_multi("tracing spans")
+        finally:
+            store.close()
+        names = [s.name for s in tracer.recent(0)]
+        assert "memory.upsert" in names and "memory.search_multi" in names
+        rec = [s for s in tracer.recent(0) if s.name == "memory.search_multi"][-1]
+        assert rec.attrs["rows"] >= 1
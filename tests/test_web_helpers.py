@@ -1,11 +1,15 @@
 from types import SimpleNamespace
 
+import pytest
+
 from actions import web_helpers
+from actions.page_cache import PageCache
 
 
-def setup_function():
-    # Isolate in-memory cache across tests.
-    web_helpers._page_cache.clear()
+@pytest.fixture(autouse=True)
+def _isolated_page_cache(monkeypatch):
+    # Memory-only cache per test; never touch the on-disk store.
+    monkeypatch.setattr(web_helpers, "_page_cache", PageCache(db_path=None))
 
 
 def test_do_web_search_uses_ddg_results(monkeypatch):
@@ -31,11 +35,11 @@ def test_do_web_search_falls_back_to_bing(monkeypatch):
 def test_fetch_url_text_caches_success(monkeypatch):
     calls = {"n": 0}
 
-    def fake_get(url, headers=None, timeout=None):
+    def fake_get(url, **kwargs):
         calls["n"] += 1
         return SimpleNamespace(text="<html><body>hello</body></html>", apparent_encoding="utf-8", encoding=None)
 
-    monkeypatch.setattr(web_helpers.requests, "get", fake_get)
+    monkeypatch.setattr(web_helpers.http_client, "get", fake_get)
     monkeypatch.setattr(web_helpers, "extract_html_text", lambda html: "hello")
 
     first = web_helpers.fetch_url_text("https://example.com")
@@ -49,13 +53,13 @@ def test_fetch_url_text_caches_success(monkeypatch):
 def test_fetch_url_text_retries_then_succeeds(monkeypatch):
     calls = {"n": 0}
 
-    def fake_get(url, headers=None, timeout=None):
+    def fake_get(url, **kwargs):
         calls["n"] += 1
         if calls["n"] < 3:
             raise RuntimeError("temporary")
         return SimpleNamespace(text="<html>ok</html>", apparent_encoding="utf-8", encoding=None)
 
-    monkeypatch.setattr(web_helpers.requests, "get", fake_get)
+    monkeypatch.setattr(web_helpers.http_client, "get", fake_get)
     monkeypatch.setattr(web_helpers, "extract_html_text", lambda html: "ok")
     monkeypatch.setattr(web_helpers.time, "sleep", lambda s: None)
 
@@ -67,11 +71,11 @@ def test_fetch_url_text_retries_then_succeeds(monkeypatch):
 def test_fetch_url_text_returns_empty_after_retries(monkeypatch):
     calls = {"n": 0}
 
-    def fake_get(url, headers=None, timeout=None):
+    def fake_get(url, **kwargs):
         calls["n"] += 1
         raise RuntimeError("down")
 
-    monkeypatch.setattr(web_helpers.requests, "get", fake_get)
+    monkeypatch.setattr(web_helpers.http_client, "get", fake_get)
     monkeypatch.setattr(web_helpers.time, "sleep", lambda s: None)
 
     got = web_helpers.fetch_url_text("https://down.test")
@@ -103,3 +107,27 @@ def test_extract_html_text_prefers_trafilatura_when_long_text(monkeypatch):
     got = web_helpers.extract_html_text("<html><body>ignored</body></html>")
     assert got == long_text
 
+
+
+def test_stale_page_revalidates_with_etag_and_skips_extraction_on_304(monkeypatch):
+    sent = []
+    responses = [
+        SimpleNamespace(status_code=200, text="<html>v1</html>", apparent_encoding="utf-8",
+                        encoding=None, headers={"ETag": '"abc"'}),
+        SimpleNamespace(status_code=304, text="", apparent_encoding="utf-8", encoding=None, headers={}),
+    ]
+
+    def fake_get(url, headers=None, **kwargs):
+        sent.append(dict(headers or {}))
+        return responses.pop(0)
+
+    extracted = []
+    monkeypatch.setattr(web_helpers.http_client, "get", fake_get)
+    monkeypatch.setattr(web_helpers, "extract_html_text", lambda html: extracted.append(html) or "v1 text")
+
+    assert web_helpers.fetch_url_text("https://etag.test") == "v1 text"
+    web_helpers._page_cache.get("https://etag.test").fetched_at = 0  # force stale
+    assert web_helpers.fetch_url_text("https://etag.test") == "v1 text"
+
+    assert sent[1].get("If-None-Match") == '"abc"'
+    assert len(extracted) == 1
@@ -21,3 +21,82 @@ def test_start_webui_parse_cli():
     assert parsed["host"] == "0.0.0.0"
     assert parsed["port"] == 9999
     assert parsed["open_browser"] is False
+
+
+def test_webui_event_stream_pushes_and_resumes_from_last_event_id():
+    import http.client
+
+    mod = importlib.import_module("comms.webui_server")
+
+    class FakeService:
+        def __init__(self):
+            self.events = [{"id": i, "type": "status", "text": f"e{i}"} for i in range(1, 4)]
+            self.asked = []
+
+        def chat_event_cursor(self):
+            return 3
+
+        def wait_chat_events(self, after_id, *, timeout=15.0, limit=200):
+            self.asked.append(after_id)
+            return {"ok": True, "data": {"events": [e for e in self.events if e["id"] > after_id], "missed": False}}
+
+        def status(self):
+            return {"ok": True, "data": {"session_busy": False}}
+
+    service = FakeService()
+    server = mod.WebUiServer(service=service, port=0)
+    server.start()
+    try:
+        conn = http.client.HTTPConnection(server.host, server.port, timeout=5)
+        conn.request("GET", "/api/chat/stream", headers={"Last-Event-ID": "1"})
+        resp = conn.getresponse()
+        assert resp.status == 200
+        assert resp.getheader("Content-Type").startswith("text/event-stream")
+        body = b""
+        while b"event: status" not in body:
+            body += resp.read1(4096)
+        text = body.decode("utf-8")
+        assert "id: 2\n" in text and "id: 3\n" in text and "id: 1\n" not in text
+        assert service.asked[0] == 1
+        conn.close()
+    finally:
+        server.stop()
+
+
+def test_webui_event_stream_resets_a_resume_id_from_before_a_restart():
+    import http.client
+
+    mod = importlib.import_module("comms.webui_server")
+
+    class FakeService:
+        def __init__(self):
+            self.asked = []
+
+        def chat_event_cursor(self):
+            return 2
+
+        def wait_chat_events(self, after_id, *, timeout=15.0, limit=200):
+            self.asked.append(after_id)
+            if after_id > 2:
+                return {"ok": True, "data": {"events": [], "missed": True}}
+            return {"ok": True, "data": {"events": [{"id": 3, "type": "status", "text": "new"}], "missed": False}}
+
+        def status(self):
+            return {"ok": True, "data": {"session_busy": False}}
+
+    service = FakeService()
+    server = mod.WebUiServer(service=service, port=0)
+    server.start()
+    try:
+        conn = http.client.HTTPConnection(server.host, server.port, timeout=5)
+        conn.request("GET", "/api/chat/stream", headers={"Last-Event-ID": "40"})
+        resp = conn.getresponse()
+        body = b""
+        while b"id: 3\n" not in body:
+            body += resp.read1(4096)
+        text = body.decode("utf-8")
+        assert 'event: gap\ndata: {"restarted": true}' in text
+        assert service.asked[:2] == [40, 2]
+        conn.close()
+    finally:
+        server.stop()
@@ -0,0 +1,166 @@
+"""Benchmark MemoryStore.search_multi against the previous per-keyword recall path.
+
+Usage:
+    python -m tools.bench_memory_recall                 # 10k and 100k rows
+    python -m tools.bench_memory_recall --rows 10000 --queries 100 --json out.json
+
+The legacy path (up to 8 FTS queries + LIKE fallbacks, merged and re-ranked in
+Python) is reproduced here on top of the store's ``_fts_one`` / ``_like_one``
+helpers so both paths run against the same database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from memory.store import CATEGORIES, MemoryStore
+
+ZH_WORDS = [
+    "异步编程", "数据库", "索引", "缓存", "机器学习", "神经网络", "部署", "容器", "网络请求", "并发",
+    "内存泄漏", "性能优化", "日志", "配置文件", "正则表达式", "爬虫", "截图", "快捷键", "浏览器", "定时任务",
+    "向量检索", "分词", "全文搜索", "事务", "线程池", "协程", "视频学习", "字幕", "摘要", "知识点",
+]
+EN_WORDS = [
+    "python", "asyncio", "sqlite", "docker", "redis", "kubernetes", "pytorch", "numpy", "pandas", "discord",
+    "webhook", "latency", "throughput", "tokenizer", "embedding", "cache", "index", "thread", "socket", "proxy",
+]
+ZH_FILLER = ["今天", "学习了", "发现", "记录一下", "用户喜欢", "注意", "最近", "关于", "的问题", "解决方法是"]
+
+# Fixed "now" for the synthetic created_at ages (2026-01-01 UTC), so a seed
+# always produces the same corpus
+CORPUS_EPOCH = 1767225600.0
+
+
+def make_corpus(n: int, seed: int = 7, now: float = CORPUS_EPOCH) -> list[tuple[str, str, int, str]]:
+    """``n`` synthetic (category, content, importance, created_at) rows mixing CJK and English.
+
+    ``created_at`` spreads over the 180 days before ``now``.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        parts = []
+        for _ in range(rng.randint(3, 8)):
+            r = rng.random()
+            if r < 0.45:
+                parts.append(rng.choice(ZH_WORDS))
+            elif r < 0.75:
+                parts.append(rng.choice(EN_WORDS))
+            else:
+                parts.append(rng.choice(ZH_FILLER))
+        content = f"{' '.join(parts)} #{i}"
+        age = rng.random() * 180 * 86400
+        created = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now - age))
+        rows.append((rng.choice(CATEGORIES), content, rng.randint(1, 10), created))
+    return rows
+
+
+def make_queries(n: int, seed: int = 11) -> list[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        words = rng.sample(ZH_WORDS, rng.randint(1, 2)) + rng.sample(EN_WORDS, rng.randint(0, 2))
+        out.append("帮我找一下" + "和".join(words) + "相关的笔记")
+    return out
+
+
+def build_store(path: str, rows: list[tuple[str, str, int, str]], *, vectors: bool = True) -> MemoryStore:
+    store = MemoryStore(db_path=path, vector_search=vectors)
+    with store._lock:
+        store._con.executemany(
+            "INSERT INTO memories (category, content, importance, created_at) VALUES (?, ?, ?, ?)", rows,
+        )
+        store._con.commit()
+    # Embed everything up front so timings don't include the one-off backfill
+    store._vector_index(sync=True)
+    return store
+
+
+def legacy_search_multi(store: MemoryStore, query: str, limit: int = 8, category: str | None = None) -> list[dict]:
+    """The pre-recall-engine search_multi: one FTS (or LIKE) query per keyword."""
+    seen: set[str] = set()
+    results: list[dict] = []
+    for kw in store._keywords(query)[:8]:
+        if len(results) >= limit:
+            break
+        need = max(2, limit - len(results))
+        for item in store._fts_one(kw, need, category=category) or store._like_one(kw, need, category=category):
+            key = item.get("content", "")[:120]
+            if key not in seen:
+                seen.add(key)
+                results.append(item)
+    if results:
+        store._bump_access([r["id"] for r in results])
+    return results[:limit]
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "p50_ms": round(statistics.median(ms), 3),
+        "p99_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.99))], 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+    }
+
+
+def _time(fn, queries: list[str], limit: int) -> list[float]:
+    out = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q, limit)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def run(rows: int, queries: int, limit: int = 8, *, vectors: bool = True) -> dict:
+    qs = make_queries(queries)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = build_store(str(Path(tmp) / "bench.db"), make_corpus(rows), vectors=vectors)
+        try:
+            # Warm page cache for both paths
+            store.search_multi(qs[0], limit)
+            legacy_search_multi(store, qs[0], limit)
+            legacy = _time(lambda q, k: legacy_search_multi(store, q, k), qs, limit)
+            engine = _time(store.search_multi, qs, limit)
+        finally:
+            store.close()
+    report = {"rows": rows, "queries": queries, "limit": limit, "vectors": vectors,
+              "legacy": _percentiles(legacy), "search_multi": _percentiles(engine)}
+    report["speedup_p50"] = round(report["legacy"]["p50_ms"] / max(report["search_multi"]["p50_ms"], 1e-6), 2)
+    return report
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Benchmark MemoryStore recall (search_multi vs legacy per-keyword path).")
+    p.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="corpus sizes")
+    p.add_argument("--queries", type=int, default=200, help="queries per size")
+    p.add_argument("--limit", type=int, default=8, help="top-k per query")
+    p.add_argument("--no-vectors", action="store_true", help="disable hybrid vector recall in search_multi")
+    p.add_argument("--json", dest="json_path", default="", help="write the report to this JSON file")
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    reports = []
+    for n in args.rows:
+        r = run(n, args.queries, args.limit, vectors=not args.no_vectors)
+        reports.append(r)
+        print(
+            f"{n:>7} rows  legacy p50 {r['legacy']['p50_ms']:.2f} ms / p99 {r['legacy']['p99_ms']:.2f} ms"
+            f"   search_multi p50 {r['search_multi']['p50_ms']:.2f} ms / p99 {r['search_multi']['p99_ms']:.2f} ms"
+            f"   ({r['speedup_p50']}x)"
+        )
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(reports, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+"""Benchmark and regression check for the main MemoryStore operations.
+
+Usage:
+    python -m tools.bench_memory_store                          # 1k, 10k and 100k rows
+    python -m tools.bench_memory_store --rows 10000 --json now.json
+    python -m tools.bench_memory_store --json now.json --baseline last_release.json
+
+Each size gets a database that looks like a long-lived one: mixed CJK/English
+rows spread over six months, content hashes, LSH keys and vectors filled in.
+On it we time ``save``, ``search_multi``, ``list_by_category``,
+``get_preferences`` (uncached) and the trigram FTS migration
+(``_migrate_fts_trigram``, run against a rebuilt pre-trigram index).
+
+With ``--baseline`` the p50 of every operation is compared with the earlier
+report; the exit code is 1 when any of them got slower than ``--max-regression``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from memory.dedup import content_hash
+from memory.store import CATEGORIES, MemoryStore
+from tools.bench_memory_recall import _percentiles, make_corpus, make_queries
+
+OPS = ("save", "search_multi", "list_by_category", "get_preferences", "migrate_fts_trigram")
+
+_LEGACY_FTS = """
+    DROP TRIGGER IF EXISTS memories_ai;
+    DROP TRIGGER IF EXISTS memories_ad;
+    DROP TABLE IF EXISTS memories_fts;
+    CREATE VIRTUAL TABLE memories_fts USING fts5(content, content_rowid='id');
+    INSERT INTO memories_fts(rowid, content) SELECT id, content FROM memories;
+    CREATE TRIGGER memories_ai AFTER INSERT ON memories BEGIN
+        INSERT INTO memories_fts(rowid, content) VALUES (new.id, new.content);
+    END;
+    CREATE TRIGGER memories_ad AFTER DELETE ON memories BEGIN
+        DELETE FROM memories_fts WHERE rowid = old.id;
+    END;
+    DELETE FROM db_meta WHERE key = 'fts_tokenizer';
+"""
+
+
+def build_store(path: str, rows: list[tuple[str, str, int, str]]) -> MemoryStore:
+    """A store holding ``rows`` with every derived index (hash, LSH, vectors) up to date."""
+    store = MemoryStore(db_path=path)
+    with store._lock:
+        store._con.executemany(
+            "INSERT INTO memories (category, content, importance, created_at, content_hash) VALUES (?, ?, ?, ?, ?)",
+            [(cat, content, imp, created, content_hash(content)) for cat, content, imp, created in rows],
+        )
+        store._con.commit()
+    store._minhash_busy = True
+    store._minhash_batches(0)
+    store._vector_index(sync=True)
+    return store
+
+
+def _time(fn, args: list) -> list[float]:
+    out = []
+    for a in args:
+        t0 = time.perf_counter()
+        fn(a)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def _uncached_preferences(store: MemoryStore) -> list[str]:
+    store._invalidate_preferences()
+    return store.get_preferences()
+
+
+def _migrate_from_legacy(store: MemoryStore) -> float:
+    """Put the pre-trigram FTS index back, then time the migration alone."""
+    with store._lock:
+        store._con.executescript(_LEGACY_FTS)
+    t0 = time.perf_counter()
+    store._migrate_fts_trigram()
+    return time.perf_counter() - t0
+
+
+def run(rows: int, queries: int = 200, saves: int = 200, migrations: int = 3, limit: int = 8) -> dict:
+    qs = make_queries(queries)
+    # New rows from a different seed; the "#new" tag keeps them out of the exact-dup path
+    new_rows = [(cat, f"{content} #new", imp) for cat, content, imp, _ in make_corpus(saves, seed=23)]
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        store = build_store(str(Path(tmp) / "bench.db"), make_corpus(rows))
+        build_s = time.perf_counter() - t0
+        try:
+            store.search_multi(qs[0], limit)        # warm page cache and vector index
+            samples = {
+                "search_multi": _time(lambda q: store.search_multi(q, limit), qs),
+                "list_by_category": _time(
+                    lambda i: store.list_by_category(CATEGORIES[i % len(CATEGORIES)]), list(range(queries)),
+                ),
+                "get_preferences": _time(lambda _: _uncached_preferences(store), list(range(queries))),
+                "save": _time(lambda r: store.save(*r), new_rows),
+                "migrate_fts_trigram": [_migrate_from_legacy(store) for _ in range(migrations)],
+            }
+        finally:
+            store.close()
+    ops = {name: {**_percentiles(samples[name]), "n": len(samples[name])} for name in OPS}
+    return {"rows": rows, "build_s": round(build_s, 2), "ops": ops}
+
+
+def compare(baseline: list[dict], current: list[dict], max_regression: float = 0.25) -> list[str]:
+    """Operations whose p50 grew by more than ``max_regression`` (0.25 = 25%) at the same row count."""
+    before = {r["rows"]: r["ops"] for r in baseline}
+    problems = []
+    for report in current:
+        old_ops = before.get(report["rows"])
+        if not old_ops:
+            continue
+        for name, stats in report["ops"].items():
+            old = old_ops.get(name)
+            if not old or old["p50_ms"] <= 0:
+                continue
+            ratio = stats["p50_ms"] / old["p50_ms"]
+            if ratio > 1 + max_regression:
+                problems.append(
+                    f"{report['rows']} rows {name}: p50 {old['p50_ms']:.3f} -> {stats['p50_ms']:.3f} ms ({ratio:.2f}x)"
+                )
+    return problems
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Benchmark MemoryStore operations and compare against a baseline.")
+    p.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="corpus sizes")
+    p.add_argument("--queries", type=int, default=200, help="search/list/preference calls per size")
+    p.add_argument("--saves", type=int, default=200, help="save() calls per size")
+    p.add_argument("--migrations", type=int, default=3, help="trigram migration runs per size")
+    p.add_argument("--json", dest="json_path", default="", help="write the report to this JSON file")
+    p.add_argument("--baseline", default="", help="earlier JSON report to compare p50 latencies against")
+    p.add_argument("--max-regression", type=float, default=0.25,
+                   help="allowed p50 slowdown versus the baseline (0.25 = 25%%)")
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    results = []
+    for n in args.rows:
+        r = run(n, args.queries, args.saves, args.migrations)
+        results.append(r)
+        print(f"{n:>7} rows  (built in {r['build_s']:.1f} s)")
+        for name, s in r["ops"].items():
+            print(f"    {name:<20} p50 {s['p50_ms']:>9.3f} ms   p99 {s['p99_ms']:>9.3f} ms")
+    report = {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        problems = compare(baseline.get("results", []), results, args.max_regression)
+        for line in problems:
+            print(f"REGRESSION: {line}")
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,159 @@
+"""Benchmark frame-change detection on synthetic screen sequences.
+
+Usage:
+    python -m tools.bench_screen_change                       # 960x540 (what watch_screen compares) and 1920x1080
+    python -m tools.bench_screen_change --size 1920x1080 --frames 120 --json out.json
+
+Three detectors run over the same grey frames, each frame compared with the
+one before it:
+
+- ``legacy``: the old watch_screen check: threshold the difference, take
+  ``getbbox()`` and use the box area as the change ratio;
+- ``pil`` / ``numpy``: ``actions.capture.measure_change`` on its PIL and
+  NumPy paths (``numpy`` is skipped when NumPy is not installed).
+
+For every scenario the report has per-frame p50/p99 latency, the mean change
+ratio each detector reported and how many frames it would have kept as key
+frames (ratio above 1%; cells for the tile detectors, box area for legacy).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageDraw
+
+from actions import capture
+from tools.bench_memory_recall import _percentiles
+
+SCENARIOS = ("static", "corners", "video", "scroll", "typing")
+KEY_RATIO = 0.01
+TILE = 16
+MIN_PIXELS = 4
+THRESHOLD = 10
+
+
+def _desktop(w: int, h: int) -> Image.Image:
+    """Windows, a panel and some text over a soft noise background."""
+    img = Image.effect_noise((w, h), 24).point(lambda p: p // 2 + 60)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((w // 10, h // 8, w * 6 // 10, h * 7 // 8), fill=230)
+    draw.rectangle((w * 13 // 20, h // 8, w * 19 // 20, h // 2), fill=40)
+    for i in range(0, h * 5 // 8, 18):
+        draw.text((w // 10 + 10, h // 8 + 10 + i), "lorem ipsum dolor sit amet " * 2, fill=20)
+    return img
+
+
+def make_sequence(scenario: str, frames: int, w: int, h: int) -> list[Image.Image]:
+    """``frames`` grey frames of ``scenario``."""
+    base = _desktop(w, h)
+    out = []
+    for i in range(frames):
+        img = base.copy()
+        draw = ImageDraw.Draw(img)
+        if scenario == "static":
+            if i % 2:       # blinking caret
+                draw.rectangle((w // 3, h // 3, w // 3 + 1, h // 3 + 15), fill=0)
+        elif scenario == "corners":
+            s = max(2, w // 200)
+            v = 255 if i % 2 else 0
+            draw.rectangle((0, 0, s, s), fill=v)
+            draw.rectangle((w - 1 - s, h - 1 - s, w - 1, h - 1), fill=v)
+        elif scenario == "video":
+            vw, vh = w // 3, h // 3
+            img.paste(Image.effect_noise((vw, vh), 80 + i % 7), (w * 13 // 20, h // 2 + 20))
+        elif scenario == "scroll":
+            img = ImageChops.offset(base, 0, -(i * 24) % h)
+        elif scenario == "typing":
+            draw.text((w // 10 + 10, h * 3 // 4), "typed text " * (i % 12), fill=0)
+        else:
+            raise ValueError(f"unknown scenario {scenario!r}")
+        out.append(img)
+    return out
+
+
+def legacy_ratio(prev: Image.Image, cur: Image.Image) -> float:
+    bbox = ImageChops.difference(cur, prev).point(lambda p: 255 if p > THRESHOLD else 0).getbbox()
+    if not bbox:
+        return 0.0
+    return (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]) / float(cur.width * cur.height)
+
+
+def _detectors() -> dict:
+    def tiles(fn):
+        def run(prev, cur):
+            change = fn(prev, cur, TILE, THRESHOLD, MIN_PIXELS)
+            return change.ratio, change.tile_ratio
+        return run
+
+    def legacy(prev, cur):
+        r = legacy_ratio(prev, cur)
+        return r, r
+
+    out = {"legacy": legacy, "pil": tiles(capture._change_pil)}
+    if capture.np is not None:
+        out["numpy"] = tiles(capture._change_np)
+    return out
+
+
+def run(frames: int = 60, size: tuple[int, int] = (960, 540)) -> dict:
+    w, h = size
+    results = {}
+    for scenario in SCENARIOS:
+        seq = make_sequence(scenario, frames, w, h)
+        per = {}
+        for name, detect in _detectors().items():
+            samples, ratios, keys = [], [], 0
+            for prev, cur in zip(seq, seq[1:]):
+                t0 = time.perf_counter()
+                ratio, decide = detect(prev, cur)
+                samples.append(time.perf_counter() - t0)
+                ratios.append(ratio)
+                keys += decide > KEY_RATIO
+            per[name] = {**_percentiles(samples), "mean_ratio": round(statistics.fmean(ratios), 4), "key_frames": keys}
+        results[scenario] = per
+    return {"size": f"{w}x{h}", "frames": frames, "scenarios": results}
+
+
+def _size(text: str) -> tuple[int, int]:
+    w, _, h = text.lower().partition("x")
+    return int(w), int(h)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Benchmark screen change detectors on synthetic frame sequences.")
+    p.add_argument("--size", type=_size, nargs="+", default=[(960, 540), (1920, 1080)], help="frame sizes, WxH")
+    p.add_argument("--frames", type=int, default=60, help="frames per scenario")
+    p.add_argument("--json", dest="json_path", default="", help="write the report to this JSON file")
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    reports = []
+    for size in args.size:
+        r = run(args.frames, size)
+        reports.append(r)
+        print(f"{r['size']}  ({r['frames']} frames per scenario)")
+        for scenario, per in r["scenarios"].items():
+            for name, s in per.items():
+                print(f"    {scenario:<8} {name:<7} p50 {s['p50_ms']:>8.3f} ms   p99 {s['p99_ms']:>8.3f} ms"
+                      f"   ratio {s['mean_ratio']:>6.3f}   key frames {s['key_frames']}")
+    if args.json_path:
+        report = {
+            "python": platform.python_version(),
+            "numpy": getattr(capture.np, "__version__", None),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "results": reports,
+        }
+        Path(args.json_path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,171 @@
+"""Benchmark find_image template matching on synthetic screens.
+
+Usage:
+    python -m tools.bench_template_match                        # 1920x1080, 8 trials per scale
+    python -m tools.bench_template_match --size 2560x1440 --trials 5 --json out.json
+
+Each trial draws a desktop-like screen and pastes one of a few generated
+icons at a random spot, at display scale 1.0, 1.25 or 1.5 (the template
+itself is always saved at 1.0). Paths compared:
+
+- ``legacy``: what ``pyautogui.locateOnScreen`` did: decode the template
+  file, one full-resolution match at scale 1.0 only;
+- ``cold``: a fresh TemplateMatcher per call (decode, pyramid, coarse-to-fine);
+- ``warm``: the shared matcher on a new frame (template cache hit);
+- ``warm_grey``: as ``warm`` in grayscale-only mode;
+- ``roi``: as ``warm`` restricted to a 400x400 region around the icon.
+
+A trial is a hit when the best match's centre is within 4 px of the icon's.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from actions import template_match as tm
+from tools.bench_memory_recall import _percentiles
+
+SCALES = (1.0, 1.25, 1.5)
+PATHS = ("legacy", "cold", "warm", "warm_grey", "roi")
+ROI = 400
+
+
+def make_icons(n: int = 4, side: int = 40, seed: int = 5) -> list[Image.Image]:
+    rng = random.Random(seed)
+    icons = []
+    for i in range(n):
+        bg = tuple(rng.randrange(40, 220) for _ in range(3))
+        img = Image.new("RGB", (side, side), bg)
+        draw = ImageDraw.Draw(img)
+        fg = tuple(255 - c for c in bg)
+        if i % 2:
+            draw.ellipse((6, 6, side - 6, side - 6), fill=fg)
+        else:
+            draw.polygon([(side // 2, 4), (side - 4, side - 4), (4, side - 4)], fill=fg)
+        draw.text((side // 2 - 6, side // 2 - 6), chr(ord("A") + i), fill=(0, 0, 0))
+        icons.append(img)
+    return icons
+
+
+def make_screen(w: int, h: int, rng: random.Random) -> Image.Image:
+    """Noise background with window frames, panels and text."""
+    img = Image.effect_noise((w, h), 30).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x0, y0 = rng.randrange(w - 200), rng.randrange(h - 150)
+        x1, y1 = x0 + rng.randrange(150, w // 2), y0 + rng.randrange(100, h // 2)
+        draw.rectangle((x0, y0, x1, y1), fill=tuple(rng.randrange(200, 250) for _ in range(3)), outline=(60, 60, 60))
+        for ty in range(y0 + 8, min(y1, h) - 12, 18):
+            draw.text((x0 + 8, ty), "lorem ipsum dolor sit amet", fill=(30, 30, 30))
+    return img
+
+
+def _hit(best, center: tuple[int, int]) -> bool:
+    return best is not None and abs(best[0] - center[0]) <= 4 and abs(best[1] - center[1]) <= 4
+
+
+def _legacy(screen: Image.Image, path: str):
+    with Image.open(path) as f:
+        tpl = tm._array(f, False)
+    scores = tm.ncc(tm._array(screen, False), tpl)
+    i = int(tm.np.argmax(scores))
+    y, x = divmod(i, scores.shape[1])
+    if scores[y, x] < 0.8:
+        return None
+    return x + tpl.shape[1] // 2, y + tpl.shape[0] // 2
+
+
+def _best(matches):
+    return matches[0].center if matches else None
+
+
+def run(trials: int = 8, size: tuple[int, int] = (1920, 1080), seed: int = 3) -> dict:
+    rng = random.Random(seed)
+    w, h = size
+    icons = make_icons()
+    shared = tm.TemplateMatcher()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, icon in enumerate(icons):
+            p = str(Path(tmp) / f"icon{i}.png")
+            icon.save(p)
+            paths.append(p)
+        for scale in SCALES:
+            samples = {name: [] for name in PATHS}
+            hits = dict.fromkeys(PATHS, 0)
+            for t in range(trials):
+                k = t % len(icons)
+                icon = icons[k]
+                if scale != 1.0:
+                    icon = icon.resize((round(icon.width * scale), round(icon.height * scale)), Image.Resampling.BILINEAR)
+                screen = make_screen(w, h, rng)
+                x, y = rng.randrange(w - icon.width), rng.randrange(h - icon.height)
+                screen.paste(icon, (x, y))
+                center = (x + icon.width // 2, y + icon.height // 2)
+                rx, ry = max(0, min(x - ROI // 3, w - ROI)), max(0, min(y - ROI // 3, h - ROI))
+                calls = {
+                    "legacy": lambda: _legacy(screen, paths[k]),
+                    "cold": lambda: _best(tm.TemplateMatcher().find(screen, paths[k])),
+                    "warm": lambda: _best(shared.find(screen.copy(), paths[k])),
+                    "warm_grey": lambda: _best(shared.find(screen.copy(), paths[k], grey=True)),
+                    "roi": lambda: _best(shared.find(screen.copy(), paths[k], region=(rx, ry, ROI, ROI))),
+                }
+                shared.find(screen, paths[k])       # template decoded and its pyramid built
+                for name in PATHS:
+                    t0 = time.perf_counter()
+                    best = calls[name]()
+                    samples[name].append(time.perf_counter() - t0)
+                    hits[name] += _hit(best, center)
+            results[str(scale)] = {
+                name: {**_percentiles(samples[name]), "hit_rate": round(hits[name] / float(trials), 3)}
+                for name in PATHS
+            }
+    return {"size": f"{w}x{h}", "trials": trials, "scales": results}
+
+
+def _size(text: str) -> tuple[int, int]:
+    w, _, h = text.lower().partition("x")
+    return int(w), int(h)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Benchmark find_image template matching on synthetic screens.")
+    p.add_argument("--size", type=_size, default=(1920, 1080), help="screen size, WxH")
+    p.add_argument("--trials", type=int, default=8, help="screens per display scale")
+    p.add_argument("--json", dest="json_path", default="", help="write the report to this JSON file")
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if tm.np is None:
+        print("numpy is required for this benchmark")
+        return 1
+    r = run(args.trials, args.size)
+    print(f"{r['size']}  ({r['trials']} screens per scale, matcher: {'opencv' if tm.cv2 is not None else 'numpy'})")
+    for scale, per in r["scales"].items():
+        for name, s in per.items():
+            print(f"    x{scale:<5} {name:<10} p50 {s['p50_ms']:>9.1f} ms   p99 {s['p99_ms']:>9.1f} ms"
+                  f"   hit rate {s['hit_rate']:.0%}")
+    if args.json_path:
+        report = {
+            "python": platform.python_version(),
+            "backend": "opencv" if tm.cv2 is not None else "numpy",
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "results": [r],
+        }
+        Path(args.json_path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
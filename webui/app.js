@@ -377,7 +377,8 @@ const I18N = {
 
 const state = {
   activeView: "home",
-  seenEventKeys: new Set(),
+  lastEventId: 0,
+  eventSource: null,
   chatBusy: false,
   configDraft: {},
   skillItems: [],
@@ -1356,7 +1357,10 @@ function switchView(name) {
 async function loadStatus() {
   const res = await apiGet("/api/status");
   if (!res.ok) return;
-  const d = res.data || {};
+  applyStatus(res.data || {});
+}
+
+function applyStatus(d) {
   setBusy(!!d.session_busy);
   updateUsage(d.usage || {});
   if (d.model) {
@@ -1365,6 +1369,106 @@ async function loadStatus() {
   }
 }
 
+async function handleChatEvent(ev) {
+  // Events carry increasing ids; skip anything already handled (reconnects, poll+push overlap)
+  if (ev.id) {
+    if (ev.id <= state.lastEventId) return;
+    state.lastEventId = ev.id;
+  }
+
+  switch (ev.type) {
+    case "user":
+      appendChat("user", ev.text || "");
+      showThinkingBubble();
+      break;
+    case "assistant":
+      appendChat("assistant", ev.text || "");
+      break;
+    case "stream_start": {
+      removeThinkingBubble();
+      getOrCreateStreamBubble();
+      break;
+    }
+    case "stream_delta": {
+      const bubble = getOrCreateStreamBubble();
+      const contentEl = bubble.querySelector(".content");
+      if (contentEl) {
+        const prev = contentEl.dataset.raw || "";
+        const next = prev + (ev.text || "");
+        contentEl.dataset.raw = next;
+        contentEl.innerHTML = renderRichText(next);
+      }
+      els.chatFeed.scrollTop = els.chatFeed.scrollHeight;
+      break;
+    }
+    case "stream_end": {
+      const sb = document.getElementById("streamBubble");
+      if (sb) {
+        const ct = (sb.querySelector(".content")?.textContent || "").trim();
+        if (!ct) { sb.remove(); } else { sb.id = "assistantBubble"; }
+      }
+      break;
+    }
+    case "stream_clear": {
+      // LLM switched from text to tool calls — keep text in bubble
+      const sc = document.getElementById("streamBubble");
+      if (sc) {
+        const ct = (sc.querySelector(".content")?.textContent || "").trim();
+        if (!ct) { sc.remove(); } else { sc.id = "assistantBubble"; }
+      }
+      showThinkingBubble();
+      break;
+    }
+    case "status":
+      appendEventLog(ev.text || "");
+      break;
+    case "tool_call": {
+      const names = ev.names || [];
+      const label =
+        names && names.length
+          ? `工具运行中（${names.join("、")}）`
+          : "工具运行中";
+      showThinkingBubble(label);
+      appendEventLog(`${t("log.toolCall")}: ${names.join(", ")}`);
+      break;
+    }
+    case "tool_result":
+      appendEventLog(`${ev.done ? t("log.done") : t("log.step")}: ${ev.summary || ""}`);
+      if (ev.image && ev.image.base64) {
+        appendChatImage(ev.image, ev.summary || "");
+      }
+      if (!ev.done) {
+        showThinkingBubble("思考中");
+      } else {
+        // 工具已结束，移除“工具运行中/思考中”提示
+        removeThinkingBubble();
+      }
+      break;
+    case "confirm_request": {
+      removeThinkingBubble();
+      showConfirmCard(ev.tool, ev.args);
+      break;
+    }
+    case "done":
+      removeThinkingBubble();
+      // Finalize assistant bubble
+      const ab = document.getElementById("assistantBubble");
+      if (ab) ab.removeAttribute("id");
+      setBusy(false);
+      await loadSessions();
+      break;
+    case "error":
+      appendEventLog(`${t("toast.error")}: ${ev.message || ""}`);
+      showToast(ev.message || t("toast.error"), "error");
+      break;
+    case "cancelled":
+      appendEventLog(t("log.cancelled"));
+      break;
+    default:
+      break;
+  }
+}
+
 async function pollEvents() {
   try {
     const res = await apiGet("/api/chat/events?limit=200");
@@ -1372,112 +1476,58 @@ async function pollEvents() {
     const data = res.data || {};
     if (typeof data.busy === "boolean") setBusy(data.busy);
     if (data.usage) updateUsage(data.usage);
-
     for (const ev of data.events || []) {
-      const key = `${ev.type}:${ev.time}:${ev.text || ev.message || ev.reason || ""}`;
-      if (state.seenEventKeys.has(key)) continue;
-      state.seenEventKeys.add(key);
-      if (state.seenEventKeys.size > 5000) {
-        state.seenEventKeys = new Set([...state.seenEventKeys].slice(-3000));
-      }
-
-      switch (ev.type) {
-        case "user":
-          appendChat("user", ev.text || "");
-          showThinkingBubble();
-          break;
-        case "assistant":
-          appendChat("assistant", ev.text || "");
-          break;
-        case "stream_start": {
-          removeThinkingBubble();
-          getOrCreateStreamBubble();
-          break;
-        }
-        case "stream_delta": {
-          const bubble = getOrCreateStreamBubble();
-          const contentEl = bubble.querySelector(".content");
-          if (contentEl) {
-            const prev = contentEl.dataset.raw || "";
-            const next = prev + (ev.text || "");
-            contentEl.dataset.raw = next;
-            contentEl.innerHTML = renderRichText(next);
-          }
-          els.chatFeed.scrollTop = els.chatFeed.scrollHeight;
-          break;
-        }
-        case "stream_end": {
-          const sb = document.getElementById("streamBubble");
-          if (sb) {
-            const ct = (sb.querySelector(".content")?.textContent || "").trim();
-            if (!ct) { sb.remove(); } else { sb.id = "assistantBubble"; }
-          }
-          break;
-        }
-        case "stream_clear": {
-          // LLM switched from text to tool calls — keep text in bubble
-          const sc = document.getElementById("streamBubble");
-          if (sc) {
-            const ct = (sc.querySelector(".content")?.textContent || "").trim();
-            if (!ct) { sc.remove(); } else { sc.id = "assistantBubble"; }
-          }
-          showThinkingBubble();
-          break;
-        }
-        case "status":
-          appendEventLog(ev.text || "");
-          break;
-        case "tool_call": {
-          const names = ev.names || [];
-          const label =
-            names && names.length
-              ? `工具运行中（${names.join("、")}）`
-              : "工具运行中";
-          showThinkingBubble(label);
-          appendEventLog(`${t("log.toolCall")}: ${names.join(", ")}`);
-          break;
-        }
-        case "tool_result":
-          appendEventLog(`${ev.done ? t("log.done") : t("log.step")}: ${ev.summary || ""}`);
-          if (ev.image && ev.image.base64) {
-            appendChatImage(ev.image, ev.summary || "");
-          }
-          if (!ev.done) {
-            showThinkingBubble("思考中");
-          } else {
-            // 工具已结束，移除“工具运行中/思考中”提示
-            removeThinkingBubble();
-          }
-          break;
-        case "confirm_request": {
-          removeThinkingBubble();
-          showConfirmCard(ev.tool, ev.args);
-          break;
-        }
-        case "done":
-          removeThinkingBubble();
-          // Finalize assistant bubble
-          const ab = document.getElementById("assistantBubble");
-          if (ab) ab.removeAttribute("id");
-          setBusy(false);
-          await loadSessions();
-          break;
-        case "error":
-          appendEventLog(`${t("toast.error")}: ${ev.message || ""}`);
-          showToast(ev.message || t("toast.error"), "error");
-          break;
-        case "cancelled":
-          appendEventLog(t("log.cancelled"));
-          break;
-        default:
-          break;
-      }
+      await handleChatEvent(ev);
     }
   } catch (e) {
     appendEventLog(`${t("log.pollError")}: ${e}`);
   }
 }
 
+async function reloadTranscript() {
+  const ss = await apiGet("/api/chat/sessions");
+  if (!ss.ok) return;
+  renderTranscript((ss.data || {}).transcript || []);
+}
+
+// Server-Sent Events push channel; the browser reconnects on its own and
+// resumes from the last event id it saw (Last-Event-ID).
+function startEventStream() {
+  const es = new EventSource("/api/chat/stream");
+  let chain = Promise.resolve();
+  const enqueue = (fn) => {
+    chain = chain.then(fn).catch((e) => appendEventLog(`${t("log.pollError")}: ${e}`));
+  };
+  es.onmessage = (msg) => {
+    let ev;
+    try {
+      ev = JSON.parse(msg.data);
+    } catch {
+      return;
+    }
+    enqueue(() => handleChatEvent(ev));
+  };
+  es.addEventListener("status", (msg) => {
+    try {
+      applyStatus(JSON.parse(msg.data));
+    } catch {
+      /* ignore malformed status */
+    }
+  });
+  es.addEventListener("gap", (msg) => {
+    let restarted = false;
+    try {
+      restarted = !!JSON.parse(msg.data).restarted;
+    } catch {
+      /* plain gap */
+    }
+    // After a backend restart ids start over; forget the old high-water mark
+    if (restarted) state.lastEventId = 0;
+    enqueue(reloadTranscript);
+  });
+  return es;
+}
+
 // ── File attachments ──
 const pendingFiles = [];
 
@@ -2303,6 +2353,10 @@ async function bootstrapPanels() {
 }
 
 function startPolling() {
+  if (window.EventSource) {
+    state.eventSource = startEventStream();
+    return;
+  }
   setInterval(pollEvents, 700);
   setInterval(loadStatus, 5000);
 }